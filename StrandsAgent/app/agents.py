@@ -3,18 +3,35 @@
 from __future__ import annotations
 
 import logging
-from typing import Callable, Dict
+import threading
+import weakref
+from collections.abc import Iterator
+from contextlib import contextmanager
+from typing import Any, Awaitable, Callable, Dict
 
 from strands import Agent
-from strands.models import BedrockModel
+from strands.agent.state import AgentState
+from strands.models import BedrockModel, Model
+from strands.telemetry.metrics import EventLoopMetrics
 
+from .changefeed import ChangeFeed
 from .config import Settings, get_settings
 from .db import Database
+from .metrics import AGENT_RUN_SECONDS
+from .smart_queue import SmartQueue
+from .station_index import StationQueueIndex
+from .stub_model import StubModel
 from .tools import KitchenTools
+from .tracing import AgentTracer, RunStore, RunTrace, TracedModel
+from .write_behind import WriteBehindLog
 
 LOGGER = logging.getLogger(__name__)
 
 
+_MODEL_CACHE: dict[tuple[str | None, str | None], Model] = {}
+_MODEL_CACHE_LOCK = threading.Lock()
+
+
 def _build_model(settings: Settings) -> BedrockModel:
     model_kwargs: dict[str, object] = {}
     if settings.aws.region:
@@ -25,24 +42,91 @@ def _build_model(settings: Settings) -> BedrockModel:
     return BedrockModel(**model_kwargs)
 
 
+def _shared_model(settings: Settings) -> Model:
+    """Return the process-wide Bedrock model for the configured (region, model_id).
+
+    Creating a `BedrockModel` builds a boto client and resolves credentials, so it is
+    done once per key and reused by every agent. `AGENT_MODEL_PROVIDER=stub` swaps in
+    the offline `StubModel` instead.
+    """
+    if settings.model_provider == "stub":
+        key = ("stub", None)
+    else:
+        key = (settings.aws.region, settings.aws.bedrock_model_id)
+    with _MODEL_CACHE_LOCK:
+        model = _MODEL_CACHE.get(key)
+        if model is None:
+            model = StubModel() if settings.model_provider == "stub" else _build_model(settings)
+            _MODEL_CACHE[key] = model
+        return model
+
+
+def _reset_conversation(agent: Agent) -> None:
+    """Drop per-request conversation state so a cached agent can serve the next caller."""
+    agent.messages = []
+    agent.state = AgentState()
+    # Per-run metrics, so `AgentResult.metrics.tool_metrics` lists only that run's tools.
+    agent.event_loop_metrics = EventLoopMetrics()
+
+
 class AgentRegistry:
-    """Factory for all configured kitchen agents."""
+    """Factory for all configured kitchen agents.
+
+    Built agents are kept in a small per-name idle pool. `checkout` hands out an agent
+    with empty conversation state and returns it to the pool afterwards, so concurrent
+    requests never share messages while avoiding repeated model and tool-spec setup.
+
+    With tracing enabled each agent gets its own `AgentTracer`; `invoke` records a
+    `RunTrace` per call in `runs`.
+    """
 
-    def __init__(self, db: Database, settings: Settings | None = None) -> None:
+    def __init__(
+        self,
+        db: Database,
+        settings: Settings | None = None,
+        max_idle_per_agent: int | None = None,
+        change_feed: ChangeFeed | None = None,
+        station_index: StationQueueIndex | None = None,
+        write_behind: WriteBehindLog | None = None,
+    ) -> None:
         self._db = db
         self._settings = settings or get_settings()
-        self._tools = KitchenTools(db)
+        smart_queue = SmartQueue(
+            db,
+            merge_window=self._settings.smart_queue.merge_window,
+            default_capacity=self._settings.smart_queue.default_capacity,
+        )
+        self._tools = KitchenTools(
+            db,
+            change_feed=change_feed,
+            station_index=station_index,
+            smart_queue=smart_queue,
+            write_behind=write_behind,
+        )
+        self._max_idle = (
+            max_idle_per_agent if max_idle_per_agent is not None else self._settings.concurrency.agent_workers
+        )
+        self._idle: dict[str, list[Agent]] = {}
+        self._idle_lock = threading.Lock()
+        self.runs = RunStore(self._settings.tracing.max_runs)
+        self._tracers: weakref.WeakKeyDictionary[Agent, AgentTracer] = weakref.WeakKeyDictionary()
 
     def _agent(self, name: str, system_prompt: str, tools: list, description: str | None = None) -> Agent:
-        return Agent(
-            model=_build_model(self._settings),
+        model = _shared_model(self._settings)
+        tracer = AgentTracer(name, self.runs) if self._settings.tracing.enabled else None
+        agent = Agent(
+            model=TracedModel(model, tracer) if tracer is not None else model,
             system_prompt=system_prompt,
             agent_id=name,
             name=name,
             description=description,
             tools=tools,
             callback_handler=None,
+            hooks=[tracer] if tracer is not None else None,
         )
+        if tracer is not None:
+            self._tracers[agent] = tracer
+        return agent
 
     def build_station_dispatcher(self) -> Agent:
         prompt = (
@@ -51,9 +135,16 @@ class AgentRegistry:
         )
         tools = [
             self._tools.get_station_queue,
+            self._tools.get_station_batches,
             self._tools.start_ticket,
             self._tools.hold_ticket,
             self._tools.pass_ticket,
+            self._tools.start_tickets,
+            self._tools.hold_tickets,
+            self._tools.pass_tickets,
+            self._tools.transition_tickets,
+            self._tools.estimate_prep_time,
+            self._tools.rescore_tickets,
             self._tools.explain_ticket,
         ]
         return self._agent("station_dispatcher", prompt, tools)
@@ -87,10 +178,12 @@ class AgentRegistry:
     def build_prep_planner(self) -> Agent:
         prompt = (
             "Generate pre-service prep plans at least 30 minutes ahead. Combine forecasts with on-hand stock and "
-            "output item, quantity, start time plus rationale referencing forecast and inventory."
+            "output item, quantity, start time plus rationale referencing forecast and inventory. "
+            "Use generate_prep_plans_batch when several locations or windows are requested."
         )
         tools = [
             self._tools.generate_prep_plan,
+            self._tools.generate_prep_plans_batch,
             self._tools.summarize_prep_plan,
             self._tools.explain_prep_plan,
         ]
@@ -108,6 +201,7 @@ class AgentRegistry:
         tools = [
             self._tools.list_restock_risks,
             self._tools.create_po_from_recs,
+            self._tools.create_pos_bulk,
             self._tools.monthly_shopping_list,
             self._tools.notify,
         ]
@@ -144,11 +238,80 @@ class AgentRegistry:
         return {name: builder() for name, builder in self._builders().items()}
 
     def get_agent(self, name: str) -> Agent:
+        """Build a new agent owned by the caller (shares the cached model client)."""
         builders = self._builders()
         if name not in builders:
             raise KeyError(f"Unknown agent '{name}'")
         return builders[name]()
 
+    @contextmanager
+    def checkout(self, name: str) -> Iterator[Agent]:
+        """Borrow a pooled agent with fresh conversation state for a single request."""
+        with self._idle_lock:
+            idle = self._idle.get(name)
+            agent = idle.pop() if idle else None
+        if agent is None:
+            agent = self.get_agent(name)
+        try:
+            yield agent
+        finally:
+            _reset_conversation(agent)
+            with self._idle_lock:
+                idle = self._idle.setdefault(name, [])
+                if len(idle) < self._max_idle:
+                    idle.append(agent)
+
+    def run(self, agent: Agent, prompt: str) -> tuple[Any, RunTrace | None]:
+        """Invoke an agent owned by the caller, tracing the run when enabled."""
+        tracer = self._tracers.get(agent)
+        trace = tracer.begin(prompt) if tracer is not None else None
+        try:
+            with AGENT_RUN_SECONDS.time(agent=agent.name):
+                result = agent(prompt)
+        except BaseException as exc:
+            if tracer is not None:
+                tracer.finish(error=exc)
+            raise
+        if tracer is not None:
+            tracer.finish(result=result)
+        return result, trace
+
+    async def stream_run(
+        self, agent: Agent, prompt: str, on_event: Callable[[dict[str, Any]], Awaitable[None]]
+    ) -> tuple[Any, RunTrace | None]:
+        """Async counterpart of `run` over `agent.stream_async`; awaits `on_event` for every raw event."""
+        tracer = self._tracers.get(agent)
+        trace = tracer.begin(prompt) if tracer is not None else None
+        result = None
+        try:
+            with AGENT_RUN_SECONDS.time(agent=agent.name):
+                async for event in agent.stream_async(prompt):
+                    if "result" in event:
+                        result = event["result"]
+                    await on_event(event)
+        except BaseException as exc:
+            if tracer is not None:
+                tracer.finish(error=exc)
+            raise
+        if tracer is not None:
+            tracer.finish(result=result)
+        return result, trace
+
+    def invoke(self, name: str, prompt: str) -> tuple[Any, RunTrace | None]:
+        """Run a pooled agent once; returns the agent result and its trace (if tracing)."""
+        with self.checkout(name) as agent:
+            return self.run(agent, prompt)
+
+    def warm_up(self, names: list[str] | None = None) -> list[str]:
+        """Create the model client and one pooled agent per name ahead of the first request."""
+        warmed: list[str] = []
+        for name in names or self.agent_names():
+            with self.checkout(name):
+                pass
+            warmed.append(name)
+        LOGGER.info("Warmed up agents | names=%s", warmed)
+        return warmed
+
     def _builders(self) -> dict[str, Callable[[], Agent]]:
         return {
             "station_dispatcher": self.build_station_dispatcher,
@@ -2,24 +2,218 @@
 
 from __future__ import annotations
 
-from collections.abc import Generator
+import asyncio
+import functools
+import logging
+import threading
+import uuid
+from collections.abc import AsyncIterator, Iterator
+from contextlib import asynccontextmanager
+from itertools import islice
 from typing import Any
 
-from fastapi import Body, Depends, FastAPI, HTTPException, status
-from fastapi.encoders import jsonable_encoder
+from fastapi import Body, Depends, FastAPI, HTTPException, Request, status
+from fastapi.responses import JSONResponse, Response, StreamingResponse
 from pydantic import BaseModel
 
 from app.agents import AgentRegistry
+from app.breaches import BreachDetector
+from app.changefeed import ChangeFeed
 from app.config import get_settings
-from app.db import Database
+from app.db import STREAM_CHUNK_SIZE, Database
+from app.executor import BoundedExecutor, ExecutorSaturated
+from app.fast_path import FastPathRequestError, FastPathRouter
+from app.forecasting import DemandForecaster
+from app.prep_times import PrepTimeLearner
+from app.purchasing import restock_risks_params, stream_restock_risks
+from app.metrics import METRICS
+from app.response_cache import AGENT_TABLES, ResponseCache
+from app.scoring import PriorityScorer
+from app.shopping import shopping_items, stream_ingredient_usage
+from app.station_index import StationQueueIndex
+from app.streaming import NDJSON_MEDIA_TYPE, SSE_MEDIA_TYPE, AgentRunStream, encode_ndjson, encode_sse
+from app.utils import dumps_bytes
+from app.write_behind import WriteBehindLog
 
-app = FastAPI(title="Kitchen Agents API", version="1.0.0")
+LOGGER = logging.getLogger(__name__)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI) -> AsyncIterator[None]:
+    """Open one shared pool and registry for the process; drain them on shutdown."""
+
+    settings = get_settings()
+    database = Database(settings.database)
+    try:
+        database.wait_ready()
+    except RuntimeError:
+        database.close(timeout=0)
+        raise
+    concurrency = settings.concurrency
+    if concurrency.tool_workers > settings.database.max_size:
+        LOGGER.warning(
+            "API_TOOL_WORKERS=%s exceeds DB_POOL_MAX_SIZE=%s; tool calls will queue on the pool",
+            concurrency.tool_workers,
+            settings.database.max_size,
+        )
+    executor = BoundedExecutor(
+        {"agents": concurrency.agent_workers, "tools": concurrency.tool_workers},
+        max_queue=concurrency.max_queue,
+    )
+    feed: ChangeFeed | None = None
+    if settings.change_feed.enabled:
+        feed = ChangeFeed(
+            settings.database,
+            database,
+            max_staleness=settings.change_feed.max_staleness,
+            resync_interval=settings.change_feed.resync_interval,
+        )
+        feed.start()
+    station_index: StationQueueIndex | None = None
+    if settings.station_index.enabled:
+        station_index = StationQueueIndex(database, reconcile_interval=settings.station_index.reconcile_interval)
+        if feed is not None:
+            feed.add_listener(station_index.on_change)
+        station_index.start()
+    write_behind: WriteBehindLog | None = None
+    if settings.write_behind.enabled:
+        write_behind = WriteBehindLog(
+            database,
+            settings.write_behind.path,
+            batch_size=settings.write_behind.batch_size,
+            flush_interval=settings.write_behind.flush_interval,
+        )
+        write_behind.start()
+    registry = AgentRegistry(
+        database, settings, change_feed=feed, station_index=station_index, write_behind=write_behind
+    )
+    try:
+        registry.warm_up()
+    except Exception:  # noqa: BLE001
+        LOGGER.warning("Agent warm-up failed; agents will be built on first use", exc_info=True)
+    detector: BreachDetector | None = None
+    if settings.breach_detector.enabled:
+        detector = BreachDetector(
+            database,
+            location_id=settings.breach_detector.location_id,
+            discovery_interval=settings.breach_detector.discovery_interval,
+            resync_interval=settings.breach_detector.resync_interval,
+        )
+        if feed is not None:
+            feed.add_listener(detector.on_change)
+        detector.start()
+    scorer: PriorityScorer | None = None
+    if settings.scoring.enabled:
+        scorer = PriorityScorer(
+            database,
+            location_id=settings.scoring.location_id,
+            interval=settings.scoring.interval,
+        )
+        scorer.start()
+    learner: PrepTimeLearner | None = None
+    if settings.prep_times.enabled:
+        learner = PrepTimeLearner(
+            database,
+            interval=settings.prep_times.interval,
+            alpha=settings.prep_times.alpha,
+            chunk_size=settings.prep_times.chunk_size,
+            min_observations=settings.prep_times.min_observations,
+        )
+        learner.start()
+    forecaster: DemandForecaster | None = None
+    if settings.forecasts.enabled:
+        forecaster = DemandForecaster(
+            database,
+            settings.database,
+            interval=settings.forecasts.interval,
+            workers=settings.forecasts.workers,
+            horizon_days=settings.forecasts.horizon_days,
+            history_days=settings.forecasts.history_days,
+            alpha=settings.forecasts.alpha,
+        )
+        forecaster.start()
+    cache: ResponseCache | None = None
+    if settings.response_cache.enabled:
+        cache = ResponseCache(
+            settings.database,
+            ttl=settings.response_cache.ttl,
+            max_bytes=settings.response_cache.max_bytes,
+            agents={name: AGENT_TABLES[name] for name in settings.response_cache.agents if name in AGENT_TABLES},
+        )
+        cache.start()
+    app.state.database = database
+    app.state.registry = registry
+    app.state.executor = executor
+    app.state.breach_detector = detector
+    app.state.change_feed = feed
+    app.state.station_index = station_index
+    app.state.scorer = scorer
+    app.state.prep_time_learner = learner
+    app.state.forecaster = forecaster
+    app.state.fast_path = FastPathRouter(registry.call_tool)
+    app.state.response_cache = cache
+    app.state.write_behind = write_behind
+    LOGGER.info("Kitchen agents API started | pool=%s", database.stats())
+    try:
+        yield
+    finally:
+        if cache is not None:
+            cache.stop()
+        if forecaster is not None:
+            forecaster.stop()
+        if learner is not None:
+            learner.stop()
+        if scorer is not None:
+            scorer.stop()
+        if detector is not None:
+            detector.stop()
+        if station_index is not None:
+            station_index.stop()
+        if feed is not None:
+            feed.stop()
+        executor.shutdown(wait=True)
+        if write_behind is not None:
+            write_behind.stop()
+        LOGGER.info("Draining database pool")
+        database.close()
+
+
+app = FastAPI(title="Kitchen Agents API", version="1.0.0", lifespan=lifespan)
+
+
+class FastJSONResponse(Response):
+    """JSON response encoded in one pass by `utils.dumps_bytes` (orjson when available)."""
+
+    media_type = "application/json"
+
+    def render(self, content: Any) -> bytes:
+        return dumps_bytes(content)
 
 
 class AgentRunRequest(BaseModel):
-    """Payload for running an agent."""
+    """Payload for running an agent.
 
-    prompt: str
+    `intent` + `params` request a fast-path answer explicitly (see `app.fast_path`),
+    e.g. ``{"intent": "station_queue", "params": {"station_id": "...", "limit": 3}}``.
+    """
+
+    prompt: str = ""
+    intent: str | None = None
+    params: dict[str, Any] | None = None
+
+
+class TicketAction(BaseModel):
+    """One requested KDS ticket transition."""
+
+    ticket_id: str
+    action: str
+    minutes: int = 2
+
+
+class TicketTransitionRequest(BaseModel):
+    """Transitions applied together in one transaction (e.g. bumping a whole table)."""
+
+    actions: list[TicketAction]
 
 
 class AgentRunResponse(BaseModel):
@@ -27,27 +221,159 @@ class AgentRunResponse(BaseModel):
 
     output: str
     stop_reason: str | None = None
+    run_id: str | None = None
+    route: str = "llm"
+    intent: str | None = None
 
 
-def get_registry() -> Generator[AgentRegistry, None, None]:
-    """Provide an AgentRegistry tied to a fresh database pool."""
+def get_database(request: Request) -> Database:
+    """Return the process-wide database pool created in `lifespan`."""
+
+    return request.app.state.database
+
+
+def get_registry(request: Request) -> AgentRegistry:
+    """Return the process-wide AgentRegistry created in `lifespan`."""
+
+    return request.app.state.registry
 
-    settings = get_settings()
-    database = Database(settings.database)
-    registry = AgentRegistry(database, settings)
-    try:
-        yield registry
-    finally:
-        database.close()
+
+def get_executor(request: Request) -> BoundedExecutor:
+    """Return the worker pool used for blocking agent and tool calls."""
+
+    return request.app.state.executor
+
+
+def _saturated(exc: ExecutorSaturated) -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        detail=str(exc),
+        headers={"Retry-After": "1"},
+    )
 
 
 @app.get("/health")
 async def health() -> dict[str, str]:
-    """Simple readiness probe."""
+    """Simple liveness probe; never touches the database."""
 
     return {"status": "ok"}
 
 
+@app.get("/health/db")
+def database_health(database: Database = Depends(get_database)) -> JSONResponse:
+    """Readiness probe that checks a pooled connection and reports pool counters."""
+
+    healthy = database.check()
+    return JSONResponse(
+        status_code=status.HTTP_200_OK if healthy else status.HTTP_503_SERVICE_UNAVAILABLE,
+        content={"status": "ok" if healthy else "unavailable", "pool": database.stats()},
+    )
+
+
+@app.get("/health/workers")
+async def worker_health(executor: BoundedExecutor = Depends(get_executor)) -> dict[str, Any]:
+    """Report active, queued and rejected work per executor lane."""
+
+    return {"lanes": executor.stats()}
+
+
+@app.get("/health/breaches")
+async def breach_detector_health(request: Request) -> dict[str, Any]:
+    """Report breach detector counters (tracked tickets, alerts fired, next deadline)."""
+
+    detector: BreachDetector | None = request.app.state.breach_detector
+    if detector is None:
+        return {"enabled": False}
+    return {"enabled": True, **detector.stats()}
+
+
+@app.get("/health/changefeed")
+async def change_feed_health(request: Request) -> dict[str, Any]:
+    """Report change feed freshness (connection, staleness, notify lag, cached rows)."""
+
+    feed: ChangeFeed | None = request.app.state.change_feed
+    if feed is None:
+        return {"enabled": False}
+    return {"enabled": True, **feed.stats()}
+
+
+@app.get("/health/station-index")
+async def station_index_health(request: Request) -> dict[str, Any]:
+    """Report station index counters (stations loaded, write-throughs, drift corrected)."""
+
+    station_index: StationQueueIndex | None = request.app.state.station_index
+    if station_index is None:
+        return {"enabled": False}
+    return {"enabled": True, **station_index.stats()}
+
+
+@app.get("/health/scoring")
+async def scoring_health(request: Request) -> dict[str, Any]:
+    """Report priority scorer counters (runs, tickets scored/updated, last run time)."""
+
+    scorer: PriorityScorer | None = request.app.state.scorer
+    if scorer is None:
+        return {"enabled": False}
+    return {"enabled": True, **scorer.stats()}
+
+
+@app.get("/health/fast-path")
+async def fast_path_health(request: Request) -> dict[str, Any]:
+    """Report fast-path routing counters (hits, misses, LLM fallbacks, hit rate)."""
+
+    router: FastPathRouter = request.app.state.fast_path
+    return {"enabled": get_settings().fast_path.enabled, **router.stats()}
+
+
+@app.get("/health/response-cache")
+async def response_cache_health(request: Request) -> dict[str, Any]:
+    """Report agent response cache counters (hit rate, entries, bytes, invalidations)."""
+
+    cache: ResponseCache | None = request.app.state.response_cache
+    if cache is None:
+        return {"enabled": False}
+    return {"enabled": True, **cache.stats()}
+
+
+@app.get("/health/prep-times")
+async def prep_times_health(request: Request) -> dict[str, Any]:
+    """Report the prep-time learner (runs, observations folded in, predictions written)."""
+
+    learner: PrepTimeLearner | None = request.app.state.prep_time_learner
+    if learner is None:
+        return {"enabled": False}
+    return {"enabled": True, **learner.stats()}
+
+
+@app.get("/health/forecasts")
+async def forecasts_health(request: Request) -> dict[str, Any]:
+    """Report the demand forecaster (runs, locations refreshed, forecast rows written)."""
+
+    forecaster: DemandForecaster | None = request.app.state.forecaster
+    if forecaster is None:
+        return {"enabled": False}
+    return {"enabled": True, **forecaster.stats()}
+
+
+@app.get("/health/write-behind")
+async def write_behind_health(request: Request) -> dict[str, Any]:
+    """Report the write-behind log (pending events, oldest pending, dead letters, batches)."""
+
+    write_behind: WriteBehindLog | None = request.app.state.write_behind
+    if write_behind is None:
+        return {"enabled": False}
+    return {"enabled": True, **write_behind.stats()}
+
+
+@app.get("/metrics")
+async def metrics(format: str = "prometheus") -> Response:
+    """Tool, agent and database histograms in Prometheus text format (`?format=json` for a summary)."""
+
+    if format == "json":
+        return FastJSONResponse(METRICS.snapshot())
+    return Response(METRICS.render(), media_type="text/plain; version=0.0.4; charset=utf-8")
+
+
 @app.get("/agents")
 async def list_agents(registry: AgentRegistry = Depends(get_registry)) -> dict[str, list[str]]:
     """Return all agent identifiers registered in the system."""
@@ -59,30 +385,251 @@ async def list_agents(registry: AgentRegistry = Depends(get_registry)) -> dict[s
 async def run_agent(
     agent_name: str,
     payload: AgentRunRequest,
+    request: Request,
     registry: AgentRegistry = Depends(get_registry),
+    executor: BoundedExecutor = Depends(get_executor),
 ) -> AgentRunResponse:
-    """Invoke a named agent with the provided prompt."""
+    """Invoke a named agent with the provided prompt.
 
-    try:
-        agent = registry.get_agent(agent_name)
-    except KeyError as exc:
-        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=str(exc)) from exc
+    Structured requests (an explicit `intent`, or a prompt matching a fast-path rule) are
+    answered directly from the tools; everything else goes to the model.
+    """
+
+    if agent_name not in registry.agent_names():
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=f"Unknown agent '{agent_name}'")
 
-    result = agent(payload.prompt)
+    router: FastPathRouter = request.app.state.fast_path
+    if payload.intent is not None or get_settings().fast_path.enabled:
+        try:
+            matched = router.match(agent_name, payload.prompt, payload.intent, payload.params)
+        except FastPathRequestError as exc:
+            raise HTTPException(status_code=status.HTTP_422_UNPROCESSABLE_ENTITY, detail=str(exc)) from exc
+        answer = None
+        if matched is None:
+            router.record_miss(agent_name)
+        else:
+            try:
+                answer = await executor.run("tools", router.answer, agent_name, *matched)
+            except ExecutorSaturated as exc:
+                raise _saturated(exc) from exc
+        if answer is not None:
+            return AgentRunResponse(
+                output=answer.output, stop_reason="end_turn", route="fast_path", intent=answer.intent
+            )
+    if not payload.prompt.strip():
+        raise HTTPException(status_code=status.HTTP_422_UNPROCESSABLE_ENTITY, detail="prompt is required")
+
+    cache: ResponseCache | None = request.app.state.response_cache
+    ticket = None
+    if cache is not None:
+        cached, ticket = cache.lookup(agent_name, payload.prompt)
+        if cached is not None:
+            return AgentRunResponse(output=cached.output, stop_reason=cached.stop_reason, route="cache")
+
+    try:
+        result, trace = await executor.run(
+            "agents", functools.partial(registry.invoke, agent_name, payload.prompt)
+        )
+    except ExecutorSaturated as exc:
+        raise _saturated(exc) from exc
+    if ticket is not None:
+        cache.store(ticket, result)
     stop_reason = getattr(result, "stop_reason", None)
-    return AgentRunResponse(output=str(result).strip(), stop_reason=stop_reason)
+    return AgentRunResponse(
+        output=str(result).strip(), stop_reason=stop_reason, run_id=trace.run_id if trace is not None else None
+    )
+
+
+@app.post("/agents/{agent_name}/stream")
+async def stream_agent(
+    agent_name: str,
+    payload: AgentRunRequest,
+    request: Request,
+    format: str | None = None,
+    registry: AgentRegistry = Depends(get_registry),
+    executor: BoundedExecutor = Depends(get_executor),
+) -> StreamingResponse:
+    """Invoke a named agent and stream tokens and tool events as they happen.
+
+    Server-Sent Events by default; `?format=ndjson` (or `Accept: application/x-ndjson`)
+    switches to newline-delimited JSON. Disconnecting cancels the agent run.
+    """
+
+    if agent_name not in registry.agent_names():
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=f"Unknown agent '{agent_name}'")
+    if not payload.prompt.strip():
+        raise HTTPException(status_code=status.HTTP_422_UNPROCESSABLE_ENTITY, detail="prompt is required")
+    try:
+        executor.ensure_capacity("agents")
+    except ExecutorSaturated as exc:
+        raise _saturated(exc) from exc
+
+    ndjson = format == "ndjson" or (format is None and NDJSON_MEDIA_TYPE in request.headers.get("accept", ""))
+    encode, media_type = (encode_ndjson, NDJSON_MEDIA_TYPE) if ndjson else (encode_sse, SSE_MEDIA_TYPE)
+    settings = get_settings()
+    stream = AgentRunStream(
+        registry,
+        executor,
+        agent_name,
+        payload.prompt,
+        max_buffer=settings.streaming.buffer_events,
+        heartbeat=settings.streaming.heartbeat,
+    )
+
+    async def body() -> AsyncIterator[bytes]:
+        async for event in stream.events():
+            yield encode(event)
+
+    return StreamingResponse(
+        body(), media_type=media_type, headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
+@app.get("/agents/runs")
+async def list_agent_runs(
+    limit: int = 20,
+    agent: str | None = None,
+    registry: AgentRegistry = Depends(get_registry),
+) -> dict[str, Any]:
+    """Summaries of recent traced agent runs, newest first."""
+
+    runs = registry.runs.recent(limit=min(max(limit, 1), 200), agent=agent)
+    return {"runs": [run.to_dict(include_spans=False) for run in runs]}
+
+
+@app.get("/agents/runs/{run_id}", response_class=FastJSONResponse)
+async def get_agent_run(run_id: str, registry: AgentRegistry = Depends(get_registry)) -> Any:
+    """Full trace of one agent run: model and tool spans with timings, tokens and payload sizes."""
+
+    trace = registry.runs.get(run_id)
+    if trace is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=f"Unknown run '{run_id}'")
+    return trace.to_dict()
+
+
+@app.get("/stations/{station_id}/batches", response_class=FastJSONResponse)
+async def station_batches(
+    station_id: uuid.UUID,
+    registry: AgentRegistry = Depends(get_registry),
+    executor: BoundedExecutor = Depends(get_executor),
+) -> Any:
+    """Return Smart Queue batch cards for a station (lead/queued/cooking, FIFO)."""
+
+    try:
+        outcome = await executor.run(
+            "tools", functools.partial(registry.call_tool, "get_station_batches", station_id=str(station_id))
+        )
+    except ExecutorSaturated as exc:
+        raise _saturated(exc) from exc
+    if outcome["status"] == "error":
+        raise HTTPException(status_code=status.HTTP_422_UNPROCESSABLE_ENTITY, detail=outcome["content"][0]["text"])
+    return FastJSONResponse(outcome["content"][0]["json"])
+
+
+@app.post("/tickets/transitions", response_class=FastJSONResponse)
+async def transition_tickets(
+    request: TicketTransitionRequest,
+    registry: AgentRegistry = Depends(get_registry),
+    executor: BoundedExecutor = Depends(get_executor),
+) -> Any:
+    """Start, hold or pass many tickets in one set-based update; returns per-ticket outcomes."""
+
+    actions = [action.model_dump() for action in request.actions]
+    try:
+        outcome = await executor.run(
+            "tools", functools.partial(registry.call_tool, "transition_tickets", actions=actions)
+        )
+    except ExecutorSaturated as exc:
+        raise _saturated(exc) from exc
+    if outcome["status"] == "error":
+        raise HTTPException(status_code=status.HTTP_422_UNPROCESSABLE_ENTITY, detail=outcome["content"][0]["text"])
+    return FastJSONResponse(outcome["content"][1]["json"])
+
+
+def _ndjson_rows(executor: BoundedExecutor, rows: Iterator[dict[str, Any]], chunk_size: int) -> StreamingResponse:
+    """Stream `rows` as NDJSON, pulling `chunk_size` rows per call on the ``tools`` lane.
+
+    Only one chunk is in memory at a time; the generator (and its pooled connection)
+    is closed when the body finishes or the client disconnects.
+    """
+    try:
+        executor.ensure_capacity("tools")
+    except ExecutorSaturated as exc:
+        rows.close()
+        raise _saturated(exc) from exc
+
+    # A disconnect can cancel `body` while a worker is still pulling a chunk; the lock
+    # makes the close wait for that pull instead of failing on a running generator.
+    lock = threading.Lock()
+
+    def pull() -> list[dict[str, Any]]:
+        with lock:
+            return list(islice(rows, chunk_size))
+
+    def close() -> None:
+        with lock:
+            rows.close()
+
+    async def body() -> AsyncIterator[bytes]:
+        try:
+            while True:
+                chunk = await executor.run("tools", pull)
+                if not chunk:
+                    break
+                yield b"".join(encode_ndjson(row) for row in chunk)
+        finally:
+            # Closing rolls back and returns the pooled connection, and may wait on the lock:
+            # keep it off the event loop. The default pool is used so a saturated lane cannot
+            # skip the close and leak the connection.
+            await asyncio.get_running_loop().run_in_executor(None, close)
+
+    return StreamingResponse(body(), media_type=NDJSON_MEDIA_TYPE, headers={"Cache-Control": "no-cache"})
+
+
+@app.get("/locations/{location_id}/restock-risks")
+async def export_restock_risks(
+    location_id: str,
+    after: str | None = None,
+    database: Database = Depends(get_database),
+    executor: BoundedExecutor = Depends(get_executor),
+) -> StreamingResponse:
+    """Stream every restock recommendation for a location as NDJSON, newest first.
+
+    `after` takes a `next_cursor` from `list_restock_risks` to resume behind that page.
+    """
+
+    try:
+        restock_risks_params(location_id, after)
+    except ValueError as exc:
+        raise HTTPException(status_code=status.HTTP_422_UNPROCESSABLE_ENTITY, detail=str(exc)) from exc
+    return _ndjson_rows(executor, stream_restock_risks(database, location_id, after), STREAM_CHUNK_SIZE)
+
+
+@app.get("/shopping-list")
+async def export_shopping_list(
+    days: int = 30,
+    database: Database = Depends(get_database),
+    executor: BoundedExecutor = Depends(get_executor),
+) -> StreamingResponse:
+    """Stream the `monthly_shopping_list` items for the last `days` days as NDJSON."""
+
+    rows = stream_ingredient_usage(database, days)
+    return _ndjson_rows(executor, shopping_items(rows, days), STREAM_CHUNK_SIZE)
 
 
-@app.post("/tools/{tool_name}")
+@app.post("/tools/{tool_name}", response_class=FastJSONResponse)
 async def call_tool(
     tool_name: str,
     payload: dict[str, Any] = Body(default_factory=dict),
     registry: AgentRegistry = Depends(get_registry),
+    executor: BoundedExecutor = Depends(get_executor),
 ) -> Any:
     """Execute a tool with the provided payload."""
 
     try:
-        outcome = registry.call_tool(tool_name, **payload)
+        outcome = await executor.run("tools", functools.partial(registry.call_tool, tool_name, **payload))
     except KeyError as exc:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=str(exc)) from exc
-    return jsonable_encoder({"result": outcome})
+    except ExecutorSaturated as exc:
+        raise _saturated(exc) from exc
+    return FastJSONResponse({"result": outcome})
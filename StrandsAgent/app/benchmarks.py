@@ -0,0 +1,799 @@
+"""Benchmarks for the kitchen agents backend.
+
+Each benchmark takes the shared `Database` and `Settings` plus keyword options and
+returns a JSON-serialisable dict of results. Run them with `python main.py bench <name>`.
+They require a reachable PostgreSQL with the schema applied (and `python main.py seed`
+for the benchmarks that reuse the demo identifiers); no Bedrock access is needed.
+"""
+
+from __future__ import annotations
+
+import json
+import logging
+import math
+import os
+import random
+import time
+import timeit
+import tracemalloc
+import uuid
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
+from decimal import Decimal
+from typing import Any, Callable
+
+from .config import Settings
+from .db import STREAM_CHUNK_SIZE, Database
+from .forecasting import BUCKET_MINUTES, ensure_forecast_schema, forecast_chain
+from .prep import generate_plan
+from .prep_times import PrepTimeModel, ensure_prep_time_schema, learn, predict
+from .scoring import DEFAULT_WEIGHTS, rescore_location, score_arrays, to_arrays
+from .seed_data import LOCATION_ID, MENU_ITEM_ID, STATION_ID
+from .station_index import StationQueueIndex
+from .streaming import encode_ndjson
+from .tools import KitchenTools
+from .utils import (
+    JSON_ENCODER,
+    _IsoTimestamptzLoader,
+    decode_json_columns,
+    dumps_bytes,
+    serialize_row,
+    serialize_rows,
+    serialize_value,
+)
+
+LOGGER = logging.getLogger(__name__)
+
+
+def _percentile(samples: list[float], pct: float) -> float:
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, max(0, round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def _run_load(call: Callable[[], Any], iterations: int, concurrency: int) -> dict[str, float]:
+    """Invoke `call` `iterations` times across `concurrency` threads and summarise latency."""
+
+    def timed() -> float:
+        started = time.perf_counter()
+        call()
+        return time.perf_counter() - started
+
+    started = time.perf_counter()
+    if concurrency <= 1:
+        samples = [timed() for _ in range(iterations)]
+    else:
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            samples = list(pool.map(lambda _: timed(), range(iterations)))
+    elapsed = time.perf_counter() - started
+    return {
+        "iterations": iterations,
+        "elapsed_s": round(elapsed, 4),
+        "requests_per_s": round(iterations / elapsed, 2) if elapsed else 0.0,
+        "p50_ms": round(_percentile(samples, 50) * 1000, 3),
+        "p95_ms": round(_percentile(samples, 95) * 1000, 3),
+    }
+
+
+def bench_pool_reuse(
+    database: Database,
+    settings: Settings,
+    iterations: int = 200,
+    concurrency: int = 4,
+    station_id: str = STATION_ID,
+) -> dict[str, Any]:
+    """Compare a pool-per-request dependency against the shared, lifespan-managed pool."""
+
+    iterations = int(iterations)
+    concurrency = int(concurrency)
+
+    def per_request() -> None:
+        # Mirrors the previous `get_registry` dependency: new pool, one tool call, close.
+        fresh = Database(settings.database)
+        try:
+            KitchenTools(fresh).get_station_queue(station_id=station_id, limit=5)
+        finally:
+            fresh.close()
+
+    shared_tools = KitchenTools(database)
+
+    def shared() -> None:
+        shared_tools.get_station_queue(station_id=station_id, limit=5)
+
+    LOGGER.info("Benchmarking pool-per-request | iterations=%s concurrency=%s", iterations, concurrency)
+    before = _run_load(per_request, iterations, concurrency)
+    LOGGER.info("Benchmarking shared pool | iterations=%s concurrency=%s", iterations, concurrency)
+    after = _run_load(shared, iterations, concurrency)
+    speedup = after["requests_per_s"] / before["requests_per_s"] if before["requests_per_s"] else None
+    return {"before": before, "after": after, "speedup": round(speedup, 2) if speedup else None}
+
+
+_BENCH_NAMESPACE = uuid.UUID("0b7c6a52-4f39-4d6e-9a51-6b0e2f8f1c00")
+BENCH_WINDOW_START = datetime(2025, 1, 6, 3, 0, tzinfo=timezone.utc)
+BENCH_WINDOW_END = BENCH_WINDOW_START + timedelta(hours=2)
+
+
+def _bench_id(*parts: object) -> str:
+    """Deterministic UUID so synthetic benchmark rows are upserted, not duplicated."""
+    return str(uuid.uuid5(_BENCH_NAMESPACE, "/".join(str(part) for part in parts)))
+
+
+def seed_prep_dataset(
+    database: Database,
+    items: int = 500,
+    locations: int = 5,
+    ingredients: int = 200,
+    seed: int = 7,
+) -> list[str]:
+    """Upsert a synthetic org with `locations` x `items` forecasts, recipes and stock.
+
+    Returns the generated location ids. Rows live under a dedicated benchmark org and
+    are keyed by deterministic ids, so re-running replaces rather than grows the data.
+    """
+    rng = random.Random(seed)
+    org_id = _bench_id("org")
+    location_ids = [_bench_id("location", index) for index in range(locations)]
+    ingredient_ids = [_bench_id("ingredient", index) for index in range(ingredients)]
+    menu_item_ids = [_bench_id("menu_item", index) for index in range(items)]
+    bucket_minutes = 30
+    buckets = int((BENCH_WINDOW_END - BENCH_WINDOW_START).total_seconds() // (bucket_minutes * 60))
+
+    recipe_rows = []
+    for menu_item_id in menu_item_ids:
+        for ingredient_id in rng.sample(ingredient_ids, k=rng.randint(2, 6)):
+            recipe_rows.append(
+                (_bench_id("recipe", menu_item_id, ingredient_id), menu_item_id, ingredient_id, round(rng.uniform(0.05, 1.5), 3), "kg")
+            )
+
+    with database.transaction() as cur:
+        cur.execute(
+            """
+            INSERT INTO orgs (id, name) VALUES (%s, %s)
+            ON CONFLICT (id) DO UPDATE SET name = EXCLUDED.name
+            """,
+            (org_id, "Benchmark Org"),
+        )
+        cur.executemany(
+            """
+            INSERT INTO locations (id, org_id, name) VALUES (%s, %s, %s)
+            ON CONFLICT (id) DO UPDATE SET name = EXCLUDED.name
+            """,
+            [(location_id, org_id, f"Bench Location {index}") for index, location_id in enumerate(location_ids)],
+        )
+        cur.executemany(
+            """
+            INSERT INTO ingredients (id, org_id, name, unit) VALUES (%s, %s, %s, %s)
+            ON CONFLICT (id) DO UPDATE SET name = EXCLUDED.name, unit = EXCLUDED.unit
+            """,
+            [(ingredient_id, org_id, f"Bench Ingredient {index}", "kg") for index, ingredient_id in enumerate(ingredient_ids)],
+        )
+        cur.executemany(
+            """
+            INSERT INTO menu_items (id, org_id, name, avg_prep_minutes) VALUES (%s, %s, %s, %s)
+            ON CONFLICT (id) DO UPDATE SET name = EXCLUDED.name, avg_prep_minutes = EXCLUDED.avg_prep_minutes
+            """,
+            [(menu_item_id, org_id, f"Bench Item {index}", rng.randint(3, 15)) for index, menu_item_id in enumerate(menu_item_ids)],
+        )
+        cur.executemany(
+            """
+            INSERT INTO recipes (id, menu_item_id, ingredient_id, qty, unit) VALUES (%s, %s, %s, %s, %s)
+            ON CONFLICT (menu_item_id, ingredient_id) DO UPDATE SET qty = EXCLUDED.qty
+            """,
+            recipe_rows,
+        )
+        cur.executemany(
+            """
+            INSERT INTO inventory_levels (id, location_id, ingredient_id, on_hand, unit) VALUES (%s, %s, %s, %s, %s)
+            ON CONFLICT (location_id, ingredient_id) DO UPDATE SET on_hand = EXCLUDED.on_hand
+            """,
+            [
+                (_bench_id("inventory", location_id, ingredient_id), location_id, ingredient_id, round(rng.uniform(0, 40), 3), "kg")
+                for location_id in location_ids
+                for ingredient_id in ingredient_ids
+            ],
+        )
+        cur.executemany(
+            """
+            INSERT INTO demand_forecasts (id, location_id, menu_item_id, bucket_start, bucket_end, expected_qty, model_version)
+            VALUES (%s, %s, %s, %s, %s, %s, %s)
+            ON CONFLICT (location_id, menu_item_id, bucket_start, bucket_end)
+            DO UPDATE SET expected_qty = EXCLUDED.expected_qty
+            """,
+            [
+                (
+                    _bench_id("forecast", location_id, menu_item_id, bucket),
+                    location_id,
+                    menu_item_id,
+                    BENCH_WINDOW_START + timedelta(minutes=bucket * bucket_minutes),
+                    BENCH_WINDOW_START + timedelta(minutes=(bucket + 1) * bucket_minutes),
+                    rng.randint(0, 12),
+                    "bench",
+                )
+                for location_id in location_ids
+                for menu_item_id in menu_item_ids
+                for bucket in range(buckets)
+            ],
+        )
+    LOGGER.info(
+        "Seeded prep benchmark dataset | locations=%s items=%s recipes=%s", locations, items, len(recipe_rows)
+    )
+    return location_ids
+
+
+class _CountingCursor:
+    """Cursor proxy counting statements sent, i.e. round trips of a code path."""
+
+    def __init__(self, cur: Any) -> None:
+        self._cur = cur
+        self.statements = 0
+
+    def execute(self, *args: Any, **kwargs: Any) -> Any:
+        self.statements += 1
+        return self._cur.execute(*args, **kwargs)
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self._cur, name)
+
+
+def _legacy_prep_plan(cur: Any, location_id: str, start_at: datetime, end_at: datetime, window: dict) -> int:
+    """Reference copy of the pre-`app.prep` planner: one recipe query and one upsert per item."""
+    cur.execute("SELECT id FROM prep_plans WHERE location_id = %s AND plan_for = %s", (location_id, start_at))
+    existing = cur.fetchone()
+    if existing:
+        plan_id = existing["id"]
+        cur.execute("DELETE FROM prep_plan_lines WHERE plan_id = %s", (plan_id,))
+    else:
+        cur.execute(
+            """
+            INSERT INTO prep_plans (location_id, plan_for, model_version, note)
+            VALUES (%s, %s, %s, %s)
+            RETURNING id
+            """,
+            (location_id, start_at, "planner-v0", json.dumps({"window": window})),
+        )
+        plan_id = cur.fetchone()["id"]
+
+    cur.execute(
+        """
+        SELECT menu_item_id, SUM(expected_qty) AS expected_qty
+        FROM demand_forecasts
+        WHERE location_id = %s AND bucket_start >= %s AND bucket_end <= %s
+        GROUP BY menu_item_id
+        """,
+        (location_id, start_at, end_at),
+    )
+    total_lines = 0
+    for forecast in cur.fetchall():
+        menu_item_id = forecast["menu_item_id"]
+        expected_qty = forecast["expected_qty"] or Decimal("0")
+        cur.execute(
+            """
+            SELECT r.ingredient_id, r.qty, i.on_hand, i.unit
+            FROM recipes r
+            LEFT JOIN inventory_levels i ON i.ingredient_id = r.ingredient_id AND i.location_id = %s
+            WHERE r.menu_item_id = %s
+            """,
+            (location_id, menu_item_id),
+        )
+        available_portions: float | None = None
+        ingredient_details: list[dict[str, Any]] = []
+        for ingredient in cur.fetchall():
+            qty = ingredient["qty"] or 0
+            on_hand = ingredient.get("on_hand") or 0
+            if qty and on_hand is not None:
+                possible = float(on_hand) / float(qty) if qty else 0
+                available_portions = possible if available_portions is None else min(available_portions, possible)
+            ingredient_details.append(serialize_row(ingredient))
+
+        available_portions = available_portions or 0.0
+        recommended_qty = max(float(expected_qty) - available_portions, 0.0)
+        if recommended_qty <= 0:
+            continue
+        rationale = {
+            "expected_qty": float(expected_qty),
+            "available_portions": available_portions,
+            "ingredients": ingredient_details,
+            "window": window,
+        }
+        cur.execute(
+            """
+            INSERT INTO prep_plan_lines (plan_id, menu_item_id, recommended_qty, rationale)
+            VALUES (%s, %s, %s, %s)
+            ON CONFLICT (plan_id, menu_item_id)
+            DO UPDATE SET recommended_qty = EXCLUDED.recommended_qty, rationale = EXCLUDED.rationale
+            """,
+            (plan_id, menu_item_id, recommended_qty, json.dumps(rationale)),
+        )
+        total_lines += 1
+    return total_lines
+
+
+def bench_prep_plan(
+    database: Database,
+    settings: Settings,
+    items: int = 500,
+    locations: int = 5,
+    rounds: int = 3,
+    seed: int = 7,
+) -> dict[str, Any]:
+    """Time prep plan generation per location, set-based (`app.prep`) versus the legacy per-item loop.
+
+    Both paths run on the same synthetic menu and window, alternating per location;
+    round trips are counted from the statements each one actually sends.
+    """
+
+    location_ids = seed_prep_dataset(database, items=int(items), locations=int(locations), seed=int(seed))
+    window = {"start": BENCH_WINDOW_START.isoformat(), "end": BENCH_WINDOW_END.isoformat()}
+    paths: dict[str, Callable[[Any, str], int]] = {
+        "set_based": lambda cur, location_id: generate_plan(
+            cur, location_id, BENCH_WINDOW_START, BENCH_WINDOW_END, window
+        )[1],
+        "legacy": lambda cur, location_id: _legacy_prep_plan(
+            cur, location_id, BENCH_WINDOW_START, BENCH_WINDOW_END, window
+        ),
+    }
+
+    samples: dict[str, list[float]] = {name: [] for name in paths}
+    round_trips: dict[str, list[int]] = {name: [] for name in paths}
+    lines: dict[str, int] = {name: 0 for name in paths}
+    for _ in range(int(rounds)):
+        for location_id in location_ids:
+            for name, plan in paths.items():
+                started = time.perf_counter()
+                with database.transaction() as cur:
+                    counting = _CountingCursor(cur)
+                    lines[name] = max(lines[name], plan(counting, location_id))
+                samples[name].append(time.perf_counter() - started)
+                # +1 for the COMMIT sent by the transaction.
+                round_trips[name].append(counting.statements + 1)
+
+    result: dict[str, Any] = {"items": int(items), "locations": int(locations), "plans": len(samples["set_based"])}
+    for name in paths:
+        result[name] = {
+            "max_lines_per_plan": lines[name],
+            "round_trips_per_plan": max(round_trips[name]),
+            "p50_ms": round(_percentile(samples[name], 50) * 1000, 3),
+            "p95_ms": round(_percentile(samples[name], 95) * 1000, 3),
+            "total_s": round(sum(samples[name]), 4),
+        }
+    result["speedup_p50"] = (
+        round(result["legacy"]["p50_ms"] / result["set_based"]["p50_ms"], 2) if result["set_based"]["p50_ms"] else None
+    )
+    return result
+
+
+def _best_of(stmt: Callable[[], Any], number: int, repeat: int = 5) -> float:
+    """Best per-call time in microseconds."""
+    return round(min(timeit.repeat(stmt, number=number, repeat=repeat)) / number * 1e6, 3)
+
+
+def bench_serialization(
+    database: Database | None = None,
+    settings: Settings | None = None,
+    rows: int = 500,
+    number: int = 50,
+) -> dict[str, Any]:
+    """Microbenchmarks for `app.utils`: legacy triple pass vs fetch-time conversion.
+
+    Runs without a database: rows are synthesised in the shapes psycopg returns with
+    the default loaders (Decimal/datetime/UUID) and with `configure_json_loaders`.
+    """
+    from fastapi.encoders import jsonable_encoder
+
+    rows = int(rows)
+    number = int(number)
+    now = datetime.now(tz=timezone.utc)
+    legacy_rows = [
+        {
+            "ticket_id": uuid.uuid4(),
+            "status": "queued",
+            "priority_score": Decimal("0.9500"),
+            "priority_reason": {"wait": f"{index}m>sla", "table": f"T{index % 40}"},
+            "enqueued_at": now - timedelta(seconds=index),
+        }
+        for index in range(rows)
+    ]
+    ready_rows = [
+        {
+            "ticket_id": str(row["ticket_id"]),
+            "status": row["status"],
+            "priority_score": float(row["priority_score"]),
+            "priority_reason": dict(row["priority_reason"]),
+            "enqueued_at": row["enqueued_at"].isoformat(),
+        }
+        for row in legacy_rows
+    ]
+
+    def legacy_path() -> bytes:
+        serialised = serialize_rows(legacy_rows)
+        for row in serialised:
+            if isinstance(row.get("priority_reason"), str):
+                row["priority_reason"] = json.loads(row["priority_reason"])
+        return json.dumps(jsonable_encoder({"result": {"tickets": serialised}})).encode()
+
+    def fast_path() -> bytes:
+        decode_json_columns(ready_rows, "priority_reason")
+        return dumps_bytes({"result": {"tickets": ready_rows}})
+
+    timestamp_bytes = b"2025-01-10 03:00:00.123456+00"
+    iso_loader = _IsoTimestamptzLoader(0)
+    sample = legacy_rows[0]
+
+    return {
+        "rows": rows,
+        "encoder": JSON_ENCODER,
+        "serialize_value_decimal_us": _best_of(lambda: serialize_value(sample["priority_score"]), number * 100),
+        "serialize_value_dict_us": _best_of(lambda: serialize_value(sample["priority_reason"]), number * 100),
+        "serialize_rows_us": _best_of(lambda: serialize_rows(legacy_rows), number),
+        "decode_json_columns_us": _best_of(lambda: decode_json_columns(ready_rows, "priority_reason"), number),
+        "dumps_bytes_us": _best_of(lambda: dumps_bytes(ready_rows), number),
+        "iso_timestamptz_loader_us": _best_of(lambda: iso_loader.load(timestamp_bytes), number * 100),
+        "legacy_response_us": _best_of(legacy_path, number),
+        "fast_response_us": _best_of(fast_path, number),
+    }
+
+
+def bench_station_queue(
+    database: Database,
+    settings: Settings,
+    iterations: int = 500,
+    concurrency: int = 4,
+    station_id: str = STATION_ID,
+    limit: int = 5,
+    transitions: int = 0,
+) -> dict[str, Any]:
+    """Compare `get_station_queue` via SQL against the in-process station index.
+
+    With `transitions` > 0, that many queued tickets are held for 0 minutes through the
+    tools (this rewrites their enqueue time and score) so the consistency check also
+    covers write-through. The check compares index and SQL order for the station.
+    """
+    iterations = int(iterations)
+    concurrency = int(concurrency)
+    sql_tools = KitchenTools(database)
+    station_index = StationQueueIndex(database)
+    index_tools = KitchenTools(database, station_index=station_index)
+
+    for row in station_index.top(station_id, int(transitions)):
+        index_tools.hold_ticket(ticket_id=row["ticket_id"], minutes=0)
+
+    LOGGER.info("Benchmarking station queue via SQL | iterations=%s concurrency=%s", iterations, concurrency)
+    before = _run_load(lambda: sql_tools.get_station_queue(station_id=station_id, limit=limit), iterations, concurrency)
+    LOGGER.info("Benchmarking station queue via index | iterations=%s concurrency=%s", iterations, concurrency)
+    after = _run_load(lambda: index_tools.get_station_queue(station_id=station_id, limit=limit), iterations, concurrency)
+    speedup = after["requests_per_s"] / before["requests_per_s"] if before["requests_per_s"] else None
+    return {
+        "before": before,
+        "after": after,
+        "speedup": round(speedup, 2) if speedup else None,
+        "consistency": station_index.verify([station_id], limit=max(int(limit), 20)),
+        "index": station_index.stats(),
+    }
+
+
+def _score_row_python(row: dict[str, Any]) -> float:
+    """Per-row reference implementation of `scoring.score_arrays` used for comparison."""
+    weights = DEFAULT_WEIGHTS
+    sla = row["sla_minutes"] if row["sla_minutes"] and row["sla_minutes"] > 0 else weights.default_sla_minutes
+    prep = row["predicted_prep_minutes"]
+    if prep is None:
+        prep = row["avg_prep_minutes"]
+    if prep is None:
+        prep = weights.default_prep_minutes
+    wait = max(row["wait_s"] or 0.0, 0.0) / 60.0
+    slack = sla - wait - prep
+    risk = 1.0 / (1.0 + math.exp(min(max(slack / weights.risk_scale_minutes, -50.0), 50.0)))
+    total = row["siblings_total"] or 0.0
+    done = (row["siblings_done"] or 0.0) / max(total, 1.0) if total > 0 else 0.0
+    score = (
+        weights.sla_risk * risk
+        + weights.prep_share * min(max(prep / sla, 0.0), 1.0)
+        + weights.order_done * done
+        + weights.overdue * max(wait / sla - 1.0, 0.0)
+    )
+    if (row["held_s"] or 0.0) > 0:
+        score *= weights.hold_factor
+    return round(score, 4)
+
+
+def synthetic_scoring_rows(tickets: int, seed: int = 11) -> list[dict[str, Any]]:
+    """Rows shaped like `scoring.SCORING_INPUTS_SQL` output, with realistic NULLs."""
+    rng = random.Random(seed)
+    rows = []
+    for _ in range(tickets):
+        total = float(rng.randint(1, 8))
+        rows.append(
+            {
+                "current_score": rng.choice([None, round(rng.random(), 4)]),
+                "sla_minutes": rng.choice([None, 8.0, 12.0, 15.0, 20.0]),
+                "wait_s": rng.uniform(0, 40 * 60),
+                "held_s": rng.choice([0.0] * 9 + [120.0]),
+                "predicted_prep_minutes": rng.choice([None, round(rng.uniform(2, 18), 2)]),
+                "avg_prep_minutes": rng.choice([None, round(rng.uniform(2, 18), 2)]),
+                "siblings_total": total,
+                "siblings_done": float(rng.randint(0, int(total) - 1)),
+            }
+        )
+    return rows
+
+
+def bench_scoring(
+    database: Database | None = None,
+    settings: Settings | None = None,
+    tickets: int = 10_000,
+    number: int = 20,
+    location_id: str | None = None,
+) -> dict[str, Any]:
+    """Score `tickets` synthetic active tickets per-row in Python vs one NumPy pass.
+
+    With `location_id`, also times a full `rescore_location` (load, score, write)
+    against that location's real tickets.
+    """
+    tickets = int(tickets)
+    number = int(number)
+    rows = synthetic_scoring_rows(tickets)
+
+    vectorised = score_arrays(to_arrays(rows))["score"]
+    reference = [_score_row_python(row) for row in rows]
+    mismatches = sum(1 for left, right in zip(vectorised.tolist(), reference) if abs(left - right) > 1e-4)
+
+    result: dict[str, Any] = {
+        "tickets": tickets,
+        "python_per_row_us": _best_of(lambda: [_score_row_python(row) for row in rows], number=max(1, number // 4)),
+        "numpy_with_conversion_us": _best_of(lambda: score_arrays(to_arrays(rows)), number=number),
+        "mismatches": mismatches,
+    }
+    inputs = to_arrays(rows)
+    result["numpy_score_only_us"] = _best_of(lambda: score_arrays(inputs), number=number)
+    if location_id and database is not None:
+        result["rescore_location"] = rescore_location(database, location_id)
+    return result
+
+
+def bench_prep_times(
+    database: Database,
+    settings: Settings,
+    days: int = 30,
+    chunk_size: int = 50_000,
+) -> dict[str, Any]:
+    """Rebuild learned prep times from the last `days` of passed tickets, then predict.
+
+    Use `python main.py seed-bulk` first for a realistic history. Reports the learn
+    timings (load / stream / write) and rows per second; the rebuild replaces the
+    stored statistics, like ``python main.py prep-times learn --full``.
+    """
+    ensure_prep_time_schema(database)
+    since = datetime.now(timezone.utc) - timedelta(days=int(days))
+    started = time.perf_counter()
+    learned = learn(
+        database, PrepTimeModel(settings.prep_times.alpha), chunk_size=int(chunk_size), since=since, full=True
+    )
+    predicted_at = time.perf_counter()
+    predicted = predict(database, settings.prep_times.min_observations)
+    return {
+        "days": int(days),
+        "learn": learned,
+        "predict": predicted,
+        "predict_ms": round((time.perf_counter() - predicted_at) * 1000, 3),
+        "total_s": round(time.perf_counter() - started, 3),
+    }
+
+
+def bench_forecasts(
+    database: Database,
+    settings: Settings,
+    workers: int | None = None,
+    history_days: int | None = None,
+) -> dict[str, Any]:
+    """Rebuild every location's demand profile and forecast window, then rerun incrementally.
+
+    Use `python main.py seed-bulk --locations 20 --menu-items 500 --start <date>` first,
+    with a start date inside the last `history_days`; the target is a full chain
+    (20 locations x 500 items x 48 buckets) in under a minute. The second run only
+    folds days closed since the first, so it is normally skipped.
+    """
+    ensure_forecast_schema(database)
+    options = {
+        "workers": int(workers or settings.forecasts.workers),
+        "horizon_days": settings.forecasts.horizon_days,
+        "history_days": int(history_days or settings.forecasts.history_days),
+        "alpha": settings.forecasts.alpha,
+    }
+    full = forecast_chain(database, settings.database, full=True, **options)
+    incremental = forecast_chain(database, settings.database, **options)
+    full.pop("results")
+    incremental.pop("results")
+    return {
+        "bucket_minutes": BUCKET_MINUTES,
+        "full": full,
+        "full_rows_per_s": round(full["forecast_rows"] / full["elapsed_s"], 1) if full["elapsed_s"] else None,
+        "under_a_minute": full["elapsed_s"] < 60.0,
+        "incremental": incremental,
+    }
+
+
+# Restock-recommendation shaped rows without touching real tables.
+STREAM_BENCH_SQL = """
+SELECT md5(g::text)::uuid AS id,
+       md5((g %% 5000)::text)::uuid AS ingredient_id,
+       'ingredient ' || (g %% 5000) AS ingredient_name,
+       (g %% 17 + 1)::numeric(12,2) AS recommended_qty_packs,
+       jsonb_build_object('reason', 'below par', 'days_cover', g %% 9) AS rationale,
+       now() - make_interval(secs => g) AS created_at
+FROM generate_series(1, %s) AS g
+"""
+
+
+def _rss_mb() -> float | None:
+    """Current resident set size, or None where /proc is unavailable."""
+    try:
+        with open("/proc/self/statm", encoding="ascii") as statm:
+            pages = int(statm.read().split()[1])
+    except (OSError, ValueError, IndexError):
+        return None
+    return round(pages * os.sysconf("SC_PAGE_SIZE") / 2**20, 1)
+
+
+def _measure_memory(run: Callable[[], int]) -> dict[str, Any]:
+    rss_before = _rss_mb()
+    tracemalloc.start()
+    started = time.perf_counter()
+    try:
+        encoded = run()
+        elapsed = time.perf_counter() - started
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    rss_after = _rss_mb()
+    return {
+        "elapsed_s": round(elapsed, 3),
+        "python_peak_mb": round(peak / 2**20, 1),
+        "rss_growth_mb": round(rss_after - rss_before, 1) if rss_before is not None and rss_after is not None else None,
+        "bytes_encoded": encoded,
+    }
+
+
+def bench_stream_memory(
+    database: Database,
+    settings: Settings,
+    rows: int = 1_000_000,
+    chunk_size: int = STREAM_CHUNK_SIZE,
+) -> dict[str, Any]:
+    """Peak memory of encoding `rows` rows with `fetch_all_json` versus `Database.stream_chunks`.
+
+    Both paths produce NDJSON bytes and count them. ``python_peak_mb`` is the
+    tracemalloc peak (Python objects); ``rss_growth_mb`` also covers libpq's copy of a
+    fully fetched result. The streamed path runs first so its RSS is not inflated by
+    pages the materialised path leaves behind. Timings include tracemalloc overhead.
+    """
+    rows = int(rows)
+
+    def streamed() -> int:
+        encoded = 0
+        for chunk in database.stream_chunks(STREAM_BENCH_SQL, (rows,), int(chunk_size), json=True):
+            encoded += len(b"".join(encode_ndjson(row) for row in chunk))
+        return encoded
+
+    def materialised() -> int:
+        result = database.fetch_all_json(STREAM_BENCH_SQL, (rows,))
+        return len(b"".join(encode_ndjson(row) for row in result))
+
+    stream_result = _measure_memory(streamed)
+    fetch_result = _measure_memory(materialised)
+    return {
+        "rows": rows,
+        "chunk_size": int(chunk_size),
+        "stream": stream_result,
+        "fetch_all": fetch_result,
+        "peak_ratio": (
+            round(fetch_result["python_peak_mb"] / stream_result["python_peak_mb"], 1)
+            if stream_result["python_peak_mb"]
+            else None
+        ),
+    }
+
+
+TICKET_BENCH_CUSTOMER = "bench:ticket-transitions"
+
+TICKET_BENCH_ORDERS_SQL = """
+INSERT INTO orders (id, location_id, source, table_number, customer_name, placed_at, status)
+SELECT o.id, %s, 'dine_in', o.table_number, %s, now(), 'open'
+FROM unnest(%s::uuid[], %s::text[]) AS o(id, table_number)
+"""
+
+TICKET_BENCH_ITEMS_SQL = """
+INSERT INTO order_items (id, order_id, menu_item_id, qty)
+SELECT item.id, item.order_id, %s, 1
+FROM unnest(%s::uuid[], %s::uuid[]) AS item(id, order_id)
+"""
+
+TICKET_BENCH_TICKETS_SQL = """
+INSERT INTO kds_tickets (id, order_item_id, station_id, status, priority_score)
+SELECT t.id, t.id, %s, 'queued', 0
+FROM unnest(%s::uuid[]) AS t(id)
+"""
+
+
+def _seed_bench_tables(database: Database, tables: int, tickets_per_table: int) -> list[list[str]]:
+    """Create `tables` open orders of one-ticket items; ticket ids reuse their order item ids."""
+    order_ids = [str(uuid.uuid4()) for _ in range(tables)]
+    grouped = [[str(uuid.uuid4()) for _ in range(tickets_per_table)] for _ in order_ids]
+    item_ids = [item_id for group in grouped for item_id in group]
+    item_orders = [order_id for order_id, group in zip(order_ids, grouped) for _ in group]
+    with database.transaction() as cur:
+        cur.execute(
+            TICKET_BENCH_ORDERS_SQL,
+            (LOCATION_ID, TICKET_BENCH_CUSTOMER, order_ids, [f"B{index}" for index in range(tables)]),
+        )
+        cur.execute(TICKET_BENCH_ITEMS_SQL, (MENU_ITEM_ID, item_ids, item_orders))
+        cur.execute(TICKET_BENCH_TICKETS_SQL, (STATION_ID, item_ids))
+    return grouped
+
+
+def bench_ticket_transitions(
+    database: Database,
+    settings: Settings,
+    tables: int = 50,
+    tickets_per_table: int = 10,
+    concurrency: int = 1,
+) -> dict[str, Any]:
+    """Bump whole tables: start then pass each ticket one call at a time vs. two batch calls.
+
+    Every sample is one table of `tickets_per_table` fresh tickets at the demo station
+    (``python main.py seed`` first). The single-ticket path does not roll order items
+    forward; the batch path also updates `order_items` and writes status history, and
+    ``items_passed`` checks that it did. Benchmark orders are deleted afterwards.
+    """
+    tables = int(tables)
+    tickets_per_table = int(tickets_per_table)
+    concurrency = int(concurrency)
+    tools = KitchenTools(database)
+
+    def single(group: list[str]) -> None:
+        for ticket_id in group:
+            tools.start_ticket(ticket_id=ticket_id)
+        for ticket_id in group:
+            tools.pass_ticket(ticket_id=ticket_id)
+
+    def batch(group: list[str]) -> None:
+        tools.start_tickets(ticket_ids=group)
+        tools.pass_tickets(ticket_ids=group)
+
+    try:
+        results: dict[str, Any] = {"tables": tables, "tickets_per_table": tickets_per_table}
+        for label, bump in (("single", single), ("batch", batch)):
+            pending = deque(_seed_bench_tables(database, tables, tickets_per_table))
+            groups = list(pending)
+            LOGGER.info("Benchmarking %s ticket transitions | tables=%s concurrency=%s", label, tables, concurrency)
+            results[label] = _run_load(lambda: bump(pending.popleft()), tables, concurrency)
+            if label == "batch":
+                passed = database.fetch_one(
+                    "SELECT count(*) AS n FROM order_items WHERE id = ANY(%s::uuid[]) AND status = 'passed'",
+                    ([ticket_id for group in groups for ticket_id in group],),
+                )
+                results["items_passed"] = passed["n"] if passed else 0
+        single_ms, batch_ms = results["single"]["p50_ms"], results["batch"]["p50_ms"]
+        results["speedup_p50"] = round(single_ms / batch_ms, 2) if batch_ms else None
+        return results
+    finally:
+        removed = database.execute("DELETE FROM orders WHERE customer_name = %s", (TICKET_BENCH_CUSTOMER,))
+        LOGGER.info("Removed %s benchmark orders", removed)
+
+
+BENCHMARKS: dict[str, Callable[..., dict[str, Any]]] = {
+    "forecasts": bench_forecasts,
+    "pool": bench_pool_reuse,
+    "prep-plan": bench_prep_plan,
+    "prep-times": bench_prep_times,
+    "scoring": bench_scoring,
+    "serialization": bench_serialization,
+    "station-queue": bench_station_queue,
+    "stream-memory": bench_stream_memory,
+    "ticket-transitions": bench_ticket_transitions,
+}
+
+
+__all__ = ["BENCHMARKS", "bench_pool_reuse", "bench_prep_plan", "bench_serialization", "seed_prep_dataset"]
@@ -0,0 +1,436 @@
+"""Push-based SLA breach detection for active KDS tickets.
+
+Instead of scanning `v_wait_sla_breaches` on every poll, `BreachDetector` keeps a
+min-heap of (deadline, ticket) for every active ticket with an SLA and sleeps until the
+earliest deadline. A ticket has one deadline per severity threshold (1.0x, 1.2x and
+2.0x of `sla_minutes`, measured from `COALESCE(order_items.started_at, created_at)` as
+in the view). When a deadline passes, a single guarded statement re-checks the ticket
+and writes the alert only if it is still active, still over the threshold and not
+already alerted at that severity, so work is O(log n) per event instead of O(active
+tickets) per poll. A ticket first seen past several thresholds (e.g. after a restart)
+only gets the highest one it has crossed.
+
+Concurrent detectors rely on a unique partial index on
+``alerts((entity->>'ticket_id'), severity)``; `install_breach_detector` (run by
+`BreachDetector.start` and ``python main.py breach-detector install``) removes
+duplicate alerts and creates it.
+"""
+
+from __future__ import annotations
+
+import heapq
+import itertools
+import logging
+import threading
+import time
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from typing import Any
+
+from .db import Database
+
+LOGGER = logging.getLogger(__name__)
+
+ACTIVE_TICKET_STATUSES = ("queued", "firing", "prepping")
+
+# (sla ratio, alert severity); shared with `KitchenTools.list_open_breaches`.
+SEVERITY_THRESHOLDS: tuple[tuple[float, str], ...] = ((1.0, "info"), (1.2, "warning"), (2.0, "critical"))
+
+
+def severity_for_ratio(ratio: float) -> str:
+    """Map an elapsed/SLA ratio to the alert severity used by the watchdog."""
+    severity = SEVERITY_THRESHOLDS[0][1]
+    for threshold, name in SEVERITY_THRESHOLDS:
+        if ratio >= threshold:
+            severity = name
+    return severity
+
+
+_TICKET_SELECT = """
+SELECT kt.id AS ticket_id,
+       kt.station_id,
+       s.name AS station_name,
+       s.location_id,
+       l.org_id,
+       kt.order_item_id,
+       kt.sla_minutes,
+       kt.enqueued_at,
+       kt.status IN ('queued','firing','prepping') AS active,
+       COALESCE(oi.started_at, oi.created_at) AS base_at
+FROM kds_tickets kt
+JOIN order_items oi ON oi.id = kt.order_item_id
+JOIN stations s ON s.id = kt.station_id
+JOIN locations l ON l.id = s.location_id
+"""
+
+SYNC_SQL = _TICKET_SELECT + """
+WHERE kt.status IN ('queued','firing','prepping')
+  AND kt.sla_minutes IS NOT NULL
+  AND (%(location_id)s::uuid IS NULL OR s.location_id = %(location_id)s::uuid)
+  AND (%(since)s::timestamptz IS NULL OR kt.enqueued_at >= %(since)s::timestamptz)
+"""
+
+ALERTED_SQL = """
+SELECT entity->>'ticket_id' AS ticket_id, array_agg(DISTINCT severity) AS severities
+FROM alerts
+WHERE kind = 'wait_sla_breach' AND entity->>'ticket_id' = ANY(%s::text[])
+GROUP BY entity->>'ticket_id'
+"""
+
+INSTALL_SQL = """
+LOCK TABLE alerts IN SHARE ROW EXCLUSIVE MODE;
+-- An older non-unique index of the same name would make CREATE ... IF NOT EXISTS a no-op.
+DO $$
+BEGIN
+  IF EXISTS (
+      SELECT 1 FROM pg_index i JOIN pg_class c ON c.oid = i.indexrelid
+      WHERE c.relname = 'idx_alerts_wait_sla_ticket' AND NOT i.indisunique
+  ) THEN
+    DROP INDEX idx_alerts_wait_sla_ticket;
+  END IF;
+END $$;
+"""
+
+# Keep one alert per (ticket, severity), preferring an acknowledged one, then the oldest.
+DEDUPE_ALERTS_SQL = """
+DELETE FROM alerts a
+USING (
+    SELECT id,
+           row_number() OVER (
+               PARTITION BY entity->>'ticket_id', severity
+               ORDER BY acknowledged_at IS NULL, detected_at, id
+           ) AS copy
+    FROM alerts
+    WHERE kind = 'wait_sla_breach' AND entity->>'ticket_id' IS NOT NULL
+) d
+WHERE a.id = d.id AND d.copy > 1
+"""
+
+UNIQUE_INDEX_SQL = """
+CREATE UNIQUE INDEX IF NOT EXISTS idx_alerts_wait_sla_ticket
+  ON alerts ((entity->>'ticket_id'), severity) WHERE kind = 'wait_sla_breach'
+"""
+
+FIRE_SQL = """
+WITH t AS (
+    SELECT ticket.*,
+           now() - ticket.base_at >= make_interval(secs => ticket.sla_minutes * 60 * %(ratio)s) AS over_threshold,
+           EXISTS (
+               SELECT 1 FROM alerts a
+               WHERE a.kind = 'wait_sla_breach'
+                 AND a.entity->>'ticket_id' = ticket.ticket_id::text
+                 AND a.severity = %(severity)s
+           ) AS alerted
+    FROM (
+""" + _TICKET_SELECT + """
+        WHERE kt.id = %(ticket_id)s
+    ) ticket
+),
+ins AS (
+    INSERT INTO alerts (org_id, location_id, kind, severity, entity, message)
+    SELECT t.org_id,
+           t.location_id,
+           'wait_sla_breach',
+           %(severity)s,
+           jsonb_build_object(
+               'ticket_id', t.ticket_id::text,
+               'station_id', t.station_id::text,
+               'order_item_id', t.order_item_id::text,
+               'sla_ratio', %(ratio)s
+           ),
+           format('Ticket at %%s is %%sx SLA (%%s min)', t.station_name, %(ratio)s::text, t.sla_minutes)
+    FROM t
+    WHERE t.active AND t.sla_minutes IS NOT NULL AND t.over_threshold AND NOT t.alerted
+    -- Another detector process may insert the same alert concurrently; the unique index keeps one.
+    ON CONFLICT ((entity->>'ticket_id'), severity) WHERE kind = 'wait_sla_breach' DO NOTHING
+    RETURNING id
+)
+SELECT t.*, (SELECT id FROM ins) AS alert_id
+FROM t
+"""
+
+
+def install_breach_detector(db: Database) -> int:
+    """Drop duplicate `wait_sla_breach` alerts and create the unique dedupe index; returns rows removed."""
+    with db.transaction() as cur:
+        cur.execute(INSTALL_SQL)
+        cur.execute(DEDUPE_ALERTS_SQL)
+        removed = cur.rowcount
+        cur.execute(UNIQUE_INDEX_SQL)
+    LOGGER.info("Breach detector index installed | duplicate_alerts_removed=%s", removed)
+    return removed
+
+
+@dataclass
+class _TicketTimer:
+    ticket_id: str
+    base_at: float
+    sla_minutes: int
+    next_threshold: int
+    version: int
+
+    def deadline(self) -> float:
+        ratio = SEVERITY_THRESHOLDS[self.next_threshold][0]
+        return self.base_at + self.sla_minutes * 60 * ratio
+
+
+class BreachDetector:
+    """Background thread that writes `wait_sla_breach` alerts exactly when SLAs are crossed.
+
+    New tickets are picked up by a cheap range query on `enqueued_at` every
+    `discovery_interval` seconds (or pushed directly with `track`), and the whole state
+    is rebuilt every `resync_interval` seconds to absorb anything missed.
+    """
+
+    def __init__(
+        self,
+        db: Database,
+        location_id: str | None = None,
+        discovery_interval: float = 5.0,
+        resync_interval: float = 300.0,
+        retry_delay: float = 1.0,
+    ) -> None:
+        self._db = db
+        self._location_id = location_id
+        self._discovery_interval = discovery_interval
+        self._resync_interval = resync_interval
+        self._retry_delay = retry_delay
+        self._heap: list[tuple[float, int, str, int]] = []
+        self._timers: dict[str, _TicketTimer] = {}
+        self._versions = itertools.count(1)
+        self._sequence = itertools.count()
+        self._cond = threading.Condition()
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+        self._watermark: datetime | None = None
+        self._last_resync = 0.0
+        self._stats = {"fired": 0, "deduplicated": 0, "rescheduled": 0, "retired": 0, "resyncs": 0}
+
+    # --- state ------------------------------------------------------------------
+
+    def _schedule(self, timer: _TicketTimer) -> None:
+        heapq.heappush(self._heap, (timer.deadline(), next(self._sequence), timer.ticket_id, timer.version))
+        self._cond.notify()
+
+    def track(self, row: dict[str, Any], alerted: set[str] | frozenset[str] = frozenset()) -> None:
+        """Start (or restart) timers for an active ticket row shaped like `SYNC_SQL`."""
+        ticket_id = str(row["ticket_id"])
+        if not row.get("active", True) or row.get("sla_minutes") is None or row.get("base_at") is None:
+            self.forget(ticket_id)
+            return
+        next_threshold = 0
+        while next_threshold < len(SEVERITY_THRESHOLDS) and SEVERITY_THRESHOLDS[next_threshold][1] in alerted:
+            next_threshold += 1
+        # Thresholds crossed before the ticket was tracked collapse into the highest one.
+        elapsed_ratio = (time.time() - row["base_at"].timestamp()) / (int(row["sla_minutes"]) * 60 or 1)
+        while (
+            next_threshold + 1 < len(SEVERITY_THRESHOLDS)
+            and elapsed_ratio >= SEVERITY_THRESHOLDS[next_threshold + 1][0]
+        ):
+            next_threshold += 1
+        with self._cond:
+            current = self._timers.get(ticket_id)
+            if current is not None:
+                next_threshold = max(next_threshold, current.next_threshold)
+            if next_threshold >= len(SEVERITY_THRESHOLDS):
+                self._timers.pop(ticket_id, None)
+                return
+            timer = _TicketTimer(
+                ticket_id=ticket_id,
+                base_at=row["base_at"].timestamp(),
+                sla_minutes=int(row["sla_minutes"]),
+                next_threshold=next_threshold,
+                version=next(self._versions),
+            )
+            self._timers[ticket_id] = timer
+            self._schedule(timer)
+
+    def on_change(self, table: str, upserted: list[dict[str, Any]], removed: list[str]) -> None:
+        """`ChangeFeed` listener: retime tickets as soon as they change instead of at discovery."""
+        if table != "kds_tickets":
+            return
+        for row in upserted:
+            if self._location_id is not None and row.get("location_id") != str(self._location_id):
+                continue
+            base_epoch = row.get("base_epoch")
+            self.track(
+                {
+                    "ticket_id": row["ticket_id"],
+                    "sla_minutes": row.get("sla_minutes"),
+                    "base_at": datetime.fromtimestamp(base_epoch, tz=timezone.utc) if base_epoch is not None else None,
+                }
+            )
+        for ticket_id in removed:
+            self.forget(ticket_id)
+
+    def forget(self, ticket_id: str) -> None:
+        """Stop tracking a ticket (e.g. after it was passed); heap entries expire lazily."""
+        with self._cond:
+            self._timers.pop(str(ticket_id), None)
+
+    def _load(self, since: datetime | None) -> int:
+        # Next discovery starts slightly before the database clock now, so tickets
+        # whose inserting transaction commits late are still picked up.
+        head = self._db.fetch_one("SELECT now() - interval '30 seconds' AS next_since")
+        rows = self._db.fetch_all(
+            SYNC_SQL,
+            {"location_id": self._location_id, "since": since},
+        )
+        self._watermark = head["next_since"] if head else since
+        if not rows:
+            return 0
+        alerted_rows = self._db.fetch_all(ALERTED_SQL, ([str(row["ticket_id"]) for row in rows],))
+        alerted = {row["ticket_id"]: set(row["severities"]) for row in alerted_rows}
+        for row in rows:
+            self.track(row, alerted.get(str(row["ticket_id"]), set()))
+        return len(rows)
+
+    def resync(self) -> int:
+        """Rebuild all timers from the database."""
+        with self._cond:
+            self._timers.clear()
+            self._heap.clear()
+        self._watermark = None
+        loaded = self._load(None)
+        self._last_resync = time.monotonic()
+        self._stats["resyncs"] += 1
+        LOGGER.info("Breach detector resynced | tickets=%s", loaded)
+        return loaded
+
+    def discover(self) -> int:
+        """Track tickets enqueued since the previous load."""
+        return self._load(self._watermark)
+
+    # --- firing -----------------------------------------------------------------
+
+    def _pop_due(self, now: float) -> list[_TicketTimer]:
+        due: list[_TicketTimer] = []
+        with self._cond:
+            while self._heap and self._heap[0][0] <= now:
+                _, _, ticket_id, version = heapq.heappop(self._heap)
+                timer = self._timers.get(ticket_id)
+                if timer is not None and timer.version == version:
+                    due.append(timer)
+        return due
+
+    def _fire(self, timer: _TicketTimer) -> None:
+        ratio, severity = SEVERITY_THRESHOLDS[timer.next_threshold]
+        with self._db.transaction() as cur:
+            cur.execute(FIRE_SQL, {"ticket_id": timer.ticket_id, "severity": severity, "ratio": ratio})
+            row = cur.fetchone()
+
+        with self._cond:
+            if self._timers.get(timer.ticket_id) is not timer:
+                return  # re-tracked or forgotten while the statement ran
+            if row is None or not row["active"] or row["sla_minutes"] is None:
+                self._timers.pop(timer.ticket_id, None)
+                self._stats["retired"] += 1
+                return
+
+            base_at = row["base_at"].timestamp()
+            sla_minutes = int(row["sla_minutes"])
+            if base_at != timer.base_at or sla_minutes != timer.sla_minutes:
+                timer.base_at, timer.sla_minutes = base_at, sla_minutes
+                timer.version = next(self._versions)
+                self._stats["rescheduled"] += 1
+                if time.time() < timer.deadline():
+                    self._schedule(timer)
+                    return
+
+            if row["alert_id"] is not None:
+                self._stats["fired"] += 1
+                LOGGER.info("SLA breach alert | ticket_id=%s severity=%s", timer.ticket_id, severity)
+            elif row["alerted"] or row["over_threshold"]:
+                # Over the threshold but not inserted: a concurrent detector won the conflict.
+                self._stats["deduplicated"] += 1
+            else:
+                # Not yet over the threshold by the database clock (app/db clock skew): retry shortly.
+                timer.version = next(self._versions)
+                heapq.heappush(
+                    self._heap,
+                    (time.time() + self._retry_delay, next(self._sequence), timer.ticket_id, timer.version),
+                )
+                return
+
+            timer.next_threshold += 1
+            if timer.next_threshold >= len(SEVERITY_THRESHOLDS):
+                self._timers.pop(timer.ticket_id, None)
+                return
+            timer.version = next(self._versions)
+            self._schedule(timer)
+
+    def run_once(self, now: float | None = None) -> int:
+        """Fire every due timer; returns how many were processed."""
+        due = self._pop_due(now if now is not None else time.time())
+        for timer in due:
+            try:
+                self._fire(timer)
+            except Exception:  # noqa: BLE001
+                LOGGER.exception("Failed to evaluate SLA breach | ticket_id=%s", timer.ticket_id)
+                # Keep the ticket tracked: a transient DB error must not silence it until the next resync.
+                with self._cond:
+                    if self._timers.get(timer.ticket_id) is timer:
+                        timer.version = next(self._versions)
+                        heapq.heappush(
+                            self._heap,
+                            (time.time() + self._retry_delay, next(self._sequence), timer.ticket_id, timer.version),
+                        )
+        return len(due)
+
+    # --- lifecycle --------------------------------------------------------------
+
+    def _run(self) -> None:
+        next_discovery = time.monotonic() + self._discovery_interval
+        while not self._stop.is_set():
+            try:
+                if time.monotonic() - self._last_resync >= self._resync_interval:
+                    self.resync()
+                elif time.monotonic() >= next_discovery:
+                    self.discover()
+                    next_discovery = time.monotonic() + self._discovery_interval
+                self.run_once()
+            except Exception:  # noqa: BLE001
+                LOGGER.exception("Breach detector iteration failed")
+
+            with self._cond:
+                next_deadline = self._heap[0][0] - time.time() if self._heap else self._discovery_interval
+                wait_for = max(0.0, min(next_deadline, next_discovery - time.monotonic()))
+                if wait_for > 0 and not self._stop.is_set():
+                    self._cond.wait(timeout=wait_for)
+
+    def start(self) -> None:
+        if self._thread is not None:
+            return
+        install_breach_detector(self._db)
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="breach-detector", daemon=True)
+        self._thread.start()
+        LOGGER.info("Breach detector started | location_id=%s", self._location_id or "all")
+
+    def stop(self, timeout: float = 5.0) -> None:
+        self._stop.set()
+        with self._cond:
+            self._cond.notify_all()
+        if self._thread is not None:
+            self._thread.join(timeout=timeout)
+            self._thread = None
+        LOGGER.info("Breach detector stopped")
+
+    def stats(self) -> dict[str, Any]:
+        with self._cond:
+            next_deadline = self._heap[0][0] if self._heap else None
+            return {
+                **self._stats,
+                "tracked": len(self._timers),
+                "heap_size": len(self._heap),
+                "next_deadline_in_s": round(next_deadline - time.time(), 3) if next_deadline else None,
+            }
+
+
+__all__ = [
+    "ACTIVE_TICKET_STATUSES",
+    "BreachDetector",
+    "SEVERITY_THRESHOLDS",
+    "install_breach_detector",
+    "severity_for_ratio",
+]
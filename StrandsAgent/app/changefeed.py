@@ -0,0 +1,462 @@
+"""LISTEN/NOTIFY change feed that keeps hot kitchen state in process.
+
+Row-level triggers on `kds_tickets`, `inventory_levels`, `alerts`,
+`restock_recommendations` (and `order_items` start/creation times, which drive SLA
+elapsed time) send `{table, op, id, ts}` on the `kitchen_changes` channel. A dedicated
+autocommit connection listens, batches the ids from a burst of notifications and
+re-reads only those rows (one `= ANY(...)` query per table) into in-memory caches.
+Tools read the caches instead of Postgres while the feed is fresh; after a reconnect
+the caches are rebuilt from scratch (resync) before they are served again.
+"""
+
+from __future__ import annotations
+
+import json
+import logging
+import threading
+import time
+from typing import Any, Callable
+
+import psycopg
+
+from .config import DatabaseSettings
+from .db import Database
+from .utils import decode_json_columns
+
+LOGGER = logging.getLogger(__name__)
+
+CHANNEL = "kitchen_changes"
+
+FEED_TABLES = ("kds_tickets", "inventory_levels", "alerts", "restock_recommendations", "order_items")
+
+INSTALL_SQL = """
+CREATE OR REPLACE FUNCTION kitchen_notify_change() RETURNS trigger AS $$
+DECLARE
+  rec RECORD;
+BEGIN
+  IF TG_OP = 'DELETE' THEN rec := OLD; ELSE rec := NEW; END IF;
+  PERFORM pg_notify('kitchen_changes', json_build_object(
+      'table', TG_TABLE_NAME,
+      'op', TG_OP,
+      'id', rec.id,
+      'ts', extract(epoch FROM clock_timestamp())
+  )::text);
+  RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS kds_tickets_notify ON kds_tickets;
+CREATE TRIGGER kds_tickets_notify AFTER INSERT OR UPDATE OR DELETE ON kds_tickets
+  FOR EACH ROW EXECUTE FUNCTION kitchen_notify_change();
+
+DROP TRIGGER IF EXISTS inventory_levels_notify ON inventory_levels;
+CREATE TRIGGER inventory_levels_notify AFTER INSERT OR UPDATE OR DELETE ON inventory_levels
+  FOR EACH ROW EXECUTE FUNCTION kitchen_notify_change();
+
+DROP TRIGGER IF EXISTS alerts_notify ON alerts;
+CREATE TRIGGER alerts_notify AFTER INSERT OR UPDATE OR DELETE ON alerts
+  FOR EACH ROW EXECUTE FUNCTION kitchen_notify_change();
+
+DROP TRIGGER IF EXISTS restock_recommendations_notify ON restock_recommendations;
+CREATE TRIGGER restock_recommendations_notify AFTER INSERT OR UPDATE OR DELETE ON restock_recommendations
+  FOR EACH ROW EXECUTE FUNCTION kitchen_notify_change();
+
+DROP TRIGGER IF EXISTS order_items_notify ON order_items;
+CREATE TRIGGER order_items_notify AFTER UPDATE OF started_at, created_at ON order_items
+  FOR EACH ROW EXECUTE FUNCTION kitchen_notify_change();
+"""
+
+TICKETS_SQL = """
+SELECT kt.id AS ticket_id,
+       kt.station_id,
+       s.location_id,
+       s.name AS station_name,
+       kt.order_item_id,
+       kt.status,
+       kt.priority_score,
+       kt.priority_reason,
+       kt.enqueued_at,
+       kt.sla_minutes,
+       EXTRACT(EPOCH FROM kt.enqueued_at)::float8 AS enqueued_epoch,
+       EXTRACT(EPOCH FROM COALESCE(oi.started_at, oi.created_at))::float8 AS base_epoch
+FROM kds_tickets kt
+JOIN order_items oi ON oi.id = kt.order_item_id
+JOIN stations s ON s.id = kt.station_id
+WHERE kt.status IN ('queued','firing','prepping')
+"""
+
+INVENTORY_SQL = """
+SELECT id, location_id, ingredient_id, on_hand, unit, par_level, reorder_point, safety_stock
+FROM inventory_levels
+WHERE TRUE
+"""
+
+ALERTS_SQL = """
+SELECT id, org_id, location_id, kind, severity, entity, message, detected_at
+FROM alerts
+WHERE acknowledged_at IS NULL AND resolved_at IS NULL
+"""
+
+RESTOCK_SQL = """
+SELECT rr.id,
+       rr.location_id,
+       rr.ingredient_id,
+       ing.name AS ingredient_name,
+       rr.recommended_qty_packs,
+       rr.supplier_id,
+       sup.name AS supplier_name,
+       rr.rationale,
+       rr.created_at
+FROM restock_recommendations rr
+JOIN ingredients ing ON ing.id = rr.ingredient_id
+LEFT JOIN suppliers sup ON sup.id = rr.supplier_id
+WHERE TRUE
+"""
+
+_ID_FILTERS = {
+    "kds_tickets": (TICKETS_SQL, "kt.id"),
+    "inventory_levels": (INVENTORY_SQL, "id"),
+    "alerts": (ALERTS_SQL, "id"),
+    "restock_recommendations": (RESTOCK_SQL, "rr.id"),
+}
+
+_JSON_COLUMNS = {
+    "kds_tickets": ("priority_reason",),
+    "order_items": ("priority_reason",),
+    "alerts": ("entity",),
+    "restock_recommendations": ("rationale",),
+}
+
+ChangeListener = Callable[[str, list[dict[str, Any]], list[str]], None]
+
+
+def install_change_feed(db: Database) -> None:
+    """Create (or replace) the notify function and triggers."""
+    with db.transaction() as cur:
+        cur.execute(INSTALL_SQL)
+    LOGGER.info("Change feed triggers installed on %s", ", ".join(FEED_TABLES))
+
+
+def uninstall_change_feed(db: Database) -> None:
+    """Drop the notify triggers and function (databases built from an older base schema carry them)."""
+    with db.transaction() as cur:
+        for table in FEED_TABLES:
+            cur.execute(f"DROP TRIGGER IF EXISTS {table}_notify ON {table}")
+        cur.execute("DROP FUNCTION IF EXISTS kitchen_notify_change()")
+    LOGGER.info("Change feed triggers removed from %s", ", ".join(FEED_TABLES))
+
+
+def _sort_key_priority(row: dict[str, Any]) -> tuple[float, float]:
+    score = row.get("priority_score")
+    return (-(score if score is not None else float("-inf")), row.get("enqueued_epoch") or 0.0)
+
+
+class ChangeFeed:
+    """Listener thread plus the caches it maintains.
+
+    Read accessors return ``None`` when the caches are not fresh (listener down,
+    resync pending, or no heartbeat within `max_staleness` seconds) so callers fall
+    back to querying Postgres. The heartbeat only advances after a `SELECT 1` round
+    trip on the LISTEN connection (every `probe_interval` seconds), so a half-open
+    socket that silently stops delivering notifications is detected as stale.
+    """
+
+    def __init__(
+        self,
+        settings: DatabaseSettings,
+        db: Database,
+        max_staleness: float = 5.0,
+        resync_interval: float = 600.0,
+        batch_window: float = 0.05,
+        probe_interval: float = 2.0,
+    ) -> None:
+        self._settings = settings
+        self._db = db
+        self._max_staleness = max_staleness
+        self._resync_interval = resync_interval
+        self._batch_window = batch_window
+        self._probe_interval = probe_interval
+        self._lock = threading.RLock()
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+        self._listeners: list[ChangeListener] = []
+
+        self._tickets: dict[str, dict[str, Any]] = {}
+        self._tickets_by_station: dict[str, set[str]] = {}
+        self._inventory: dict[str, dict[str, Any]] = {}
+        self._alerts: dict[str, dict[str, Any]] = {}
+        self._restock: dict[str, dict[str, Any]] = {}
+
+        self._connected = False
+        self._synced = False
+        self._last_heartbeat = 0.0
+        self._last_event = 0.0
+        self._last_resync = 0.0
+        self._lag_ms = 0.0
+        self._stats = {"events": 0, "rows_refreshed": 0, "resyncs": 0, "reconnects": 0}
+
+    # --- cache maintenance ------------------------------------------------------
+
+    def add_listener(self, listener: ChangeListener) -> None:
+        """Call `listener(table, upserted_rows, removed_ids)` after each applied batch."""
+        self._listeners.append(listener)
+
+    def _fetch(self, table: str, ids: list[str] | None) -> list[dict[str, Any]]:
+        if table == "order_items":
+            sql, column = TICKETS_SQL, "kt.order_item_id"
+        else:
+            sql, column = _ID_FILTERS[table]
+        if ids is None:
+            rows = self._db.fetch_all_json(sql)
+        else:
+            rows = self._db.fetch_all_json(f"{sql} AND {column} = ANY(%s::uuid[])", (ids,))
+        decode_json_columns(rows, *_JSON_COLUMNS.get(table, ()))
+        return rows
+
+    def _put_ticket(self, row: dict[str, Any]) -> None:
+        ticket_id = row["ticket_id"]
+        previous = self._tickets.get(ticket_id)
+        if previous is not None and previous["station_id"] != row["station_id"]:
+            self._tickets_by_station.get(previous["station_id"], set()).discard(ticket_id)
+        self._tickets[ticket_id] = row
+        self._tickets_by_station.setdefault(row["station_id"], set()).add(ticket_id)
+
+    def _drop_ticket(self, ticket_id: str) -> None:
+        previous = self._tickets.pop(ticket_id, None)
+        if previous is not None:
+            self._tickets_by_station.get(previous["station_id"], set()).discard(ticket_id)
+
+    def _apply(self, table: str, ids: list[str] | None) -> None:
+        rows = self._fetch(table, ids)
+        removed: list[str] = []
+        with self._lock:
+            if table in ("kds_tickets", "order_items"):
+                if ids is None:
+                    self._tickets.clear()
+                    self._tickets_by_station.clear()
+                for row in rows:
+                    self._put_ticket(row)
+                if table == "kds_tickets" and ids is not None:
+                    present = {row["ticket_id"] for row in rows}
+                    removed = [ticket_id for ticket_id in ids if ticket_id not in present]
+                    for ticket_id in removed:
+                        self._drop_ticket(ticket_id)
+                table = "kds_tickets"
+            else:
+                cache = {
+                    "inventory_levels": self._inventory,
+                    "alerts": self._alerts,
+                    "restock_recommendations": self._restock,
+                }[table]
+                if ids is None:
+                    cache.clear()
+                for row in rows:
+                    cache[row["id"]] = row
+                if ids is not None:
+                    present = {row["id"] for row in rows}
+                    removed = [row_id for row_id in ids if row_id not in present]
+                    for row_id in removed:
+                        cache.pop(row_id, None)
+            self._stats["rows_refreshed"] += len(rows)
+
+        for listener in self._listeners:
+            try:
+                listener(table, rows, removed)
+            except Exception:  # noqa: BLE001
+                LOGGER.exception("Change feed listener failed | table=%s", table)
+
+    def resync(self) -> None:
+        """Reload every cache from Postgres."""
+        for table in _ID_FILTERS:
+            self._apply(table, None)
+        with self._lock:
+            self._synced = True
+            self._last_resync = time.monotonic()
+            self._stats["resyncs"] += 1
+        LOGGER.info(
+            "Change feed resynced | tickets=%s inventory=%s alerts=%s restock=%s",
+            len(self._tickets),
+            len(self._inventory),
+            len(self._alerts),
+            len(self._restock),
+        )
+
+    # --- listener loop ----------------------------------------------------------
+
+    def _handle_batch(self, pending: dict[str, set[str]]) -> None:
+        for table, ids in pending.items():
+            if table in _ID_FILTERS or table == "order_items":
+                self._apply(table, sorted(ids))
+
+    def _listen(self) -> None:
+        with psycopg.connect(self._settings.dsn, autocommit=True) as conn:
+            conn.execute(f"LISTEN {CHANNEL}")
+            self._connected = True
+            # Resync after LISTEN so no change between load and subscribe is lost.
+            self.resync()
+            last_probe = 0.0
+            while not self._stop.is_set():
+                pending: dict[str, set[str]] = {}
+                for notify in conn.notifies(timeout=1.0, stop_after=1):
+                    self._collect(notify.payload, pending)
+                if pending:
+                    # Drain the rest of a burst so one query covers many ids.
+                    for notify in conn.notifies(timeout=self._batch_window, stop_after=1000):
+                        self._collect(notify.payload, pending)
+                    self._handle_batch(pending)
+                if time.monotonic() - last_probe >= self._probe_interval:
+                    # An idle notifies() timeout proves nothing about the socket; a round trip does.
+                    conn.execute("SELECT 1")
+                    last_probe = self._last_heartbeat = time.monotonic()
+                if self._resync_interval and time.monotonic() - self._last_resync >= self._resync_interval:
+                    self.resync()
+
+    def _collect(self, payload: str, pending: dict[str, set[str]]) -> None:
+        try:
+            event = json.loads(payload)
+        except json.JSONDecodeError:
+            LOGGER.warning("Ignoring malformed change payload: %s", payload)
+            return
+        pending.setdefault(event["table"], set()).add(str(event["id"]))
+        self._stats["events"] += 1
+        self._last_event = time.monotonic()
+        if event.get("ts") is not None:
+            self._lag_ms = max(0.0, (time.time() - float(event["ts"])) * 1000)
+
+    def _run(self) -> None:
+        backoff = 1.0
+        while not self._stop.is_set():
+            try:
+                self._listen()
+                backoff = 1.0
+            except Exception:  # noqa: BLE001
+                LOGGER.exception("Change feed connection lost; reconnecting in %.1fs", backoff)
+            finally:
+                with self._lock:
+                    self._connected = False
+                    self._synced = False
+            if not self._stop.wait(backoff):
+                self._stats["reconnects"] += 1
+                backoff = min(backoff * 2, 30.0)
+
+    def start(self) -> None:
+        if self._thread is not None:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="change-feed", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float = 5.0) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=timeout)
+            self._thread = None
+
+    # --- reads ------------------------------------------------------------------
+
+    def is_fresh(self) -> bool:
+        return (
+            self._connected
+            and self._synced
+            and time.monotonic() - self._last_heartbeat <= self._max_staleness
+        )
+
+    def station_queue(self, station_id: str, limit: int) -> list[dict[str, Any]] | None:
+        """Active tickets for a station ordered like `get_station_queue`, or None if stale."""
+        if not self.is_fresh():
+            return None
+        with self._lock:
+            rows = [self._tickets[ticket_id] for ticket_id in self._tickets_by_station.get(str(station_id), ())]
+        rows.sort(key=_sort_key_priority)
+        return [
+            {
+                "ticket_id": row["ticket_id"],
+                "status": row["status"],
+                "priority_score": row["priority_score"],
+                "priority_reason": row["priority_reason"],
+                "enqueued_at": row["enqueued_at"],
+            }
+            for row in rows[: max(int(limit), 0)]
+        ]
+
+    def open_breaches(self, location_id: str) -> list[dict[str, Any]] | None:
+        """Tickets over their SLA for a location (same shape as the tool), or None if stale."""
+        if not self.is_fresh():
+            return None
+        now = time.time()
+        breaches: list[dict[str, Any]] = []
+        with self._lock:
+            candidates = [row for row in self._tickets.values() if row["location_id"] == str(location_id)]
+        for row in candidates:
+            sla = row.get("sla_minutes")
+            base = row.get("base_epoch")
+            if not sla or base is None:
+                continue
+            minutes_elapsed = (now - base) / 60
+            if minutes_elapsed <= sla:
+                continue
+            breaches.append(
+                {
+                    "ticket_id": row["ticket_id"],
+                    "station_id": row["station_id"],
+                    "station_name": row["station_name"],
+                    "minutes_elapsed": minutes_elapsed,
+                    "sla_minutes": sla,
+                    "sla_ratio": minutes_elapsed / sla,
+                }
+            )
+        breaches.sort(key=lambda item: item["minutes_elapsed"], reverse=True)
+        return breaches
+
+    def restock_risks(self, location_id: str) -> list[dict[str, Any]] | None:
+        """Restock recommendations for a location, newest first, or None if stale."""
+        if not self.is_fresh():
+            return None
+        with self._lock:
+            rows = [dict(row) for row in self._restock.values() if row["location_id"] == str(location_id)]
+        rows.sort(key=lambda row: (row["created_at"], str(row["id"])), reverse=True)
+        for row in rows:
+            row.pop("location_id", None)
+        return rows
+
+    def open_alerts(self, location_id: str | None = None) -> list[dict[str, Any]] | None:
+        if not self.is_fresh():
+            return None
+        with self._lock:
+            return [
+                dict(row)
+                for row in self._alerts.values()
+                if location_id is None or row["location_id"] == str(location_id)
+            ]
+
+    def inventory_level(self, location_id: str, ingredient_id: str) -> dict[str, Any] | None:
+        if not self.is_fresh():
+            return None
+        with self._lock:
+            for row in self._inventory.values():
+                if row["location_id"] == str(location_id) and row["ingredient_id"] == str(ingredient_id):
+                    return dict(row)
+        return None
+
+    def stats(self) -> dict[str, Any]:
+        now = time.monotonic()
+        with self._lock:
+            return {
+                **self._stats,
+                "connected": self._connected,
+                "synced": self._synced,
+                "fresh": self.is_fresh(),
+                "staleness_s": round(now - self._last_heartbeat, 3) if self._last_heartbeat else None,
+                "since_last_event_s": round(now - self._last_event, 3) if self._last_event else None,
+                "since_last_resync_s": round(now - self._last_resync, 3) if self._last_resync else None,
+                "notify_lag_ms": round(self._lag_ms, 3),
+                "cached": {
+                    "tickets": len(self._tickets),
+                    "inventory_levels": len(self._inventory),
+                    "alerts": len(self._alerts),
+                    "restock_recommendations": len(self._restock),
+                },
+            }
+
+
+__all__ = ["CHANNEL", "ChangeFeed", "install_change_feed", "uninstall_change_feed"]
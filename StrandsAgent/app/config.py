@@ -30,11 +30,134 @@ class AWSSettings:
 
 @dataclass(frozen=True)
 class DatabaseSettings:
-    """PostgreSQL connection information."""
+    """PostgreSQL connection information and pool sizing."""
 
     dsn: str
     min_size: int = 1
     max_size: int = 5
+    pool_timeout: float = 30.0
+    max_idle: float = 600.0
+    drain_timeout: float = 10.0
+
+
+@dataclass(frozen=True)
+class ConcurrencySettings:
+    """Worker limits for blocking agent and tool calls made from the API."""
+
+    agent_workers: int = 4
+    # Defaults to the pool's max size: every tool call holds a connection.
+    tool_workers: int = 5
+    max_queue: int = 64
+
+
+@dataclass(frozen=True)
+class BreachDetectorSettings:
+    """Background SLA breach detector configuration."""
+
+    enabled: bool = False
+    location_id: Optional[str] = None
+    discovery_interval: float = 5.0
+    resync_interval: float = 300.0
+
+
+@dataclass(frozen=True)
+class ChangeFeedSettings:
+    """LISTEN/NOTIFY change feed that keeps hot rows cached in process."""
+
+    enabled: bool = False
+    max_staleness: float = 5.0
+    resync_interval: float = 600.0
+
+
+@dataclass(frozen=True)
+class StationIndexSettings:
+    """In-process per-station priority index behind `get_station_queue`."""
+
+    enabled: bool = False
+    reconcile_interval: float = 15.0
+
+
+@dataclass(frozen=True)
+class ScoringSettings:
+    """Scheduled priority scoring of active KDS tickets."""
+
+    enabled: bool = False
+    location_id: Optional[str] = None
+    interval: float = 30.0
+
+
+@dataclass(frozen=True)
+class SmartQueueSettings:
+    """Smart Queue batching (lead merge window and fallback station capacity)."""
+
+    merge_window: float = 180.0
+    default_capacity: int = 4
+
+
+@dataclass(frozen=True)
+class TracingSettings:
+    """Per-run agent tracing (model and tool spans) kept in memory."""
+
+    enabled: bool = True
+    max_runs: int = 200
+
+
+@dataclass(frozen=True)
+class ResponseCacheSettings:
+    """Cache of LLM agent answers, invalidated by table-change notifications."""
+
+    enabled: bool = False
+    ttl: float = 300.0
+    max_bytes: int = 8 * 1024 * 1024
+    agents: tuple[str, ...] = ("prep_planner", "inventory_controller")
+
+
+@dataclass(frozen=True)
+class FastPathSettings:
+    """Rule-based routing of structured agent requests straight to tools."""
+
+    enabled: bool = True
+
+
+@dataclass(frozen=True)
+class StreamingSettings:
+    """Streaming agent responses (`POST /agents/{name}/stream`)."""
+
+    buffer_events: int = 64
+    heartbeat: float = 15.0
+
+
+@dataclass(frozen=True)
+class PrepTimeSettings:
+    """Background learning of prep times from passed tickets (`app.prep_times`)."""
+
+    enabled: bool = False
+    interval: float = 60.0
+    alpha: float = 0.05
+    chunk_size: int = 50_000
+    min_observations: int = 5
+
+
+@dataclass(frozen=True)
+class ForecastSettings:
+    """Seasonal demand forecasts written to `demand_forecasts` (`app.forecasting`)."""
+
+    enabled: bool = False
+    interval: float = 900.0
+    workers: int = 4
+    horizon_days: int = 2
+    history_days: int = 56
+    alpha: float = 0.2
+
+
+@dataclass(frozen=True)
+class WriteBehindSettings:
+    """Local durable event log that takes ticket/alert/waste writes off the request path."""
+
+    enabled: bool = False
+    path: str = "kitchen-events.sqlite3"
+    batch_size: int = 200
+    flush_interval: float = 0.05
 
 
 @dataclass(frozen=True)
@@ -43,9 +166,70 @@ class Settings:
 
     aws: AWSSettings
     database: DatabaseSettings
+    concurrency: ConcurrencySettings = ConcurrencySettings()
+    breach_detector: BreachDetectorSettings = BreachDetectorSettings()
+    change_feed: ChangeFeedSettings = ChangeFeedSettings()
+    station_index: StationIndexSettings = StationIndexSettings()
+    scoring: ScoringSettings = ScoringSettings()
+    smart_queue: SmartQueueSettings = SmartQueueSettings()
+    tracing: TracingSettings = TracingSettings()
+    streaming: StreamingSettings = StreamingSettings()
+    fast_path: FastPathSettings = FastPathSettings()
+    response_cache: ResponseCacheSettings = ResponseCacheSettings()
+    write_behind: WriteBehindSettings = WriteBehindSettings()
+    prep_times: PrepTimeSettings = PrepTimeSettings()
+    forecasts: ForecastSettings = ForecastSettings()
+    model_provider: str = "bedrock"
     log_level: str = "INFO"
 
 
+def _env_int(name: str, default: int) -> int:
+    raw = os.getenv(name)
+    if raw is None or raw.strip() == "":
+        return default
+    try:
+        return int(raw)
+    except ValueError as exc:
+        raise RuntimeError(f"{name} must be an integer, got {raw!r}.") from exc
+
+
+def _env_float(name: str, default: float) -> float:
+    raw = os.getenv(name)
+    if raw is None or raw.strip() == "":
+        return default
+    try:
+        return float(raw)
+    except ValueError as exc:
+        raise RuntimeError(f"{name} must be a number, got {raw!r}.") from exc
+
+
+def _env_bool(name: str, default: bool) -> bool:
+    raw = os.getenv(name)
+    if raw is None or raw.strip() == "":
+        return default
+    return raw.strip().lower() in {"1", "true", "yes", "on"}
+
+
+def _resolve_database_settings() -> DatabaseSettings:
+    """Build pool settings from `DB_POOL_*` environment variables."""
+
+    min_size = _env_int("DB_POOL_MIN_SIZE", 1)
+    max_size = _env_int("DB_POOL_MAX_SIZE", 5)
+    if min_size < 0 or max_size < 1 or max_size < min_size:
+        raise RuntimeError(
+            f"Invalid pool sizing: DB_POOL_MIN_SIZE={min_size}, DB_POOL_MAX_SIZE={max_size}."
+        )
+
+    return DatabaseSettings(
+        dsn=_resolve_database_dsn(),
+        min_size=min_size,
+        max_size=max_size,
+        pool_timeout=_env_float("DB_POOL_TIMEOUT", 30.0),
+        max_idle=_env_float("DB_POOL_MAX_IDLE", 600.0),
+        drain_timeout=_env_float("DB_POOL_DRAIN_TIMEOUT", 10.0),
+    )
+
+
 def _resolve_database_dsn() -> str:
     """Create a PostgreSQL DSN string from environment variables.
 
@@ -94,6 +278,111 @@ def get_settings() -> Settings:
         bedrock_model_id=os.getenv("BEDROCK_MODEL_ID"),
     )
 
-    database_settings = DatabaseSettings(dsn=_resolve_database_dsn())
+    database_settings = _resolve_database_settings()
+
+    concurrency_settings = ConcurrencySettings(
+        agent_workers=max(1, _env_int("API_AGENT_WORKERS", 4)),
+        tool_workers=max(1, _env_int("API_TOOL_WORKERS", database_settings.max_size)),
+        max_queue=max(0, _env_int("API_MAX_QUEUE", 64)),
+    )
+
+    breach_settings = BreachDetectorSettings(
+        enabled=_env_bool("BREACH_DETECTOR_ENABLED", False),
+        location_id=os.getenv("BREACH_DETECTOR_LOCATION_ID") or None,
+        discovery_interval=_env_float("BREACH_DETECTOR_DISCOVERY_INTERVAL", 5.0),
+        resync_interval=_env_float("BREACH_DETECTOR_RESYNC_INTERVAL", 300.0),
+    )
+
+    change_feed_settings = ChangeFeedSettings(
+        enabled=_env_bool("CHANGE_FEED_ENABLED", False),
+        max_staleness=_env_float("CHANGE_FEED_MAX_STALENESS", 5.0),
+        resync_interval=_env_float("CHANGE_FEED_RESYNC_INTERVAL", 600.0),
+    )
+
+    station_index_settings = StationIndexSettings(
+        enabled=_env_bool("STATION_INDEX_ENABLED", False),
+        reconcile_interval=max(1.0, _env_float("STATION_INDEX_RECONCILE_INTERVAL", 15.0)),
+    )
+
+    scoring_settings = ScoringSettings(
+        enabled=_env_bool("PRIORITY_SCORER_ENABLED", False),
+        location_id=os.getenv("PRIORITY_SCORER_LOCATION_ID") or None,
+        interval=max(1.0, _env_float("PRIORITY_SCORER_INTERVAL", 30.0)),
+    )
+
+    smart_queue_settings = SmartQueueSettings(
+        merge_window=max(0.0, _env_float("SMART_QUEUE_MERGE_WINDOW", 180.0)),
+        default_capacity=max(1, _env_int("SMART_QUEUE_DEFAULT_CAPACITY", 4)),
+    )
+
+    tracing_settings = TracingSettings(
+        enabled=_env_bool("AGENT_TRACING_ENABLED", True),
+        max_runs=max(1, _env_int("AGENT_TRACE_MAX_RUNS", 200)),
+    )
+
+    streaming_settings = StreamingSettings(
+        buffer_events=max(1, _env_int("STREAM_BUFFER_EVENTS", 64)),
+        heartbeat=max(1.0, _env_float("STREAM_HEARTBEAT_SECONDS", 15.0)),
+    )
 
-    return Settings(aws=aws_settings, database=database_settings, log_level=log_level)
+    fast_path_settings = FastPathSettings(enabled=_env_bool("FAST_PATH_ENABLED", True))
+
+    cache_agents = os.getenv("RESPONSE_CACHE_AGENTS")
+    response_cache_settings = ResponseCacheSettings(
+        enabled=_env_bool("RESPONSE_CACHE_ENABLED", False),
+        ttl=max(1.0, _env_float("RESPONSE_CACHE_TTL", 300.0)),
+        max_bytes=max(1024, _env_int("RESPONSE_CACHE_MAX_BYTES", 8 * 1024 * 1024)),
+        agents=(
+            tuple(name.strip() for name in cache_agents.split(",") if name.strip())
+            if cache_agents
+            else ResponseCacheSettings.agents
+        ),
+    )
+
+    write_behind_settings = WriteBehindSettings(
+        enabled=_env_bool("WRITE_BEHIND_ENABLED", False),
+        path=os.getenv("WRITE_BEHIND_PATH") or WriteBehindSettings.path,
+        batch_size=max(1, _env_int("WRITE_BEHIND_BATCH_SIZE", 200)),
+        flush_interval=max(0.005, _env_float("WRITE_BEHIND_FLUSH_INTERVAL", 0.05)),
+    )
+
+    prep_time_settings = PrepTimeSettings(
+        enabled=_env_bool("PREP_TIME_LEARNER_ENABLED", False),
+        interval=max(1.0, _env_float("PREP_TIME_LEARNER_INTERVAL", 60.0)),
+        alpha=min(max(_env_float("PREP_TIME_ALPHA", 0.05), 0.001), 1.0),
+        chunk_size=max(100, _env_int("PREP_TIME_CHUNK_SIZE", 50_000)),
+        min_observations=max(1, _env_int("PREP_TIME_MIN_OBSERVATIONS", 5)),
+    )
+
+    forecast_settings = ForecastSettings(
+        enabled=_env_bool("FORECASTER_ENABLED", False),
+        interval=max(1.0, _env_float("FORECASTER_INTERVAL", 900.0)),
+        workers=max(1, _env_int("FORECAST_WORKERS", min(os.cpu_count() or 1, 8))),
+        horizon_days=max(1, _env_int("FORECAST_HORIZON_DAYS", 2)),
+        history_days=max(7, _env_int("FORECAST_HISTORY_DAYS", 56)),
+        alpha=min(max(_env_float("FORECAST_ALPHA", 0.2), 0.001), 1.0),
+    )
+
+    model_provider = os.getenv("AGENT_MODEL_PROVIDER", "bedrock").strip().lower() or "bedrock"
+    if model_provider not in {"bedrock", "stub"}:
+        raise RuntimeError(f"AGENT_MODEL_PROVIDER must be 'bedrock' or 'stub', got {model_provider!r}.")
+
+    return Settings(
+        aws=aws_settings,
+        database=database_settings,
+        concurrency=concurrency_settings,
+        breach_detector=breach_settings,
+        change_feed=change_feed_settings,
+        station_index=station_index_settings,
+        scoring=scoring_settings,
+        smart_queue=smart_queue_settings,
+        tracing=tracing_settings,
+        streaming=streaming_settings,
+        fast_path=fast_path_settings,
+        response_cache=response_cache_settings,
+        write_behind=write_behind_settings,
+        prep_times=prep_time_settings,
+        forecasts=forecast_settings,
+        model_provider=model_provider,
+        log_level=log_level,
+    )
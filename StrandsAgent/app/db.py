@@ -3,48 +3,209 @@
 from __future__ import annotations
 
 import logging
+import time
 from contextlib import contextmanager
-from typing import Any, Iterable, Iterator, Sequence
+from typing import Any, Iterable, Iterator, Mapping, Sequence
 
 from psycopg.rows import dict_row
-from psycopg_pool import ConnectionPool
+from psycopg_pool import ConnectionPool, PoolTimeout
 
 from .config import DatabaseSettings
+from .metrics import (
+    DB_POOL_WAIT_SECONDS,
+    DB_QUERY_SECONDS,
+    DB_ROWS,
+    DB_TRANSACTION_SECONDS,
+    current_tool,
+    timed_db_call,
+)
+from .utils import configure_json_loaders
 
 LOGGER = logging.getLogger(__name__)
 
+Params = Sequence[Any] | Mapping[str, Any]
+
+STREAM_CHUNK_SIZE = 1000
+
+
+def iter_chunks(
+    conn: Any,
+    sql: str,
+    params: Params | None = None,
+    chunk_size: int = STREAM_CHUNK_SIZE,
+    row_factory: Any = dict_row,
+    json: bool = False,
+    name: str = "kitchen_stream",
+) -> Iterator[list[Any]]:
+    """Yield lists of up to `chunk_size` rows from a named (server-side) cursor on `conn`.
+
+    Postgres keeps the result set and only one chunk is held client-side at a time.
+    The cursor lives in the caller's transaction, which must stay open until the
+    generator is exhausted or closed. `json` registers the JSON-ready loaders.
+    """
+    with conn.cursor(name=name, row_factory=row_factory) as cur:
+        if json:
+            configure_json_loaders(cur.adapters)
+        cur.itersize = chunk_size
+        cur.execute(sql, params)
+        while True:
+            rows = cur.fetchmany(chunk_size)
+            if not rows:
+                return
+            yield rows
+
 
 class Database:
-    """Lightweight wrapper around a psycopg connection pool."""
+    """Lightweight wrapper around a psycopg connection pool.
+
+    A single instance is meant to be shared for the lifetime of a process (see
+    `app.api` lifespan); constructing one per request pays a full connect/auth
+    handshake each time.
+    """
 
     def __init__(self, settings: DatabaseSettings) -> None:
+        self._settings = settings
         self._pool = ConnectionPool(
             settings.dsn,
             min_size=settings.min_size,
             max_size=settings.max_size,
+            timeout=settings.pool_timeout,
+            max_idle=settings.max_idle,
             kwargs={"autocommit": False, "row_factory": dict_row},
+            check=ConnectionPool.check_connection,
+            name="kitchen-agents",
+            open=False,
         )
-        LOGGER.debug("Initialized database pool with dsn=%s", settings.dsn)
+        self._pool.open()
+        LOGGER.debug(
+            "Initialized database pool min_size=%s max_size=%s", settings.min_size, settings.max_size
+        )
+
+    @property
+    def pool_max_size(self) -> int:
+        return self._settings.max_size
+
+    def wait_ready(self, timeout: float | None = None) -> None:
+        """Block until the pool has opened `min_size` connections."""
+        try:
+            self._pool.wait(timeout=timeout if timeout is not None else self._settings.pool_timeout)
+        except PoolTimeout as exc:
+            raise RuntimeError("Database pool did not become ready in time") from exc
+
+    def check(self) -> bool:
+        """Return True when a pooled connection can run a trivial query."""
+        try:
+            with self.connection() as conn:
+                conn.execute("SELECT 1")
+                conn.rollback()
+            return True
+        except Exception:  # noqa: BLE001
+            LOGGER.exception("Database health check failed")
+            return False
+
+    def stats(self) -> dict[str, int]:
+        """Return pool counters (size, available, waiting requests, ...)."""
+        return dict(self._pool.get_stats())
 
     @contextmanager
     def connection(self) -> Iterator[Any]:
         """Yield a raw psycopg connection from the pool."""
+        requested = time.perf_counter()
         with self._pool.connection() as conn:
+            DB_POOL_WAIT_SECONDS.observe(time.perf_counter() - requested)
             yield conn
 
-    def fetch_one(self, sql: str, params: Sequence[Any] | None = None) -> dict | None:
+    @timed_db_call
+    def fetch_one(self, sql: str, params: Params | None = None) -> dict | None:
         with self.connection() as conn:
             with conn.cursor(row_factory=dict_row) as cur:
                 cur.execute(sql, params)
                 return cur.fetchone()
 
-    def fetch_all(self, sql: str, params: Sequence[Any] | None = None) -> list[dict]:
+    @timed_db_call
+    def fetch_all(self, sql: str, params: Params | None = None) -> list[dict]:
         with self.connection() as conn:
             with conn.cursor(row_factory=dict_row) as cur:
                 cur.execute(sql, params)
                 return list(cur.fetchall())
 
-    def execute(self, sql: str, params: Sequence[Any] | None = None) -> int:
+    @timed_db_call
+    def fetch_one_json(self, sql: str, params: Params | None = None) -> dict | None:
+        """Like `fetch_one`, but values are JSON-ready (see `utils.configure_json_loaders`)."""
+        with self.connection() as conn:
+            with conn.cursor(row_factory=dict_row) as cur:
+                configure_json_loaders(cur.adapters)
+                cur.execute(sql, params)
+                return cur.fetchone()
+
+    @timed_db_call
+    def fetch_all_json(self, sql: str, params: Params | None = None) -> list[dict]:
+        """Like `fetch_all`, but values are JSON-ready (see `utils.configure_json_loaders`)."""
+        with self.connection() as conn:
+            with conn.cursor(row_factory=dict_row) as cur:
+                configure_json_loaders(cur.adapters)
+                cur.execute(sql, params)
+                return cur.fetchall()
+
+    def stream_chunks(
+        self,
+        sql: str,
+        params: Params | None = None,
+        chunk_size: int = STREAM_CHUNK_SIZE,
+        json: bool = False,
+        row_factory: Any = dict_row,
+    ) -> Iterator[list[Any]]:
+        """Stream a large result in chunks through `iter_chunks` on a pooled connection.
+
+        The connection stays checked out until the generator is exhausted or closed;
+        closing it early discards the rest of the result on the server. Timed as
+        method ``stream`` (latency includes the time the consumer spends per chunk).
+        """
+        tool = current_tool()
+        started = time.perf_counter()
+        status = "error"
+        rows = 0
+        with self.connection() as conn:
+            chunks = iter_chunks(conn, sql, params, chunk_size, row_factory=row_factory, json=json)
+            try:
+                for chunk in chunks:
+                    rows += len(chunk)
+                    yield chunk
+                status = "ok"
+            except GeneratorExit:
+                # The consumer stopped early (a page is full, a client went away).
+                status = "ok"
+                raise
+            finally:
+                chunks.close()
+                conn.rollback()
+                DB_ROWS.observe(rows, method="stream", tool=tool)
+                DB_QUERY_SECONDS.observe(time.perf_counter() - started, method="stream", tool=tool, status=status)
+
+    def stream(
+        self, sql: str, params: Params | None = None, chunk_size: int = STREAM_CHUNK_SIZE, json: bool = False
+    ) -> Iterator[dict]:
+        """Like `fetch_all` (or `fetch_all_json`), but yields rows one at a time from `stream_chunks`."""
+        for chunk in self.stream_chunks(sql, params, chunk_size, json=json):
+            yield from chunk
+
+    @timed_db_call
+    def execute_returning(self, sql: str, params: Params | None = None) -> dict | None:
+        """Run a write with a RETURNING clause, commit it and return the first row.
+
+        `fetch_one` would persist the same write, because the pool's connection
+        context commits on a clean exit. This helper commits explicitly so write
+        call sites state their intent and the commit is timed with the statement.
+        """
+        with self.connection() as conn:
+            with conn.cursor(row_factory=dict_row) as cur:
+                cur.execute(sql, params)
+                row = cur.fetchone()
+            conn.commit()
+            return row
+
+    @timed_db_call
+    def execute(self, sql: str, params: Params | None = None) -> int:
         with self.connection() as conn:
             with conn.cursor() as cur:
                 cur.execute(sql, params)
@@ -52,6 +213,7 @@ class Database:
             conn.commit()
             return affected
 
+    @timed_db_call
     def execute_many(self, sql: str, param_list: Iterable[Sequence[Any]]) -> None:
         with self.connection() as conn:
             with conn.cursor() as cur:
@@ -62,14 +224,23 @@ class Database:
     def transaction(self) -> Iterator[Any]:
         """Provide a cursor inside an explicit transaction."""
         with self.connection() as conn:
+            started = time.perf_counter()
+            outcome = "rollback"
             with conn.cursor(row_factory=dict_row) as cur:
                 try:
                     yield cur
                     conn.commit()
+                    outcome = "commit"
                 except Exception:
                     conn.rollback()
                     raise
+                finally:
+                    DB_TRANSACTION_SECONDS.observe(
+                        time.perf_counter() - started, tool=current_tool(), outcome=outcome
+                    )
 
-    def close(self) -> None:
-        self._pool.close()
+    def close(self, timeout: float | None = None) -> None:
+        """Close the pool, giving checked-out connections `timeout` seconds to return."""
+        drain = timeout if timeout is not None else self._settings.drain_timeout
+        self._pool.close(timeout=drain)
         LOGGER.debug("Database pool closed")
@@ -0,0 +1,120 @@
+"""Bounded thread-pool execution of blocking work for the async API."""
+
+from __future__ import annotations
+
+import asyncio
+import contextvars
+import functools
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Any, Callable, Mapping, TypeVar
+
+LOGGER = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+
+class ExecutorSaturated(RuntimeError):
+    """Raised when a lane's wait queue is full and new work must be rejected."""
+
+
+@dataclass
+class _Lane:
+    limit: int
+    max_queue: int
+    semaphore: asyncio.Semaphore = field(init=False)
+    active: int = 0
+    waiting: int = 0
+    completed: int = 0
+    failed: int = 0
+    rejected: int = 0
+    wait_seconds_total: float = 0.0
+    wait_seconds_max: float = 0.0
+
+    def __post_init__(self) -> None:
+        self.semaphore = asyncio.Semaphore(self.limit)
+
+    def snapshot(self) -> dict[str, Any]:
+        return {
+            "limit": self.limit,
+            "max_queue": self.max_queue,
+            "active": self.active,
+            "queued": self.waiting,
+            "completed": self.completed,
+            "failed": self.failed,
+            "rejected": self.rejected,
+            "wait_seconds_total": round(self.wait_seconds_total, 6),
+            "wait_seconds_max": round(self.wait_seconds_max, 6),
+        }
+
+
+class BoundedExecutor:
+    """Run synchronous callables off the event loop with per-lane concurrency limits.
+
+    Each lane (e.g. ``agents`` or ``tools``) has its own semaphore so a burst of slow
+    Bedrock calls cannot starve tool calls, and a bounded wait queue so overload turns
+    into fast rejections instead of unbounded latency. Endpoints that never block
+    (such as ``/health``) stay on the event loop and are unaffected.
+    """
+
+    def __init__(self, limits: Mapping[str, int], max_queue: int) -> None:
+        if not limits:
+            raise ValueError("At least one lane is required")
+        self._lanes = {name: _Lane(limit=limit, max_queue=max_queue) for name, limit in limits.items()}
+        self._pool = ThreadPoolExecutor(
+            max_workers=sum(limits.values()),
+            thread_name_prefix="kitchen-worker",
+        )
+
+    def ensure_capacity(self, lane_name: str) -> None:
+        """Raise `ExecutorSaturated` if `run` on this lane would be rejected right now.
+
+        Lets streaming endpoints fail with 503 before response headers are sent.
+        """
+        lane = self._lanes[lane_name]
+        if lane.waiting >= lane.max_queue and lane.semaphore.locked():
+            lane.rejected += 1
+            raise ExecutorSaturated(f"Too many pending '{lane_name}' requests")
+
+    async def run(self, lane_name: str, fn: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+        """Run `fn(*args, **kwargs)` in the worker pool under the lane's limit."""
+        self.ensure_capacity(lane_name)
+        lane = self._lanes[lane_name]
+
+        queued_at = time.perf_counter()
+        lane.waiting += 1
+        try:
+            await lane.semaphore.acquire()
+        finally:
+            lane.waiting -= 1
+        waited = time.perf_counter() - queued_at
+        lane.wait_seconds_total += waited
+        lane.wait_seconds_max = max(lane.wait_seconds_max, waited)
+
+        lane.active += 1
+        try:
+            loop = asyncio.get_running_loop()
+            ctx = contextvars.copy_context()
+            call = functools.partial(ctx.run, fn, *args, **kwargs)
+            result = await loop.run_in_executor(self._pool, call)
+        except Exception:
+            lane.failed += 1
+            raise
+        finally:
+            lane.active -= 1
+            lane.semaphore.release()
+        lane.completed += 1
+        return result
+
+    def stats(self) -> dict[str, dict[str, Any]]:
+        """Return per-lane counters including current queue depth."""
+        return {name: lane.snapshot() for name, lane in self._lanes.items()}
+
+    def shutdown(self, wait: bool = True) -> None:
+        self._pool.shutdown(wait=wait, cancel_futures=not wait)
+        LOGGER.debug("Worker pool shut down")
+
+
+__all__ = ["BoundedExecutor", "ExecutorSaturated"]
@@ -0,0 +1,349 @@
+"""Rule-based fast path that answers structured agent requests straight from the tools.
+
+Many `/agents/{name}/run` prompts are fully structured ("next 3 tickets for station
+<id>", "monthly shopping list for 30 days"). `FastPathRouter` recognises those, or an
+explicit ``intent`` + ``params`` payload, calls the one tool the agent would have
+called and renders the same Do / Why answer without a Bedrock round trip.
+
+Anything the rules do not match goes to the LLM as before, and so does a matched
+request whose tool returns an error (the model can still ask for clarification).
+Hits, misses and fallbacks are counted in `stats()` (served at `/health/fast-path`),
+and fast-path latency goes to the ``kitchen_fast_path_duration_seconds`` histogram.
+"""
+
+from __future__ import annotations
+
+import json
+import logging
+import re
+import threading
+import time
+from dataclasses import dataclass
+from typing import Any, Callable
+
+from .metrics import FAST_PATH_SECONDS
+
+LOGGER = logging.getLogger(__name__)
+
+_UUID = r"[0-9a-fA-F]{8}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{12}"
+
+# Short prompts only: anything longer is probably a real question for the model.
+_MAX_PROMPT_CHARS = 200
+
+
+class FastPathRequestError(ValueError):
+    """Raised for an explicit intent that is unknown, not available to the agent or missing parameters."""
+
+
+@dataclass(frozen=True)
+class FastPathAnswer:
+    intent: str
+    tool: str
+    output: str
+    elapsed_ms: float
+
+
+def _payload(result: dict[str, Any]) -> dict[str, Any]:
+    for block in result.get("content", []):
+        if "json" in block:
+            return block["json"]
+    return {}
+
+
+def _error_text(result: dict[str, Any]) -> str:
+    return " ".join(block.get("text", "") for block in result.get("content", [])).strip()
+
+
+def _minutes(value: Any) -> str:
+    return f"{float(value):.0f} min" if isinstance(value, (int, float)) else "n/a"
+
+
+# --- Renderers ------------------------------------------------------------------
+
+
+def _render_station_queue(params: dict[str, Any], payload: dict[str, Any]) -> str:
+    tickets = payload.get("tickets") or []
+    if not tickets:
+        return f"Do now: Nothing to fire for station {params['station_id']}.\nWhy: The station queue is empty."
+    order = ", then ".join(str(ticket.get("ticket_id")) for ticket in tickets)
+    lines = [f"Do now: Fire {order}.", "Why:"]
+    for ticket in tickets:
+        reason = ticket.get("priority_reason")
+        score = ticket.get("priority_score")
+        detail = f"score {float(score):.2f}" if isinstance(score, (int, float)) else "unscored"
+        if isinstance(reason, dict):
+            detail += (
+                f", {reason.get('dominant', 'priority')} leads; waiting {_minutes(reason.get('wait_min'))}"
+                f", slack {_minutes(reason.get('slack_min'))}, order {reason.get('order_progress', '?')}"
+            )
+            if reason.get("held"):
+                detail += " (held)"
+        elif reason:
+            detail += f", {reason}"
+        lines.append(f"- {ticket.get('ticket_id')} ({ticket.get('status')}): {detail}")
+    slack = [
+        ticket["priority_reason"].get("slack_min")
+        for ticket in tickets
+        if isinstance(ticket.get("priority_reason"), dict)
+    ]
+    late = [value for value in slack if isinstance(value, (int, float)) and value < 0]
+    if late:
+        lines.append(f"Risks: {len(late)} of these are already past SLA.")
+    return "\n".join(lines)
+
+
+def _render_breaches(params: dict[str, Any], payload: dict[str, Any]) -> str:
+    breaches = payload.get("breaches") or []
+    if not breaches:
+        return f"Do now: No action needed at location {params['location_id']}.\nWhy: No open SLA breaches."
+    worst = breaches[0]
+    lines = [
+        f"Do now: Expedite {worst.get('ticket_id')} at {worst.get('station_name') or worst.get('station_id')} first.",
+        f"Why: {len(breaches)} open breach(es):",
+    ]
+    for breach in breaches[:10]:
+        lines.append(
+            f"- [{breach.get('severity', 'n/a')}] {breach.get('ticket_id')} at "
+            f"{breach.get('station_name') or breach.get('station_id')}: "
+            f"{_minutes(breach.get('minutes_elapsed'))} vs SLA {_minutes(breach.get('sla_minutes'))}"
+        )
+    if len(breaches) > 10:
+        lines.append(f"- ... and {len(breaches) - 10} more")
+    return "\n".join(lines)
+
+
+def _render_restock(params: dict[str, Any], payload: dict[str, Any]) -> str:
+    recommendations = payload.get("recommendations") or []
+    if not recommendations:
+        return f"Do now: Nothing to reorder for location {params['location_id']}.\nWhy: No restock recommendations."
+    more = "+" if payload.get("next_cursor") else ""
+    lines = [f"Do now: Reorder {len(recommendations)}{more} ingredient(s).", "Why:"]
+    for rec in recommendations[:10]:
+        supplier = rec.get("supplier_name") or "no supplier"
+        lines.append(
+            f"- {rec.get('ingredient_name')}: {rec.get('recommended_qty_packs')} pack(s) from {supplier}"
+        )
+    if len(recommendations) > 10:
+        lines.append(f"- ... and {len(recommendations) - 10} more")
+    return "\n".join(lines)
+
+
+def _render_shopping_list(params: dict[str, Any], payload: dict[str, Any]) -> str:
+    # The inventory controller is instructed to answer with strict JSON of this shape.
+    return json.dumps({"items": payload.get("items") or []}, separators=(",", ":"), default=str)
+
+
+# --- Rules ----------------------------------------------------------------------
+
+
+@dataclass(frozen=True)
+class _Rule:
+    intent: str
+    tool: str
+    agents: frozenset[str]
+    patterns: tuple[re.Pattern[str], ...]
+    parse: Callable[[re.Match[str]], dict[str, Any]]
+    normalise: Callable[[dict[str, Any]], dict[str, Any]]
+    render: Callable[[dict[str, Any], dict[str, Any]], str]
+
+
+def _station_params(params: dict[str, Any]) -> dict[str, Any]:
+    if not params.get("station_id"):
+        raise FastPathRequestError("station_queue requires station_id")
+    return {"station_id": str(params["station_id"]), "limit": min(max(int(params.get("limit") or 3), 1), 10)}
+
+
+def _location_params(params: dict[str, Any]) -> dict[str, Any]:
+    if not params.get("location_id"):
+        raise FastPathRequestError("location_id is required")
+    return {"location_id": str(params["location_id"])}
+
+
+def _days_params(params: dict[str, Any]) -> dict[str, Any]:
+    return {"days": min(max(int(params.get("days") or 30), 1), 365)}
+
+
+RULES: tuple[_Rule, ...] = (
+    _Rule(
+        intent="station_queue",
+        tool="get_station_queue",
+        agents=frozenset({"station_dispatcher", "kitchen_copilot", "supervisor"}),
+        patterns=(
+            re.compile(
+                rf"^\s*(?:what(?:'s| is| are)?\s+)?(?:the\s+)?next\s+(?:(?P<limit>\d+)\s+)?tickets?\s+"
+                rf"(?:for|at|on)\s+station\s+(?P<station_id>{_UUID})\s*[?.!]*\s*$",
+                re.IGNORECASE,
+            ),
+            re.compile(
+                rf"^\s*(?:show\s+)?(?:the\s+)?(?:station\s+)?queue\s+(?:for|at)\s+station\s+(?P<station_id>{_UUID})"
+                r"\s*[?.!]*\s*$",
+                re.IGNORECASE,
+            ),
+        ),
+        parse=lambda match: {"station_id": match["station_id"], "limit": match.groupdict().get("limit")},
+        normalise=_station_params,
+        render=_render_station_queue,
+    ),
+    _Rule(
+        intent="open_breaches",
+        tool="list_open_breaches",
+        agents=frozenset({"sla_watchdog", "supervisor", "kitchen_copilot"}),
+        patterns=(
+            re.compile(
+                rf"^\s*(?:list\s+|show\s+)?(?:the\s+)?(?:current\s+|open\s+)*(?:sla\s+)?breaches\s+"
+                rf"(?:for|at)\s+location\s+(?P<location_id>{_UUID})\s*[?.!]*\s*$",
+                re.IGNORECASE,
+            ),
+        ),
+        parse=lambda match: {"location_id": match["location_id"]},
+        normalise=_location_params,
+        render=_render_breaches,
+    ),
+    _Rule(
+        intent="restock_risks",
+        tool="list_restock_risks",
+        agents=frozenset({"inventory_controller", "kitchen_copilot"}),
+        patterns=(
+            re.compile(
+                rf"^\s*(?:list\s+|show\s+)?(?:the\s+)?restock\s+(?:risks|recommendations)\s+"
+                rf"(?:for|at)\s+location\s+(?P<location_id>{_UUID})\s*[?.!]*\s*$",
+                re.IGNORECASE,
+            ),
+        ),
+        parse=lambda match: {"location_id": match["location_id"]},
+        normalise=_location_params,
+        render=_render_restock,
+    ),
+    _Rule(
+        intent="monthly_shopping_list",
+        tool="monthly_shopping_list",
+        agents=frozenset({"inventory_controller"}),
+        patterns=(
+            re.compile(
+                r"^\s*(?:generate\s+|build\s+|get\s+)?(?:the\s+|a\s+)?(?:monthly\s+)?shopping\s+list"
+                r"(?:\s+for\s+(?:the\s+)?(?:next\s+|last\s+)?(?P<days>\d+)\s+days?)?\s*[?.!]*\s*$",
+                re.IGNORECASE,
+            ),
+            re.compile(
+                r"^\s*(?:generate\s+|build\s+|get\s+)?(?:the\s+|a\s+)?monthly\s+list"
+                r"(?:\s+for\s+(?:the\s+)?(?:next\s+|last\s+)?(?P<days>\d+)\s+days?)?\s*[?.!]*\s*$",
+                re.IGNORECASE,
+            ),
+        ),
+        parse=lambda match: {"days": match["days"]},
+        normalise=_days_params,
+        render=_render_shopping_list,
+    ),
+)
+
+
+class FastPathRouter:
+    """Answer structured requests from tools; everything else goes to the LLM.
+
+    `call_tool` is `AgentRegistry.call_tool` (or anything with the same signature).
+    """
+
+    def __init__(self, call_tool: Callable[..., Any], rules: tuple[_Rule, ...] = RULES) -> None:
+        self._call_tool = call_tool
+        self._rules = {rule.intent: rule for rule in rules}
+        self._lock = threading.Lock()
+        self._stats = {"requests": 0, "hits": 0, "misses": 0, "fallbacks": 0}
+        self._by_intent: dict[str, int] = {}
+
+    def intents(self, agent_name: str | None = None) -> list[str]:
+        return [
+            rule.intent for rule in self._rules.values() if agent_name is None or agent_name in rule.agents
+        ]
+
+    def match(
+        self,
+        agent_name: str,
+        prompt: str,
+        intent: str | None = None,
+        params: dict[str, Any] | None = None,
+    ) -> tuple[_Rule, dict[str, Any]] | None:
+        """Return (rule, tool arguments) for a fast-path request, or None for the LLM.
+
+        An explicit `intent` must exist, be available to the agent and carry valid
+        `params` (`FastPathRequestError` otherwise); free-text prompts are matched
+        against the rule patterns.
+        """
+        if intent is not None:
+            rule = self._rules.get(intent)
+            if rule is None or agent_name not in rule.agents:
+                raise FastPathRequestError(
+                    f"Intent '{intent}' is not available for agent '{agent_name}'; "
+                    f"choose one of {self.intents(agent_name)}"
+                )
+            try:
+                return rule, rule.normalise(dict(params or {}))
+            except (TypeError, ValueError) as exc:
+                raise FastPathRequestError(str(exc)) from exc
+        if len(prompt) > _MAX_PROMPT_CHARS:
+            return None
+        for rule in self._rules.values():
+            if agent_name not in rule.agents:
+                continue
+            for pattern in rule.patterns:
+                found = pattern.match(prompt)
+                if found:
+                    return rule, rule.normalise(rule.parse(found))
+        return None
+
+    def answer(self, agent_name: str, rule: _Rule, arguments: dict[str, Any]) -> FastPathAnswer | None:
+        """Run the rule's tool and render its answer; None (a fallback) if the tool failed."""
+        started = time.perf_counter()
+        result = self._call_tool(rule.tool, **arguments)
+        elapsed = time.perf_counter() - started
+        if not isinstance(result, dict) or result.get("status") != "success":
+            LOGGER.info(
+                "Fast path falling back to LLM | agent=%s intent=%s error=%s",
+                agent_name,
+                rule.intent,
+                _error_text(result) if isinstance(result, dict) else result,
+            )
+            self._record(agent_name, rule.intent, "fallback", elapsed)
+            return None
+        output = rule.render(arguments, _payload(result))
+        elapsed = time.perf_counter() - started
+        self._record(agent_name, rule.intent, "fast_path", elapsed)
+        return FastPathAnswer(intent=rule.intent, tool=rule.tool, output=output, elapsed_ms=round(elapsed * 1000, 3))
+
+    def route(
+        self,
+        agent_name: str,
+        prompt: str,
+        intent: str | None = None,
+        params: dict[str, Any] | None = None,
+    ) -> FastPathAnswer | None:
+        """`match` + `answer` in one blocking call; None means "ask the LLM"."""
+        matched = self.match(agent_name, prompt, intent, params)
+        if matched is None:
+            self.record_miss(agent_name)
+            return None
+        rule, arguments = matched
+        return self.answer(agent_name, rule, arguments)
+
+    def record_miss(self, agent_name: str) -> None:
+        with self._lock:
+            self._stats["requests"] += 1
+            self._stats["misses"] += 1
+
+    def _record(self, agent_name: str, intent: str, outcome: str, elapsed: float) -> None:
+        with self._lock:
+            self._stats["requests"] += 1
+            self._stats["hits" if outcome == "fast_path" else "fallbacks"] += 1
+            if outcome == "fast_path":
+                self._by_intent[intent] = self._by_intent.get(intent, 0) + 1
+        FAST_PATH_SECONDS.observe(elapsed, agent=agent_name, intent=intent, outcome=outcome)
+
+    def stats(self) -> dict[str, Any]:
+        with self._lock:
+            stats: dict[str, Any] = dict(self._stats)
+            stats["hits_by_intent"] = dict(self._by_intent)
+        stats["hit_rate"] = round(stats["hits"] / stats["requests"], 4) if stats["requests"] else None
+        stats["intents"] = self.intents()
+        return stats
+
+
+__all__ = ["FastPathAnswer", "FastPathRequestError", "FastPathRouter", "RULES"]
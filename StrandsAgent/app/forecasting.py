@@ -0,0 +1,622 @@
+"""Seasonal demand forecasts per (location, menu item, weekday, time bucket).
+
+For each location the history in ``orders`` / ``order_items`` is reduced to a
+profile of shape (items, 7 weekdays, 48 half-hour buckets). A profile entry is an
+exponentially decayed sum of the quantity sold in that bucket on past closed days
+of that weekday; each weekday also keeps the decayed count of closed days folded
+in, so ``qty / dow_weight`` is the expected quantity for the next such day. One
+decay factor ``1 - alpha`` is applied per closed day of the same weekday (i.e. per
+week), so recent weeks dominate.
+
+Closed days are folded in incrementally: ``demand_profile_state.closed_through``
+records the last local day already in the profile, and a run only aggregates the
+days after it (``history_days`` back on the first run or with ``full``). The whole
+fold is vectorised: a day followed by k later days of the same weekday is weighted
+``decay ** k`` and every (item, weekday, bucket) cell is summed with one NumPy
+`bincount`.
+
+Days are local to each location's org timezone (``orgs.timezone``), so "today"
+and the half-hour buckets follow the kitchen's wall clock. Forecasts for
+``horizon_days`` starting today are COPY'd into a temp stage table and upserted
+into ``demand_forecasts`` with ``model_version`` and ``features``; rows of this
+model that it no longer predicts in that window are deleted. Other models' rows
+are left alone, except where one shares a (menu item, bucket) key with a new
+forecast and is replaced by the upsert. `forecast_chain` runs locations in a
+process pool, one database pool per worker process.
+"""
+
+from __future__ import annotations
+
+import atexit
+import json
+import logging
+import multiprocessing
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from dataclasses import replace
+from datetime import date, datetime, timedelta
+from typing import Any, Sequence
+from zoneinfo import ZoneInfo
+
+import numpy as np
+from psycopg.rows import tuple_row
+
+from .config import DatabaseSettings
+from .db import Database, iter_chunks
+
+LOGGER = logging.getLogger(__name__)
+
+MODEL_VERSION = "seasonal-dow-v1"
+
+BUCKET_MINUTES = 30
+BUCKETS = 24 * 60 // BUCKET_MINUTES
+WEEKDAYS = 7
+
+SCHEMA_SQL = """
+CREATE TABLE IF NOT EXISTS demand_profiles (
+  location_id UUID NOT NULL REFERENCES locations(id) ON DELETE CASCADE,
+  menu_item_id UUID NOT NULL REFERENCES menu_items(id) ON DELETE CASCADE,
+  dow SMALLINT NOT NULL CHECK (dow BETWEEN 0 AND 6),  -- 0 = Monday
+  qty DOUBLE PRECISION[] NOT NULL,                    -- decayed qty per time bucket
+  updated_at TIMESTAMPTZ NOT NULL DEFAULT now(),
+  PRIMARY KEY (location_id, menu_item_id, dow)
+);
+CREATE TABLE IF NOT EXISTS demand_profile_state (
+  location_id UUID PRIMARY KEY REFERENCES locations(id) ON DELETE CASCADE,
+  dow_weight DOUBLE PRECISION[] NOT NULL,  -- decayed count of closed days per weekday
+  closed_through DATE NOT NULL,            -- last local day folded into the profiles
+  forecast_through DATE,                   -- last local day written to demand_forecasts
+  bucket_minutes INT NOT NULL,
+  updated_at TIMESTAMPTZ NOT NULL DEFAULT now()
+);
+"""
+
+LOCATIONS_SQL = """
+SELECT l.id, o.timezone
+FROM locations l
+JOIN orgs o ON o.id = l.org_id
+ORDER BY l.id
+"""
+
+LOCATION_TIMEZONE_SQL = """
+SELECT o.timezone
+FROM locations l
+JOIN orgs o ON o.id = l.org_id
+WHERE l.id = %s
+"""
+
+STATE_SQL = """
+SELECT location_id, dow_weight, closed_through, forecast_through, bucket_minutes
+FROM demand_profile_state
+WHERE location_id = ANY(%s::uuid[])
+"""
+
+ITEMS_SQL = """
+SELECT mi.id
+FROM menu_items mi
+JOIN locations l ON l.org_id = mi.org_id
+WHERE l.id = %s AND mi.is_active
+ORDER BY mi.id
+"""
+
+LOAD_PROFILES_SQL = "SELECT menu_item_id, dow, qty FROM demand_profiles WHERE location_id = %s"
+
+_LOCAL = "(o.placed_at AT TIME ZONE %(timezone)s)"
+
+# (item slot, day offset, bucket, qty) per cell; the item slot comes from the
+# ordinality of the requested id array so the rows convert straight to NumPy.
+HISTORY_SQL = f"""
+WITH items AS (
+    SELECT menu_item_id, slot - 1 AS slot
+    FROM unnest(%(item_ids)s::uuid[]) WITH ORDINALITY AS i(menu_item_id, slot)
+)
+SELECT i.slot,
+       {_LOCAL}::date - %(first_day)s::date AS day_offset,
+       (EXTRACT(HOUR FROM {_LOCAL}) * 60 + EXTRACT(MINUTE FROM {_LOCAL}))::int / {BUCKET_MINUTES} AS bucket,
+       SUM(oi.qty)::float8 AS qty
+FROM orders o
+JOIN order_items oi ON oi.order_id = o.id
+JOIN items i ON i.menu_item_id = oi.menu_item_id
+WHERE o.location_id = %(location_id)s
+  AND o.placed_at >= %(start)s
+  AND o.placed_at < %(end)s
+  AND o.status <> 'cancelled'
+  AND oi.status <> 'cancelled'
+GROUP BY 1, 2, 3
+"""
+
+UPSERT_PROFILES_SQL = """
+INSERT INTO demand_profiles (location_id, menu_item_id, dow, qty, updated_at)
+SELECT %s, p.menu_item_id, p.dow, p.qty::float8[], now()
+FROM unnest(%s::uuid[], %s::smallint[], %s::text[]) AS p(menu_item_id, dow, qty)
+ON CONFLICT (location_id, menu_item_id, dow) DO UPDATE
+SET qty = EXCLUDED.qty, updated_at = now()
+"""
+
+UPSERT_STATE_SQL = """
+INSERT INTO demand_profile_state (location_id, dow_weight, closed_through, forecast_through, bucket_minutes)
+VALUES (%s, %s, %s, %s, %s)
+ON CONFLICT (location_id) DO UPDATE
+SET dow_weight = EXCLUDED.dow_weight,
+    closed_through = EXCLUDED.closed_through,
+    forecast_through = EXCLUDED.forecast_through,
+    bucket_minutes = EXCLUDED.bucket_minutes,
+    updated_at = now()
+"""
+
+STAGE_SQL = """
+CREATE TEMP TABLE demand_forecast_stage (
+  menu_item_id UUID NOT NULL,
+  bucket_start TIMESTAMPTZ NOT NULL,
+  bucket_end TIMESTAMPTZ NOT NULL,
+  expected_qty NUMERIC(12,3) NOT NULL,
+  features JSONB
+) ON COMMIT DROP
+"""
+
+COPY_STAGE_SQL = (
+    "COPY demand_forecast_stage (menu_item_id, bucket_start, bucket_end, expected_qty, features) FROM STDIN"
+)
+
+DELETE_STALE_SQL = """
+DELETE FROM demand_forecasts f
+WHERE f.location_id = %(location_id)s
+  AND f.model_version = %(model_version)s
+  AND f.bucket_start >= %(start)s
+  AND f.bucket_start < %(end)s
+  AND NOT EXISTS (
+      SELECT 1 FROM demand_forecast_stage s
+      WHERE s.menu_item_id = f.menu_item_id AND s.bucket_start = f.bucket_start AND s.bucket_end = f.bucket_end
+  )
+"""
+
+# Unchanged rows are left alone so an incremental run only rewrites what moved.
+UPSERT_FORECASTS_SQL = """
+INSERT INTO demand_forecasts
+    (location_id, menu_item_id, bucket_start, bucket_end, expected_qty, model_version, features)
+SELECT %(location_id)s, s.menu_item_id, s.bucket_start, s.bucket_end, s.expected_qty, %(model_version)s, s.features
+FROM demand_forecast_stage s
+ON CONFLICT (location_id, menu_item_id, bucket_start, bucket_end) DO UPDATE
+SET expected_qty = EXCLUDED.expected_qty,
+    model_version = EXCLUDED.model_version,
+    features = EXCLUDED.features,
+    created_at = now()
+WHERE (demand_forecasts.expected_qty, demand_forecasts.model_version, demand_forecasts.features)
+      IS DISTINCT FROM (EXCLUDED.expected_qty, EXCLUDED.model_version, EXCLUDED.features)
+"""
+
+
+def _array_literal(values: np.ndarray) -> str:
+    return "{" + ",".join(repr(float(value)) for value in values) + "}"
+
+
+class DemandProfile:
+    """Decayed weekday x bucket quantities for one location's menu items."""
+
+    def __init__(self, item_ids: Sequence[str], alpha: float = 0.2) -> None:
+        self.decay = 1.0 - min(max(alpha, 1e-6), 1.0)
+        self.item_ids = list(item_ids)
+        self._index = {item_id: slot for slot, item_id in enumerate(self.item_ids)}
+        self.qty = np.zeros((len(self.item_ids), WEEKDAYS, BUCKETS))
+        self.dow_weight = np.zeros(WEEKDAYS)
+        self.stored = np.zeros((len(self.item_ids), WEEKDAYS), dtype=bool)
+
+    def load(self, state: dict[str, Any] | None, rows: Sequence[tuple[Any, ...]]) -> None:
+        """Restore `demand_profile_state.dow_weight` and (menu_item_id, dow, qty) profile rows."""
+        if state is not None:
+            self.dow_weight = np.asarray(state["dow_weight"], dtype=np.float64)
+        for menu_item_id, dow, qty in rows:
+            slot = self._index.get(str(menu_item_id))
+            if slot is not None:
+                self.qty[slot, dow] = qty
+                self.stored[slot, dow] = True
+
+    def fold(self, first_day: date, days: int, cells: np.ndarray) -> np.ndarray:
+        """Fold `days` consecutive closed days starting at `first_day` into the profile.
+
+        `cells` has columns (item slot, day offset, bucket, qty) as read by
+        `HISTORY_SQL`; days without rows still count as closed days with zero
+        demand. Returns the mask of weekdays that changed.
+        """
+        offsets = np.arange(days)
+        dows = (first_day.weekday() + offsets) % WEEKDAYS
+        # Days are consecutive, so a day has (days - 1 - offset) // 7 later days of its weekday.
+        day_weight = self.decay ** ((days - 1 - offsets) // WEEKDAYS)
+        counts = np.bincount(dows, minlength=WEEKDAYS)
+        shrink = self.decay ** counts
+
+        self.dow_weight = self.dow_weight * shrink + np.bincount(dows, weights=day_weight, minlength=WEEKDAYS)
+        self.qty *= shrink[None, :, None]
+        if cells.size:
+            slots = cells[:, 0].astype(np.int64)
+            day_offsets = cells[:, 1].astype(np.int64)
+            buckets = cells[:, 2].astype(np.int64)
+            usable = (day_offsets >= 0) & (day_offsets < days) & (buckets >= 0) & (buckets < BUCKETS)
+            slots, day_offsets, buckets = slots[usable], day_offsets[usable], buckets[usable]
+            flat = (slots * WEEKDAYS + dows[day_offsets]) * BUCKETS + buckets
+            self.qty += np.bincount(
+                flat, weights=cells[usable, 3] * day_weight[day_offsets], minlength=self.qty.size
+            ).reshape(self.qty.shape)
+        return counts > 0
+
+    def expected(self, day: date) -> np.ndarray:
+        """Expected quantity per (item, bucket) on `day`."""
+        weight = self.dow_weight[day.weekday()]
+        if weight <= 0:
+            return np.zeros((len(self.item_ids), BUCKETS))
+        return self.qty[:, day.weekday(), :] / weight
+
+    def changed_rows(self, dows: np.ndarray) -> tuple[list[Any], ...]:
+        """`UPSERT_PROFILES_SQL` columns for the (item, weekday) rows of changed weekdays."""
+        keep = (self.qty.any(axis=2) | self.stored) & dows[None, :]
+        slots, days = np.nonzero(keep)
+        self.stored |= keep
+        return (
+            [self.item_ids[slot] for slot in slots.tolist()],
+            days.tolist(),
+            [_array_literal(self.qty[slot, dow]) for slot, dow in zip(slots.tolist(), days.tolist())],
+        )
+
+
+def ensure_forecast_schema(db: Database) -> None:
+    with db.transaction() as cur:
+        cur.execute(SCHEMA_SQL)
+
+
+def _forecast_lines(
+    profile: DemandProfile, today: date, horizon_days: int, zone: ZoneInfo, alpha: float
+) -> list[str]:
+    """COPY lines for `demand_forecast_stage`, skipping buckets that round to zero."""
+    lines: list[str] = []
+    for offset in range(horizon_days):
+        day = today + timedelta(days=offset)
+        midnight = datetime(day.year, day.month, day.day, tzinfo=zone)
+        edges = [(midnight + timedelta(minutes=BUCKET_MINUTES * bucket)).isoformat() for bucket in range(BUCKETS + 1)]
+        weeks = round(float(profile.dow_weight[day.weekday()]), 3)
+        features = [
+            json.dumps(
+                {
+                    "dow": day.isoweekday(),
+                    "bucket": bucket,
+                    "bucket_minutes": BUCKET_MINUTES,
+                    "weeks": weeks,
+                    "alpha": alpha,
+                },
+                separators=(",", ":"),
+            )
+            for bucket in range(BUCKETS)
+        ]
+        expected = np.round(profile.expected(day), 3)
+        slots, buckets = np.nonzero(expected > 0)
+        quantities = expected[slots, buckets].astype(str).tolist()
+        lines.extend(
+            f"{profile.item_ids[slot]}\t{edges[bucket]}\t{edges[bucket + 1]}\t{qty}\t{features[bucket]}"
+            for slot, bucket, qty in zip(slots.tolist(), buckets.tolist(), quantities)
+        )
+    return lines
+
+
+def forecast_location(
+    db: Database,
+    location_id: str,
+    horizon_days: int = 2,
+    history_days: int = 56,
+    alpha: float = 0.2,
+    chunk_size: int = 50_000,
+    full: bool = False,
+) -> dict[str, Any]:
+    """Fold newly closed days into one location's profile and rewrite its forecast window.
+
+    Today is the location's current local date in its org timezone: it is the first
+    (still open) day forecast and every day before it is treated as closed. Skips the
+    location when another process holds it, or when no day has closed since the last
+    run and the window is already written.
+    """
+    timings: dict[str, float] = {}
+    started = time.perf_counter()
+    result: dict[str, Any] = {"location_id": str(location_id), "days_folded": 0, "history_rows": 0}
+    with db.connection() as conn:
+        with conn.cursor() as cur:
+            cur.execute(
+                "SELECT pg_try_advisory_xact_lock(hashtext('demand_forecast:' || %s)) AS locked", (str(location_id),)
+            )
+            if not cur.fetchone()["locked"]:
+                conn.rollback()
+                return {**result, "skipped": "locked"}
+            cur.execute(LOCATION_TIMEZONE_SQL, (str(location_id),))
+            row = cur.fetchone()
+            if row is None:
+                raise ValueError(f"Unknown location {location_id}")
+            timezone = row["timezone"]
+            zone = ZoneInfo(timezone)
+            today = datetime.now(zone).date()
+            horizon_end = today + timedelta(days=horizon_days)
+            result.update(timezone=timezone, today=today.isoformat())
+            cur.execute(STATE_SQL, ([str(location_id)],))
+            state = None if full else cur.fetchone()
+            if state is not None and state["bucket_minutes"] != BUCKET_MINUTES:
+                state = None
+            first_day = state["closed_through"] + timedelta(days=1) if state else today - timedelta(days=history_days)
+            if (
+                state is not None
+                and first_day >= today
+                and state["forecast_through"] is not None
+                and state["forecast_through"] >= horizon_end - timedelta(days=1)
+            ):
+                conn.rollback()
+                return {**result, "skipped": "up_to_date"}
+
+            cur.execute(ITEMS_SQL, (str(location_id),))
+            profile = DemandProfile([str(row["id"]) for row in cur.fetchall()], alpha)
+            if state is None:
+                cur.execute("DELETE FROM demand_profiles WHERE location_id = %s", (str(location_id),))
+            else:
+                with conn.cursor(row_factory=tuple_row) as rows:
+                    rows.execute(LOAD_PROFILES_SQL, (str(location_id),))
+                    profile.load(state, rows.fetchall())
+        timings["load_ms"] = (time.perf_counter() - started) * 1000
+
+        try:
+            days = max((today - first_day).days, 0)
+            changed = np.zeros(WEEKDAYS, dtype=bool)
+            if days:
+                streamed_at = time.perf_counter()
+                params = {
+                    "item_ids": profile.item_ids,
+                    "first_day": first_day,
+                    "location_id": str(location_id),
+                    "start": datetime(first_day.year, first_day.month, first_day.day, tzinfo=zone),
+                    "end": datetime(today.year, today.month, today.day, tzinfo=zone),
+                    "timezone": timezone,
+                }
+                chunks = [
+                    np.asarray(chunk, dtype=np.float64)
+                    for chunk in iter_chunks(
+                        conn, HISTORY_SQL, params, chunk_size, row_factory=tuple_row, name="demand_history"
+                    )
+                ]
+                cells = np.concatenate(chunks) if chunks else np.zeros((0, 4))
+                changed = profile.fold(first_day, days, cells)
+                result.update(days_folded=days, history_rows=int(cells.shape[0]))
+                timings["fold_ms"] = (time.perf_counter() - streamed_at) * 1000
+
+            written_at = time.perf_counter()
+            lines = _forecast_lines(profile, today, horizon_days, zone, alpha)
+            window = {
+                "location_id": str(location_id),
+                "start": datetime(today.year, today.month, today.day, tzinfo=zone),
+                "end": datetime(horizon_end.year, horizon_end.month, horizon_end.day, tzinfo=zone),
+                "model_version": MODEL_VERSION,
+            }
+            with conn.cursor() as cur:
+                if changed.any():
+                    cur.execute(UPSERT_PROFILES_SQL, (str(location_id), *profile.changed_rows(changed)))
+                cur.execute(STAGE_SQL)
+                if lines:
+                    with cur.copy(COPY_STAGE_SQL) as copy:
+                        copy.write("\n".join(lines) + "\n")
+                cur.execute("ANALYZE demand_forecast_stage")
+                cur.execute(DELETE_STALE_SQL, window)
+                deleted = cur.rowcount
+                cur.execute(UPSERT_FORECASTS_SQL, window)
+                upserted = cur.rowcount
+                cur.execute(
+                    UPSERT_STATE_SQL,
+                    (
+                        str(location_id),
+                        profile.dow_weight.tolist(),
+                        today - timedelta(days=1),
+                        horizon_end - timedelta(days=1),
+                        BUCKET_MINUTES,
+                    ),
+                )
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        timings["write_ms"] = (time.perf_counter() - written_at) * 1000
+
+    result.update(
+        items=len(profile.item_ids),
+        forecast_rows=len(lines),
+        rows_upserted=upserted,
+        rows_deleted=deleted,
+        timings_ms={name: round(value, 3) for name, value in timings.items()},
+    )
+    return result
+
+
+# Each worker process opens its own small pool; psycopg connections do not cross processes.
+_WORKER_DB: Database | None = None
+
+
+def _init_worker(settings: DatabaseSettings) -> None:
+    global _WORKER_DB
+    _WORKER_DB = Database(settings)
+    atexit.register(_WORKER_DB.close)
+
+
+def _forecast_worker(location_id: str, options: dict[str, Any]) -> dict[str, Any]:
+    assert _WORKER_DB is not None
+    return forecast_location(_WORKER_DB, location_id, **options)
+
+
+def forecast_chain(
+    db: Database,
+    db_settings: DatabaseSettings,
+    location_ids: Sequence[str] | None = None,
+    workers: int = 4,
+    horizon_days: int = 2,
+    history_days: int = 56,
+    alpha: float = 0.2,
+    chunk_size: int = 50_000,
+    full: bool = False,
+) -> dict[str, Any]:
+    """Forecast every location (or `location_ids`), `workers` locations at a time.
+
+    Locations whose profile already covers yesterday (in their own timezone) and whose
+    window is written are skipped without starting the pool. A failing location is
+    logged and reported under ``errors``; the others still commit.
+    """
+    started = time.perf_counter()
+    zones = {str(row["id"]): row["timezone"] for row in db.fetch_all(LOCATIONS_SQL)}
+    if location_ids is None:
+        location_ids = list(zones)
+    location_ids = [str(location_id) for location_id in location_ids]
+    pending = location_ids
+    if not full:
+        fresh = set()
+        for row in db.fetch_all(STATE_SQL, (location_ids,)):
+            location_id = str(row["location_id"])
+            try:
+                today = datetime.now(ZoneInfo(zones[location_id])).date()
+            except (KeyError, ValueError):
+                continue  # let forecast_location report the missing location or bad zone
+            if (
+                row["bucket_minutes"] == BUCKET_MINUTES
+                and row["closed_through"] >= today - timedelta(days=1)
+                and row["forecast_through"] is not None
+                and row["forecast_through"] >= today + timedelta(days=horizon_days - 1)
+            ):
+                fresh.add(location_id)
+        pending = [location_id for location_id in location_ids if location_id not in fresh]
+
+    options = {
+        "horizon_days": horizon_days,
+        "history_days": history_days,
+        "alpha": alpha,
+        "chunk_size": chunk_size,
+        "full": full,
+    }
+    results: list[dict[str, Any]] = []
+    errors: list[dict[str, str]] = []
+    workers = max(1, min(workers, len(pending)))
+    if workers == 1:
+        for location_id in pending:
+            try:
+                results.append(forecast_location(db, location_id, **options))
+            except Exception as exc:  # noqa: BLE001
+                LOGGER.exception("Forecast failed | location=%s", location_id)
+                errors.append({"location_id": location_id, "error": str(exc)})
+    elif pending:
+        # Spawned (not forked) workers: the parent may hold pool threads and open sockets.
+        worker_settings = replace(db_settings, min_size=1, max_size=1)
+        with ProcessPoolExecutor(
+            max_workers=workers,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_init_worker,
+            initargs=(worker_settings,),
+        ) as pool:
+            futures = {pool.submit(_forecast_worker, location_id, options): location_id for location_id in pending}
+            for future in as_completed(futures):
+                try:
+                    results.append(future.result())
+                except Exception as exc:  # noqa: BLE001
+                    LOGGER.error("Forecast failed | location=%s error=%s", futures[future], exc)
+                    errors.append({"location_id": futures[future], "error": str(exc)})
+
+    elapsed = time.perf_counter() - started
+    forecast_rows = sum(result.get("forecast_rows", 0) for result in results)
+    LOGGER.info(
+        "Demand forecasts written | locations=%s skipped=%s rows=%s workers=%s elapsed=%.3fs",
+        len(pending),
+        len(location_ids) - len(pending),
+        forecast_rows,
+        workers,
+        elapsed,
+    )
+    return {
+        "model_version": MODEL_VERSION,
+        "locations": len(location_ids),
+        "locations_run": len(pending),
+        "workers": workers,
+        "days_folded": sum(result.get("days_folded", 0) for result in results),
+        "history_rows": sum(result.get("history_rows", 0) for result in results),
+        "forecast_rows": forecast_rows,
+        "rows_upserted": sum(result.get("rows_upserted", 0) for result in results),
+        "rows_deleted": sum(result.get("rows_deleted", 0) for result in results),
+        "elapsed_s": round(elapsed, 3),
+        "results": sorted(results, key=lambda result: result["location_id"]),
+        "errors": errors,
+    }
+
+
+class DemandForecaster:
+    """Background thread that folds closed days in and refreshes the forecast window."""
+
+    def __init__(
+        self,
+        db: Database,
+        db_settings: DatabaseSettings,
+        interval: float = 900.0,
+        workers: int = 4,
+        horizon_days: int = 2,
+        history_days: int = 56,
+        alpha: float = 0.2,
+    ) -> None:
+        self._db = db
+        self._db_settings = db_settings
+        self._interval = interval
+        self._options = {
+            "workers": workers,
+            "horizon_days": horizon_days,
+            "history_days": history_days,
+            "alpha": alpha,
+        }
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+        self._stats: dict[str, Any] = {
+            "runs": 0,
+            "locations_run": 0,
+            "forecast_rows": 0,
+            "errors": 0,
+            "last_run_ms": None,
+        }
+
+    def run_once(self) -> dict[str, Any]:
+        started = time.perf_counter()
+        result = forecast_chain(self._db, self._db_settings, **self._options)
+        self._stats["runs"] += 1
+        self._stats["locations_run"] += result["locations_run"]
+        self._stats["forecast_rows"] += result["forecast_rows"]
+        self._stats["errors"] += len(result["errors"])
+        self._stats["last_run_ms"] = round((time.perf_counter() - started) * 1000, 3)
+        return result
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            try:
+                self.run_once()
+            except Exception:  # noqa: BLE001
+                LOGGER.exception("Demand forecast run failed")
+            self._stop.wait(self._interval)
+
+    def start(self) -> None:
+        if self._thread is not None:
+            return
+        ensure_forecast_schema(self._db)
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="demand-forecaster", daemon=True)
+        self._thread.start()
+        LOGGER.info("Demand forecaster started | interval=%ss workers=%s", self._interval, self._options["workers"])
+
+    def stop(self, timeout: float = 5.0) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=timeout)
+            self._thread = None
+
+    def stats(self) -> dict[str, Any]:
+        return {**self._stats, "model_version": MODEL_VERSION}
+
+
+__all__ = [
+    "BUCKET_MINUTES",
+    "DemandForecaster",
+    "DemandProfile",
+    "MODEL_VERSION",
+    "ensure_forecast_schema",
+    "forecast_chain",
+    "forecast_location",
+]
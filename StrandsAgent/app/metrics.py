@@ -0,0 +1,362 @@
+"""In-process latency and size histograms (plus a few counters) exposed in Prometheus text format.
+
+Every `KitchenTools` tool is wrapped with `timed_tool` and every `Database` call is
+timed (latency, rows returned, pool acquisition wait, transaction duration). DB
+calls are labelled with the tool that issued them, so a slow agent run can be
+broken down into "which tool" and "how much of it was Postgres".
+
+Histograms use fixed cumulative buckets like `prometheus_client`, so `/metrics` can
+be scraped as-is; `snapshot()` adds bucket-interpolated p50/p95/p99 for humans
+(`python main.py stats`). Metrics are per process.
+"""
+
+from __future__ import annotations
+
+import bisect
+import contextvars
+import functools
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Callable, Iterator, TypeVar
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+ROW_BUCKETS = (0, 1, 5, 10, 25, 50, 100, 250, 500, 1000, 5000, 10000)
+
+F = TypeVar("F", bound=Callable[..., Any])
+
+_current_tool: contextvars.ContextVar[str] = contextvars.ContextVar("kitchen_current_tool", default="none")
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_bound(bound: float) -> str:
+    return "+Inf" if bound == float("inf") else repr(bound)
+
+
+class Histogram:
+    """Cumulative-bucket histogram with a fixed label set."""
+
+    def __init__(self, name: str, documentation: str, labelnames: tuple[str, ...] = (), buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = labelnames
+        self.buckets = tuple(float(bound) for bound in buckets)
+        self._lock = threading.Lock()
+        # label values -> ([per-bucket counts..., +Inf count], [sum, max])
+        self._series: dict[tuple[str, ...], tuple[list[int], list[float]]] = {}
+
+    def observe(self, value: float, **labels: str) -> None:
+        key = tuple(str(labels.get(name, "")) for name in self.labelnames)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = ([0] * (len(self.buckets) + 1), [0.0, value])
+            series[0][index] += 1
+            totals = series[1]
+            totals[0] += value
+            if value > totals[1]:
+                totals[1] = value
+
+    @contextmanager
+    def time(self, **labels: str) -> Iterator[None]:
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started, **labels)
+
+    def collect(self) -> list[tuple[dict[str, str], list[int], float, float]]:
+        """Return (labels, cumulative bucket counts incl. +Inf, sum, max) per series."""
+        with self._lock:
+            items = [(key, list(counts), totals[0], totals[1]) for key, (counts, totals) in self._series.items()]
+        collected = []
+        for key, counts, total, peak in sorted(items):
+            running, cumulative = 0, []
+            for count in counts:
+                running += count
+                cumulative.append(running)
+            collected.append((dict(zip(self.labelnames, key)), cumulative, total, peak))
+        return collected
+
+    def reset(self) -> None:
+        with self._lock:
+            self._series.clear()
+
+
+class Counter:
+    """Monotonic counter with a fixed label set."""
+
+    def __init__(self, name: str, documentation: str, labelnames: tuple[str, ...] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = labelnames
+        self._lock = threading.Lock()
+        self._values: dict[tuple[str, ...], float] = {}
+
+    def inc(self, amount: float = 1.0, **labels: str) -> None:
+        key = tuple(str(labels.get(name, "")) for name in self.labelnames)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def collect(self) -> list[tuple[dict[str, str], float]]:
+        with self._lock:
+            items = sorted(self._values.items())
+        return [(dict(zip(self.labelnames, key)), value) for key, value in items]
+
+    def reset(self) -> None:
+        with self._lock:
+            self._values.clear()
+
+
+def _quantile(q: float, bounds: tuple[float, ...], cumulative: list[int]) -> float | None:
+    """Estimate a quantile from cumulative buckets (same interpolation as `histogram_quantile`)."""
+    total = cumulative[-1]
+    if not total:
+        return None
+    rank = q * total
+    index = bisect.bisect_left(cumulative, rank)
+    if index >= len(bounds):
+        return bounds[-1]
+    upper = bounds[index]
+    lower = bounds[index - 1] if index > 0 else min(0.0, upper)
+    below = cumulative[index - 1] if index > 0 else 0
+    in_bucket = cumulative[index] - below
+    if in_bucket <= 0:
+        return upper
+    return lower + (upper - lower) * (rank - below) / in_bucket
+
+
+class MetricsRegistry:
+    """Named histograms and counters for one process."""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._histograms: dict[str, Histogram] = {}
+        self._counters: dict[str, Counter] = {}
+
+    def histogram(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: tuple[str, ...] = (),
+        buckets=LATENCY_BUCKETS,
+    ) -> Histogram:
+        with self._lock:
+            existing = self._histograms.get(name)
+            if existing is None:
+                existing = self._histograms[name] = Histogram(name, documentation, labelnames, buckets)
+            return existing
+
+    def counter(self, name: str, documentation: str, labelnames: tuple[str, ...] = ()) -> Counter:
+        with self._lock:
+            existing = self._counters.get(name)
+            if existing is None:
+                existing = self._counters[name] = Counter(name, documentation, labelnames)
+            return existing
+
+    def render(self) -> str:
+        """Prometheus text exposition format (version 0.0.4)."""
+        lines: list[str] = []
+        for histogram in list(self._histograms.values()):
+            lines.append(f"# HELP {histogram.name} {histogram.documentation}")
+            lines.append(f"# TYPE {histogram.name} histogram")
+            bounds = [*histogram.buckets, float("inf")]
+            for labels, cumulative, total, _ in histogram.collect():
+                base = ",".join(f'{name}="{_escape(value)}"' for name, value in labels.items())
+                prefix = f"{base}," if base else ""
+                for bound, count in zip(bounds, cumulative):
+                    lines.append(f'{histogram.name}_bucket{{{prefix}le="{_format_bound(bound)}"}} {count}')
+                suffix = f"{{{base}}}" if base else ""
+                lines.append(f"{histogram.name}_sum{suffix} {repr(total)}")
+                lines.append(f"{histogram.name}_count{suffix} {cumulative[-1]}")
+        for counter in list(self._counters.values()):
+            lines.append(f"# HELP {counter.name} {counter.documentation}")
+            lines.append(f"# TYPE {counter.name} counter")
+            for labels, value in counter.collect():
+                base = ",".join(f'{name}="{_escape(value)}"' for name, value in labels.items())
+                lines.append(f"{counter.name}{{{base}}} {repr(value)}" if base else f"{counter.name} {repr(value)}")
+        return "\n".join(lines) + "\n"
+
+    def snapshot(self) -> dict[str, Any]:
+        """JSON-friendly summary: count, sum, mean, max and estimated percentiles per series."""
+        output: dict[str, Any] = {}
+        for histogram in list(self._histograms.values()):
+            series = []
+            for labels, cumulative, total, peak in histogram.collect():
+                count = cumulative[-1]
+                entry: dict[str, Any] = {"labels": labels, "count": count, "sum": round(total, 6)}
+                entry["mean"] = round(total / count, 6) if count else None
+                for name, q in (("p50", 0.5), ("p95", 0.95), ("p99", 0.99)):
+                    value = _quantile(q, histogram.buckets, cumulative)
+                    # Bucket interpolation can overshoot the largest value actually seen.
+                    entry[name] = round(min(value, peak), 6) if value is not None else None
+                entry["max"] = round(peak, 6)
+                series.append(entry)
+            output[histogram.name] = {"help": histogram.documentation, "series": series}
+        for counter in list(self._counters.values()):
+            output[counter.name] = {
+                "help": counter.documentation,
+                "type": "counter",
+                "series": [{"labels": labels, "value": value} for labels, value in counter.collect()],
+            }
+        return output
+
+    def reset(self) -> None:
+        for metric in [*self._histograms.values(), *self._counters.values()]:
+            metric.reset()
+
+
+METRICS = MetricsRegistry()
+
+TOOL_SECONDS = METRICS.histogram(
+    "kitchen_tool_duration_seconds", "KitchenTools call latency by tool and result status.", ("tool", "status")
+)
+AGENT_RUN_SECONDS = METRICS.histogram(
+    "kitchen_agent_run_duration_seconds", "End-to-end agent invocation latency.", ("agent",)
+)
+FAST_PATH_SECONDS = METRICS.histogram(
+    "kitchen_fast_path_duration_seconds",
+    "Agent requests answered by the rule-based fast path (outcome=fast_path) or handed back to the LLM.",
+    ("agent", "intent", "outcome"),
+)
+DB_QUERY_SECONDS = METRICS.histogram(
+    "kitchen_db_query_duration_seconds",
+    "Database call latency (pool wait included) by method and calling tool.",
+    ("method", "tool", "status"),
+)
+DB_ROWS = METRICS.histogram(
+    "kitchen_db_rows", "Rows returned or affected per database call.", ("method", "tool"), buckets=ROW_BUCKETS
+)
+DB_POOL_WAIT_SECONDS = METRICS.histogram(
+    "kitchen_db_pool_wait_seconds", "Time spent waiting to check a connection out of the pool."
+)
+DB_TRANSACTION_SECONDS = METRICS.histogram(
+    "kitchen_db_transaction_duration_seconds", "Explicit transaction duration by outcome.", ("tool", "outcome")
+)
+RESPONSE_CACHE_REQUESTS = METRICS.counter(
+    "kitchen_response_cache_requests_total",
+    "Agent response cache lookups by agent and outcome (hit, miss, bypass, uncacheable).",
+    ("agent", "outcome"),
+)
+
+WRITE_BEHIND_FLUSH_SECONDS = METRICS.histogram(
+    "kitchen_write_behind_flush_duration_seconds",
+    "Write-behind group commits to Postgres by outcome (commit, partial, error).",
+    ("outcome",),
+)
+WRITE_BEHIND_BATCH_EVENTS = METRICS.histogram(
+    "kitchen_write_behind_batch_events", "Events per write-behind group commit.", buckets=ROW_BUCKETS
+)
+
+
+def current_tool() -> str:
+    """Name of the tool running in this context ("none" outside tools)."""
+    return _current_tool.get()
+
+
+def timed_tool(func: F) -> F:
+    """Record latency and result status of a tool; DB calls inside are attributed to it.
+
+    Apply below `@tool(...)` so Strands still sees the original signature.
+    """
+    name = func.__name__
+
+    @functools.wraps(func)
+    def wrapper(*args: Any, **kwargs: Any) -> Any:
+        token = _current_tool.set(name)
+        started = time.perf_counter()
+        status = "exception"
+        try:
+            result = func(*args, **kwargs)
+            status = result.get("status", "success") if isinstance(result, dict) else "success"
+            return result
+        finally:
+            TOOL_SECONDS.observe(time.perf_counter() - started, tool=name, status=status)
+            _current_tool.reset(token)
+
+    return wrapper  # type: ignore[return-value]
+
+
+def _row_count(result: Any) -> int:
+    if result is None:
+        return 0
+    if isinstance(result, int):
+        return max(result, 0)
+    if isinstance(result, list):
+        return len(result)
+    return 1
+
+
+def timed_db_call(func: F) -> F:
+    """Record latency and row count of a `Database` method."""
+    method = func.__name__
+
+    @functools.wraps(func)
+    def wrapper(*args: Any, **kwargs: Any) -> Any:
+        tool = _current_tool.get()
+        started = time.perf_counter()
+        status = "error"
+        try:
+            result = func(*args, **kwargs)
+            status = "ok"
+            DB_ROWS.observe(_row_count(result), method=method, tool=tool)
+            return result
+        finally:
+            DB_QUERY_SECONDS.observe(time.perf_counter() - started, method=method, tool=tool, status=status)
+
+    return wrapper  # type: ignore[return-value]
+
+
+def format_snapshot(snapshot: dict[str, Any]) -> str:
+    """Render a `snapshot()` as plain-text tables, slowest series first."""
+    blocks: list[str] = []
+    for name, histogram in snapshot.items():
+        if histogram.get("type") == "counter":
+            if histogram["series"]:
+                lines = [f"{name} - {histogram['help']}", f"{'series':<48} {'value':>10}"]
+                for entry in sorted(histogram["series"], key=lambda entry: entry["value"], reverse=True):
+                    label = ",".join(f"{key}={value}" for key, value in entry["labels"].items()) or "-"
+                    lines.append(f"{label[:48]:<48} {entry['value']:>10.0f}")
+                blocks.append("\n".join(lines))
+            continue
+        series = sorted(histogram["series"], key=lambda entry: entry["sum"], reverse=True)
+        if not series:
+            continue
+        seconds = name.endswith("_seconds")
+        scale, unit = (1000.0, "ms") if seconds else (1.0, "")
+        columns = " ".join(f"{column + unit:>10}" for column in ("mean", "p50", "p95", "p99"))
+        header = f"{'series':<48} {'count':>8} {'total':>10} {columns}"
+        lines = [f"{name} - {histogram['help']}", header]
+        for entry in series:
+            label = ",".join(f"{key}={value}" for key, value in entry["labels"].items()) or "-"
+            values = [entry[key] for key in ("mean", "p50", "p95", "p99")]
+            rendered = [f"{value * scale:>10.2f}" if value is not None else f"{'-':>10}" for value in values]
+            lines.append(f"{label[:48]:<48} {entry['count']:>8} {entry['sum']:>10.3f} {' '.join(rendered)}")
+        blocks.append("\n".join(lines))
+    return "\n\n".join(blocks) if blocks else "No metrics recorded yet."
+
+
+__all__ = [
+    "AGENT_RUN_SECONDS",
+    "Counter",
+    "DB_POOL_WAIT_SECONDS",
+    "DB_QUERY_SECONDS",
+    "DB_ROWS",
+    "DB_TRANSACTION_SECONDS",
+    "FAST_PATH_SECONDS",
+    "Histogram",
+    "METRICS",
+    "MetricsRegistry",
+    "RESPONSE_CACHE_REQUESTS",
+    "TOOL_SECONDS",
+    "WRITE_BEHIND_BATCH_EVENTS",
+    "WRITE_BEHIND_FLUSH_SECONDS",
+    "current_tool",
+    "format_snapshot",
+    "timed_db_call",
+    "timed_tool",
+]
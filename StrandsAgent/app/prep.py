@@ -0,0 +1,329 @@
+"""Set-based prep plan computation used by the prep planner tools."""
+
+from __future__ import annotations
+
+import json
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from datetime import datetime
+from typing import TYPE_CHECKING, Any, Iterable, Mapping, Sequence
+
+if TYPE_CHECKING:
+    from .db import Database
+
+LOGGER = logging.getLogger(__name__)
+
+PLANNER_MODEL_VERSION = "planner-v0"
+
+# Forecast x recipe x on-hand for one location/window in a single round trip.
+PREP_INPUTS_SQL = """
+WITH forecast AS (
+    SELECT menu_item_id, SUM(expected_qty) AS expected_qty
+    FROM demand_forecasts
+    WHERE location_id = %(location_id)s AND bucket_start >= %(start)s AND bucket_end <= %(end)s
+    GROUP BY menu_item_id
+)
+SELECT f.menu_item_id,
+       f.expected_qty,
+       r.ingredient_id,
+       r.qty,
+       i.on_hand,
+       i.unit
+FROM forecast f
+LEFT JOIN recipes r ON r.menu_item_id = f.menu_item_id
+LEFT JOIN inventory_levels i ON i.ingredient_id = r.ingredient_id AND i.location_id = %(location_id)s
+"""
+
+# All lines of a plan written as one multi-row statement.
+WRITE_LINES_SQL = """
+INSERT INTO prep_plan_lines (plan_id, menu_item_id, recommended_qty, rationale)
+SELECT %s, line.menu_item_id, line.recommended_qty, line.rationale
+FROM unnest(%s::uuid[], %s::numeric[], %s::jsonb[]) AS line(menu_item_id, recommended_qty, rationale)
+ON CONFLICT (plan_id, menu_item_id)
+DO UPDATE SET recommended_qty = EXCLUDED.recommended_qty, rationale = EXCLUDED.rationale
+"""
+
+# Recipes for every menu item of the orgs owning the requested locations (shared by all plans).
+BATCH_RECIPES_SQL = """
+SELECT r.menu_item_id, r.ingredient_id, r.qty
+FROM recipes r
+JOIN menu_items mi ON mi.id = r.menu_item_id
+WHERE mi.org_id IN (SELECT org_id FROM locations WHERE id = ANY(%s::uuid[]))
+"""
+
+BATCH_ON_HAND_SQL = """
+SELECT ingredient_id, on_hand, unit
+FROM inventory_levels
+WHERE location_id = %s
+"""
+
+# Forecast totals for every requested window of one location in a single query.
+BATCH_FORECASTS_SQL = """
+SELECT w.idx, f.menu_item_id, SUM(f.expected_qty) AS expected_qty
+FROM unnest(%s::timestamptz[], %s::timestamptz[]) WITH ORDINALITY AS w(start_at, end_at, idx)
+JOIN demand_forecasts f
+  ON f.location_id = %s AND f.bucket_start >= w.start_at AND f.bucket_end <= w.end_at
+GROUP BY w.idx, f.menu_item_id
+"""
+
+RecipeMap = Mapping[Any, Sequence[tuple[Any, Any]]]
+OnHandMap = Mapping[Any, tuple[Any, str | None]]
+
+
+@dataclass(frozen=True)
+class PrepLine:
+    """A single recommended prep quantity with its explanation."""
+
+    menu_item_id: Any
+    recommended_qty: float
+    rationale: dict[str, Any]
+
+
+def _number(value: Any) -> float | None:
+    if value is None:
+        return None
+    return float(value)
+
+
+def split_inputs(
+    rows: Iterable[Mapping[str, Any]],
+) -> tuple[dict[Any, Any], dict[Any, list[tuple[Any, Any]]], dict[Any, tuple[Any, str | None]]]:
+    """Split flat `PREP_INPUTS_SQL` rows into forecast, recipe and on-hand maps."""
+    forecasts: dict[Any, Any] = {}
+    recipes: dict[Any, list[tuple[Any, Any]]] = {}
+    on_hand: dict[Any, tuple[Any, str | None]] = {}
+    for row in rows:
+        menu_item_id = row["menu_item_id"]
+        forecasts[menu_item_id] = row["expected_qty"]
+        lines = recipes.setdefault(menu_item_id, [])
+        ingredient_id = row["ingredient_id"]
+        if ingredient_id is None:
+            continue
+        lines.append((ingredient_id, row["qty"]))
+        on_hand[ingredient_id] = (row["on_hand"], row["unit"])
+    return forecasts, recipes, on_hand
+
+
+def compute_prep_lines(
+    forecasts: Mapping[Any, Any],
+    recipes: RecipeMap,
+    on_hand: OnHandMap,
+    window: Mapping[str, str],
+) -> list[PrepLine]:
+    """Compute recommended prep quantities for every forecast menu item.
+
+    Available portions are the minimum of ``on_hand / qty`` across an item's recipe
+    (missing stock counts as zero, zero-qty lines are ignored); the recommendation is
+    the forecast shortfall. Items already covered by stock produce no line.
+    """
+    lines: list[PrepLine] = []
+    for menu_item_id, expected in forecasts.items():
+        expected_qty = _number(expected) or 0.0
+        available: float | None = None
+        details: list[dict[str, Any]] = []
+        for ingredient_id, qty in recipes.get(menu_item_id, ()):
+            stock, unit = on_hand.get(ingredient_id, (None, None))
+            qty_value = _number(qty) or 0.0
+            stock_value = _number(stock)
+            if qty_value:
+                possible = (stock_value or 0.0) / qty_value
+                available = possible if available is None else min(available, possible)
+            details.append(
+                {"ingredient_id": str(ingredient_id), "qty": qty_value, "on_hand": stock_value, "unit": unit}
+            )
+
+        available_portions = available or 0.0
+        recommended_qty = max(expected_qty - available_portions, 0.0)
+        if recommended_qty <= 0:
+            continue
+        lines.append(
+            PrepLine(
+                menu_item_id=menu_item_id,
+                recommended_qty=recommended_qty,
+                rationale={
+                    "expected_qty": expected_qty,
+                    "available_portions": available_portions,
+                    "ingredients": details,
+                    "window": dict(window),
+                },
+            )
+        )
+    return lines
+
+
+def upsert_plan_header(cur: Any, location_id: str, plan_for: datetime, window: Mapping[str, str]) -> Any:
+    """Return the plan id for (location, plan_for), clearing any previous lines."""
+    cur.execute(
+        """
+        SELECT id
+        FROM prep_plans
+        WHERE location_id = %s AND plan_for = %s
+        """,
+        (location_id, plan_for),
+    )
+    existing = cur.fetchone()
+    if existing:
+        cur.execute("DELETE FROM prep_plan_lines WHERE plan_id = %s", (existing["id"],))
+        return existing["id"]
+    cur.execute(
+        """
+        INSERT INTO prep_plans (location_id, plan_for, model_version, note)
+        VALUES (%s, %s, %s, %s)
+        RETURNING id
+        """,
+        (location_id, plan_for, PLANNER_MODEL_VERSION, json.dumps({"window": dict(window)})),
+    )
+    return cur.fetchone()["id"]
+
+
+def write_plan_lines(cur: Any, plan_id: Any, lines: Sequence[PrepLine]) -> int:
+    """Write all plan lines in a single statement; returns the number written."""
+    if not lines:
+        return 0
+    cur.execute(
+        WRITE_LINES_SQL,
+        (
+            plan_id,
+            [line.menu_item_id for line in lines],
+            [line.recommended_qty for line in lines],
+            [json.dumps(line.rationale) for line in lines],
+        ),
+    )
+    return len(lines)
+
+
+def generate_plan(
+    cur: Any,
+    location_id: str,
+    start_at: datetime,
+    end_at: datetime,
+    window: Mapping[str, str],
+) -> tuple[Any, int]:
+    """Create or refresh one prep plan in four round trips regardless of menu size."""
+    plan_id = upsert_plan_header(cur, location_id, start_at, window)
+    cur.execute(PREP_INPUTS_SQL, {"location_id": location_id, "start": start_at, "end": end_at})
+    forecasts, recipes, on_hand = split_inputs(cur.fetchall())
+    lines = compute_prep_lines(forecasts, recipes, on_hand, window)
+    written = write_plan_lines(cur, plan_id, lines)
+    LOGGER.debug("Prep plan computed | plan_id=%s forecast_items=%s lines=%s", plan_id, len(forecasts), written)
+    return plan_id, written
+
+
+@dataclass(frozen=True)
+class PlanWindow:
+    """A validated planning window plus the raw payload stored in rationales."""
+
+    start_at: datetime
+    end_at: datetime
+    raw: Mapping[str, str]
+
+
+def _plan_location(
+    db: "Database",
+    location_id: str,
+    windows: Sequence[PlanWindow],
+    recipes: RecipeMap,
+) -> list[dict[str, Any]]:
+    """Plan every window for one location inside a single transaction."""
+    results: list[dict[str, Any]] = []
+    with db.transaction() as cur:
+        cur.execute(BATCH_ON_HAND_SQL, (location_id,))
+        on_hand = {row["ingredient_id"]: (row["on_hand"], row["unit"]) for row in cur.fetchall()}
+        cur.execute(
+            BATCH_FORECASTS_SQL,
+            ([window.start_at for window in windows], [window.end_at for window in windows], location_id),
+        )
+        forecasts_by_window: dict[int, dict[Any, Any]] = {}
+        for row in cur.fetchall():
+            forecasts_by_window.setdefault(row["idx"], {})[row["menu_item_id"]] = row["expected_qty"]
+
+        for index, window in enumerate(windows, start=1):
+            started = time.perf_counter()
+            forecasts = forecasts_by_window.get(index, {})
+            plan_id = upsert_plan_header(cur, location_id, window.start_at, window.raw)
+            lines = compute_prep_lines(forecasts, recipes, on_hand, window.raw)
+            written = write_plan_lines(cur, plan_id, lines)
+            results.append(
+                {
+                    "location_id": location_id,
+                    "window": dict(window.raw),
+                    "plan_id": str(plan_id),
+                    "status": "success",
+                    "forecast_items": len(forecasts),
+                    "lines": written,
+                    "elapsed_ms": round((time.perf_counter() - started) * 1000, 3),
+                }
+            )
+    return results
+
+
+def generate_plans_batch(
+    db: "Database",
+    location_ids: Sequence[str],
+    windows: Sequence[PlanWindow],
+    max_workers: int = 4,
+) -> dict[str, Any]:
+    """Plan N locations x M windows in one pass.
+
+    Recipes are loaded once and shared; each location then runs in its own worker and
+    transaction (on-hand and all window forecasts in two queries), so one failing
+    location does not roll back the others. An empty `location_ids` plans every location.
+    """
+    started = time.perf_counter()
+    if not location_ids:
+        location_ids = [str(row["id"]) for row in db.fetch_all("SELECT id FROM locations ORDER BY name")]
+    if not location_ids or not windows:
+        return {"plans": [], "locations": 0, "windows": len(windows), "elapsed_ms": 0.0}
+
+    recipes: dict[Any, list[tuple[Any, Any]]] = {}
+    for row in db.fetch_all(BATCH_RECIPES_SQL, (list(location_ids),)):
+        recipes.setdefault(row["menu_item_id"], []).append((row["ingredient_id"], row["qty"]))
+
+    workers = max(1, min(int(max_workers), len(location_ids), db.pool_max_size))
+    plans: list[dict[str, Any]] = []
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="prep-plan") as pool:
+        futures = {
+            location_id: pool.submit(_plan_location, db, location_id, windows, recipes)
+            for location_id in location_ids
+        }
+        for location_id, future in futures.items():
+            try:
+                plans.extend(future.result())
+            except Exception as exc:  # noqa: BLE001
+                LOGGER.exception("Batch prep planning failed | location_id=%s", location_id)
+                plans.extend(
+                    {"location_id": location_id, "window": dict(window.raw), "status": "error", "error": str(exc)}
+                    for window in windows
+                )
+
+    elapsed_ms = round((time.perf_counter() - started) * 1000, 3)
+    LOGGER.info(
+        "Batch prep planning finished | locations=%s windows=%s workers=%s elapsed_ms=%s",
+        len(location_ids),
+        len(windows),
+        workers,
+        elapsed_ms,
+    )
+    return {
+        "plans": plans,
+        "locations": len(location_ids),
+        "windows": len(windows),
+        "workers": workers,
+        "total_lines": sum(plan.get("lines", 0) for plan in plans),
+        "elapsed_ms": elapsed_ms,
+    }
+
+
+__all__ = [
+    "PLANNER_MODEL_VERSION",
+    "PlanWindow",
+    "PrepLine",
+    "compute_prep_lines",
+    "generate_plan",
+    "generate_plans_batch",
+    "split_inputs",
+    "upsert_plan_header",
+    "write_plan_lines",
+]
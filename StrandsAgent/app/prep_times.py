@@ -0,0 +1,582 @@
+"""Learned prep times per (menu item, station, daypart) from passed KDS tickets.
+
+Each passed ticket with a start and completion time is one observation of how long
+that station took for that item in that daypart, read in the local time of the
+station's org (``orgs.timezone``). `PrepTimeModel` keeps, per key, an
+exponentially decayed weight, sum and sum of squares (EWMA mean and variance) and a
+decayed log-spaced histogram used as a quantile sketch (p50 / p90). One decay factor
+``1 - alpha`` is applied per observation to all of them, so a chunk of observations
+updates every key with a few NumPy `bincount` calls instead of a Python loop.
+
+`learn` streams new history in completion order through a named (server-side)
+cursor, ``chunk_size`` rows at a time, resuming from a keyset watermark
+(completed_at, ticket id) kept in ``prep_time_watermarks``. Changed keys are written
+back to ``prep_time_stats`` in one ``unnest`` upsert, in the same transaction as the
+new watermark. `predict` then fills ``order_items.predicted_prep_minutes`` for
+active items (sum of their stations' means) and refreshes
+``menu_items.avg_prep_minutes``, each in a single set-based UPDATE.
+
+Tickets whose ``completed_at`` lands behind the watermark after it has moved on (e.g.
+write-behind events flushed after an outage) are only picked up by a ``full`` rebuild.
+"""
+
+from __future__ import annotations
+
+import logging
+import threading
+import time
+from datetime import datetime
+from typing import Any, Sequence
+from zoneinfo import ZoneInfo
+
+import numpy as np
+from psycopg import errors
+from psycopg.rows import tuple_row
+
+from .db import Database, iter_chunks
+
+LOGGER = logging.getLogger(__name__)
+
+HISTORY_NAME = "kds_ticket_prep_times"
+
+DAYPARTS = ("breakfast", "lunch", "afternoon", "dinner", "late")
+
+# Local hour-of-day buckets; `daypart_sql` renders the same mapping for SQL.
+_DAYPART_HOURS = ((5, 11, "breakfast"), (11, 15, "lunch"), (15, 17, "afternoon"), (17, 22, "dinner"))
+
+HIST_BINS = 48
+# Log-spaced bin edges from 15 s to 4 h; observations outside (0, MAX_SECONDS] are dropped.
+MAX_SECONDS = 4 * 3600.0
+BIN_EDGES = np.geomspace(15.0, MAX_SECONDS, HIST_BINS + 1)
+
+
+def daypart_for(at: datetime) -> str:
+    """Daypart of a local wall-clock time; convert to the station's timezone first."""
+    for start, end, name in _DAYPART_HOURS:
+        if start <= at.hour < end:
+            return name
+    return "late"
+
+
+def daypart_sql(column: str) -> str:
+    """SQL CASE mapping a local timestamp expression onto `DAYPARTS`, matching `daypart_for`."""
+    branches = " ".join(
+        f"WHEN EXTRACT(HOUR FROM {column}) >= {start} AND EXTRACT(HOUR FROM {column}) < {end} THEN '{name}'"
+        for start, end, name in _DAYPART_HOURS
+    )
+    return f"CASE {branches} ELSE 'late' END"
+
+
+SCHEMA_SQL = """
+CREATE TABLE IF NOT EXISTS prep_time_stats (
+  menu_item_id UUID NOT NULL REFERENCES menu_items(id) ON DELETE CASCADE,
+  station_id UUID NOT NULL REFERENCES stations(id) ON DELETE CASCADE,
+  daypart TEXT NOT NULL,
+  observations BIGINT NOT NULL,
+  weight DOUBLE PRECISION NOT NULL,     -- decayed observation count
+  sum_s DOUBLE PRECISION NOT NULL,      -- decayed sum of prep seconds
+  sum_sq DOUBLE PRECISION NOT NULL,     -- decayed sum of squared prep seconds
+  hist DOUBLE PRECISION[] NOT NULL,     -- decayed counts per log-spaced bin
+  last_completed_at TIMESTAMPTZ,
+  updated_at TIMESTAMPTZ NOT NULL DEFAULT now(),
+  PRIMARY KEY (menu_item_id, station_id, daypart)
+);
+CREATE TABLE IF NOT EXISTS prep_time_watermarks (
+  name TEXT PRIMARY KEY,
+  completed_at TIMESTAMPTZ NOT NULL,
+  ticket_id UUID NOT NULL,
+  updated_at TIMESTAMPTZ NOT NULL DEFAULT now()
+);
+CREATE INDEX IF NOT EXISTS idx_kds_tickets_passed_completed
+  ON kds_tickets(completed_at, id) WHERE status = 'passed';
+"""
+
+LOAD_STATS_SQL = """
+SELECT menu_item_id, station_id, daypart, observations, weight, sum_s, sum_sq, hist, last_completed_at
+FROM prep_time_stats
+"""
+
+HISTORY_SQL = f"""
+SELECT kt.id,
+       kt.completed_at,
+       oi.menu_item_id,
+       kt.station_id,
+       {daypart_sql("(kt.started_at AT TIME ZONE o.timezone)")} AS daypart,
+       EXTRACT(EPOCH FROM kt.completed_at - kt.started_at)::float8 AS seconds
+FROM kds_tickets kt
+JOIN order_items oi ON oi.id = kt.order_item_id
+JOIN stations st ON st.id = kt.station_id
+JOIN locations l ON l.id = st.location_id
+JOIN orgs o ON o.id = l.org_id
+WHERE kt.status = 'passed'
+  AND kt.started_at IS NOT NULL
+  AND kt.completed_at IS NOT NULL
+  AND (kt.completed_at, kt.id) > (%(after_at)s::timestamptz, %(after_id)s::uuid)
+  AND (%(since)s::timestamptz IS NULL OR kt.completed_at >= %(since)s::timestamptz)
+ORDER BY kt.completed_at, kt.id
+"""
+
+UPSERT_STATS_SQL = """
+INSERT INTO prep_time_stats
+    (menu_item_id, station_id, daypart, observations, weight, sum_s, sum_sq, hist, last_completed_at, updated_at)
+SELECT s.menu_item_id, s.station_id, s.daypart, s.observations, s.weight, s.sum_s, s.sum_sq,
+       s.hist::float8[], s.last_completed_at, now()
+FROM unnest(%s::uuid[], %s::uuid[], %s::text[], %s::bigint[], %s::float8[], %s::float8[], %s::float8[],
+            %s::text[], %s::timestamptz[])
+    AS s(menu_item_id, station_id, daypart, observations, weight, sum_s, sum_sq, hist, last_completed_at)
+ON CONFLICT (menu_item_id, station_id, daypart) DO UPDATE
+SET observations = EXCLUDED.observations,
+    weight = EXCLUDED.weight,
+    sum_s = EXCLUDED.sum_s,
+    sum_sq = EXCLUDED.sum_sq,
+    hist = EXCLUDED.hist,
+    last_completed_at = EXCLUDED.last_completed_at,
+    updated_at = now()
+"""
+
+WATERMARK_SQL = """
+INSERT INTO prep_time_watermarks (name, completed_at, ticket_id)
+VALUES (%s, %s, %s)
+ON CONFLICT (name) DO UPDATE
+SET completed_at = EXCLUDED.completed_at, ticket_id = EXCLUDED.ticket_id, updated_at = now()
+"""
+
+# Active items get the sum of their stations' learned means, but only when every
+# non-cancelled ticket of the item has an estimate (a partial sum would undershoot).
+PREDICT_ITEMS_SQL = f"""
+WITH est AS (
+    SELECT menu_item_id, station_id, daypart, sum_s / NULLIF(weight, 0) AS mean_s
+    FROM prep_time_stats
+    WHERE observations >= %(min_observations)s
+),
+item_est AS (
+    SELECT oi.id,
+           round((SUM(e.mean_s) / 60.0)::numeric, 2) AS minutes,
+           COUNT(e.mean_s) AS covered,
+           COUNT(*) AS steps
+    FROM order_items oi
+    JOIN kds_tickets kt ON kt.order_item_id = oi.id AND kt.status <> 'cancelled'
+    JOIN stations st ON st.id = kt.station_id
+    JOIN locations l ON l.id = st.location_id
+    JOIN orgs o ON o.id = l.org_id
+    LEFT JOIN est e
+        ON e.menu_item_id = oi.menu_item_id
+       AND e.station_id = kt.station_id
+       AND e.daypart = {daypart_sql("(oi.created_at AT TIME ZONE o.timezone)")}
+    WHERE oi.status IN ('queued', 'firing', 'prepping')
+    GROUP BY oi.id
+)
+UPDATE order_items oi
+SET predicted_prep_minutes = ie.minutes
+FROM item_est ie
+WHERE oi.id = ie.id
+  AND ie.covered = ie.steps
+  AND ie.minutes < 10000
+  AND oi.predicted_prep_minutes IS DISTINCT FROM ie.minutes
+"""
+
+# Catalog average: per location, sum the item's station means (all dayparts pooled);
+# then average across locations.
+REFRESH_MENU_SQL = """
+WITH per_station AS (
+    SELECT p.menu_item_id, s.location_id, SUM(p.sum_s) / NULLIF(SUM(p.weight), 0) AS mean_s
+    FROM prep_time_stats p
+    JOIN stations s ON s.id = p.station_id
+    WHERE p.observations >= %(min_observations)s
+    GROUP BY p.menu_item_id, p.station_id, s.location_id
+),
+per_item AS (
+    SELECT menu_item_id, round((AVG(location_s) / 60.0)::numeric, 2) AS minutes
+    FROM (
+        SELECT menu_item_id, location_id, SUM(mean_s) AS location_s
+        FROM per_station
+        GROUP BY menu_item_id, location_id
+    ) per_location
+    GROUP BY menu_item_id
+)
+UPDATE menu_items mi
+SET avg_prep_minutes = p.minutes
+FROM per_item p
+WHERE mi.id = p.menu_item_id
+  AND p.minutes IS NOT NULL
+  AND p.minutes < 10000
+  AND mi.avg_prep_minutes IS DISTINCT FROM p.minutes
+"""
+
+ESTIMATES_SQL = f"""
+SELECT p.menu_item_id, mi.name AS menu_item_name, p.station_id, st.name AS station_name, p.daypart,
+       p.observations, p.weight, p.sum_s, p.sum_sq, p.hist, p.last_completed_at, o.timezone
+FROM prep_time_stats p
+JOIN menu_items mi ON mi.id = p.menu_item_id
+JOIN stations st ON st.id = p.station_id
+JOIN locations l ON l.id = st.location_id
+JOIN orgs o ON o.id = l.org_id
+WHERE p.menu_item_id = %(menu_item_id)s
+  AND (%(station_id)s::uuid IS NULL OR p.station_id = %(station_id)s::uuid)
+ORDER BY st.name, array_position(ARRAY{list(DAYPARTS)}::text[], p.daypart)
+"""
+
+
+def _hist_literal(row: np.ndarray) -> str:
+    return "{" + ",".join(repr(float(value)) for value in row) + "}"
+
+
+def hist_quantiles(hist: np.ndarray, quantiles: Sequence[float]) -> list[float | None]:
+    """Quantiles (seconds) of a binned sketch, interpolating geometrically within a bin."""
+    total = float(hist.sum())
+    if total <= 0:
+        return [None for _ in quantiles]
+    cumulative = np.cumsum(hist)
+    values: list[float | None] = []
+    for quantile in quantiles:
+        target = quantile * total
+        index = min(int(np.searchsorted(cumulative, target)), HIST_BINS - 1)
+        below = cumulative[index - 1] if index else 0.0
+        fraction = (target - below) / hist[index] if hist[index] > 0 else 0.0
+        low, high = BIN_EDGES[index], BIN_EDGES[index + 1]
+        values.append(float(low * (high / low) ** min(max(fraction, 0.0), 1.0)))
+    return values
+
+
+def summarise(weight: float, sum_s: float, sum_sq: float, hist: Sequence[float]) -> dict[str, Any]:
+    """Mean / std / p50 / p90 in minutes from one key's decayed statistics."""
+    if weight <= 0:
+        return {"mean_minutes": None, "std_minutes": None, "p50_minutes": None, "p90_minutes": None}
+    mean = float(sum_s) / float(weight)
+    std = max(float(sum_sq) / float(weight) - mean * mean, 0.0) ** 0.5
+    p50, p90 = hist_quantiles(np.asarray(hist, dtype=np.float64), (0.5, 0.9))
+    return {
+        "mean_minutes": round(mean / 60.0, 2),
+        "std_minutes": round(std / 60.0, 2),
+        "p50_minutes": round(p50 / 60.0, 2) if p50 is not None else None,
+        "p90_minutes": round(p90 / 60.0, 2) if p90 is not None else None,
+    }
+
+
+class PrepTimeModel:
+    """Decayed per-key statistics held as NumPy columns; see the module docstring."""
+
+    def __init__(self, alpha: float = 0.05) -> None:
+        self.decay = 1.0 - min(max(alpha, 1e-6), 1.0)
+        self._clear()
+
+    def _clear(self) -> None:
+        # (completed_at, ticket_id) of the last folded observation, as persisted by `learn`.
+        self.watermark: tuple[Any, Any] | None = None
+        self.keys: list[tuple[str, str, str]] = []
+        self._index: dict[tuple[str, str, str], int] = {}
+        self.observations = np.zeros(0, dtype=np.int64)
+        self.weight = np.zeros(0)
+        self.sum_s = np.zeros(0)
+        self.sum_sq = np.zeros(0)
+        self.hist = np.zeros((0, HIST_BINS))
+        self.last_completed_at: list[datetime | None] = []
+        self.dirty: set[int] = set()
+
+    def __len__(self) -> int:
+        return len(self.keys)
+
+    def _add_key(self, key: tuple[str, str, str]) -> int:
+        index = self._index[key] = len(self.keys)
+        self.keys.append(key)
+        self.last_completed_at.append(None)
+        return index
+
+    def _resize(self) -> None:
+        grow = len(self.keys) - self.weight.size
+        if grow > 0:
+            self.observations = np.concatenate([self.observations, np.zeros(grow, dtype=np.int64)])
+            self.weight = np.concatenate([self.weight, np.zeros(grow)])
+            self.sum_s = np.concatenate([self.sum_s, np.zeros(grow)])
+            self.sum_sq = np.concatenate([self.sum_sq, np.zeros(grow)])
+            self.hist = np.concatenate([self.hist, np.zeros((grow, HIST_BINS))])
+
+    def load(self, rows: Sequence[dict[str, Any]]) -> None:
+        """Replace the state with rows read by `LOAD_STATS_SQL`."""
+        self._clear()
+        for row in rows:
+            self._add_key((str(row["menu_item_id"]), str(row["station_id"]), row["daypart"]))
+        self._resize()
+        for index, row in enumerate(rows):
+            self.observations[index] = row["observations"]
+            self.weight[index] = row["weight"]
+            self.sum_s[index] = row["sum_s"]
+            self.sum_sq[index] = row["sum_sq"]
+            self.hist[index] = row["hist"]
+            self.last_completed_at[index] = row["last_completed_at"]
+
+    def update(self, rows: Sequence[tuple[Any, ...]]) -> int:
+        """Fold (ticket_id, completed_at, menu_item_id, station_id, daypart, seconds) rows in.
+
+        Rows must be in completion order; returns how many were usable observations.
+        """
+        index = self._index
+        keys = np.empty(len(rows), dtype=np.int64)
+        seconds = np.empty(len(rows), dtype=np.float64)
+        for position, (_, completed_at, menu_item_id, station_id, daypart, value) in enumerate(rows):
+            key = (str(menu_item_id), str(station_id), daypart)
+            slot = index.get(key)
+            if slot is None:
+                slot = self._add_key(key)
+            keys[position] = slot
+            seconds[position] = value if value is not None else np.nan
+            self.last_completed_at[slot] = completed_at
+        self._resize()
+
+        usable = (seconds > 0) & (seconds <= MAX_SECONDS)
+        keys, seconds = keys[usable], seconds[usable]
+        if not keys.size:
+            return 0
+
+        # Within each key, an observation followed by k later ones is decayed k times.
+        order = np.argsort(keys, kind="stable")
+        keys, seconds = keys[order], seconds[order]
+        size = len(self.keys)
+        counts = np.bincount(keys, minlength=size)
+        first = np.cumsum(counts) - counts
+        later = counts[keys] - 1 - (np.arange(keys.size) - first[keys])
+        weights = self.decay ** later
+        shrink = self.decay ** counts
+
+        self.weight = self.weight * shrink + np.bincount(keys, weights=weights, minlength=size)
+        self.sum_s = self.sum_s * shrink + np.bincount(keys, weights=weights * seconds, minlength=size)
+        self.sum_sq = self.sum_sq * shrink + np.bincount(keys, weights=weights * seconds * seconds, minlength=size)
+        self.hist *= shrink[:, None]
+        bins = np.clip(np.searchsorted(BIN_EDGES, seconds, side="right") - 1, 0, HIST_BINS - 1)
+        np.add.at(self.hist, (keys, bins), weights)
+        self.observations += counts
+        self.dirty.update(np.flatnonzero(counts).tolist())
+        return int(keys.size)
+
+    def dirty_columns(self) -> tuple[list[Any], ...]:
+        """Parameters for `UPSERT_STATS_SQL` covering every key changed since the last call."""
+        slots = sorted(self.dirty)
+        self.dirty = set()
+        return (
+            [self.keys[slot][0] for slot in slots],
+            [self.keys[slot][1] for slot in slots],
+            [self.keys[slot][2] for slot in slots],
+            self.observations[slots].tolist(),
+            self.weight[slots].tolist(),
+            self.sum_s[slots].tolist(),
+            self.sum_sq[slots].tolist(),
+            [_hist_literal(self.hist[slot]) for slot in slots],
+            [self.last_completed_at[slot] for slot in slots],
+        )
+
+    def summary(self, key: tuple[str, str, str]) -> dict[str, Any] | None:
+        slot = self._index.get(key)
+        if slot is None:
+            return None
+        return {
+            "observations": int(self.observations[slot]),
+            **summarise(self.weight[slot], self.sum_s[slot], self.sum_sq[slot], self.hist[slot]),
+        }
+
+
+def ensure_prep_time_schema(db: Database) -> None:
+    with db.transaction() as cur:
+        cur.execute(SCHEMA_SQL)
+
+
+def learn(
+    db: Database,
+    model: PrepTimeModel | None = None,
+    chunk_size: int = 50_000,
+    since: datetime | None = None,
+    full: bool = False,
+) -> dict[str, Any]:
+    """Fold passed tickets after the watermark into `model` and persist changed keys.
+
+    With `full`, stored statistics and the watermark are discarded and history is
+    replayed from `since` (or the beginning). A missing `model` is loaded from
+    `prep_time_stats`; a long-lived caller passes its own to skip that reload.
+    """
+    model = model if model is not None else PrepTimeModel()
+    timings: dict[str, float] = {}
+    started = time.perf_counter()
+    rows_read = observations = chunks = 0
+    last: tuple[Any, Any] | None = None
+    with db.connection() as conn:
+        with conn.cursor() as cur:
+            # One learner at a time across processes; the others skip this round.
+            cur.execute("SELECT pg_try_advisory_xact_lock(hashtext(%s)) AS locked", (HISTORY_NAME,))
+            if not cur.fetchone()["locked"]:
+                conn.rollback()
+                return {"skipped": True, "rows": 0, "observations": 0, "keys": len(model)}
+            if full:
+                cur.execute("DELETE FROM prep_time_stats")
+                cur.execute("DELETE FROM prep_time_watermarks WHERE name = %s", (HISTORY_NAME,))
+                model.load([])
+            else:
+                cur.execute(
+                    "SELECT completed_at, ticket_id FROM prep_time_watermarks WHERE name = %s", (HISTORY_NAME,)
+                )
+                watermark = cur.fetchone()
+                if watermark is not None:
+                    last = (watermark["completed_at"], watermark["ticket_id"])
+                if not len(model) or model.watermark != last:
+                    cur.execute(LOAD_STATS_SQL)
+                    model.load(cur.fetchall())
+        timings["load_ms"] = (time.perf_counter() - started) * 1000
+
+        try:
+            streamed_at = time.perf_counter()
+            params = {
+                "after_at": last[0] if last else "-infinity",
+                "after_id": str(last[1]) if last else "00000000-0000-0000-0000-000000000000",
+                "since": since,
+            }
+            # Named cursor: Postgres holds the result set and we pull `chunk_size` rows at a time.
+            history = iter_chunks(
+                conn, HISTORY_SQL, params, chunk_size, row_factory=tuple_row, name="prep_time_history"
+            )
+            for chunk in history:
+                chunks += 1
+                rows_read += len(chunk)
+                observations += model.update(chunk)
+                last = (chunk[-1][1], chunk[-1][0])
+            timings["stream_ms"] = (time.perf_counter() - streamed_at) * 1000
+
+            written_at = time.perf_counter()
+            keys_written = len(model.dirty)
+            with conn.cursor() as cur:
+                if keys_written:
+                    cur.execute(UPSERT_STATS_SQL, model.dirty_columns())
+                if last is not None:
+                    cur.execute(WATERMARK_SQL, (HISTORY_NAME, last[0], last[1]))
+            conn.commit()
+        except Exception:
+            # The transaction rolled back; drop the partially updated state so the next run reloads it.
+            model.load([])
+            raise
+        model.watermark = last
+        timings["write_ms"] = (time.perf_counter() - written_at) * 1000
+
+    elapsed = time.perf_counter() - started
+    LOGGER.info("Learned prep times | rows=%s keys_written=%s elapsed=%.3fs", rows_read, keys_written, elapsed)
+    return {
+        "rows": rows_read,
+        "observations": observations,
+        "chunks": chunks,
+        "keys": len(model),
+        "keys_written": keys_written,
+        "watermark": last[0].isoformat() if last and isinstance(last[0], datetime) else None,
+        "rows_per_s": round(rows_read / elapsed, 1) if elapsed else None,
+        "timings_ms": {name: round(value, 3) for name, value in timings.items()},
+    }
+
+
+def predict(db: Database, min_observations: int = 5) -> dict[str, int]:
+    """Write learned estimates to active order items and the menu catalog."""
+    params = {"min_observations": min_observations}
+    with db.transaction() as cur:
+        cur.execute(PREDICT_ITEMS_SQL, params)
+        items = cur.rowcount
+        cur.execute(REFRESH_MENU_SQL, params)
+        menu_items = cur.rowcount
+    return {"order_items_updated": items, "menu_items_updated": menu_items}
+
+
+def fetch_estimates(db: Database, menu_item_id: str, station_id: str | None = None) -> list[dict[str, Any]] | None:
+    """Per station/daypart estimates for an item; `None` if the stats table is missing.
+
+    Each row carries `current_daypart`, the daypart right now in its station's timezone.
+    """
+    try:
+        rows = db.fetch_all(ESTIMATES_SQL, {"menu_item_id": menu_item_id, "station_id": station_id})
+    except errors.UndefinedTable:
+        return None
+    now: dict[str, str] = {}
+    for row in rows:
+        if row["timezone"] not in now:
+            now[row["timezone"]] = daypart_for(datetime.now(ZoneInfo(row["timezone"])))
+    return [
+        {
+            "station_id": str(row["station_id"]),
+            "station_name": row["station_name"],
+            "menu_item_name": row["menu_item_name"],
+            "daypart": row["daypart"],
+            "current_daypart": now[row["timezone"]],
+            "observations": row["observations"],
+            **summarise(row["weight"], row["sum_s"], row["sum_sq"], row["hist"]),
+            "last_completed_at": row["last_completed_at"],
+        }
+        for row in rows
+    ]
+
+
+class PrepTimeLearner:
+    """Background thread that learns from newly passed tickets and refreshes predictions."""
+
+    def __init__(
+        self,
+        db: Database,
+        interval: float = 60.0,
+        alpha: float = 0.05,
+        chunk_size: int = 50_000,
+        min_observations: int = 5,
+    ) -> None:
+        self._db = db
+        self._interval = interval
+        self._chunk_size = chunk_size
+        self._min_observations = min_observations
+        self._model = PrepTimeModel(alpha)
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+        self._stats: dict[str, Any] = {
+            "runs": 0,
+            "observations": 0,
+            "order_items_updated": 0,
+            "menu_items_updated": 0,
+            "last_run_ms": None,
+        }
+
+    def run_once(self) -> dict[str, Any]:
+        started = time.perf_counter()
+        learned = learn(self._db, self._model, chunk_size=self._chunk_size)
+        predicted = predict(self._db, self._min_observations)
+        self._stats["runs"] += 1
+        self._stats["observations"] += learned["observations"]
+        self._stats["order_items_updated"] += predicted["order_items_updated"]
+        self._stats["menu_items_updated"] += predicted["menu_items_updated"]
+        self._stats["last_run_ms"] = round((time.perf_counter() - started) * 1000, 3)
+        return {**learned, **predicted}
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            try:
+                self.run_once()
+            except Exception:  # noqa: BLE001
+                LOGGER.exception("Prep-time learning run failed")
+            self._stop.wait(self._interval)
+
+    def start(self) -> None:
+        if self._thread is not None:
+            return
+        ensure_prep_time_schema(self._db)
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="prep-time-learner", daemon=True)
+        self._thread.start()
+        LOGGER.info("Prep-time learner started | interval=%ss", self._interval)
+
+    def stop(self, timeout: float = 5.0) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=timeout)
+            self._thread = None
+
+    def stats(self) -> dict[str, Any]:
+        return {**self._stats, "keys": len(self._model)}
+
+
+__all__ = [
+    "DAYPARTS",
+    "PrepTimeLearner",
+    "PrepTimeModel",
+    "daypart_for",
+    "ensure_prep_time_schema",
+    "fetch_estimates",
+    "learn",
+    "predict",
+]
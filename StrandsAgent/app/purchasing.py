@@ -0,0 +1,223 @@
+"""Set-based purchase order drafting from restock recommendations."""
+
+from __future__ import annotations
+
+import logging
+import uuid
+from datetime import datetime
+from typing import TYPE_CHECKING, Any, Iterator, Sequence
+
+from .utils import decode_json_columns
+
+if TYPE_CHECKING:
+    from .db import Database
+
+LOGGER = logging.getLogger(__name__)
+
+MAX_PAGE_SIZE = 1000
+
+# Newest first with the id as tie-break, so (created_at, id) is a keyset cursor;
+# a NULL limit returns every row.
+RESTOCK_RISKS_SQL = """
+SELECT rr.id,
+       rr.ingredient_id,
+       ing.name AS ingredient_name,
+       rr.recommended_qty_packs,
+       rr.supplier_id,
+       sup.name AS supplier_name,
+       rr.rationale,
+       rr.created_at
+FROM restock_recommendations rr
+JOIN ingredients ing ON ing.id = rr.ingredient_id
+LEFT JOIN suppliers sup ON sup.id = rr.supplier_id
+WHERE rr.location_id = %(location_id)s
+  AND (%(after_at)s::timestamptz IS NULL
+       OR (rr.created_at, rr.id) < (%(after_at)s::timestamptz, %(after_id)s::uuid))
+ORDER BY rr.created_at DESC, rr.id DESC
+LIMIT %(limit)s::bigint
+"""
+
+# Recommendations with a resolved supplier: the recommended one, else the primary
+# (then cheapest) supplier of the ingredient. Ordered so the newest rec wins on dedupe.
+BULK_RECS_SQL = """
+SELECT rr.location_id,
+       rr.ingredient_id,
+       ing.name AS ingredient_name,
+       rr.recommended_qty_packs,
+       COALESCE(rr.supplier_id, pref.supplier_id) AS supplier_id,
+       isp.price_per_pack
+FROM restock_recommendations rr
+JOIN ingredients ing ON ing.id = rr.ingredient_id
+LEFT JOIN LATERAL (
+    SELECT s.supplier_id
+    FROM ingredient_suppliers s
+    WHERE s.ingredient_id = rr.ingredient_id
+    ORDER BY s.is_primary DESC, s.price_per_pack ASC
+    LIMIT 1
+) pref ON rr.supplier_id IS NULL
+LEFT JOIN ingredient_suppliers isp
+    ON isp.ingredient_id = rr.ingredient_id
+   AND isp.supplier_id = COALESCE(rr.supplier_id, pref.supplier_id)
+WHERE (%(location_id)s::uuid IS NULL OR rr.location_id = %(location_id)s::uuid)
+ORDER BY rr.created_at ASC
+"""
+
+INSERT_HEADERS_SQL = """
+INSERT INTO purchase_orders (org_id, location_id, supplier_id, po_number)
+SELECT l.org_id, h.location_id, h.supplier_id, h.po_number
+FROM unnest(%s::uuid[], %s::uuid[], %s::text[]) AS h(location_id, supplier_id, po_number)
+JOIN locations l ON l.id = h.location_id
+RETURNING id, location_id, supplier_id, po_number
+"""
+
+INSERT_LINES_SQL = """
+INSERT INTO purchase_order_items (po_id, ingredient_id, qty_packs, price_per_pack)
+SELECT line.po_id, line.ingredient_id, line.qty_packs, line.price_per_pack
+FROM unnest(%s::uuid[], %s::uuid[], %s::numeric[], %s::numeric[])
+    AS line(po_id, ingredient_id, qty_packs, price_per_pack)
+ON CONFLICT (po_id, ingredient_id)
+DO UPDATE SET qty_packs = EXCLUDED.qty_packs, price_per_pack = EXCLUDED.price_per_pack
+"""
+
+
+def restock_cursor(row: dict[str, Any]) -> str:
+    """Opaque keyset cursor (``created_at|id``) pointing just past `row`."""
+    created_at = row["created_at"]
+    if isinstance(created_at, datetime):
+        created_at = created_at.isoformat()
+    return f"{created_at}|{row['id']}"
+
+
+def restock_risks_params(location_id: str, after: str | None = None, limit: int | None = None) -> dict[str, Any]:
+    """`RESTOCK_RISKS_SQL` parameters; raises ValueError for a malformed `after` cursor."""
+    after_at = after_id = None
+    if after:
+        created_at, _, row_id = after.partition("|")
+        try:
+            after_at = datetime.fromisoformat(created_at.replace("Z", "+00:00"))
+            after_id = str(uuid.UUID(row_id))
+        except ValueError as exc:
+            raise ValueError(f"Invalid restock cursor: {after}") from exc
+    return {"location_id": location_id, "after_at": after_at, "after_id": after_id, "limit": limit}
+
+
+def stream_restock_risks(
+    db: Database, location_id: str, after: str | None = None, chunk_size: int = MAX_PAGE_SIZE
+) -> Iterator[dict[str, Any]]:
+    """Every restock recommendation after `after`, newest first, read through a server-side cursor."""
+    params = restock_risks_params(location_id, after)
+    for chunk in db.stream_chunks(RESTOCK_RISKS_SQL, params, chunk_size, json=True):
+        decode_json_columns(chunk, "rationale")
+        yield from chunk
+
+
+def po_number_prefix(now: datetime | None = None) -> str:
+    """Unique PO number (or prefix for a batch's `-NNNN` numbers).
+
+    The random part keeps drafts started in the same second from colliding on the
+    UNIQUE `po_number`.
+    """
+    return f"PO-{(now or datetime.utcnow()).strftime('%Y%m%d%H%M%S')}-{uuid.uuid4().hex[:8].upper()}"
+
+
+def write_po_lines(cur: Any, lines: Sequence[tuple[Any, Any, Any, Any]]) -> int:
+    """Write (po_id, ingredient_id, qty_packs, price_per_pack) lines in one statement."""
+    if not lines:
+        return 0
+    po_ids, ingredient_ids, qtys, prices = (list(column) for column in zip(*lines))
+    cur.execute(INSERT_LINES_SQL, (po_ids, ingredient_ids, qtys, prices))
+    return len(lines)
+
+
+def draft_purchase_orders(cur: Any, location_id: str | None = None) -> dict[str, Any]:
+    """Draft one PO per (location, supplier) from current recommendations.
+
+    Runs inside the caller's transaction in three statements: read recommendations,
+    insert all headers, insert all lines. Recommendations without any known supplier
+    are reported as unassigned rather than dropped silently.
+    """
+    cur.execute(BULK_RECS_SQL, {"location_id": location_id})
+    recs = cur.fetchall()
+
+    grouped: dict[tuple[Any, Any], dict[Any, dict[str, Any]]] = {}
+    unassigned: list[dict[str, Any]] = []
+    for rec in recs:
+        if rec["supplier_id"] is None:
+            unassigned.append(
+                {
+                    "location_id": str(rec["location_id"]),
+                    "ingredient_id": str(rec["ingredient_id"]),
+                    "ingredient_name": rec["ingredient_name"],
+                }
+            )
+            continue
+        # Later (newer) recommendations for the same ingredient replace earlier ones.
+        grouped.setdefault((rec["location_id"], rec["supplier_id"]), {})[rec["ingredient_id"]] = rec
+
+    if not grouped:
+        return {"purchase_orders": [], "total_cost": 0.0, "unassigned": unassigned}
+
+    prefix = po_number_prefix()
+    keys = list(grouped)
+    cur.execute(
+        INSERT_HEADERS_SQL,
+        (
+            [key[0] for key in keys],
+            [key[1] for key in keys],
+            [f"{prefix}-{index:04d}" for index in range(1, len(keys) + 1)],
+        ),
+    )
+    headers = {(row["location_id"], row["supplier_id"]): row for row in cur.fetchall()}
+
+    lines: list[tuple[Any, Any, Any, Any]] = []
+    orders: list[dict[str, Any]] = []
+    for key in keys:
+        header = headers.get(key)
+        if header is None:
+            continue
+        po_lines: list[dict[str, Any]] = []
+        po_total = 0.0
+        for rec in grouped[key].values():
+            qty_packs = rec["recommended_qty_packs"]
+            price = rec["price_per_pack"] or 0
+            lines.append((header["id"], rec["ingredient_id"], qty_packs, price))
+            line_cost = float(qty_packs) * float(price)
+            po_total += line_cost
+            po_lines.append(
+                {
+                    "ingredient_id": str(rec["ingredient_id"]),
+                    "ingredient_name": rec["ingredient_name"],
+                    "qty_packs": float(qty_packs),
+                    "price_per_pack": float(price),
+                    "line_cost": round(line_cost, 4),
+                }
+            )
+        orders.append(
+            {
+                "po_id": str(header["id"]),
+                "po_number": header["po_number"],
+                "location_id": str(key[0]),
+                "supplier_id": str(key[1]),
+                "lines": po_lines,
+                "total_cost": round(po_total, 4),
+            }
+        )
+
+    written = write_po_lines(cur, lines)
+    LOGGER.debug("Drafted purchase orders | headers=%s lines=%s", len(orders), written)
+    return {
+        "purchase_orders": orders,
+        "total_cost": round(sum(order["total_cost"] for order in orders), 4),
+        "unassigned": unassigned,
+    }
+
+
+__all__ = [
+    "MAX_PAGE_SIZE",
+    "draft_purchase_orders",
+    "po_number_prefix",
+    "restock_cursor",
+    "restock_risks_params",
+    "stream_restock_risks",
+    "write_po_lines",
+]
@@ -0,0 +1,368 @@
+"""Result cache for LLM agent runs, invalidated by table changes.
+
+Entries are keyed by (agent, normalised prompt) and stamped with the version of every
+table the agent's tools read (`AGENT_TABLES`). Versions are in-process counters bumped
+by statement-level triggers that `pg_notify` on the ``kitchen_table_changes`` channel
+(``python main.py response-cache install``). Notifications are only delivered on
+commit, so a write that lands while a run is in flight bumps the version after the
+run captured its stamp, and the stale entry is never served.
+
+Eviction is TTL + LRU with a bound on total cached bytes. While the listener is
+disconnected nothing is read from or written to the cache (``bypass``), and a
+reconnect drops every entry because notifications may have been missed. Each (re)connect
+also checks ``pg_trigger``: an agent reading a table without its ``*_version_notify``
+trigger would never be invalidated, so it bypasses the cache until the triggers exist.
+
+Runs that used a tool with side effects beyond idempotent plan generation (purchase
+orders, notifications, ticket transitions, waste logs) are never cached, so a repeated
+question repeats the action.
+"""
+
+from __future__ import annotations
+
+import logging
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Mapping
+
+import psycopg
+
+from .config import DatabaseSettings
+from .db import Database
+from .metrics import RESPONSE_CACHE_REQUESTS
+
+LOGGER = logging.getLogger(__name__)
+
+CHANNEL = "kitchen_table_changes"
+
+# Tables read by each cacheable agent's tools. Tables an agent only writes idempotently
+# (prep_plans, prep_plan_lines for `generate_prep_plan`) are deliberately left out.
+# Agents whose answers depend on the clock (SLA elapsed time) are not listed.
+AGENT_TABLES: dict[str, tuple[str, ...]] = {
+    "prep_planner": (
+        "demand_forecasts",
+        "recipes",
+        "menu_items",
+        "ingredients",
+        "inventory_levels",
+        "locations",
+    ),
+    "inventory_controller": (
+        "restock_recommendations",
+        "ingredients",
+        "suppliers",
+        "ingredient_suppliers",
+        "inventory_levels",
+        "orders",
+        "orderitems",
+        "menuitemingredients",
+        "legacy_item_daily_usage",
+    ),
+}
+
+SIDE_EFFECT_TOOLS = frozenset(
+    {
+        "start_ticket",
+        "hold_ticket",
+        "pass_ticket",
+        "start_tickets",
+        "hold_tickets",
+        "pass_tickets",
+        "transition_tickets",
+        "rescore_tickets",
+        "ack_alert",
+        "notify",
+        "create_po_from_recs",
+        "create_pos_bulk",
+        "log_waste",
+    }
+)
+
+INSTALL_SQL = """
+CREATE OR REPLACE FUNCTION kitchen_notify_table_change() RETURNS trigger AS $$
+BEGIN
+  -- Identical payloads are folded into one notification per transaction.
+  PERFORM pg_notify('kitchen_table_changes', TG_TABLE_NAME);
+  RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+"""
+
+
+TRIGGERS_SQL = """
+SELECT tbl AS table_name,
+       to_regclass(tbl) IS NOT NULL AS present,
+       EXISTS (
+           SELECT 1 FROM pg_trigger
+           WHERE tgrelid = to_regclass(tbl)
+             AND tgname = tbl || '_version_notify'
+             AND tgenabled <> 'D'
+       ) AS watched
+FROM unnest(%s::text[]) AS tbl
+"""
+
+
+def cached_tables() -> list[str]:
+    return sorted({table for tables in AGENT_TABLES.values() for table in tables})
+
+
+def install_response_cache(db: Database) -> list[str]:
+    """Create (or replace) the statement-level notify triggers; returns the tables watched.
+
+    Tables missing from this database (e.g. the legacy order tables) are skipped.
+    """
+    installed: list[str] = []
+    with db.transaction() as cur:
+        cur.execute(INSTALL_SQL)
+        for table in cached_tables():
+            cur.execute("SELECT to_regclass(%s) IS NOT NULL AS present", (table,))
+            if not cur.fetchone()["present"]:
+                continue
+            cur.execute(f"DROP TRIGGER IF EXISTS {table}_version_notify ON {table}")
+            cur.execute(
+                f"CREATE TRIGGER {table}_version_notify AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON {table} "
+                "FOR EACH STATEMENT EXECUTE FUNCTION kitchen_notify_table_change()"
+            )
+            installed.append(table)
+    return installed
+
+
+_STAT_KEYS = {"hit": "hits", "miss": "misses", "bypass": "bypass", "uncacheable": "uncacheable"}
+
+
+def normalise_prompt(prompt: str) -> str:
+    return " ".join(prompt.casefold().split())
+
+
+@dataclass
+class CachedResponse:
+    output: str
+    stop_reason: str | None
+    versions: tuple[int, ...]
+    stored_at: float
+    size: int
+
+
+@dataclass(frozen=True)
+class CacheTicket:
+    """What a miss hands back to the caller so the run's result can be stored."""
+
+    key: tuple[str, str]
+    versions: tuple[int, ...]
+    epoch: int
+
+
+class ResponseCache:
+    """LISTEN-driven table versions plus the TTL/LRU entry store."""
+
+    def __init__(
+        self,
+        settings: DatabaseSettings,
+        ttl: float = 300.0,
+        max_bytes: int = 8 * 1024 * 1024,
+        agents: Mapping[str, tuple[str, ...]] | None = None,
+        max_staleness: float = 5.0,
+        probe_interval: float = 2.0,
+    ) -> None:
+        self._settings = settings
+        self._ttl = ttl
+        self._max_bytes = max_bytes
+        self._agents = dict(agents if agents is not None else AGENT_TABLES)
+        self._max_staleness = max_staleness
+        self._probe_interval = probe_interval
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+
+        self._versions: dict[str, int] = {}
+        self._epoch = 0
+        self._entries: OrderedDict[tuple[str, str], CachedResponse] = OrderedDict()
+        self._bytes = 0
+
+        self._unwatched: frozenset[str] = frozenset()
+        self._connected = False
+        self._last_heartbeat = 0.0
+        self._stats = {
+            "hits": 0,
+            "misses": 0,
+            "stores": 0,
+            "bypass": 0,
+            "uncacheable": 0,
+            "evictions": 0,
+            "expired": 0,
+            "invalidations": 0,
+            "reconnects": 0,
+        }
+
+    # --- versions ---------------------------------------------------------------
+
+    def _bump(self, table: str) -> None:
+        with self._lock:
+            self._versions[table] = self._versions.get(table, 0) + 1
+            self._stats["invalidations"] += 1
+
+    def _reset(self) -> None:
+        with self._lock:
+            self._epoch += 1
+            self._entries.clear()
+            self._bytes = 0
+
+    def _listen(self) -> None:
+        with psycopg.connect(self._settings.dsn, autocommit=True) as conn:
+            conn.execute(f"LISTEN {CHANNEL}")
+            self._check_triggers(conn)
+            # Anything committed while we were not listening is unknown: start empty.
+            self._reset()
+            self._connected = True
+            last_probe = self._last_heartbeat = time.monotonic()
+            while not self._stop.is_set():
+                for notify in conn.notifies(timeout=1.0, stop_after=100):
+                    self._bump(notify.payload)
+                if time.monotonic() - last_probe >= self._probe_interval:
+                    # A quiet socket may be half-open; only a round trip proves invalidations still arrive.
+                    conn.execute("SELECT 1")
+                    last_probe = self._last_heartbeat = time.monotonic()
+
+    def _check_triggers(self, conn: psycopg.Connection) -> None:
+        # Tables absent from this database (the legacy order tables) cannot change, so only
+        # present tables without a trigger make an agent's answers unsafe to cache.
+        tables = sorted({table for tables in self._agents.values() for table in tables})
+        rows = conn.execute(TRIGGERS_SQL, (tables,)).fetchall()
+        missing = {table for table, present, watched in rows if present and not watched}
+        unwatched = frozenset(agent for agent, tables in self._agents.items() if missing.intersection(tables))
+        if unwatched and unwatched != self._unwatched:
+            LOGGER.warning(
+                "Response cache bypassed for %s: no change trigger on %s "
+                "(run `python main.py response-cache install`)",
+                ", ".join(sorted(unwatched)),
+                ", ".join(sorted(missing)),
+            )
+        self._unwatched = unwatched
+
+    def _run(self) -> None:
+        backoff = 1.0
+        while not self._stop.is_set():
+            try:
+                self._listen()
+                backoff = 1.0
+            except Exception:  # noqa: BLE001
+                LOGGER.exception("Response cache listener lost; reconnecting in %.1fs", backoff)
+            finally:
+                self._connected = False
+            if not self._stop.wait(backoff):
+                self._stats["reconnects"] += 1
+                backoff = min(backoff * 2, 30.0)
+
+    def start(self) -> None:
+        if self._thread is not None:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="response-cache", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float = 5.0) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=timeout)
+            self._thread = None
+
+    def is_fresh(self) -> bool:
+        return self._connected and time.monotonic() - self._last_heartbeat <= self._max_staleness
+
+    # --- entries ----------------------------------------------------------------
+
+    def _count(self, agent: str, outcome: str) -> None:
+        self._stats[_STAT_KEYS[outcome]] += 1
+        RESPONSE_CACHE_REQUESTS.inc(agent=agent, outcome=outcome)
+
+    def lookup(self, agent: str, prompt: str) -> tuple[CachedResponse | None, CacheTicket | None]:
+        """Return (hit, None), (None, ticket) on a miss, or (None, None) if the run must not be cached."""
+        tables = self._agents.get(agent)
+        if tables is None:
+            return None, None
+        if agent in self._unwatched or not self.is_fresh():
+            with self._lock:
+                self._count(agent, "bypass")
+            return None, None
+        key = (agent, normalise_prompt(prompt))
+        now = time.monotonic()
+        with self._lock:
+            versions = tuple(self._versions.get(table, 0) for table in tables)
+            entry = self._entries.get(key)
+            if entry is not None and now - entry.stored_at > self._ttl:
+                self._drop(key)
+                self._stats["expired"] += 1
+                entry = None
+            if entry is not None and entry.versions == versions:
+                self._entries.move_to_end(key)
+                self._count(agent, "hit")
+                return entry, None
+            self._count(agent, "miss")
+            return None, CacheTicket(key=key, versions=versions, epoch=self._epoch)
+
+    def store(self, ticket: CacheTicket, result: Any) -> bool:
+        """Cache a finished run unless it used a side-effect tool or the listener reconnected."""
+        agent = ticket.key[0]
+        tools_used = set(getattr(getattr(result, "metrics", None), "tool_metrics", None) or ())
+        if tools_used & SIDE_EFFECT_TOOLS or getattr(result, "stop_reason", None) != "end_turn":
+            with self._lock:
+                self._count(agent, "uncacheable")
+            return False
+        output = str(result).strip()
+        size = len(output.encode()) + len(ticket.key[1].encode())
+        if size > self._max_bytes:
+            return False
+        with self._lock:
+            if ticket.epoch != self._epoch:
+                return False
+            self._drop(ticket.key)
+            self._entries[ticket.key] = CachedResponse(
+                output=output,
+                stop_reason=getattr(result, "stop_reason", None),
+                versions=ticket.versions,
+                stored_at=time.monotonic(),
+                size=size,
+            )
+            self._bytes += size
+            self._stats["stores"] += 1
+            while self._bytes > self._max_bytes and self._entries:
+                _, evicted = self._entries.popitem(last=False)
+                self._bytes -= evicted.size
+                self._stats["evictions"] += 1
+        return True
+
+    def _drop(self, key: tuple[str, str]) -> None:
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self._bytes -= entry.size
+
+    def clear(self) -> None:
+        self._reset()
+
+    def stats(self) -> dict[str, Any]:
+        with self._lock:
+            stats: dict[str, Any] = dict(self._stats)
+            stats["entries"] = len(self._entries)
+            stats["bytes"] = self._bytes
+        lookups = stats["hits"] + stats["misses"]
+        stats["hit_rate"] = round(stats["hits"] / lookups, 4) if lookups else None
+        stats["connected"] = self._connected
+        stats["fresh"] = self.is_fresh()
+        stats["ttl_s"] = self._ttl
+        stats["max_bytes"] = self._max_bytes
+        stats["agents"] = sorted(self._agents)
+        stats["unwatched_agents"] = sorted(self._unwatched)
+        return stats
+
+
+__all__ = [
+    "AGENT_TABLES",
+    "CHANNEL",
+    "CacheTicket",
+    "CachedResponse",
+    "ResponseCache",
+    "install_response_cache",
+    "normalise_prompt",
+]
@@ -0,0 +1,311 @@
+"""Vectorised priority scoring for active KDS tickets.
+
+One query loads every active ticket of a location together with its wait time, SLA,
+expected prep time and how much of its order is already done. Scores are computed
+for all tickets at once with NumPy and only tickets whose score moved by more than
+`min_delta` are written back, in a single `unnest` UPDATE with a structured
+`priority_reason`. The UPDATE is optimistic: a ticket whose score or `enqueued_at`
+changed after it was read (a hold, or another scorer) is left alone and counted
+under ``skipped``.
+
+Score (roughly 0..1, above 1 once a ticket is past its SLA):
+
+    w_sla * sla_risk + w_prep * prep_share + w_completion * order_done + w_overdue * overdue
+
+* `sla_risk`   - logistic on the slack left (SLA - wait - prep), 0.5 at zero slack
+* `prep_share` - expected prep time as a share of the SLA (long items start early)
+* `order_done` - fraction of the order's sibling tickets already ready/passed
+* `overdue`    - how far past the SLA the ticket already is (wait / SLA - 1, >= 0)
+
+Held tickets (`enqueued_at` in the future, see `hold_ticket`) keep `hold_factor` of
+their score until the hold expires.
+"""
+
+from __future__ import annotations
+
+import json
+import logging
+import threading
+import time
+from dataclasses import dataclass
+from typing import Any
+
+import numpy as np
+
+from .db import Database
+
+LOGGER = logging.getLogger(__name__)
+
+ENGINE_VERSION = "v1"
+
+SCORING_INPUTS_SQL = """
+WITH active AS (
+    SELECT kt.id AS ticket_id,
+           oi.order_id,
+           kt.priority_score AS old_score,
+           kt.enqueued_at AS old_enqueued_at,
+           kt.priority_score::float8 AS current_score,
+           kt.sla_minutes::float8 AS sla_minutes,
+           EXTRACT(EPOCH FROM now() - COALESCE(oi.started_at, oi.created_at))::float8 AS wait_s,
+           GREATEST(EXTRACT(EPOCH FROM kt.enqueued_at - now()), 0)::float8 AS held_s,
+           oi.predicted_prep_minutes::float8 AS predicted_prep_minutes,
+           mi.avg_prep_minutes::float8 AS avg_prep_minutes
+    FROM kds_tickets kt
+    JOIN stations s ON s.id = kt.station_id
+    JOIN order_items oi ON oi.id = kt.order_item_id
+    JOIN menu_items mi ON mi.id = oi.menu_item_id
+    WHERE s.location_id = %(location_id)s
+      AND kt.status IN ('queued','firing','prepping')
+),
+siblings AS (
+    SELECT oi.order_id,
+           COUNT(*)::float8 AS total,
+           (COUNT(*) FILTER (WHERE kt.status IN ('ready','passed')))::float8 AS done
+    FROM kds_tickets kt
+    JOIN order_items oi ON oi.id = kt.order_item_id
+    WHERE oi.order_id IN (SELECT order_id FROM active)
+      AND kt.status <> 'cancelled'
+    GROUP BY oi.order_id
+)
+SELECT a.ticket_id, a.old_score, a.old_enqueued_at, a.current_score, a.sla_minutes, a.wait_s, a.held_s,
+       a.predicted_prep_minutes, a.avg_prep_minutes, s.total AS siblings_total, s.done AS siblings_done
+FROM active a
+JOIN siblings s ON s.order_id = a.order_id
+ORDER BY a.ticket_id  -- deterministic input order; no rows are locked by this read
+"""
+
+WRITE_SCORES_SQL = """
+UPDATE kds_tickets kt
+SET priority_score = u.score,
+    priority_reason = u.reason::jsonb
+FROM unnest(%s::uuid[], %s::numeric[], %s::text[], %s::numeric[], %s::timestamptz[])
+    AS u(id, score, reason, old_score, old_enqueued_at)
+WHERE kt.id = u.id
+  AND kt.status IN ('queued','firing','prepping')
+  -- Optimistic check: skip tickets held or rescored since they were read.
+  AND kt.priority_score IS NOT DISTINCT FROM u.old_score
+  AND kt.enqueued_at = u.old_enqueued_at
+"""
+
+_INPUT_COLUMNS = (
+    "current_score",
+    "sla_minutes",
+    "wait_s",
+    "held_s",
+    "predicted_prep_minutes",
+    "avg_prep_minutes",
+    "siblings_total",
+    "siblings_done",
+)
+
+
+@dataclass(frozen=True)
+class ScoringWeights:
+    """Tunable weights and defaults for `score_arrays`."""
+
+    sla_risk: float = 0.5
+    prep_share: float = 0.2
+    order_done: float = 0.3
+    overdue: float = 0.5
+    risk_scale_minutes: float = 3.0
+    default_sla_minutes: float = 15.0
+    default_prep_minutes: float = 5.0
+    hold_factor: float = 0.8
+
+
+DEFAULT_WEIGHTS = ScoringWeights()
+
+
+def to_arrays(rows: list[dict[str, Any]]) -> dict[str, np.ndarray]:
+    """Column arrays for `score_arrays`; SQL NULLs become NaN."""
+    return {
+        column: np.array([np.nan if row[column] is None else row[column] for row in rows], dtype=np.float64)
+        for column in _INPUT_COLUMNS
+    }
+
+
+def score_arrays(inputs: dict[str, np.ndarray], weights: ScoringWeights = DEFAULT_WEIGHTS) -> dict[str, np.ndarray]:
+    """Compute scores and their components for every ticket in one vectorised pass."""
+    sla = inputs["sla_minutes"]
+    sla = np.where(np.isnan(sla) | (sla <= 0), weights.default_sla_minutes, sla)
+    prep = inputs["predicted_prep_minutes"]
+    prep = np.where(np.isnan(prep), inputs["avg_prep_minutes"], prep)
+    prep = np.where(np.isnan(prep), weights.default_prep_minutes, prep)
+    wait = np.maximum(np.nan_to_num(inputs["wait_s"]), 0.0) / 60.0
+
+    slack = sla - wait - prep
+    sla_risk = 1.0 / (1.0 + np.exp(np.clip(slack / weights.risk_scale_minutes, -50.0, 50.0)))
+    prep_share = np.clip(prep / sla, 0.0, 1.0)
+    total = np.nan_to_num(inputs["siblings_total"], nan=1.0)
+    order_done = np.where(total > 0, np.nan_to_num(inputs["siblings_done"]) / np.maximum(total, 1.0), 0.0)
+    overdue = np.maximum(wait / sla - 1.0, 0.0)
+
+    score = (
+        weights.sla_risk * sla_risk
+        + weights.prep_share * prep_share
+        + weights.order_done * order_done
+        + weights.overdue * overdue
+    )
+    held = np.nan_to_num(inputs["held_s"]) > 0
+    score = np.round(np.where(held, score * weights.hold_factor, score), 4)
+    return {
+        "score": score,
+        "sla_risk": sla_risk,
+        "prep_share": prep_share,
+        "order_done": order_done,
+        "overdue": overdue,
+        "wait_minutes": wait,
+        "sla_minutes": sla,
+        "prep_minutes": prep,
+        "slack_minutes": slack,
+        "held": held,
+    }
+
+
+def _reason(result: dict[str, np.ndarray], index: int, inputs: dict[str, np.ndarray], weights: ScoringWeights) -> str:
+    components = {
+        "sla_risk": round(float(result["sla_risk"][index]) * weights.sla_risk, 4),
+        "prep_share": round(float(result["prep_share"][index]) * weights.prep_share, 4),
+        "order_done": round(float(result["order_done"][index]) * weights.order_done, 4),
+        "overdue": round(float(result["overdue"][index]) * weights.overdue, 4),
+    }
+    total = inputs["siblings_total"][index]
+    done = inputs["siblings_done"][index]
+    return json.dumps(
+        {
+            "engine": ENGINE_VERSION,
+            "dominant": max(components, key=components.get),
+            "components": components,
+            "wait_min": round(float(result["wait_minutes"][index]), 2),
+            "sla_min": round(float(result["sla_minutes"][index]), 2),
+            "prep_min": round(float(result["prep_minutes"][index]), 2),
+            "slack_min": round(float(result["slack_minutes"][index]), 2),
+            "order_progress": f"{int(0 if np.isnan(done) else done)}/{int(0 if np.isnan(total) else total)}",
+            "held": bool(result["held"][index]),
+        }
+    )
+
+
+def rescore_location(
+    db: Database,
+    location_id: str,
+    weights: ScoringWeights = DEFAULT_WEIGHTS,
+    min_delta: float = 0.005,
+) -> dict[str, Any]:
+    """Score every active ticket of a location and write back the ones that changed."""
+    timings: dict[str, float] = {}
+    started = time.perf_counter()
+    with db.transaction() as cur:
+        cur.execute(SCORING_INPUTS_SQL, {"location_id": location_id})
+        rows = cur.fetchall()
+        timings["load_ms"] = (time.perf_counter() - started) * 1000
+
+        scored_at = time.perf_counter()
+        inputs = to_arrays(rows)
+        result = score_arrays(inputs, weights)
+        current = inputs["current_score"]
+        changed = np.flatnonzero(np.isnan(current) | (np.abs(result["score"] - current) >= min_delta))
+        timings["score_ms"] = (time.perf_counter() - scored_at) * 1000
+
+        written_at = time.perf_counter()
+        updated = 0
+        if changed.size:
+            cur.execute(
+                WRITE_SCORES_SQL,
+                (
+                    [rows[index]["ticket_id"] for index in changed],
+                    result["score"][changed].tolist(),
+                    [_reason(result, index, inputs, weights) for index in changed],
+                    [rows[index]["old_score"] for index in changed],
+                    [rows[index]["old_enqueued_at"] for index in changed],
+                ),
+            )
+            updated = cur.rowcount
+        timings["write_ms"] = (time.perf_counter() - written_at) * 1000
+
+    LOGGER.debug("Rescored location %s | tickets=%s updated=%s", location_id, len(rows), updated)
+    return {
+        "location_id": str(location_id),
+        "tickets": len(rows),
+        "updated": updated,
+        "skipped": int(changed.size) - updated,
+        "timings_ms": {name: round(value, 3) for name, value in timings.items()},
+    }
+
+
+class PriorityScorer:
+    """Background thread that rescores active tickets on a fixed interval."""
+
+    def __init__(
+        self,
+        db: Database,
+        location_id: str | None = None,
+        interval: float = 30.0,
+        weights: ScoringWeights = DEFAULT_WEIGHTS,
+    ) -> None:
+        self._db = db
+        self._location_id = location_id
+        self._interval = interval
+        self._weights = weights
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+        self._stats: dict[str, Any] = {"runs": 0, "tickets_scored": 0, "tickets_updated": 0, "last_run_ms": None}
+
+    def _locations(self) -> list[str]:
+        if self._location_id is not None:
+            return [str(self._location_id)]
+        return [
+            str(row["location_id"])
+            for row in self._db.fetch_all(
+                """
+                SELECT DISTINCT s.location_id
+                FROM kds_tickets kt
+                JOIN stations s ON s.id = kt.station_id
+                WHERE kt.status IN ('queued','firing','prepping')
+                """
+            )
+        ]
+
+    def run_once(self) -> list[dict[str, Any]]:
+        started = time.perf_counter()
+        results = [rescore_location(self._db, location_id, self._weights) for location_id in self._locations()]
+        self._stats["runs"] += 1
+        self._stats["tickets_scored"] += sum(item["tickets"] for item in results)
+        self._stats["tickets_updated"] += sum(item["updated"] for item in results)
+        self._stats["last_run_ms"] = round((time.perf_counter() - started) * 1000, 3)
+        return results
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            try:
+                self.run_once()
+            except Exception:  # noqa: BLE001
+                LOGGER.exception("Priority scoring run failed")
+            self._stop.wait(self._interval)
+
+    def start(self) -> None:
+        if self._thread is not None:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="priority-scorer", daemon=True)
+        self._thread.start()
+        LOGGER.info("Priority scorer started | location_id=%s interval=%ss", self._location_id or "all", self._interval)
+
+    def stop(self, timeout: float = 5.0) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=timeout)
+            self._thread = None
+
+    def stats(self) -> dict[str, Any]:
+        return dict(self._stats)
+
+
+__all__ = [
+    "DEFAULT_WEIGHTS",
+    "PriorityScorer",
+    "ScoringWeights",
+    "rescore_location",
+    "score_arrays",
+    "to_arrays",
+]
@@ -0,0 +1,294 @@
+"""Incrementally maintained usage rollup behind `monthly_shopping_list` (legacy schema).
+
+`legacy_item_daily_usage` stores the quantity sold per legacy menu item per closed
+day. A shopping list for N days sums the rolled-up days inside the window and only
+reads raw `orders`/`orderitems` for the partial first day and for days not yet rolled
+up, so the cost no longer grows with the size of the order history. Recipes
+(`menuitemingredients`) are applied at query time, so recipe edits take effect
+immediately, exactly as with the full query.
+"""
+
+from __future__ import annotations
+
+import logging
+from datetime import date
+from typing import Any, Iterable, Iterator
+
+from psycopg import errors
+
+from .db import Database
+
+LOGGER = logging.getLogger(__name__)
+
+ROLLUP_NAME = "legacy_item_daily_usage"
+
+ROLLUP_SCHEMA_SQL = """
+CREATE TABLE IF NOT EXISTS legacy_item_daily_usage (
+  usage_date DATE NOT NULL,
+  itemid INT NOT NULL,
+  qty NUMERIC(14,2) NOT NULL,
+  PRIMARY KEY (usage_date, itemid)
+);
+CREATE TABLE IF NOT EXISTS rollup_watermarks (
+  name TEXT PRIMARY KEY,
+  last_order_id BIGINT NOT NULL DEFAULT 0,
+  rolled_through DATE,                 -- exclusive: every day before this is rolled up
+  refreshed_at TIMESTAMPTZ NOT NULL DEFAULT now()
+);
+CREATE INDEX IF NOT EXISTS idx_orders_orderdate ON orders(orderdate);
+"""
+
+_INGREDIENT_SELECT = """
+SELECT i.ingredientid            AS id,
+       i.ingredientname          AS name,
+       i."Category"             AS category,
+       i.unit                    AS unit,
+       i.stockquantity           AS current_stock,
+       COALESCE(u.monthly_usage, 0) AS monthly_usage,
+       i."LowThreshold"         AS low_threshold
+FROM ingredients i
+LEFT JOIN ingredient_usage u ON u.ingredient_id = i.ingredientid
+ORDER BY u.monthly_usage DESC NULLS LAST, i.ingredientid
+"""
+
+# Original query: re-aggregates every order in the lookback window.
+FULL_USAGE_SQL = """
+WITH month_orders AS (
+    SELECT oi.itemid   AS item_id,
+           SUM(oi.quantity) AS qty
+    FROM orderitems oi
+    JOIN orders o ON o.orderid = oi.orderid
+    WHERE o.orderdate >= (now() - make_interval(days => %(days)s))
+    GROUP BY oi.itemid
+),
+ingredient_usage AS (
+    SELECT mii.ingredientid AS ingredient_id,
+           SUM(mo.qty * mii.quantityneeded) AS monthly_usage
+    FROM month_orders mo
+    JOIN menuitemingredients mii ON mii.itemid = mo.item_id
+    GROUP BY mii.ingredientid
+)
+""" + _INGREDIENT_SELECT
+
+# Rolled-up closed days inside the window plus raw orders for the partial first day
+# and anything at or after the rollup watermark.
+ROLLUP_USAGE_SQL = """
+WITH bounds AS (
+    SELECT (now() - make_interval(days => %(days)s))::timestamp AS cutoff,
+           COALESCE(
+               (SELECT rolled_through FROM rollup_watermarks WHERE name = %(rollup)s),
+               '-infinity'::date
+           ) AS rolled_through
+),
+rolled AS (
+    SELECT u.itemid AS item_id, SUM(u.qty) AS qty
+    FROM legacy_item_daily_usage u, bounds b
+    WHERE u.usage_date > b.cutoff::date AND u.usage_date < b.rolled_through
+    GROUP BY u.itemid
+),
+recent AS (
+    SELECT oi.itemid AS item_id, SUM(oi.quantity) AS qty
+    FROM orderitems oi
+    JOIN orders o ON o.orderid = oi.orderid, bounds b
+    WHERE o.orderdate >= b.cutoff
+      AND (o.orderdate < b.cutoff::date + 1 OR o.orderdate >= GREATEST(b.rolled_through, b.cutoff::date + 1))
+    GROUP BY oi.itemid
+),
+month_orders AS (
+    SELECT item_id, SUM(qty) AS qty
+    FROM (SELECT * FROM rolled UNION ALL SELECT * FROM recent) combined
+    GROUP BY item_id
+),
+ingredient_usage AS (
+    SELECT mii.ingredientid AS ingredient_id,
+           SUM(mo.qty * mii.quantityneeded) AS monthly_usage
+    FROM month_orders mo
+    JOIN menuitemingredients mii ON mii.itemid = mo.item_id
+    GROUP BY mii.ingredientid
+)
+""" + _INGREDIENT_SELECT
+
+_REBUILD_DAYS_SQL = """
+INSERT INTO legacy_item_daily_usage (usage_date, itemid, qty)
+SELECT o.orderdate::date, oi.itemid, SUM(oi.quantity)
+FROM orderitems oi
+JOIN orders o ON o.orderid = oi.orderid
+WHERE o.orderdate::date = ANY(%s::date[])
+GROUP BY o.orderdate::date, oi.itemid
+"""
+
+_rollup_missing_logged = False
+
+
+def ensure_rollup_schema(db: Database) -> None:
+    """Create the rollup tables and supporting index if they do not exist."""
+    with db.transaction() as cur:
+        cur.execute(ROLLUP_SCHEMA_SQL)
+
+
+def refresh_usage_rollup(db: Database, settle_days: int = 2, full: bool = False) -> dict[str, Any]:
+    """Roll newly closed days (and late edits) into `legacy_item_daily_usage`.
+
+    Days touched by orders newer than the watermark, days closed since the last
+    refresh and the trailing `settle_days` closed days are recomputed from raw orders.
+    Today is never rolled up; readers take it from raw orders. `full` rebuilds every
+    closed day. Concurrent refreshes are serialised with an advisory lock.
+    """
+    ensure_rollup_schema(db)
+    with db.transaction() as cur:
+        cur.execute("SELECT pg_advisory_xact_lock(hashtext(%s))", (ROLLUP_NAME,))
+        cur.execute("SELECT current_date AS today, COALESCE(MAX(orderid), 0) AS max_order_id FROM orders")
+        head = cur.fetchone()
+        today: date = head["today"]
+        cur.execute(
+            "SELECT last_order_id, rolled_through FROM rollup_watermarks WHERE name = %s FOR UPDATE",
+            (ROLLUP_NAME,),
+        )
+        watermark = cur.fetchone()
+        full = full or watermark is None or watermark["rolled_through"] is None
+
+        if full:
+            cur.execute(
+                "SELECT DISTINCT orderdate::date AS day FROM orders WHERE orderdate::date < %s",
+                (today,),
+            )
+            days = {row["day"] for row in cur.fetchall()}
+            cur.execute("DELETE FROM legacy_item_daily_usage")
+        else:
+            cur.execute(
+                """
+                SELECT DISTINCT orderdate::date AS day
+                FROM orders
+                WHERE orderid > %s AND orderdate::date < %s
+                UNION
+                SELECT generate_series(
+                    LEAST(%s::date, %s::date - %s::int), %s::date - 1, interval '1 day'
+                )::date
+                """,
+                (
+                    watermark["last_order_id"],
+                    today,
+                    watermark["rolled_through"],
+                    today,
+                    max(int(settle_days), 0),
+                    today,
+                ),
+            )
+            days = {row["day"] for row in cur.fetchall() if row["day"] < today}
+            cur.execute("DELETE FROM legacy_item_daily_usage WHERE usage_date = ANY(%s::date[])", (sorted(days),))
+
+        if days:
+            cur.execute(_REBUILD_DAYS_SQL, (sorted(days),))
+        rows_written = cur.rowcount if days else 0
+
+        cur.execute(
+            """
+            INSERT INTO rollup_watermarks (name, last_order_id, rolled_through, refreshed_at)
+            VALUES (%s, %s, %s, now())
+            ON CONFLICT (name) DO UPDATE
+            SET last_order_id = EXCLUDED.last_order_id,
+                rolled_through = EXCLUDED.rolled_through,
+                refreshed_at = EXCLUDED.refreshed_at
+            """,
+            (ROLLUP_NAME, head["max_order_id"], today),
+        )
+
+    LOGGER.info(
+        "Usage rollup refreshed | full=%s days=%s rows=%s rolled_through=%s", full, len(days), rows_written, today
+    )
+    return {
+        "full": full,
+        "days_recomputed": len(days),
+        "rows_written": rows_written,
+        "rolled_through": today.isoformat(),
+        "last_order_id": head["max_order_id"],
+    }
+
+
+def fetch_ingredient_usage(db: Database, days: int) -> list[dict]:
+    """Return per-ingredient usage for the last `days` days, using the rollup when present."""
+    global _rollup_missing_logged
+    try:
+        return db.fetch_all(ROLLUP_USAGE_SQL, {"days": days, "rollup": ROLLUP_NAME})
+    except errors.UndefinedTable:
+        if not _rollup_missing_logged:
+            LOGGER.warning("Usage rollup tables missing; run `python main.py usage-rollup refresh`")
+            _rollup_missing_logged = True
+        return db.fetch_all(FULL_USAGE_SQL, {"days": days})
+
+
+def stream_ingredient_usage(db: Database, days: int, chunk_size: int = 1000) -> Iterator[dict]:
+    """`fetch_ingredient_usage` as a generator over a server-side cursor."""
+    global _rollup_missing_logged
+    try:
+        yield from db.stream(ROLLUP_USAGE_SQL, {"days": days, "rollup": ROLLUP_NAME}, chunk_size)
+    except errors.UndefinedTable:
+        # Raised by the first fetch, before any row has been yielded.
+        if not _rollup_missing_logged:
+            LOGGER.warning("Usage rollup tables missing; run `python main.py usage-rollup refresh`")
+            _rollup_missing_logged = True
+        yield from db.stream(FULL_USAGE_SQL, {"days": days}, chunk_size)
+
+
+def shopping_items(rows: Iterable[dict], days: int) -> Iterator[dict[str, Any]]:
+    """Turn usage rows into shopping list items, skipping ingredients with nothing to buy."""
+    for row in rows:
+        name = row.get("name")
+        unit = row.get("unit") or "ea"
+        current_stock = float(row.get("current_stock") or 0)
+        monthly_usage = float(row.get("monthly_usage") or 0)
+        low = float(row.get("low_threshold") or 0)
+        recommended = max(monthly_usage - current_stock, 0)
+
+        urgency = "low"
+        if current_stock <= 0:
+            urgency = "critical"
+        elif current_stock < low:
+            urgency = "high"
+        elif recommended > 0:
+            urgency = "medium"
+
+        reason_parts: list[str] = []
+        reason_parts.append(f"Projected {days}d usage {monthly_usage:.2f} {unit}")
+        reason_parts.append(f"On hand {current_stock:.2f} {unit}")
+        if low > 0:
+            reason_parts.append(f"Par {low:.2f} {unit}")
+
+        if recommended > 0:
+            yield {
+                "id": str(row.get("id")),
+                "name": name,
+                "category": row.get("category") or "Uncategorized",
+                "currentStock": current_stock,
+                "unit": unit,
+                "recommendedQty": float(f"{recommended:.2f}"),
+                "urgency": urgency,
+                "reason": " · ".join(reason_parts),
+                "estimatedCost": 0.0,
+            }
+
+
+def verify_usage_rollup(db: Database, days: int = 30, tolerance: float = 1e-6) -> dict[str, Any]:
+    """Compare rollup-backed usage against the full re-aggregation for the same window."""
+    full_rows = {row["id"]: float(row["monthly_usage"] or 0) for row in db.fetch_all(FULL_USAGE_SQL, {"days": days})}
+    rollup_rows = {
+        row["id"]: float(row["monthly_usage"] or 0)
+        for row in db.fetch_all(ROLLUP_USAGE_SQL, {"days": days, "rollup": ROLLUP_NAME})
+    }
+    mismatches = [
+        {"ingredient_id": str(ingredient_id), "full": full_rows.get(ingredient_id), "rollup": rollup_rows.get(ingredient_id)}
+        for ingredient_id in sorted(set(full_rows) | set(rollup_rows), key=str)
+        if abs(full_rows.get(ingredient_id, 0.0) - rollup_rows.get(ingredient_id, 0.0)) > tolerance
+        or (ingredient_id in full_rows) != (ingredient_id in rollup_rows)
+    ]
+    return {"days": days, "ingredients": len(full_rows), "mismatches": mismatches, "ok": not mismatches}
+
+
+__all__ = [
+    "ensure_rollup_schema",
+    "fetch_ingredient_usage",
+    "refresh_usage_rollup",
+    "shopping_items",
+    "stream_ingredient_usage",
+    "verify_usage_rollup",
+]
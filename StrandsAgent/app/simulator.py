@@ -0,0 +1,532 @@
+"""Discrete-event kitchen simulator that drives the real `KitchenTools` against Postgres.
+
+Orders arrive as a non-homogeneous Poisson process whose rate follows daypart and
+day-of-week multipliers. Each order item is routed through its `item_station_route`
+stations in sequence; at each station a fixed number of cooks pull work with
+`get_station_queue`, fire it with `start_ticket` and finish it with `pass_ticket`
+after a log-normal prep time around the item's `avg_prep_minutes` (when tickets from
+outside the run fill the KDS top-N, cooks take the run's own queued tickets in the
+same priority order instead). KDS screens poll
+`get_station_queue` and a supervisor polls `list_open_breaches` at fixed intervals.
+
+No agents (and therefore no Bedrock calls) are involved: the simulator plays the
+role of the cooks and screens and calls the tools directly. Simulated time can be
+replayed against the wall clock (`time_scale` sim seconds per wall second) or, with
+`time_scale=0`, as fast as the database allows. SLA breaches are evaluated by
+Postgres on real time, so breach counts are only meaningful with `time_scale=1`.
+
+Rows written by a run carry `orders.customer_name = 'sim:<run_id>'` and can be
+removed with `cleanup_run`.
+"""
+
+from __future__ import annotations
+
+import heapq
+import itertools
+import logging
+import math
+import random
+import time
+import uuid
+from collections import defaultdict
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+from typing import Any, Callable, Iterator
+
+from .db import Database
+from .tools import KitchenTools
+
+LOGGER = logging.getLogger(__name__)
+
+# Share of the base hourly rate by local hour (breakfast, lunch peak, lull, dinner peak).
+HOURLY_MULTIPLIERS = (
+    0.05, 0.02, 0.0, 0.0, 0.0, 0.05, 0.2, 0.5, 0.7, 0.6, 0.8, 1.4,
+    2.0, 1.7, 0.8, 0.5, 0.6, 1.1, 1.8, 1.9, 1.4, 0.9, 0.5, 0.2,
+)
+# Monday .. Sunday
+WEEKDAY_MULTIPLIERS = (0.8, 0.8, 0.9, 1.0, 1.3, 1.4, 1.1)
+ORDER_SOURCES = (("dine_in", 0.45), ("qr", 0.15), ("kiosk", 0.1), ("delivery", 0.2), ("pickup", 0.1))
+ITEMS_PER_ORDER = ((1, 0.35), (2, 0.35), (3, 0.2), (4, 0.1))
+
+ROUTED_MENU_SQL = """
+SELECT mi.id AS menu_item_id,
+       mi.name,
+       COALESCE(mi.avg_prep_minutes, 5)::float8 AS avg_prep_minutes,
+       array_agg(r.station_id ORDER BY r.sequence) AS route
+FROM menu_items mi
+JOIN item_station_route r ON r.menu_item_id = mi.id
+JOIN stations s ON s.id = r.station_id
+WHERE s.location_id = %s
+  AND s.is_active
+  AND mi.is_active
+GROUP BY mi.id, mi.name, mi.avg_prep_minutes
+ORDER BY mi.id
+"""
+
+INSERT_ORDER_SQL = """
+INSERT INTO orders (id, location_id, source, customer_name, placed_at, status)
+VALUES (%s, %s, %s, %s, now(), 'open')
+"""
+
+INSERT_ORDER_ITEMS_SQL = """
+INSERT INTO order_items (id, order_id, menu_item_id, qty, predicted_prep_minutes)
+SELECT item.id, %s, item.menu_item_id, item.qty, item.prep
+FROM unnest(%s::uuid[], %s::uuid[], %s::int[], %s::numeric[]) AS item(id, menu_item_id, qty, prep)
+"""
+
+INSERT_TICKETS_SQL = """
+INSERT INTO kds_tickets (id, order_item_id, station_id, sequence, status, priority_score, sla_minutes)
+SELECT t.id, t.order_item_id, t.station_id, t.sequence, 'queued', 0, %s
+FROM unnest(%s::uuid[], %s::uuid[], %s::uuid[], %s::smallint[]) AS t(id, order_item_id, station_id, sequence)
+"""
+
+# Cooks fall back to this when other tickets crowd the run's ones out of the KDS top-N
+# (e.g. open orders of a `seed-bulk` dataset); same order as `get_station_queue`.
+RUN_QUEUE_SQL = """
+SELECT kt.id AS ticket_id
+FROM kds_tickets kt
+JOIN order_items oi ON oi.id = kt.order_item_id
+JOIN orders o ON o.id = oi.order_id
+WHERE kt.station_id = %s
+  AND kt.status = 'queued'
+  AND o.customer_name = %s
+ORDER BY kt.priority_score DESC NULLS LAST, kt.enqueued_at ASC
+LIMIT %s
+"""
+
+CLEANUP_SQL = "DELETE FROM orders WHERE customer_name = %s"
+
+
+def arrival_multiplier(at: datetime) -> float:
+    """Relative order rate for a local timestamp (daypart x day-of-week)."""
+    return HOURLY_MULTIPLIERS[at.hour] * WEEKDAY_MULTIPLIERS[at.weekday()]
+
+
+def _weighted(rng: random.Random, choices: tuple[tuple[Any, float], ...]) -> Any:
+    values, weights = zip(*choices)
+    return rng.choices(values, weights=weights, k=1)[0]
+
+
+def _percentiles(samples: list[float]) -> dict[str, float]:
+    if not samples:
+        return {"p50_ms": 0.0, "p95_ms": 0.0, "p99_ms": 0.0, "max_ms": 0.0}
+    ordered = sorted(samples)
+
+    def pick(pct: float) -> float:
+        return round(ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))] * 1000, 3)
+
+    return {"p50_ms": pick(50), "p95_ms": pick(95), "p99_ms": pick(99), "max_ms": round(ordered[-1] * 1000, 3)}
+
+
+# --- round-trip accounting -------------------------------------------------------
+
+
+class _CountingCursor:
+    def __init__(self, cursor: Any, owner: "CountingDatabase") -> None:
+        self._cursor = cursor
+        self._owner = owner
+
+    def execute(self, *args: Any, **kwargs: Any) -> Any:
+        self._owner.round_trips += 1
+        return self._cursor.execute(*args, **kwargs)
+
+    def executemany(self, *args: Any, **kwargs: Any) -> Any:
+        self._owner.round_trips += 1
+        return self._cursor.executemany(*args, **kwargs)
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self._cursor, name)
+
+
+class CountingDatabase:
+    """`Database` proxy counting client-issued statements and commits.
+
+    Counts are per call site, not wire-level: pipelined or implicit statements
+    (BEGIN, the pool's reset on return) are not included.
+    """
+
+    def __init__(self, db: Database) -> None:
+        self._db = db
+        self.round_trips = 0
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self._db, name)
+
+    def _counted(self, trips: int, method: Callable[..., Any], *args: Any, **kwargs: Any) -> Any:
+        self.round_trips += trips
+        return method(*args, **kwargs)
+
+    def fetch_one(self, *args: Any, **kwargs: Any) -> Any:
+        return self._counted(1, self._db.fetch_one, *args, **kwargs)
+
+    def fetch_all(self, *args: Any, **kwargs: Any) -> Any:
+        return self._counted(1, self._db.fetch_all, *args, **kwargs)
+
+    def fetch_one_json(self, *args: Any, **kwargs: Any) -> Any:
+        return self._counted(1, self._db.fetch_one_json, *args, **kwargs)
+
+    def fetch_all_json(self, *args: Any, **kwargs: Any) -> Any:
+        return self._counted(1, self._db.fetch_all_json, *args, **kwargs)
+
+    def execute(self, *args: Any, **kwargs: Any) -> Any:
+        return self._counted(2, self._db.execute, *args, **kwargs)
+
+    def execute_returning(self, *args: Any, **kwargs: Any) -> Any:
+        return self._counted(2, self._db.execute_returning, *args, **kwargs)
+
+    def execute_many(self, *args: Any, **kwargs: Any) -> Any:
+        return self._counted(2, self._db.execute_many, *args, **kwargs)
+
+    @contextmanager
+    def transaction(self) -> Iterator[Any]:
+        with self._db.transaction() as cur:
+            yield _CountingCursor(cur, self)
+        self.round_trips += 1
+
+
+# --- simulation ------------------------------------------------------------------
+
+
+@dataclass
+class SimulationConfig:
+    location_id: str
+    start_at: datetime
+    duration_minutes: float = 60.0
+    orders_per_hour: float = 120.0
+    cooks_per_station: int = 2
+    kds_refresh_seconds: float = 5.0
+    breach_poll_seconds: float = 30.0
+    sla_minutes: int = 12
+    prep_sigma: float = 0.35
+    time_scale: float = 0.0
+    seed: int = 42
+
+
+@dataclass
+class _MenuItem:
+    menu_item_id: str
+    name: str
+    avg_prep_minutes: float
+    route: list[str]
+
+
+@dataclass
+class _Station:
+    station_id: str
+    free_cooks: int
+    busy: set[str] = field(default_factory=set)
+
+
+@dataclass
+class _Ticket:
+    ticket_id: str
+    order_item_id: str
+    item: _MenuItem
+    stage: int
+    prep_minutes: float
+    enqueued_sim: float
+
+
+class KitchenSimulator:
+    """Event loop over simulated seconds; see the module docstring."""
+
+    def __init__(self, db: Database, config: SimulationConfig, tools: KitchenTools | None = None) -> None:
+        self._db = CountingDatabase(db)
+        self._config = config
+        self._tools = tools or KitchenTools(self._db)
+        self._rng = random.Random(config.seed)
+        # Ids stay unique across runs; only the arrival and prep streams follow the seed.
+        self.run_id = uuid.uuid4().hex[:12]
+        self._events: list[tuple[float, int, str, Any]] = []
+        self._seq = itertools.count()
+        self._menu: list[_MenuItem] = []
+        self._popularity: list[float] = []
+        self._stations: dict[str, _Station] = {}
+        self._tickets: dict[str, _Ticket] = {}
+        self._latencies: dict[str, list[float]] = defaultdict(list)
+        self._round_trips: dict[str, int] = defaultdict(int)
+        self._counters: dict[str, int] = defaultdict(int)
+        self._ticket_waits: list[float] = []
+        self._max_breaches = 0
+
+    # --- helpers ------------------------------------------------------------------
+
+    @staticmethod
+    def _uuid() -> str:
+        return str(uuid.uuid4())
+
+    def _schedule(self, at: float, kind: str, payload: Any = None) -> None:
+        heapq.heappush(self._events, (at, next(self._seq), kind, payload))
+
+    def _call(self, name: str, **kwargs: Any) -> Any:
+        before = self._db.round_trips
+        started = time.perf_counter()
+        result = getattr(self._tools, name)(**kwargs)
+        self._latencies[name].append(time.perf_counter() - started)
+        self._round_trips[name] += self._db.round_trips - before
+        return result
+
+    def _load_kitchen(self) -> None:
+        rows = self._db.fetch_all(ROUTED_MENU_SQL, (self._config.location_id,))
+        if not rows:
+            raise ValueError(f"Location {self._config.location_id} has no routed, active menu items")
+        self._menu = [
+            _MenuItem(
+                menu_item_id=str(row["menu_item_id"]),
+                name=row["name"],
+                avg_prep_minutes=float(row["avg_prep_minutes"]),
+                route=[str(station_id) for station_id in row["route"]],
+            )
+            for row in rows
+        ]
+        # Zipf-like popularity: a few items dominate, as on real menus.
+        self._popularity = [1.0 / (rank + 1) ** 0.8 for rank in range(len(self._menu))]
+        self._rng.shuffle(self._popularity)
+        for item in self._menu:
+            for station_id in item.route:
+                self._stations.setdefault(station_id, _Station(station_id, self._config.cooks_per_station))
+
+    def _schedule_arrivals(self) -> None:
+        """Thinning: candidates at the peak rate, accepted with probability rate(t)/peak."""
+        config = self._config
+        peak_multiplier = max(HOURLY_MULTIPLIERS) * max(WEEKDAY_MULTIPLIERS)
+        peak_rate = config.orders_per_hour * peak_multiplier / 3600.0
+        horizon = config.duration_minutes * 60.0
+        at = 0.0
+        while peak_rate > 0:
+            at += self._rng.expovariate(peak_rate)
+            if at >= horizon:
+                break
+            multiplier = arrival_multiplier(config.start_at + timedelta(seconds=at))
+            if self._rng.random() * peak_multiplier <= multiplier:
+                self._schedule(at, "arrival")
+
+    def _prep_minutes(self, item: _MenuItem) -> float:
+        sigma = self._config.prep_sigma
+        return self._rng.lognormvariate(math.log(max(item.avg_prep_minutes, 0.1)) - sigma * sigma / 2, sigma)
+
+    def _enqueue(self, cur: Any, tickets: list[_Ticket]) -> None:
+        cur.execute(
+            INSERT_TICKETS_SQL,
+            (
+                self._config.sla_minutes,
+                [ticket.ticket_id for ticket in tickets],
+                [ticket.order_item_id for ticket in tickets],
+                [ticket.item.route[ticket.stage] for ticket in tickets],
+                [ticket.stage + 1 for ticket in tickets],
+            ),
+        )
+        for ticket in tickets:
+            self._tickets[ticket.ticket_id] = ticket
+        self._counters["tickets_created"] += len(tickets)
+
+    # --- event handlers -----------------------------------------------------------
+
+    def _on_arrival(self, now: float) -> set[str]:
+        order_id = self._uuid()
+        lines = []
+        for _ in range(_weighted(self._rng, ITEMS_PER_ORDER)):
+            item = self._rng.choices(self._menu, weights=self._popularity, k=1)[0]
+            lines.append((self._uuid(), item, self._rng.choice((1, 1, 1, 2))))
+        tickets = [
+            _Ticket(self._uuid(), order_item_id, item, 0, self._prep_minutes(item), now)
+            for order_item_id, item, _ in lines
+        ]
+        before = self._db.round_trips
+        started = time.perf_counter()
+        with self._db.transaction() as cur:
+            cur.execute(
+                INSERT_ORDER_SQL,
+                (order_id, self._config.location_id, _weighted(self._rng, ORDER_SOURCES), f"sim:{self.run_id}"),
+            )
+            cur.execute(
+                INSERT_ORDER_ITEMS_SQL,
+                (
+                    order_id,
+                    [order_item_id for order_item_id, _, _ in lines],
+                    [item.menu_item_id for _, item, _ in lines],
+                    [qty for _, _, qty in lines],
+                    [round(item.avg_prep_minutes, 2) for _, item, _ in lines],
+                ),
+            )
+            self._enqueue(cur, tickets)
+        self._latencies["order_insert"].append(time.perf_counter() - started)
+        self._round_trips["order_insert"] += self._db.round_trips - before
+        self._counters["orders"] += 1
+        return {ticket.item.route[0] for ticket in tickets}
+
+    def _dispatch(self, station_id: str, now: float) -> None:
+        """Let free cooks at a station pull the top queued tickets."""
+        station = self._stations[station_id]
+        while station.free_cooks > 0:
+            # Headroom for tickets already firing here and for tickets from outside the run.
+            result = self._call("get_station_queue", station_id=station_id, limit=len(station.busy) + 10)
+            queue = result["content"][0]["json"]["tickets"]
+            candidate = next(
+                (
+                    row["ticket_id"]
+                    for row in queue
+                    if row["status"] == "queued"
+                    and row["ticket_id"] not in station.busy
+                    and row["ticket_id"] in self._tickets
+                ),
+                None,
+            )
+            if candidate is None and any(
+                ticket.item.route[ticket.stage] == station_id and ticket.ticket_id not in station.busy
+                for ticket in self._tickets.values()
+            ):
+                # Run tickets are queued here but outranked by foreign ones: pick from the run's own.
+                started = time.perf_counter()
+                before = self._db.round_trips
+                rows = self._db.fetch_all(RUN_QUEUE_SQL, (station_id, f"sim:{self.run_id}", len(station.busy) + 1))
+                self._latencies["run_queue"].append(time.perf_counter() - started)
+                self._round_trips["run_queue"] += self._db.round_trips - before
+                candidate = next(
+                    (str(row["ticket_id"]) for row in rows if str(row["ticket_id"]) not in station.busy), None
+                )
+            if candidate is None:
+                return
+            self._call("start_ticket", ticket_id=candidate)
+            ticket = self._tickets[candidate]
+            self._ticket_waits.append((now - ticket.enqueued_sim) / 60.0)
+            station.free_cooks -= 1
+            station.busy.add(candidate)
+            self._counters["tickets_started"] += 1
+            self._schedule(now + ticket.prep_minutes * 60.0, "done", (station_id, candidate))
+
+    def _on_done(self, now: float, station_id: str, ticket_id: str) -> set[str]:
+        self._call("pass_ticket", ticket_id=ticket_id)
+        station = self._stations[station_id]
+        station.busy.discard(ticket_id)
+        station.free_cooks += 1
+        ticket = self._tickets.pop(ticket_id)
+        self._counters["tickets_passed"] += 1
+        touched = {station_id}
+        if ticket.stage + 1 < len(ticket.item.route):
+            following = _Ticket(
+                self._uuid(), ticket.order_item_id, ticket.item, ticket.stage + 1, self._prep_minutes(ticket.item), now
+            )
+            before = self._db.round_trips
+            with self._db.transaction() as cur:
+                self._enqueue(cur, [following])
+            self._round_trips["route_next_stage"] += self._db.round_trips - before
+            touched.add(following.item.route[following.stage])
+        return touched
+
+    # --- main loop ----------------------------------------------------------------
+
+    def run(self) -> dict[str, Any]:
+        config = self._config
+        self._load_kitchen()
+        self._schedule_arrivals()
+        horizon = config.duration_minutes * 60.0
+        for station_id in self._stations:
+            self._schedule(self._rng.uniform(0, config.kds_refresh_seconds), "kds_poll", station_id)
+        if config.breach_poll_seconds > 0:
+            self._schedule(config.breach_poll_seconds, "breach_poll")
+
+        LOGGER.info(
+            "Simulation %s | location=%s stations=%s menu_items=%s horizon=%ss",
+            self.run_id,
+            config.location_id,
+            len(self._stations),
+            len(self._menu),
+            horizon,
+        )
+        wall_started = time.perf_counter()
+        sim_now = 0.0
+        while self._events:
+            at, _, kind, payload = heapq.heappop(self._events)
+            if at > horizon:
+                break
+            sim_now = at
+            if config.time_scale > 0:
+                delay = wall_started + at / config.time_scale - time.perf_counter()
+                if delay > 0:
+                    time.sleep(delay)
+
+            if kind == "arrival":
+                touched = self._on_arrival(at)
+            elif kind == "done":
+                touched = self._on_done(at, *payload)
+            elif kind == "kds_poll":
+                self._call("get_station_queue", station_id=payload, limit=10)
+                self._schedule(at + config.kds_refresh_seconds, "kds_poll", payload)
+                touched = set()
+            else:
+                result = self._call("list_open_breaches", location_id=config.location_id)
+                self._max_breaches = max(self._max_breaches, len(result["content"][0]["json"]["breaches"]))
+                self._schedule(at + config.breach_poll_seconds, "breach_poll")
+                touched = set()
+            for station_id in touched:
+                self._dispatch(station_id, at)
+
+        wall_elapsed = time.perf_counter() - wall_started
+        return self._report(sim_now, wall_elapsed)
+
+    def _report(self, sim_elapsed: float, wall_elapsed: float) -> dict[str, Any]:
+        tools = {}
+        for name, samples in sorted(self._latencies.items()):
+            tools[name] = {
+                "calls": len(samples),
+                **_percentiles(samples),
+                "round_trips": self._round_trips[name],
+                "round_trips_per_call": round(self._round_trips[name] / len(samples), 2) if samples else 0.0,
+            }
+        total_calls = sum(len(samples) for samples in self._latencies.values())
+        busy = set().union(*(station.busy for station in self._stations.values()))
+        # Tickets never started count with their wait so far, so a stalled run cannot look fast.
+        unstarted = [
+            (sim_elapsed - ticket.enqueued_sim) / 60.0
+            for ticket_id, ticket in self._tickets.items()
+            if ticket_id not in busy
+        ]
+        waits = sorted(self._ticket_waits + unstarted)
+        return {
+            "run_id": self.run_id,
+            "sim_seconds": round(sim_elapsed, 1),
+            "wall_seconds": round(wall_elapsed, 3),
+            **dict(self._counters),
+            "tickets_in_flight": len(self._tickets),
+            "throughput": {
+                "orders_per_wall_s": round(self._counters["orders"] / wall_elapsed, 2) if wall_elapsed else 0.0,
+                "calls_per_wall_s": round(total_calls / wall_elapsed, 2) if wall_elapsed else 0.0,
+                "db_round_trips": self._db.round_trips,
+            },
+            "ticket_wait_sim_minutes": {
+                "p50": round(waits[len(waits) // 2], 2) if waits else None,
+                "p95": round(waits[min(len(waits) - 1, int(len(waits) * 0.95))], 2) if waits else None,
+                "started": len(self._ticket_waits),
+                "never_started": len(unstarted),
+                "never_started_max": round(max(unstarted), 2) if unstarted else None,
+            },
+            "max_open_breaches": self._max_breaches,
+            "tools": tools,
+        }
+
+
+def cleanup_run(db: Database, run_id: str) -> int:
+    """Delete the orders (and cascading items/tickets) written by a simulation run."""
+    return db.execute(CLEANUP_SQL, (f"sim:{run_id}",))
+
+
+def simulate(db: Database, config: SimulationConfig, cleanup: bool = False) -> dict[str, Any]:
+    simulator = KitchenSimulator(db, config)
+    try:
+        return simulator.run()
+    finally:
+        if cleanup:
+            removed = cleanup_run(db, simulator.run_id)
+            LOGGER.info("Removed %s simulated orders for run %s", removed, simulator.run_id)
+
+
+__all__ = [
+    "CountingDatabase",
+    "KitchenSimulator",
+    "SimulationConfig",
+    "arrival_multiplier",
+    "cleanup_run",
+    "simulate",
+]
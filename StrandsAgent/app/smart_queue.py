@@ -0,0 +1,490 @@
+"""Server-side Smart Queue batching (see `AISmartQueue.md`).
+
+Active tickets of a station are grouped by menu item, note, order source and route
+stage, then packed FIFO (by `orders.placed_at`) into cards of at most the station's
+`max_capacity` portions:
+
+* The first card of a group is the *lead*. It is ``queuing`` for `merge_window`
+  seconds after it became lead, and new matching tickets merge into it.
+* The lead flips to ``cooking`` when it is full, when the window expires, or as soon
+  as one of its tickets is started (firing/prepping).
+* Other cards are ``queued`` with no timer and never take merges. When the lead is
+  completed the next card becomes lead and gets a fresh window.
+
+Each call diffs the station's active tickets against the known ones: new tickets
+merge into the lead or append a card (O(1) amortised per ticket), and finished
+tickets are dropped from their cards. The lead card of every group (its merge-window
+start and the portions merged into it) is persisted in ``station_batch_leads``, and
+calls for a station are serialised with a transaction-scoped advisory lock, so every
+API worker process shows the same cards and timers. A process whose in-memory leads
+differ from the stored ones rebuilds the station from them; other cards follow
+deterministically from the FIFO ticket order. Card ids and ``created_at`` are derived
+from tickets, not from process state.
+"""
+
+from __future__ import annotations
+
+import json
+import logging
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from typing import Any, Iterable
+
+from psycopg import errors
+
+from .db import Database
+
+LOGGER = logging.getLogger(__name__)
+
+DEFAULT_MERGE_WINDOW = 180.0
+DEFAULT_CAPACITY = 4
+
+SMART_QUEUE_SCHEMA_SQL = """
+ALTER TABLE stations ADD COLUMN IF NOT EXISTS max_capacity INT CHECK (max_capacity > 0);
+CREATE TABLE IF NOT EXISTS station_batch_leads (
+  station_id UUID NOT NULL REFERENCES stations(id) ON DELETE CASCADE,
+  group_key TEXT NOT NULL,               -- JSON [menu_item_id, note, source, route_sequence]
+  card_key TEXT NOT NULL,                -- first ticket id on the card and its card index
+  created_at DOUBLE PRECISION NOT NULL,  -- epoch the first ticket's order was placed
+  lead_since DOUBLE PRECISION NOT NULL,  -- epoch the card became lead (merge window start)
+  started BOOLEAN NOT NULL DEFAULT false,
+  entries JSONB NOT NULL,                -- ticket_id -> portions on the lead card
+  updated_at TIMESTAMPTZ NOT NULL DEFAULT now(),
+  PRIMARY KEY (station_id, group_key)
+);
+"""
+
+_TICKETS_SQL = """
+SELECT kt.id AS ticket_id,
+       kt.station_id,
+       kt.status,
+       oi.id AS order_item_id,
+       oi.order_id,
+       oi.qty,
+       COALESCE(btrim(oi.notes), '') AS note,
+       oi.menu_item_id,
+       mi.name AS item_name,
+       o.source,
+       COALESCE(r.sequence, kt.sequence) AS route_sequence,
+       EXTRACT(EPOCH FROM o.placed_at)::float8 AS placed_epoch,
+       {capacity} AS capacity
+FROM kds_tickets kt
+JOIN stations s ON s.id = kt.station_id
+JOIN order_items oi ON oi.id = kt.order_item_id
+JOIN orders o ON o.id = oi.order_id
+JOIN menu_items mi ON mi.id = oi.menu_item_id
+LEFT JOIN item_station_route r ON r.menu_item_id = oi.menu_item_id AND r.station_id = kt.station_id
+WHERE kt.station_id = %(station_id)s
+  AND kt.status IN ('queued','firing','prepping')
+ORDER BY o.placed_at ASC, kt.id ASC
+"""
+
+STATION_TICKETS_SQL = _TICKETS_SQL.format(capacity="COALESCE(s.max_capacity, %(default_capacity)s)")
+# Used until `ensure_smart_queue_schema` has added `stations.max_capacity`.
+STATION_TICKETS_NO_CAPACITY_SQL = _TICKETS_SQL.format(capacity="%(default_capacity)s")
+
+# Serialises batching of one station across API worker processes.
+STATION_LOCK_SQL = "SELECT pg_advisory_xact_lock(hashtext('smart_queue:' || %s))"
+
+LEADS_TABLE_SQL = "SELECT to_regclass('station_batch_leads') IS NOT NULL AS present"
+
+LOAD_LEADS_SQL = """
+SELECT group_key, card_key, created_at, lead_since, started, entries
+FROM station_batch_leads
+WHERE station_id = %s
+"""
+
+UPSERT_LEADS_SQL = """
+INSERT INTO station_batch_leads (station_id, group_key, card_key, created_at, lead_since, started, entries, updated_at)
+SELECT %s, l.group_key, l.card_key, l.created_at, l.lead_since, l.started, l.entries::jsonb, now()
+FROM unnest(%s::text[], %s::text[], %s::float8[], %s::float8[], %s::boolean[], %s::text[])
+    AS l(group_key, card_key, created_at, lead_since, started, entries)
+ON CONFLICT (station_id, group_key) DO UPDATE
+SET card_key = EXCLUDED.card_key,
+    created_at = EXCLUDED.created_at,
+    lead_since = EXCLUDED.lead_since,
+    started = EXCLUDED.started,
+    entries = EXCLUDED.entries,
+    updated_at = now()
+"""
+
+DELETE_LEADS_SQL = "DELETE FROM station_batch_leads WHERE station_id = %s AND group_key = ANY(%s::text[])"
+
+STARTED_STATUSES = frozenset({"firing", "prepping"})
+
+GroupKey = tuple[str, str, str, int]
+Lead = dict[str, Any]
+
+
+def ensure_smart_queue_schema(db: Database) -> None:
+    """Add the per-station batch capacity column and the shared lead-card table if missing."""
+    with db.transaction() as cur:
+        cur.execute(SMART_QUEUE_SCHEMA_SQL)
+
+
+def _iso(epoch: float) -> str:
+    return datetime.fromtimestamp(epoch, tz=timezone.utc).isoformat()
+
+
+def _group_text(group_key: GroupKey) -> str:
+    return json.dumps(list(group_key), separators=(",", ":"))
+
+
+@dataclass
+class _Card:
+    key: str
+    group: GroupKey
+    capacity: int
+    created_at: float
+    lead_since: float | None = None
+    quantity: int = 0
+    started: bool = False
+    # ticket_id -> portions of that ticket on this card
+    entries: dict[str, int] = field(default_factory=dict)
+    # Portions a restored lead held per ticket, claimed again as the tickets are replayed.
+    reserved: dict[str, int] = field(default_factory=dict)
+
+    @property
+    def full(self) -> bool:
+        return self.quantity >= self.capacity
+
+
+@dataclass
+class _Group:
+    item_name: str
+    cards: deque[_Card] = field(default_factory=deque)
+
+
+class StationBatcher:
+    """Incremental Smart Queue state for one station."""
+
+    def __init__(self, station_id: str, merge_window: float = DEFAULT_MERGE_WINDOW) -> None:
+        self.station_id = station_id
+        self._merge_window = merge_window
+        self._groups: dict[GroupKey, _Group] = {}
+        self._tickets: dict[str, dict[str, Any]] = {}
+        self._ticket_cards: dict[str, list[_Card]] = {}
+        self._restoring: dict[GroupKey, Lead] = {}
+
+    # --- card lifecycle -----------------------------------------------------------
+
+    def _lead_open(self, card: _Card, now: float) -> bool:
+        return (
+            card.lead_since is not None
+            and not card.started
+            and not card.full
+            and now < card.lead_since + self._merge_window
+        )
+
+    def _new_card(self, group_key: GroupKey, capacity: int, now: float, row: dict[str, Any]) -> _Card:
+        group = self._groups[group_key]
+        ticket_id = str(row["ticket_id"])
+        card = _Card(
+            # Derived from the ticket, so every process names the same card the same way.
+            key=f"{ticket_id}.{len(self._ticket_cards.get(ticket_id, ()))}",
+            group=group_key,
+            capacity=capacity,
+            created_at=float(row["placed_epoch"] or now),
+        )
+        if not group.cards:
+            card.lead_since = now
+        group.cards.append(card)
+        return card
+
+    def _place(self, card: _Card, ticket_id: str, qty: int) -> int:
+        used = min(qty, card.capacity - card.quantity)
+        if used > 0:
+            card.entries[ticket_id] = card.entries.get(ticket_id, 0) + used
+            card.quantity += used
+            self._ticket_cards.setdefault(ticket_id, []).append(card)
+        return used
+
+    def _promote(self, group_key: GroupKey, now: float) -> None:
+        """Drop completed cards from the front; the new front card becomes lead."""
+        group = self._groups.get(group_key)
+        if group is None:
+            return
+        while group.cards and not group.cards[0].entries:
+            group.cards.popleft()
+        if not group.cards:
+            del self._groups[group_key]
+        elif group.cards[0].lead_since is None:
+            group.cards[0].lead_since = now
+
+    def add(self, row: dict[str, Any], now: float) -> None:
+        ticket_id = str(row["ticket_id"])
+        group_key: GroupKey = (
+            str(row["menu_item_id"]),
+            row["note"] or "",
+            row["source"] or "",
+            int(row["route_sequence"] or 1),
+        )
+        capacity = max(int(row["capacity"] or DEFAULT_CAPACITY), 1)
+        group = self._groups.setdefault(group_key, _Group(item_name=row["item_name"]))
+        self._tickets[ticket_id] = row
+        remaining = max(int(row["qty"] or 1), 1)
+
+        stored = self._restoring.get(group_key)
+        if stored is not None and not group.cards and ticket_id in stored["entries"]:
+            del self._restoring[group_key]
+            group.cards.append(
+                _Card(
+                    key=stored["card_key"],
+                    group=group_key,
+                    capacity=capacity,
+                    created_at=stored["created_at"],
+                    lead_since=stored["lead_since"],
+                    started=stored["started"],
+                    reserved=dict(stored["entries"]),
+                )
+            )
+        if group.cards:
+            lead = group.cards[0]
+            reserved = lead.reserved.pop(ticket_id, 0)
+            if reserved:
+                remaining -= self._place(lead, ticket_id, min(reserved, remaining))
+            if remaining > 0 and self._lead_open(lead, now):
+                remaining -= self._place(lead, ticket_id, remaining)
+        while remaining > 0:
+            remaining -= self._place(self._new_card(group_key, capacity, now, row), ticket_id, remaining)
+        if row["status"] in STARTED_STATUSES:
+            self._mark_started(ticket_id)
+
+    def _mark_started(self, ticket_id: str) -> None:
+        for card in self._ticket_cards.get(ticket_id, ()):
+            card.started = True
+
+    def remove(self, ticket_id: str, now: float) -> None:
+        self._tickets.pop(ticket_id, None)
+        touched: set[GroupKey] = set()
+        for card in self._ticket_cards.pop(ticket_id, ()):
+            card.quantity -= card.entries.pop(ticket_id, 0)
+            touched.add(card.group)
+        # Emptied cards behind the lead stay in place and are skipped until they reach
+        # the front, so removal never rebuilds the deque.
+        for group_key in touched:
+            self._promote(group_key, now)
+
+    def sync(self, rows: Iterable[dict[str, Any]], now: float) -> dict[str, int]:
+        """Apply the station's current active tickets (FIFO ordered) as a diff."""
+        current = {str(row["ticket_id"]): row for row in rows}
+        gone = [ticket_id for ticket_id in self._tickets if ticket_id not in current]
+        for ticket_id in gone:
+            self.remove(ticket_id, now)
+        added = 0
+        for ticket_id, row in current.items():
+            known = self._tickets.get(ticket_id)
+            if known is None:
+                self.add(row, now)
+                added += 1
+            else:
+                self._tickets[ticket_id] = row
+                if row["status"] in STARTED_STATUSES:
+                    self._mark_started(ticket_id)
+        for group_key in list(self._groups):
+            self._promote(group_key, now)
+        return {"added": added, "removed": len(gone)}
+
+    def restore(self, rows: Iterable[dict[str, Any]], leads: dict[str, Lead], now: float) -> dict[str, int]:
+        """Rebuild from the current tickets (FIFO ordered) and the stored lead cards.
+
+        Tickets a stored lead holds go back onto it; the rest are placed as `add` would.
+        """
+        known = set(self._tickets)
+        self._groups.clear()
+        self._tickets.clear()
+        self._ticket_cards.clear()
+        self._restoring = {tuple(json.loads(group)): lead for group, lead in leads.items()}
+        rows = list(rows)
+        for row in rows:
+            self.add(row, now)
+        self._restoring.clear()
+        for group in self._groups.values():
+            if group.cards:
+                group.cards[0].reserved.clear()
+        for group_key in list(self._groups):
+            self._promote(group_key, now)
+        current = set(self._tickets)
+        return {"added": len(current - known), "removed": len(known - current)}
+
+    def leads(self) -> dict[str, Lead]:
+        """Lead card of each group, in the shape stored in ``station_batch_leads``."""
+        return {
+            _group_text(group_key): {
+                "card_key": lead.key,
+                "created_at": lead.created_at,
+                "lead_since": lead.lead_since,
+                "started": lead.started,
+                "entries": dict(lead.entries),
+            }
+            for group_key, group in self._groups.items()
+            if group.cards and (lead := group.cards[0]).entries and lead.lead_since is not None
+        }
+
+    # --- output -------------------------------------------------------------------
+
+    def cards(self, now: float) -> list[dict[str, Any]]:
+        output: list[dict[str, Any]] = []
+        for group_key, group in self._groups.items():
+            menu_item_id, note, source, route_sequence = group_key
+            for position, card in enumerate(group.cards):
+                if not card.entries:
+                    continue
+                is_lead = position == 0
+                if is_lead and self._lead_open(card, now):
+                    status, lock_at = "queuing", card.lead_since + self._merge_window
+                elif is_lead:
+                    status, lock_at = "cooking", None
+                else:
+                    status, lock_at = "queued", None
+                output.append(
+                    {
+                        "card_id": f"{self.station_id}:{card.key}",
+                        "station_id": self.station_id,
+                        "menu_item_id": menu_item_id,
+                        "item_name": group.item_name,
+                        "note": note or None,
+                        "source": source or None,
+                        "route_sequence": route_sequence,
+                        "quantity": card.quantity,
+                        "capacity": card.capacity,
+                        "status": status,
+                        "is_lead": is_lead,
+                        "created_at": _iso(card.created_at),
+                        "lock_at": _iso(lock_at) if lock_at is not None else None,
+                        "seconds_left": round(lock_at - now, 1) if lock_at is not None else None,
+                        "entries": [
+                            {
+                                "ticket_id": ticket_id,
+                                "order_id": str(self._tickets[ticket_id]["order_id"]),
+                                "order_item_id": str(self._tickets[ticket_id]["order_item_id"]),
+                                "qty": qty,
+                            }
+                            for ticket_id, qty in card.entries.items()
+                        ],
+                    }
+                )
+        output.sort(key=lambda card: (card["created_at"], card["card_id"]))
+        return output
+
+
+class SmartQueue:
+    """Per-station batchers fed from Postgres, shared by tools and the API.
+
+    Lead cards are read from and written back to ``station_batch_leads`` under a
+    per-station advisory lock, so any number of worker processes agree on them. Until
+    `ensure_smart_queue_schema` has created that table, state stays in this process
+    and only a single API worker shows consistent timers.
+    """
+
+    def __init__(
+        self,
+        db: Database,
+        merge_window: float = DEFAULT_MERGE_WINDOW,
+        default_capacity: int = DEFAULT_CAPACITY,
+    ) -> None:
+        self._db = db
+        self._merge_window = merge_window
+        self._default_capacity = default_capacity
+        self._batchers: dict[str, StationBatcher] = {}
+        self._locks: dict[str, threading.Lock] = {}
+        self._guard = threading.Lock()
+        # None until probed; the schema is only checked once per process.
+        self._has_capacity: bool | None = None
+        self._shared_leads: bool | None = None
+
+    def _station_rows(self, cur: Any, station_id: str) -> list[dict[str, Any]]:
+        params = {"station_id": station_id, "default_capacity": self._default_capacity}
+        if self._has_capacity is None:
+            try:
+                with cur.connection.transaction():
+                    cur.execute(STATION_TICKETS_SQL, params)
+                    rows = cur.fetchall()
+                self._has_capacity = True
+                return rows
+            except errors.UndefinedColumn:
+                LOGGER.warning(
+                    "stations.max_capacity missing; using capacity %s (run `python main.py smart-queue install`)",
+                    self._default_capacity,
+                )
+                self._has_capacity = False
+        cur.execute(STATION_TICKETS_SQL if self._has_capacity else STATION_TICKETS_NO_CAPACITY_SQL, params)
+        return cur.fetchall()
+
+    def _load_leads(self, cur: Any, station_id: str) -> dict[str, Lead] | None:
+        if self._shared_leads is None:
+            cur.execute(LEADS_TABLE_SQL)
+            self._shared_leads = bool(cur.fetchone()["present"])
+            if not self._shared_leads:
+                LOGGER.warning(
+                    "station_batch_leads missing; Smart Queue timers are per process "
+                    "(run `python main.py smart-queue install`)"
+                )
+        if not self._shared_leads:
+            return None
+        cur.execute(LOAD_LEADS_SQL, (station_id,))
+        return {
+            row["group_key"]: {
+                "card_key": row["card_key"],
+                "created_at": row["created_at"],
+                "lead_since": row["lead_since"],
+                "started": row["started"],
+                "entries": {str(ticket_id): int(qty) for ticket_id, qty in row["entries"].items()},
+            }
+            for row in cur.fetchall()
+        }
+
+    @staticmethod
+    def _save_leads(cur: Any, station_id: str, stored: dict[str, Lead], leads: dict[str, Lead]) -> None:
+        changed = [group for group, lead in leads.items() if stored.get(group) != lead]
+        removed = [group for group in stored if group not in leads]
+        if changed:
+            cur.execute(
+                UPSERT_LEADS_SQL,
+                (
+                    station_id,
+                    changed,
+                    [leads[group]["card_key"] for group in changed],
+                    [leads[group]["created_at"] for group in changed],
+                    [leads[group]["lead_since"] for group in changed],
+                    [leads[group]["started"] for group in changed],
+                    [json.dumps(leads[group]["entries"], separators=(",", ":")) for group in changed],
+                ),
+            )
+        if removed:
+            cur.execute(DELETE_LEADS_SQL, (station_id, removed))
+
+    def station_cards(self, station_id: str, now: float | None = None) -> dict[str, Any]:
+        """Sync a station with Postgres and return its batch cards in FIFO order."""
+        station_id = str(station_id)
+        with self._guard:
+            lock = self._locks.setdefault(station_id, threading.Lock())
+            batcher = self._batchers.get(station_id)
+            if batcher is None:
+                batcher = self._batchers[station_id] = StationBatcher(station_id, self._merge_window)
+        with self._db.transaction() as cur:
+            cur.execute(STATION_LOCK_SQL, (station_id,))
+            rows = self._station_rows(cur, station_id)
+            stored = self._load_leads(cur, station_id)
+            with lock:
+                now = time.time() if now is None else now
+                if stored is not None and stored != batcher.leads():
+                    # Another process moved this station on (or this one just started).
+                    changes = batcher.restore(rows, stored, now)
+                else:
+                    changes = batcher.sync(rows, now)
+                leads = batcher.leads()
+                cards = batcher.cards(now)
+            if stored is not None:
+                self._save_leads(cur, station_id, stored, leads)
+        return {"station_id": station_id, "cards": cards, "tickets": len(rows), **changes}
+
+
+__all__ = [
+    "SmartQueue",
+    "StationBatcher",
+    "ensure_smart_queue_schema",
+]
@@ -0,0 +1,239 @@
+"""In-process per-station priority index behind `get_station_queue`.
+
+Each station keeps its active tickets in a list sorted by the same order as the tool's
+SQL (`priority_score DESC NULLS LAST, enqueued_at ASC`, ticket id as the final
+tie-break), so a top-K read is a slice of pre-serialised rows. Stations are loaded
+lazily on first read, ticket transitions made by this process write through
+immediately, and a background thread reloads every known station periodically so
+changes made elsewhere (new tickets from POS, other API workers) converge. When the
+change feed is enabled, ticket notifications trigger a reload of just the affected
+stations.
+"""
+
+from __future__ import annotations
+
+import bisect
+import logging
+import threading
+import time
+from dataclasses import dataclass
+from datetime import datetime
+from decimal import Decimal
+from typing import Any, Iterable
+
+from .db import Database
+from .utils import serialize_row
+
+LOGGER = logging.getLogger(__name__)
+
+ACTIVE_TICKET_STATUSES = ("queued", "firing", "prepping")
+
+STATION_TICKETS_SQL = """
+SELECT kt.station_id,
+       kt.id AS ticket_id,
+       kt.status,
+       kt.priority_score,
+       kt.priority_reason,
+       kt.enqueued_at
+FROM kds_tickets kt
+WHERE kt.status IN ('queued','firing','prepping')
+  AND kt.station_id = ANY(%s::uuid[])
+"""
+
+# Reference ordering for consistency checks; the ticket id tie-break matches the index.
+SQL_TOP_SQL = """
+SELECT ticket_id, status, priority_score, priority_reason, enqueued_at
+FROM v_station_queue
+WHERE station_id = %s
+ORDER BY priority_score DESC NULLS LAST, enqueued_at ASC, ticket_id ASC
+LIMIT %s
+"""
+
+# Write-throughs newer than this are replayed over a station snapshot loaded concurrently.
+_RECENT_WRITE_TTL = 60.0
+
+SortKey = tuple[int, Decimal, datetime, str]
+
+
+def _sort_key(row: dict[str, Any]) -> SortKey:
+    score = row.get("priority_score")
+    if score is None:
+        return (1, Decimal(0), row["enqueued_at"], str(row["ticket_id"]))
+    return (0, -Decimal(score), row["enqueued_at"], str(row["ticket_id"]))
+
+
+@dataclass
+class _Entry:
+    station_id: str
+    key: SortKey
+    payload: dict[str, Any]
+
+
+class StationQueueIndex:
+    """Sorted active-ticket lists per station with write-through and reconciliation."""
+
+    def __init__(self, db: Database, reconcile_interval: float = 15.0) -> None:
+        self._db = db
+        self._reconcile_interval = reconcile_interval
+        self._lock = threading.RLock()
+        self._keys: dict[str, list[SortKey]] = {}
+        self._entries: dict[str, _Entry] = {}
+        self._recent: dict[str, tuple[float, dict[str, Any]]] = {}
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+        self._stats = {"hits": 0, "loads": 0, "write_throughs": 0, "reconciles": 0, "drift_corrections": 0}
+
+    # --- mutation -----------------------------------------------------------------
+
+    def _remove_locked(self, ticket_id: str) -> None:
+        entry = self._entries.pop(ticket_id, None)
+        if entry is None:
+            return
+        keys = self._keys.get(entry.station_id)
+        if keys:
+            position = bisect.bisect_left(keys, entry.key)
+            if position < len(keys) and keys[position] == entry.key:
+                del keys[position]
+
+    def _put_locked(self, row: dict[str, Any]) -> None:
+        ticket_id = str(row["ticket_id"])
+        station_id = str(row["station_id"])
+        self._remove_locked(ticket_id)
+        if row["status"] not in ACTIVE_TICKET_STATUSES or station_id not in self._keys:
+            return
+        key = _sort_key(row)
+        payload = serialize_row(
+            {
+                "ticket_id": row["ticket_id"],
+                "status": row["status"],
+                "priority_score": row["priority_score"],
+                "priority_reason": row["priority_reason"],
+                "enqueued_at": row["enqueued_at"],
+            }
+        )
+        bisect.insort(self._keys[station_id], key)
+        self._entries[ticket_id] = _Entry(station_id, key, payload)
+
+    def apply(self, row: dict[str, Any]) -> None:
+        """Write through a ticket row returned by a committed transition.
+
+        `row` needs ticket_id (or id), station_id, status, priority_score,
+        priority_reason and enqueued_at. Non-active statuses remove the ticket.
+        """
+        if "ticket_id" not in row:
+            row = {**row, "ticket_id": row["id"]}
+        with self._lock:
+            self._put_locked(row)
+            now = time.monotonic()
+            self._recent[str(row["ticket_id"])] = (now, row)
+            if len(self._recent) > 1024:
+                self._recent = {
+                    ticket_id: item for ticket_id, item in self._recent.items() if now - item[0] < _RECENT_WRITE_TTL
+                }
+            self._stats["write_throughs"] += 1
+
+    def load(self, station_ids: Iterable[str]) -> int:
+        """(Re)load stations from Postgres; returns how many tickets appeared or vanished."""
+        stations = {str(station_id) for station_id in station_ids}
+        if not stations:
+            return 0
+        started = time.monotonic()
+        rows = self._db.fetch_all(STATION_TICKETS_SQL, (sorted(stations),))
+        with self._lock:
+            previous = {
+                ticket_id for ticket_id, entry in self._entries.items() if entry.station_id in stations
+            }
+            for ticket_id in previous:
+                self._remove_locked(ticket_id)
+            first_load = [station_id for station_id in stations if station_id not in self._keys]
+            for station_id in stations:
+                self._keys[station_id] = []
+            for row in rows:
+                self._put_locked(row)
+            # Transitions committed after the snapshot started win over it.
+            for written_at, row in self._recent.values():
+                if written_at >= started and str(row["station_id"]) in stations:
+                    self._put_locked(row)
+            current = {
+                ticket_id
+                for ticket_id, entry in self._entries.items()
+                if entry.station_id in stations and entry.station_id not in first_load
+            }
+            drift = len(previous ^ current)
+            self._stats["loads"] += 1
+            self._stats["drift_corrections"] += drift
+        return drift
+
+    def on_change(self, table: str, upserted: list[dict[str, Any]], removed: list[str]) -> None:
+        """`ChangeFeed` listener: reload the stations touched by ticket notifications."""
+        if table != "kds_tickets":
+            return
+        with self._lock:
+            stations = {str(row["station_id"]) for row in upserted if str(row["station_id"]) in self._keys}
+            stations.update(
+                self._entries[ticket_id].station_id for ticket_id in removed if ticket_id in self._entries
+            )
+        if stations:
+            self.load(stations)
+
+    # --- reads --------------------------------------------------------------------
+
+    def top(self, station_id: str, limit: int) -> list[dict[str, Any]]:
+        """Return the first `limit` active tickets for a station in tool order."""
+        station_id = str(station_id)
+        if station_id not in self._keys:
+            self.load([station_id])
+        with self._lock:
+            keys = self._keys.get(station_id, [])[: max(int(limit), 0)]
+            self._stats["hits"] += 1
+            return [self._entries[key[3]].payload for key in keys]
+
+    def verify(self, station_ids: Iterable[str] | None = None, limit: int = 20) -> dict[str, Any]:
+        """Compare index top-K against the SQL ordering for each station."""
+        with self._lock:
+            stations = sorted({str(s) for s in station_ids} if station_ids is not None else set(self._keys))
+        mismatches: list[dict[str, Any]] = []
+        for station_id in stations:
+            expected = [str(row["ticket_id"]) for row in self._db.fetch_all(SQL_TOP_SQL, (station_id, limit))]
+            actual = [row["ticket_id"] for row in self.top(station_id, limit)]
+            if expected != actual:
+                mismatches.append({"station_id": station_id, "sql": expected, "index": actual})
+        return {"stations": len(stations), "limit": limit, "mismatches": mismatches, "ok": not mismatches}
+
+    # --- background reconciliation ------------------------------------------------
+
+    def reconcile(self) -> int:
+        with self._lock:
+            stations = list(self._keys)
+        drift = self.load(stations)
+        self._stats["reconciles"] += 1
+        if drift:
+            LOGGER.info("Station index reconciled | stations=%s drift=%s", len(stations), drift)
+        return drift
+
+    def _run(self) -> None:
+        while not self._stop.wait(self._reconcile_interval):
+            try:
+                self.reconcile()
+            except Exception:  # noqa: BLE001
+                LOGGER.exception("Station index reconciliation failed")
+
+    def start(self) -> None:
+        if self._thread is not None:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="station-index", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float = 5.0) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=timeout)
+            self._thread = None
+
+    def stats(self) -> dict[str, Any]:
+        with self._lock:
+            return {**self._stats, "stations": len(self._keys), "tickets": len(self._entries)}
+
+
+__all__ = ["StationQueueIndex"]
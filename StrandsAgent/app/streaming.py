@@ -0,0 +1,164 @@
+"""Streaming agent runs as Server-Sent Events or NDJSON.
+
+`AgentRunStream` runs one agent invocation on the ``agents`` lane of the
+`BoundedExecutor` and forwards its progress to the HTTP response as it happens:
+
+* ``start`` as soon as the request is accepted (time to first byte does not wait
+  for Bedrock), then ``token`` for every text delta and ``tool_call`` /
+  ``tool_result`` around each tool invocation;
+* ``done`` with the stop reason and ``run_id`` (see `tracing`), or ``error``.
+
+The worker thread drives `agent.stream_async` on its own event loop and hands
+events to the API loop through a bounded queue, so a slow client applies
+backpressure to the agent instead of buffering without limit. When the client
+disconnects the response generator is closed and the run is stopped with
+`Agent.cancel()` at the next cancellation-safe point (while the model streams,
+or before the next tool or model call), so no further Bedrock tokens are spent.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import threading
+import time
+from collections.abc import AsyncIterator
+from typing import Any, Iterator
+
+from .agents import AgentRegistry
+from .executor import BoundedExecutor
+from .utils import dumps_bytes
+
+LOGGER = logging.getLogger(__name__)
+
+SSE_MEDIA_TYPE = "text/event-stream"
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+
+_CANCEL_POLL_SECONDS = 0.1
+
+
+def _translate(raw: dict[str, Any], seen_tools: set[str]) -> Iterator[dict[str, Any]]:
+    """Map raw Strands stream events onto the public event types."""
+    if "data" in raw:
+        if raw["data"]:
+            yield {"type": "token", "text": raw["data"]}
+        return
+    start = raw.get("event", {}).get("contentBlockStart", {}).get("start", {})
+    if "toolUse" in start:
+        tool_use = start["toolUse"]
+        if tool_use["toolUseId"] not in seen_tools:
+            seen_tools.add(tool_use["toolUseId"])
+            yield {"type": "tool_call", "tool": tool_use["name"], "tool_use_id": tool_use["toolUseId"]}
+        return
+    message = raw.get("message")
+    if isinstance(message, dict) and message.get("role") == "user":
+        for block in message.get("content", []):
+            if "toolResult" in block:
+                result = block["toolResult"]
+                yield {"type": "tool_result", "tool_use_id": result.get("toolUseId"), "status": result.get("status")}
+
+
+def encode_sse(event: dict[str, Any] | None) -> bytes:
+    """One SSE frame; `None` becomes a comment line used as a keep-alive."""
+    if event is None:
+        return b": keep-alive\n\n"
+    return b"event: " + event["type"].encode() + b"\ndata: " + dumps_bytes(event) + b"\n\n"
+
+
+def encode_ndjson(event: dict[str, Any] | None) -> bytes:
+    """One NDJSON line; `None` becomes an empty line used as a keep-alive."""
+    if event is None:
+        return b"\n"
+    return dumps_bytes(event) + b"\n"
+
+
+class AgentRunStream:
+    """One streamed agent invocation; iterate `events()` from the API event loop."""
+
+    def __init__(
+        self,
+        registry: AgentRegistry,
+        executor: BoundedExecutor,
+        agent_name: str,
+        prompt: str,
+        max_buffer: int = 64,
+        heartbeat: float = 15.0,
+    ) -> None:
+        self._registry = registry
+        self._executor = executor
+        self._agent_name = agent_name
+        self._prompt = prompt
+        self._max_buffer = max(1, max_buffer)
+        self._heartbeat = heartbeat
+        self._cancelled = threading.Event()
+
+    def _work(self, loop: asyncio.AbstractEventLoop, queue: asyncio.Queue) -> tuple[Any, Any]:
+        """Worker-thread body: run the agent on a private loop, pushing events into `queue`."""
+        seen_tools: set[str] = set()
+
+        with self._registry.checkout(self._agent_name) as agent:
+
+            async def forward(raw: dict[str, Any]) -> None:
+                for event in _translate(raw, seen_tools):
+                    # Wait for queue space on the API loop without blocking this loop.
+                    put = asyncio.wrap_future(asyncio.run_coroutine_threadsafe(queue.put(event), loop))
+                    while not put.done():
+                        if self._cancelled.is_set():
+                            put.cancel()
+                            break
+                        await asyncio.wait({put}, timeout=_CANCEL_POLL_SECONDS)
+                if self._cancelled.is_set():
+                    agent.cancel()
+
+            return asyncio.run(self._registry.stream_run(agent, self._prompt, forward))
+
+    async def events(self) -> AsyncIterator[dict[str, Any] | None]:
+        """Yield public events, or `None` after `heartbeat` seconds without one."""
+        loop = asyncio.get_running_loop()
+        queue: asyncio.Queue = asyncio.Queue(maxsize=self._max_buffer)
+        started = time.perf_counter()
+        yield {"type": "start", "agent": self._agent_name}
+
+        worker = asyncio.ensure_future(self._executor.run("agents", self._work, loop, queue))
+        # The worker may outlive a disconnected client; keep its exception from being reported as unretrieved.
+        worker.add_done_callback(lambda task: task.cancelled() or task.exception())
+        getter: asyncio.Future | None = None
+        try:
+            while True:
+                if getter is None:
+                    getter = asyncio.ensure_future(queue.get())
+                done, _ = await asyncio.wait(
+                    {getter, worker}, timeout=self._heartbeat, return_when=asyncio.FIRST_COMPLETED
+                )
+                if getter in done:
+                    yield getter.result()
+                    getter = None
+                elif worker in done:
+                    break
+                else:
+                    yield None
+            while not queue.empty():
+                yield queue.get_nowait()
+
+            elapsed_ms = round((time.perf_counter() - started) * 1000, 3)
+            try:
+                result, trace = worker.result()
+            except Exception as exc:  # noqa: BLE001
+                LOGGER.exception("Streamed agent run failed | agent=%s", self._agent_name)
+                yield {"type": "error", "detail": f"{type(exc).__name__}: {exc}", "elapsed_ms": elapsed_ms}
+            else:
+                yield {
+                    "type": "done",
+                    "stop_reason": getattr(result, "stop_reason", None),
+                    "run_id": trace.run_id if trace is not None else None,
+                    "elapsed_ms": elapsed_ms,
+                }
+        finally:
+            if getter is not None:
+                getter.cancel()
+            if not worker.done():
+                self._cancelled.set()
+                LOGGER.info("Streaming client went away; cancelling agent run | agent=%s", self._agent_name)
+
+
+__all__ = ["AgentRunStream", "NDJSON_MEDIA_TYPE", "SSE_MEDIA_TYPE", "encode_ndjson", "encode_sse"]
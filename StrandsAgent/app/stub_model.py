@@ -0,0 +1,149 @@
+"""Offline stand-in for the Bedrock model (`AGENT_MODEL_PROVIDER=stub`).
+
+`StubModel` speaks the Strands streaming event protocol without any network access,
+so agents, tools and run tracing can be exercised locally:
+
+* A prompt line of the form ``tool:<name> {"arg": ...}`` makes the model request that
+  tool (several lines request several tools in one turn). Unknown tools are refused.
+* Once tool results come back, or when the prompt has no directives, it answers with
+  a short text that echoes what it saw.
+* Structured output is built from the last ``output: {...}`` line of the prompt (or a
+  prompt that is itself one JSON object), validated by the requested output model.
+
+Text is streamed one word per delta so streaming clients see incremental tokens.
+Token usage is estimated at four bytes per token and reported in the final
+`metadata` event just like Bedrock, and `latency` adds an artificial delay per call.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import json
+import re
+import uuid
+from typing import Any, AsyncIterable
+
+from strands.models import Model
+
+_DIRECTIVE = re.compile(r"^\s*tool:(?P<name>[A-Za-z_][A-Za-z0-9_]*)\s*(?P<args>\{.*\})?\s*$")
+_OUTPUT = re.compile(r"^\s*output:\s*(?P<json>\{.*\})\s*$")
+
+
+def _tokens(value: Any) -> int:
+    return max(1, len(json.dumps(value, default=str).encode()) // 4)
+
+
+class StubModel(Model):
+    """Deterministic scripted model for offline runs and tests."""
+
+    def __init__(self, latency: float = 0.0, **config: Any) -> None:
+        self._config: dict[str, Any] = {"model_id": "stub", "latency": latency, **config}
+
+    def update_config(self, **model_config: Any) -> None:
+        self._config.update(model_config)
+
+    def get_config(self) -> dict[str, Any]:
+        return dict(self._config)
+
+    @staticmethod
+    def _output_fields(messages: list[dict[str, Any]]) -> dict[str, Any]:
+        """Fields for structured output from the newest prompt that scripts them."""
+        for message in reversed(messages or []):
+            text = "\n".join(block["text"] for block in message.get("content", []) if "text" in block)
+            lines = [match["json"] for match in map(_OUTPUT.match, text.splitlines()) if match]
+            candidate = lines[-1] if lines else text.strip()
+            if candidate.startswith("{"):
+                try:
+                    fields = json.loads(candidate)
+                except json.JSONDecodeError as exc:
+                    raise ValueError(f"StubModel structured output is not valid JSON: {exc}") from exc
+                if isinstance(fields, dict):
+                    return fields
+        raise ValueError(
+            "StubModel structured output needs an `output: {...}` line (or a JSON object prompt) "
+            "with the fields of the requested model"
+        )
+
+    async def structured_output(self, output_model: Any, prompt: Any, system_prompt: str | None = None, **kwargs: Any):
+        """Yield `output_model` built from the prompt's scripted fields (see `_output_fields`).
+
+        Raises ValueError when the prompt scripts no fields; pydantic's ValidationError
+        (also a ValueError) when they do not fit `output_model`.
+        """
+        latency = float(self._config.get("latency") or 0.0)
+        if latency > 0:
+            await asyncio.sleep(latency)
+        yield {"output": output_model.model_validate(self._output_fields(prompt))}
+
+    @staticmethod
+    def _plan(messages: list[dict[str, Any]], tool_specs: list[dict[str, Any]] | None) -> tuple[str, list[dict]]:
+        """Return (text, tool uses) for the next assistant turn."""
+        last = messages[-1] if messages else {"content": []}
+        results = [block["toolResult"] for block in last.get("content", []) if "toolResult" in block]
+        if results:
+            statuses = ", ".join(f"{result.get('status')}" for result in results)
+            return f"Stub model: received {len(results)} tool result(s) ({statuses}).", []
+
+        prompt = "\n".join(block["text"] for block in last.get("content", []) if "text" in block)
+        available = {spec["name"] for spec in tool_specs or ()}
+        uses: list[dict[str, Any]] = []
+        refused: list[str] = []
+        for line in prompt.splitlines():
+            match = _DIRECTIVE.match(line)
+            if not match:
+                continue
+            if match["name"] not in available:
+                refused.append(match["name"])
+                continue
+            uses.append(
+                {
+                    "name": match["name"],
+                    "toolUseId": f"stub-{uuid.uuid4().hex[:12]}",
+                    "input": json.loads(match["args"]) if match["args"] else {},
+                }
+            )
+        if uses:
+            return "", uses
+        if refused:
+            return f"Stub model: tool(s) not available to this agent: {', '.join(refused)}.", []
+        return f"Stub model reply ({len(available)} tools available): {prompt[:200]}", []
+
+    async def stream(
+        self,
+        messages: Any,
+        tool_specs: list[Any] | None = None,
+        system_prompt: str | None = None,
+        **kwargs: Any,
+    ) -> AsyncIterable[Any]:
+        latency = float(self._config.get("latency") or 0.0)
+        if latency > 0:
+            await asyncio.sleep(latency)
+        text, uses = self._plan(messages, tool_specs)
+
+        yield {"messageStart": {"role": "assistant"}}
+        if text:
+            yield {"contentBlockStart": {"start": {}}}
+            for chunk in re.findall(r"\S+\s*", text):
+                yield {"contentBlockDelta": {"delta": {"text": chunk}}}
+            yield {"contentBlockStop": {}}
+        for use in uses:
+            yield {"contentBlockStart": {"start": {"toolUse": {"name": use["name"], "toolUseId": use["toolUseId"]}}}}
+            yield {"contentBlockDelta": {"delta": {"toolUse": {"input": json.dumps(use["input"])}}}}
+            yield {"contentBlockStop": {}}
+        yield {"messageStop": {"stopReason": "tool_use" if uses else "end_turn"}}
+
+        input_tokens = _tokens(messages) + _tokens(system_prompt or "") + _tokens(tool_specs or [])
+        output_tokens = _tokens(text) + sum(_tokens(use["input"]) for use in uses)
+        yield {
+            "metadata": {
+                "usage": {
+                    "inputTokens": input_tokens,
+                    "outputTokens": output_tokens,
+                    "totalTokens": input_tokens + output_tokens,
+                },
+                "metrics": {"latencyMs": int(latency * 1000)},
+            }
+        }
+
+
+__all__ = ["StubModel"]
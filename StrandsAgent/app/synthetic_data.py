@@ -0,0 +1,709 @@
+"""Deterministic bulk generator for performance-test datasets.
+
+`seed_demo_data` inserts one org with a single menu item, which is enough to exercise
+each tool but says nothing about how queries behave on a real estate. This module
+builds a parameterised estate (orgs, locations, stations, thousands of menu items,
+ingredients and recipes, months of orders with their order items and KDS tickets,
+and hourly demand forecasts) and loads it with `COPY ... FROM STDIN`.
+
+* Orders, order items and tickets are generated column-wise with NumPy per
+  location-day and streamed per chunk (about `chunk_rows` order items at a time), so
+  client memory stays flat regardless of the dataset size.
+* Everything is derived from `seed`: row ids are `<seed>-<table>-4000-8000-<n>` and
+  values come from seeded `random.Random` / NumPy generator streams, so the same
+  config (and NumPy version) yields identical tables and benchmark runs are comparable.
+* Order volume follows the simulator's daypart and weekday multipliers and a Zipf
+  menu popularity, so indexes and plans see a realistic skew.
+* The load runs in one transaction; the change-feed triggers on `order_items` and
+  `kds_tickets` are disabled for its duration unless `keep_triggers` is set (a
+  million NOTIFYs would dominate the load time). Caches converge on their next resync.
+* Unless `keep_indexes` is set, the secondary indexes and foreign keys of the bulk
+  tables are dropped before the load and rebuilt once the COPYs finish, so each is
+  built in one sort or validated in one join instead of per row. Primary keys and
+  unique constraints stay in place. The tables are locked exclusively until the load
+  commits.
+"""
+
+from __future__ import annotations
+
+import logging
+import random
+import time
+from dataclasses import dataclass
+from datetime import date, datetime, timedelta
+from itertools import repeat
+from typing import Any, Iterable
+from zoneinfo import ZoneInfo
+
+import numpy as np
+
+from .db import Database
+from .simulator import HOURLY_MULTIPLIERS, ITEMS_PER_ORDER, ORDER_SOURCES, WEEKDAY_MULTIPLIERS
+
+LOGGER = logging.getLogger(__name__)
+
+MODEL_VERSION = "synthetic-v1"
+
+_TABLE_CODES = {
+    "orgs": 1,
+    "locations": 2,
+    "stations": 3,
+    "menu_items": 4,
+    "ingredients": 5,
+    "item_station_route": 6,
+    "recipes": 7,
+    "orders": 8,
+    "order_items": 9,
+    "kds_tickets": 10,
+    "demand_forecasts": 11,
+}
+
+COPY_SQL = {
+    "orgs": "COPY orgs (id, name, timezone) FROM STDIN",
+    "locations": "COPY locations (id, org_id, name, address, opens_at, closes_at) FROM STDIN",
+    "stations": "COPY stations (id, location_id, name, kind) FROM STDIN",
+    "menu_items": "COPY menu_items (id, org_id, sku, name, category, avg_prep_minutes) FROM STDIN",
+    "ingredients": "COPY ingredients (id, org_id, sku, name, unit, shelf_life_hours) FROM STDIN",
+    "item_station_route": "COPY item_station_route (id, menu_item_id, station_id, sequence) FROM STDIN",
+    "recipes": "COPY recipes (id, menu_item_id, ingredient_id, qty, unit) FROM STDIN",
+    "orders": "COPY orders (id, location_id, source, table_number, placed_at, promised_at, status) FROM STDIN",
+    "order_items": (
+        "COPY order_items (id, order_id, menu_item_id, qty, notes, status, predicted_prep_minutes,"
+        " actual_prep_seconds, created_at, started_at, completed_at) FROM STDIN"
+    ),
+    "kds_tickets": (
+        "COPY kds_tickets (id, order_item_id, station_id, sequence, status, priority_score, sla_minutes,"
+        " enqueued_at, started_at, completed_at) FROM STDIN"
+    ),
+    "demand_forecasts": (
+        "COPY demand_forecasts (id, location_id, menu_item_id, bucket_start, bucket_end, expected_qty,"
+        " model_version, features) FROM STDIN"
+    ),
+}
+
+# Tables whose change-feed triggers are switched off during a load.
+_QUIET_TABLES = ("order_items", "kds_tickets")
+
+# Tables whose secondary indexes and foreign keys are rebuilt after the load.
+_BULK_TABLES = ("orders", "order_items", "kds_tickets", "demand_forecasts")
+
+# Indexes that back no constraint (primary keys, unique constraints and FK targets stay).
+_SECONDARY_INDEXES_SQL = """
+SELECT quote_ident(ns.nspname) || '.' || quote_ident(ic.relname) AS name,
+       pg_get_indexdef(i.indexrelid) AS definition
+FROM pg_index i
+JOIN pg_class ic ON ic.oid = i.indexrelid
+JOIN pg_namespace ns ON ns.oid = ic.relnamespace
+WHERE i.indrelid = ANY(%s::regclass[])
+  AND NOT i.indisprimary
+  AND NOT EXISTS (SELECT 1 FROM pg_constraint c WHERE c.conindid = i.indexrelid)
+ORDER BY 1
+"""
+
+_FOREIGN_KEYS_SQL = """
+SELECT conrelid::regclass::text AS table_name,
+       quote_ident(conname) AS name,
+       pg_get_constraintdef(oid) AS definition
+FROM pg_constraint
+WHERE contype = 'f' AND conrelid = ANY(%s::regclass[])
+ORDER BY 1, 2
+"""
+
+# Children first and set-based, so `replace` does not depend on cascades through the
+# foreign keys dropped for the load (or on per-row cascade probes when they are kept).
+_SYNTHETIC_ITEMS = (
+    "SELECT oi.id FROM order_items oi JOIN orders o ON o.id = oi.order_id"
+    " JOIN locations l ON l.id = o.location_id WHERE l.org_id = ANY(%(org_ids)s::uuid[])"
+)
+_DELETE_SQL = (
+    f"DELETE FROM kds_tickets WHERE order_item_id IN ({_SYNTHETIC_ITEMS})",
+    f"DELETE FROM order_item_status_history WHERE order_item_id IN ({_SYNTHETIC_ITEMS})",
+    f"DELETE FROM order_items WHERE id IN ({_SYNTHETIC_ITEMS})",
+    "DELETE FROM orders WHERE location_id IN (SELECT id FROM locations WHERE org_id = ANY(%(org_ids)s::uuid[]))",
+    "DELETE FROM demand_forecasts"
+    " WHERE location_id IN (SELECT id FROM locations WHERE org_id = ANY(%(org_ids)s::uuid[]))",
+    "DELETE FROM recipes WHERE menu_item_id IN (SELECT id FROM menu_items WHERE org_id = ANY(%(org_ids)s::uuid[]))",
+    "DELETE FROM orgs WHERE id = ANY(%(org_ids)s::uuid[])",
+)
+
+# (name, category, station kind, base prep minutes)
+DISHES = (
+    ("Salmon Maki", "Sushi", "prep", 6.0),
+    ("Tuna Nigiri", "Sushi", "prep", 5.0),
+    ("Poke Bowl", "Bowl", "prep", 5.0),
+    ("Edamame", "Sides", "prep", 2.0),
+    ("Chicken Teriyaki", "Grill", "cook", 9.0),
+    ("Beef Yakiniku", "Grill", "cook", 11.0),
+    ("Tonkotsu Ramen", "Noodles", "cook", 8.0),
+    ("Kitsune Udon", "Noodles", "cook", 7.0),
+    ("Katsu Curry", "Rice", "cook", 10.0),
+    ("Pork Gyoza", "Sides", "cook", 6.0),
+    ("Matcha Latte", "Drinks", "bar", 3.0),
+    ("Yuzu Soda", "Drinks", "bar", 2.0),
+    ("Mochi Ice Cream", "Dessert", "dessert", 3.0),
+    ("Dorayaki", "Dessert", "dessert", 4.0),
+)
+
+# (name, unit, per-portion qty range)
+INGREDIENTS = (
+    ("Sushi Rice", "kg", (0.08, 0.25)),
+    ("Nori", "sheet", (1, 3)),
+    ("Salmon", "kg", (0.03, 0.15)),
+    ("Tuna", "kg", (0.03, 0.15)),
+    ("Chicken Thigh", "kg", (0.1, 0.25)),
+    ("Beef Short Rib", "kg", (0.1, 0.25)),
+    ("Ramen Noodles", "kg", (0.1, 0.18)),
+    ("Udon Noodles", "kg", (0.1, 0.2)),
+    ("Soy Sauce", "l", (0.005, 0.03)),
+    ("Mirin", "l", (0.005, 0.02)),
+    ("Scallion", "kg", (0.005, 0.02)),
+    ("Matcha Powder", "g", (2, 6)),
+    ("Milk", "l", (0.15, 0.3)),
+    ("Yuzu Syrup", "ml", (10, 30)),
+    ("Mochi", "ea", (1, 3)),
+    ("Gyoza Wrappers", "ea", (4, 8)),
+    ("Curry Roux", "kg", (0.03, 0.08)),
+    ("Sesame Oil", "ml", (2, 10)),
+)
+
+# Station layout per location: (name, kind); extra stations repeat prep/cook lines.
+STATION_LAYOUT = (
+    ("Cold Prep", "prep"),
+    ("Hot Line", "cook"),
+    ("Bar", "bar"),
+    ("Dessert", "dessert"),
+    ("Expedite", "expedite"),
+)
+
+NEIGHBOURHOODS = ("Bukit Bintang", "Bangsar", "Mont Kiara", "KLCC", "Damansara", "Subang", "Cheras", "Puchong")
+ITEM_NOTES = ("no wasabi", "extra spicy", "sauce on side", "allergy: nuts", "no onion")
+_NOTES = np.array(ITEM_NOTES, dtype=object)
+
+NULL = r"\N"
+
+
+@dataclass(frozen=True)
+class SyntheticDataConfig:
+    """Shape of a generated estate; identical configs produce identical data."""
+
+    seed: int = 1
+    orgs: int = 1
+    locations_per_org: int = 4
+    stations_per_location: int = 5
+    menu_items_per_org: int = 2000
+    ingredients_per_org: int = 1500
+    order_items: int = 1_000_000
+    start: date = date(2025, 1, 1)
+    days: int = 90
+    open_orders_per_location: int = 40
+    forecast_days: int = 2
+    sla_minutes: int = 12
+    prep_sigma: float = 0.35
+    popularity_skew: float = 1.1
+    timezone: str = "Asia/Kuala_Lumpur"
+    chunk_rows: int = 50_000
+
+
+def synthetic_id(seed: int, table: str, n: int) -> str:
+    """Deterministic UUID for the `n`-th generated row of `table`."""
+    return f"{seed & 0xFFFFFFFF:08x}-{_TABLE_CODES[table]:04x}-4000-8000-{n:012x}"
+
+
+class _IdSequence:
+    """Hands out consecutive `synthetic_id`s for one table."""
+
+    def __init__(self, seed: int, table: str) -> None:
+        self._prefix = synthetic_id(seed, table, 0)[:-12]
+        self._next = 1
+
+    def take(self, count: int) -> list[str]:
+        first = self._next
+        self._next += count
+        return [f"{self._prefix}{n:012x}" for n in range(first, first + count)]
+
+    def next(self) -> str:
+        return self.take(1)[0]
+
+
+def _timestamps(epochs: np.ndarray) -> list[str]:
+    """Format UTC epoch seconds for COPY in one vectorised call."""
+    return np.datetime_as_string(epochs.astype("int64").astype("datetime64[s]"), unit="s", timezone="UTC").tolist()
+
+
+def _row(*values: Any) -> str:
+    return "\t".join(NULL if value is None else str(value) for value in values)
+
+
+@dataclass
+class _Org:
+    org_id: str
+    # Per menu item, indexed like `popularity`.
+    menu_ids: np.ndarray
+    prep_minutes: np.ndarray
+    prep_text: np.ndarray
+
+
+@dataclass
+class _Location:
+    location_id: str
+    org_index: int
+    scale: float
+    # Per menu item: first-stage station, and whether the item then goes to `expedite_id`.
+    first_station: np.ndarray
+    via_expedite: np.ndarray
+    expedite_id: str | None
+
+
+class _CopyWriter:
+    """Buffers COPY rows per table and streams them to Postgres on `flush`."""
+
+    def __init__(self, cur: Any) -> None:
+        self._cur = cur
+        self._buffers: dict[str, list[str]] = {}
+        self._pending: dict[str, int] = {}
+        self.counts: dict[str, int] = {table: 0 for table in COPY_SQL}
+
+    def add(self, table: str, line: str) -> None:
+        self.add_rows(table, [line])
+
+    def add_columns(self, table: str, *columns: Iterable[str]) -> None:
+        """Append rows given column-wise; every value must already be COPY text."""
+        self.add_rows(table, list(map("\t".join, zip(*columns))))
+
+    def add_rows(self, table: str, lines: list[str]) -> None:
+        if lines:
+            self._buffers.setdefault(table, []).append("\n".join(lines) + "\n")
+            self._pending[table] = self._pending.get(table, 0) + len(lines)
+
+    def pending(self, table: str) -> int:
+        return self._pending.get(table, 0)
+
+    def flush(self, *tables: str) -> None:
+        # Parents first: FK checks on a COPY run when that statement ends.
+        for table in tables:
+            blocks = self._buffers.pop(table, None)
+            if not blocks:
+                continue
+            with self._cur.copy(COPY_SQL[table]) as copy:
+                for block in blocks:
+                    copy.write(block)
+            self.counts[table] += self._pending.pop(table)
+
+
+class SyntheticDataGenerator:
+    """Streams a `SyntheticDataConfig` estate into Postgres via COPY."""
+
+    def __init__(self, config: SyntheticDataConfig) -> None:
+        self.config = config
+        self._zone = ZoneInfo(config.timezone)
+        self._orgs: list[_Org] = []
+        self._locations: list[_Location] = []
+        sources, source_weights = zip(*ORDER_SOURCES)
+        self._sources = np.array(sources, dtype=object)
+        self._source_p = np.array(source_weights) / sum(source_weights)
+        counts, count_weights = zip(*ITEMS_PER_ORDER)
+        self._item_counts = np.array(counts)
+        self._item_count_p = np.array(count_weights) / sum(count_weights)
+        ranks = np.arange(1, config.menu_items_per_org + 1, dtype=np.float64)
+        popularity = 1.0 / ranks**config.popularity_skew
+        self._popularity = popularity / popularity.sum()
+        self._cum_popularity = np.cumsum(self._popularity)
+
+    @property
+    def org_ids(self) -> list[str]:
+        return [synthetic_id(self.config.seed, "orgs", n) for n in range(1, self.config.orgs + 1)]
+
+    # --- catalog ------------------------------------------------------------------
+
+    def _catalog(self, out: _CopyWriter) -> None:
+        config = self.config
+        rng = random.Random(f"{config.seed}:catalog")
+        self._orgs, self._locations = [], []
+        location_ids = _IdSequence(config.seed, "locations")
+        station_ids = _IdSequence(config.seed, "stations")
+        menu_ids = _IdSequence(config.seed, "menu_items")
+        ingredient_ids = _IdSequence(config.seed, "ingredients")
+        route_ids = _IdSequence(config.seed, "item_station_route")
+        recipe_ids = _IdSequence(config.seed, "recipes")
+
+        for org_index, org_id in enumerate(self.org_ids):
+            out.add("orgs", _row(org_id, f"Synthetic Kitchens {config.seed}-{org_index + 1}", config.timezone))
+
+            ingredients: list[tuple[str, str, tuple[float, float]]] = []
+            for n in range(config.ingredients_per_org):
+                name, unit, qty_range = INGREDIENTS[n % len(INGREDIENTS)]
+                ingredient_id = ingredient_ids.next()
+                ingredients.append((ingredient_id, unit, qty_range))
+                out.add(
+                    "ingredients",
+                    _row(
+                        ingredient_id,
+                        org_id,
+                        f"SYN{config.seed}-{org_index + 1}-I{n + 1}",
+                        f"{name} {n // len(INGREDIENTS) + 1}",
+                        unit,
+                        rng.choice((24, 48, 72, 120, 240)),
+                    ),
+                )
+
+            org_menu: list[str] = []
+            prep_minutes: list[float] = []
+            kinds: list[str] = []
+            for n in range(config.menu_items_per_org):
+                name, category, kind, base_prep = DISHES[rng.randrange(len(DISHES))]
+                menu_item_id = menu_ids.next()
+                prep = round(base_prep * rng.uniform(0.7, 1.4), 2)
+                org_menu.append(menu_item_id)
+                prep_minutes.append(prep)
+                kinds.append(kind)
+                out.add(
+                    "menu_items",
+                    _row(
+                        menu_item_id,
+                        org_id,
+                        f"SYN{config.seed}-{org_index + 1}-M{n + 1}",
+                        f"{name} {n + 1}",
+                        category,
+                        prep,
+                    ),
+                )
+                recipe_size = min(rng.randint(3, 8), len(ingredients))
+                for ingredient_id, unit, (low, high) in rng.sample(ingredients, recipe_size):
+                    qty = rng.randint(low, high) if isinstance(low, int) else round(rng.uniform(low, high), 3)
+                    out.add("recipes", _row(recipe_ids.next(), menu_item_id, ingredient_id, qty, unit))
+            self._orgs.append(
+                _Org(
+                    org_id=org_id,
+                    menu_ids=np.array(org_menu, dtype=object),
+                    prep_minutes=np.array(prep_minutes),
+                    prep_text=np.array([str(prep) for prep in prep_minutes], dtype=object),
+                )
+            )
+
+            for location_index in range(config.locations_per_org):
+                location_id = location_ids.next()
+                neighbourhood = NEIGHBOURHOODS[location_index % len(NEIGHBOURHOODS)]
+                out.add(
+                    "locations",
+                    _row(
+                        location_id,
+                        org_id,
+                        f"{neighbourhood} {location_index // len(NEIGHBOURHOODS) + 1}",
+                        f"{rng.randint(1, 300)} Jalan Sintetik",
+                        "07:00",
+                        "23:59",
+                    ),
+                )
+                by_kind: dict[str, list[str]] = {}
+                for station_index in range(config.stations_per_location):
+                    if station_index < len(STATION_LAYOUT):
+                        name, kind = STATION_LAYOUT[station_index]
+                    else:
+                        kind = "prep" if station_index % 2 else "cook"
+                        name = f"{'Cold Prep' if kind == 'prep' else 'Hot Line'} {station_index // 2}"
+                    station_id = station_ids.next()
+                    by_kind.setdefault(kind, []).append(station_id)
+                    out.add("stations", _row(station_id, location_id, name, kind))
+
+                lines = [station for kind, stations in by_kind.items() if kind != "expedite" for station in stations]
+                expedite_id = by_kind["expedite"][0] if "expedite" in by_kind else None
+                first_station: list[str] = []
+                via_expedite: list[bool] = []
+                for menu_item_id, kind in zip(org_menu, kinds):
+                    station_id = rng.choice(by_kind.get(kind) or lines or [expedite_id])
+                    second = expedite_id is not None and station_id != expedite_id and kind in ("prep", "cook")
+                    second = second and rng.random() < 0.5
+                    out.add("item_station_route", _row(route_ids.next(), menu_item_id, station_id, 1))
+                    if second:
+                        out.add("item_station_route", _row(route_ids.next(), menu_item_id, expedite_id, 2))
+                    first_station.append(station_id)
+                    via_expedite.append(second)
+                self._locations.append(
+                    _Location(
+                        location_id=location_id,
+                        org_index=org_index,
+                        scale=rng.uniform(0.6, 1.4),
+                        first_station=np.array(first_station, dtype=object),
+                        via_expedite=np.array(via_expedite, dtype=bool),
+                        expedite_id=expedite_id,
+                    )
+                )
+
+        out.flush("orgs", "locations", "stations", "menu_items", "ingredients", "item_station_route", "recipes")
+
+    # --- orders -------------------------------------------------------------------
+
+    def _midnight(self, day: date) -> float:
+        return datetime(day.year, day.month, day.day, tzinfo=self._zone).timestamp()
+
+    def _base_rate(self) -> float:
+        """Orders per location-hour at multiplier 1.0 so history totals ~`order_items`."""
+        config = self.config
+        mean_items = float(self._item_counts @ self._item_count_p)
+        weekday_total = sum(
+            WEEKDAY_MULTIPLIERS[(config.start + timedelta(days=day)).weekday()] for day in range(config.days)
+        )
+        weight = sum(HOURLY_MULTIPLIERS) * weekday_total * sum(location.scale for location in self._locations)
+        return config.order_items / mean_items / weight if weight else 0.0
+
+    def _order_block(
+        self,
+        out: _CopyWriter,
+        rng: np.random.Generator,
+        ids: dict[str, _IdSequence],
+        location: _Location,
+        placed: np.ndarray,
+        is_open: bool,
+    ) -> int:
+        """Generate one location's orders (sorted `placed` epochs) column-wise; returns item count."""
+        config = self.config
+        org = self._orgs[location.org_index]
+        orders = placed.size
+        if not orders:
+            return 0
+        sla = str(config.sla_minutes)
+
+        order_ids = ids["orders"].take(orders)
+        sources = self._sources[rng.choice(len(self._sources), size=orders, p=self._source_p)].tolist()
+        tables = rng.integers(1, 41, size=orders).tolist()
+        out.add_columns(
+            "orders",
+            order_ids,
+            repeat(location.location_id),
+            sources,
+            [f"T{table}" if source == "dine_in" else NULL for source, table in zip(sources, tables)],
+            _timestamps(placed),
+            _timestamps(placed + config.sla_minutes * 60),
+            repeat("in_progress" if is_open else "served"),
+        )
+
+        per_order = self._item_counts[rng.choice(len(self._item_counts), size=orders, p=self._item_count_p)]
+        order_index = np.repeat(np.arange(orders), per_order)
+        items = order_index.size
+        menu_index = np.minimum(
+            np.searchsorted(self._cum_popularity, rng.random(items) * self._cum_popularity[-1], side="right"),
+            len(self._cum_popularity) - 1,
+        )
+        item_ids = ids["order_items"].take(items)
+        created = placed[order_index]
+        created_text = _timestamps(created)
+        qty = np.where(rng.random(items) < 0.15, "2", "1").tolist()
+        notes = np.where(
+            rng.random(items) < 0.04, _NOTES[rng.integers(0, len(_NOTES), size=items)], NULL
+        ).tolist()
+        order_column = np.array(order_ids, dtype=object)[order_index].tolist()
+        menu_column = org.menu_ids[menu_index].tolist()
+        prep_column = org.prep_text[menu_index].tolist()
+        first_station = location.first_station[menu_index].tolist()
+
+        if is_open:
+            out.add_columns(
+                "order_items",
+                item_ids, order_column, menu_column, qty, notes, repeat("queued"), prep_column,
+                repeat(NULL), created_text, repeat(NULL), repeat(NULL),
+            )
+            out.add_columns(
+                "kds_tickets",
+                ids["kds_tickets"].take(items), item_ids, first_station, repeat("1"), repeat("queued"),
+                np.round(rng.random(items), 4).astype(str).tolist(), repeat(sla),
+                created_text, repeat(NULL), repeat(NULL),
+            )
+            return items
+
+        started = created + rng.exponential(90.0, size=items)
+        finished = started + org.prep_minutes[menu_index] * 60 * rng.lognormal(0.0, config.prep_sigma, size=items)
+        started_text = _timestamps(started)
+        finished_text = _timestamps(finished)
+        out.add_columns(
+            "kds_tickets",
+            ids["kds_tickets"].take(items), item_ids, first_station, repeat("1"), repeat("passed"), repeat("0"),
+            repeat(sla), created_text, started_text, finished_text,
+        )
+
+        completed = finished.copy()
+        second = location.via_expedite[menu_index]
+        expedited = int(second.sum())
+        if expedited:
+            enqueued = finished[second]
+            picked = enqueued + rng.exponential(30.0, size=expedited)
+            passed = picked + rng.uniform(20.0, 90.0, size=expedited)
+            completed[second] = passed
+            out.add_columns(
+                "kds_tickets",
+                ids["kds_tickets"].take(expedited), np.array(item_ids, dtype=object)[second].tolist(),
+                repeat(location.expedite_id), repeat("2"), repeat("passed"), repeat("0"), repeat(sla),
+                _timestamps(enqueued), _timestamps(picked), _timestamps(passed),
+            )
+
+        out.add_columns(
+            "order_items",
+            item_ids, order_column, menu_column, qty, notes, repeat("served"), prep_column,
+            (completed.astype("int64") - started.astype("int64")).astype(str).tolist(),
+            created_text, started_text, _timestamps(completed),
+        )
+        return items
+
+    def _orders(self, out: _CopyWriter) -> None:
+        config = self.config
+        rng = np.random.default_rng([config.seed, 1])
+        ids = {table: _IdSequence(config.seed, table) for table in ("orders", "order_items", "kds_tickets")}
+        hourly = np.array(HOURLY_MULTIPLIERS)
+        hour_offsets = np.arange(len(HOURLY_MULTIPLIERS)) * 3600.0
+        base_rate = self._base_rate()
+
+        for day_index in range(config.days):
+            day = config.start + timedelta(days=day_index)
+            midnight = self._midnight(day)
+            weekday = WEEKDAY_MULTIPLIERS[day.weekday()]
+            for location in self._locations:
+                per_hour = rng.poisson(base_rate * hourly * weekday * location.scale)
+                placed = midnight + np.repeat(hour_offsets, per_hour) + rng.random(int(per_hour.sum())) * 3600
+                self._order_block(out, rng, ids, location, np.sort(placed), is_open=False)
+                if out.pending("order_items") >= config.chunk_rows:
+                    out.flush("orders", "order_items", "kds_tickets")
+                    LOGGER.info("Synthetic orders loaded through %s | order_items=%s", day, out.counts["order_items"])
+
+        # Open orders in the last half hour of history keep queued tickets for queue benchmarks.
+        end = self._midnight(config.start + timedelta(days=config.days))
+        for location in self._locations:
+            placed = end - 1800 + np.sort(rng.random(config.open_orders_per_location)) * 1800
+            self._order_block(out, rng, ids, location, placed, is_open=True)
+        out.flush("orders", "order_items", "kds_tickets")
+
+    # --- forecasts ----------------------------------------------------------------
+
+    def _forecasts(self, out: _CopyWriter) -> None:
+        config = self.config
+        rng = np.random.default_rng([config.seed, 2])
+        ids = _IdSequence(config.seed, "demand_forecasts")
+        portions_per_order = float(self._item_counts @ self._item_count_p) * 1.15
+        hours = [hour for hour, multiplier in enumerate(HOURLY_MULTIPLIERS) if multiplier > 0]
+        hourly = np.array([HOURLY_MULTIPLIERS[hour] for hour in hours])
+        base_rate = self._base_rate()
+        items = config.menu_items_per_org
+
+        for day_index in range(config.days, config.days + config.forecast_days):
+            day = config.start + timedelta(days=day_index)
+            midnight = self._midnight(day)
+            weekday = WEEKDAY_MULTIPLIERS[day.weekday()]
+            starts = _timestamps(midnight + np.array(hours, dtype=np.float64) * 3600)
+            ends = _timestamps(midnight + (np.array(hours, dtype=np.float64) + 1) * 3600)
+            features = [f'{{"dow":{day.isoweekday()},"hour":{hour},"synthetic":true}}' for hour in hours]
+            for location in self._locations:
+                org = self._orgs[location.org_index]
+                portions = base_rate * hourly * weekday * location.scale * portions_per_order
+                expected = portions[:, None] * self._popularity[None, :] * rng.uniform(0.85, 1.15, (len(hours), items))
+                out.add_columns(
+                    "demand_forecasts",
+                    ids.take(expected.size),
+                    repeat(location.location_id),
+                    np.tile(org.menu_ids, len(hours)).tolist(),
+                    [start for start in starts for _ in range(items)],
+                    [end for end in ends for _ in range(items)],
+                    np.round(expected, 3).ravel().astype(str).tolist(),
+                    repeat(MODEL_VERSION),
+                    [feature for feature in features for _ in range(items)],
+                )
+                if out.pending("demand_forecasts") >= config.chunk_rows:
+                    out.flush("demand_forecasts")
+        out.flush("demand_forecasts")
+
+    # --- entry point --------------------------------------------------------------
+
+    @staticmethod
+    def _drop_secondary(cur: Any) -> tuple[list[dict[str, Any]], list[dict[str, Any]]]:
+        """Drop the bulk tables' secondary indexes and foreign keys; returns their definitions."""
+        cur.execute(_SECONDARY_INDEXES_SQL, (list(_BULK_TABLES),))
+        indexes = cur.fetchall()
+        cur.execute(_FOREIGN_KEYS_SQL, (list(_BULK_TABLES),))
+        foreign_keys = cur.fetchall()
+        for fk in foreign_keys:
+            cur.execute(f"ALTER TABLE {fk['table_name']} DROP CONSTRAINT {fk['name']}")
+        for index in indexes:
+            cur.execute(f"DROP INDEX {index['name']}")
+        return indexes, foreign_keys
+
+    @staticmethod
+    def _rebuild_secondary(cur: Any, indexes: list[dict[str, Any]], foreign_keys: list[dict[str, Any]]) -> None:
+        cur.execute("SET LOCAL maintenance_work_mem = '256MB'")
+        for index in indexes:
+            cur.execute(index["definition"])
+        for fk in foreign_keys:
+            cur.execute(f"ALTER TABLE {fk['table_name']} ADD CONSTRAINT {fk['name']} {fk['definition']}")
+
+    def load(
+        self,
+        db: Database,
+        replace: bool = False,
+        keep_triggers: bool = False,
+        keep_indexes: bool = False,
+    ) -> dict[str, Any]:
+        started = time.perf_counter()
+        timings: dict[str, float] = {}
+        with db.transaction() as cur:
+            cur.execute("SELECT id FROM orgs WHERE id = ANY(%s::uuid[])", (self.org_ids,))
+            existing = bool(cur.fetchall())
+            if existing and not replace:
+                raise RuntimeError(
+                    f"Synthetic data for seed {self.config.seed} already exists; pass replace=True (--replace)"
+                )
+            if not keep_triggers:
+                for table in _QUIET_TABLES:
+                    cur.execute(f"ALTER TABLE {table} DISABLE TRIGGER USER")
+            if not keep_indexes:
+                indexes, foreign_keys = self._drop_secondary(cur)
+            if existing:
+                for sql in _DELETE_SQL:
+                    cur.execute(sql, {"org_ids": self.org_ids})
+                timings["replace_s"] = time.perf_counter() - started
+
+            out = _CopyWriter(cur)
+            for name, step in (("catalog_s", self._catalog), ("orders_s", self._orders), ("forecasts_s", self._forecasts)):
+                step_started = time.perf_counter()
+                step(out)
+                timings[name] = time.perf_counter() - step_started
+
+            if not keep_triggers:
+                for table in _QUIET_TABLES:
+                    cur.execute(f"ALTER TABLE {table} ENABLE TRIGGER USER")
+            if not keep_indexes:
+                rebuilt = time.perf_counter()
+                self._rebuild_secondary(cur, indexes, foreign_keys)
+                timings["rebuild_s"] = time.perf_counter() - rebuilt
+            analyzed = time.perf_counter()
+            cur.execute("ANALYZE orders, order_items, kds_tickets, demand_forecasts")
+            timings["analyze_s"] = time.perf_counter() - analyzed
+
+        elapsed = time.perf_counter() - started
+        rows = sum(out.counts.values())
+        LOGGER.info("Synthetic data loaded | seed=%s rows=%s elapsed=%.1fs", self.config.seed, rows, elapsed)
+        return {
+            "seed": self.config.seed,
+            "org_ids": self.org_ids,
+            "rows": out.counts,
+            "total_rows": rows,
+            "elapsed_s": round(elapsed, 2),
+            "rows_per_s": round(rows / elapsed) if elapsed else None,
+            "timings_s": {name: round(value, 2) for name, value in timings.items()},
+        }
+
+
+def generate_synthetic_data(
+    db: Database,
+    config: SyntheticDataConfig,
+    replace: bool = False,
+    keep_triggers: bool = False,
+    keep_indexes: bool = False,
+) -> dict[str, Any]:
+    """Generate and load a synthetic estate; see the module docstring."""
+    return SyntheticDataGenerator(config).load(
+        db, replace=replace, keep_triggers=keep_triggers, keep_indexes=keep_indexes
+    )
+
+
+__all__ = [
+    "SyntheticDataConfig",
+    "SyntheticDataGenerator",
+    "generate_synthetic_data",
+    "synthetic_id",
+]
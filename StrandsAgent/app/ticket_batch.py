@@ -0,0 +1,189 @@
+"""Set-based KDS ticket transitions (start / hold / pass) for many tickets at once.
+
+One statement updates every ticket, rolls the owning `order_items.status` forward and
+writes `order_item_status_history` for each item that moved, so an expediter bumping
+a whole table costs one round trip and one commit instead of one per ticket.
+
+An order item's status follows its non-cancelled tickets: ``passed`` once all of them
+are passed, ``prepping`` once any is prepping / ready / passed, ``firing`` once any is
+firing. It only ever moves forward; holds never send an item back to ``queued``, and
+served or cancelled items are left alone.
+"""
+
+from __future__ import annotations
+
+import logging
+import uuid
+from typing import Any, Mapping, Sequence
+
+LOGGER = logging.getLogger(__name__)
+
+TICKET_ACTIONS = ("start", "hold", "pass")
+
+# Data-modifying CTEs all read the same snapshot, so sibling tickets are read through
+# `updated` to see this statement's own changes.
+TRANSITION_SQL = """
+WITH input AS (
+    SELECT * FROM unnest(%(ticket_ids)s::uuid[], %(actions)s::text[], %(minutes)s::int[])
+        AS i(ticket_id, action, minutes)
+),
+updated AS (
+    UPDATE kds_tickets kt
+    SET status = CASE i.action WHEN 'start' THEN 'firing' WHEN 'hold' THEN 'queued' ELSE 'passed' END,
+        started_at = CASE WHEN i.action = 'start' THEN COALESCE(kt.started_at, now()) ELSE kt.started_at END,
+        completed_at = CASE WHEN i.action = 'pass' THEN now() ELSE kt.completed_at END,
+        enqueued_at = CASE
+            WHEN i.action = 'hold' THEN now() + make_interval(mins => i.minutes)
+            ELSE kt.enqueued_at
+        END,
+        priority_score = CASE
+            WHEN i.action = 'hold' THEN COALESCE(kt.priority_score, 0) * 0.8
+            ELSE kt.priority_score
+        END
+    FROM input i
+    WHERE kt.id = i.ticket_id
+      AND kt.status NOT IN ('passed', 'cancelled')
+    RETURNING kt.id, kt.order_item_id, kt.station_id, kt.status, kt.priority_score, kt.priority_reason,
+              kt.enqueued_at, kt.started_at, kt.completed_at, i.action
+),
+item_state AS (
+    SELECT kt.order_item_id,
+           bool_and(COALESCE(u.status, kt.status) = 'passed') AS all_passed,
+           bool_or(COALESCE(u.status, kt.status) IN ('prepping', 'ready', 'passed')) AS any_prepping,
+           bool_or(COALESCE(u.status, kt.status) = 'firing') AS any_firing
+    FROM kds_tickets kt
+    LEFT JOIN updated u ON u.id = kt.id
+    WHERE kt.order_item_id IN (SELECT order_item_id FROM updated)
+      AND COALESCE(u.status, kt.status) <> 'cancelled'
+    GROUP BY kt.order_item_id
+),
+target AS (
+    SELECT oi.id,
+           oi.status AS old_status,
+           CASE
+               WHEN s.all_passed THEN 'passed'
+               WHEN s.any_prepping THEN 'prepping'
+               WHEN s.any_firing THEN 'firing'
+               ELSE 'queued'
+           END AS new_status
+    FROM order_items oi
+    JOIN item_state s ON s.order_item_id = oi.id
+),
+rolled AS (
+    UPDATE order_items oi
+    SET status = t.new_status,
+        started_at = COALESCE(oi.started_at, now()),
+        completed_at = CASE WHEN t.new_status = 'passed' THEN now() ELSE oi.completed_at END,
+        actual_prep_seconds = CASE
+            WHEN t.new_status = 'passed'
+                THEN EXTRACT(EPOCH FROM now() - COALESCE(oi.started_at, oi.created_at))::int
+            ELSE oi.actual_prep_seconds
+        END
+    FROM target t
+    WHERE oi.id = t.id
+      AND array_position(ARRAY['queued', 'firing', 'prepping', 'passed'], t.new_status)
+          > COALESCE(array_position(ARRAY['queued', 'firing', 'prepping', 'passed'], oi.status), 5)
+    RETURNING oi.id, t.old_status, oi.status AS new_status
+),
+history AS (
+    INSERT INTO order_item_status_history (order_item_id, old_status, new_status, reason)
+    SELECT r.id, r.old_status, r.new_status,
+           'kds batch: ' || string_agg(u.action || ' ' || u.id::text, ', ' ORDER BY u.id)
+    FROM rolled r
+    JOIN updated u ON u.order_item_id = r.id
+    GROUP BY r.id, r.old_status, r.new_status
+)
+SELECT u.*, r.old_status AS item_old_status, r.new_status AS item_status
+FROM updated u
+LEFT JOIN rolled r ON r.id = u.order_item_id
+"""
+
+CURRENT_STATUS_SQL = "SELECT id, status FROM kds_tickets WHERE id = ANY(%s::uuid[])"
+
+
+def _check_action(raw: Mapping[str, Any]) -> tuple[str | None, str, int, str | None]:
+    """Return (ticket_id, action, minutes, rejection) for one requested transition."""
+    action = str(raw.get("action", "")).strip().lower()
+    try:
+        ticket_id = str(uuid.UUID(str(raw.get("ticket_id", ""))))
+    except ValueError:
+        return None, action, 0, "invalid_ticket_id"
+    if action not in TICKET_ACTIONS:
+        return ticket_id, action, 0, "invalid_action"
+    try:
+        minutes = int(raw.get("minutes", 2)) if action == "hold" else 0
+    except (TypeError, ValueError):
+        return ticket_id, action, 0, "invalid_minutes"
+    return ticket_id, action, minutes, None
+
+
+def apply_ticket_actions(cur: Any, actions: Sequence[Mapping[str, Any]]) -> dict[str, Any]:
+    """Apply `actions` ({ticket_id, action, minutes?}) inside the caller's transaction.
+
+    Returns ``results`` in request order, each with an ``outcome`` of ``ok``,
+    ``not_found``, ``skipped`` (already passed or cancelled), ``duplicate`` or an
+    ``invalid_*`` rejection, plus ``rows`` (updated tickets, for write-through) and
+    ``items`` (order items whose status rolled forward).
+    """
+    results: list[dict[str, Any]] = []
+    seen: set[str] = set()
+    batch: list[tuple[str, str, int]] = []
+    for raw in actions:
+        ticket_id, action, minutes, rejection = _check_action(raw)
+        result: dict[str, Any] = {"ticket_id": ticket_id or raw.get("ticket_id"), "action": action}
+        if rejection is None and ticket_id in seen:
+            rejection = "duplicate"
+        if rejection is None:
+            seen.add(ticket_id)
+            batch.append((ticket_id, action, minutes))
+        else:
+            result["outcome"] = rejection
+        results.append(result)
+
+    rows: list[dict[str, Any]] = []
+    if batch:
+        ticket_ids, action_names, minutes = (list(column) for column in zip(*batch))
+        cur.execute(TRANSITION_SQL, {"ticket_ids": ticket_ids, "actions": action_names, "minutes": minutes})
+        rows = cur.fetchall()
+
+    by_id = {str(row["id"]): row for row in rows}
+    missing = [ticket_id for ticket_id, _, _ in batch if ticket_id not in by_id]
+    current: dict[str, str] = {}
+    if missing:
+        cur.execute(CURRENT_STATUS_SQL, (missing,))
+        current = {str(row["id"]): row["status"] for row in cur.fetchall()}
+
+    items: dict[str, dict[str, Any]] = {}
+    for result in results:
+        if "outcome" in result:
+            continue
+        row = by_id.get(result["ticket_id"])
+        if row is None:
+            status = current.get(result["ticket_id"])
+            result["outcome"] = "skipped" if status else "not_found"
+            if status:
+                result["status"] = status
+            continue
+        result.update(
+            outcome="ok",
+            status=row["status"],
+            order_item_id=row["order_item_id"],
+            started_at=row["started_at"],
+            completed_at=row["completed_at"],
+        )
+        if row["action"] == "hold":
+            result.update(enqueued_at=row["enqueued_at"], priority_score=row["priority_score"])
+        if row["item_status"] is not None:
+            items[str(row["order_item_id"])] = {
+                "order_item_id": row["order_item_id"],
+                "old_status": row["item_old_status"],
+                "new_status": row["item_status"],
+            }
+
+    LOGGER.info(
+        "Applied ticket transitions | requested=%s updated=%s items_rolled=%s", len(results), len(rows), len(items)
+    )
+    return {"results": results, "rows": rows, "items": list(items.values())}
+
+
+__all__ = ["TICKET_ACTIONS", "apply_ticket_actions"]
@@ -2,16 +2,35 @@
 
 from __future__ import annotations
 
-import json
 import logging
 from datetime import datetime
-from decimal import Decimal
+from itertools import islice
 from typing import Any
 
 from strands import ToolContext, tool
 
+from .breaches import severity_for_ratio
+from .changefeed import ChangeFeed
 from .db import Database
-from .utils import serialize_row, serialize_rows
+from .metrics import timed_tool
+from .prep import PlanWindow, generate_plan, generate_plans_batch
+from .prep_times import fetch_estimates
+from .purchasing import (
+    MAX_PAGE_SIZE,
+    RESTOCK_RISKS_SQL,
+    draft_purchase_orders,
+    po_number_prefix,
+    restock_cursor,
+    restock_risks_params,
+    write_po_lines,
+)
+from .scoring import rescore_location
+from .shopping import shopping_items, stream_ingredient_usage
+from .smart_queue import SmartQueue
+from .station_index import StationQueueIndex
+from .ticket_batch import apply_ticket_actions
+from .utils import decode_json_columns, serialize_row
+from .write_behind import WriteBehindLog
 
 LOGGER = logging.getLogger(__name__)
 
@@ -24,6 +43,17 @@ def _parse_timestamp(value: str, field_name: str) -> datetime:
         raise ValueError(f"Invalid timestamp for {field_name}: {value}") from exc
 
 
+def _parse_window(window: dict[str, str]) -> tuple[datetime, datetime]:
+    if "start" not in window or "end" not in window:
+        raise ValueError("window.start and window.end are required ISO-8601 timestamps")
+
+    start_at = _parse_timestamp(window["start"], "window.start")
+    end_at = _parse_timestamp(window["end"], "window.end")
+    if end_at <= start_at:
+        raise ValueError("window.end must be later than window.start")
+    return start_at, end_at
+
+
 def _success(payload: Any) -> dict[str, Any]:
     return {"status": "success", "content": [{"json": payload}]}
 
@@ -42,16 +72,59 @@ def _error(message: str) -> dict[str, Any]:
 class KitchenTools:
     """Collection of Strands tools that operate on the kitchen database."""
 
-    def __init__(self, db: Database):
+    def __init__(
+        self,
+        db: Database,
+        change_feed: ChangeFeed | None = None,
+        station_index: StationQueueIndex | None = None,
+        smart_queue: SmartQueue | None = None,
+        write_behind: WriteBehindLog | None = None,
+    ):
         self._db = db
+        # Optional LISTEN/NOTIFY-backed cache; reads fall back to SQL whenever it is stale.
+        self._feed = change_feed
+        # Optional in-process station queues; ticket transitions below write through to it.
+        self._station_index = station_index
+        # Batch cards are cached per station; lead timers are shared through Postgres
+        # (`station_batch_leads`), so every worker process and KDS device agrees on them.
+        self._smart_queue = smart_queue or SmartQueue(db)
+        # Optional local event log; ticket/alert/waste writes return before Postgres commits.
+        self._write_behind = write_behind
+        if write_behind is not None and station_index is not None:
+            write_behind.add_listener(self._write_through)
+
+    def _write_through(self, row: dict[str, Any]) -> None:
+        if self._station_index is not None:
+            self._station_index.apply(row)
+
+    def _overlay(self, rows: list[dict[str, Any]], limit: int) -> list[dict[str, Any]]:
+        if self._write_behind is None:
+            return rows
+        return self._write_behind.overlay_tickets(rows)[:limit]
+
+    def _append_event(self, kind: str, entity_id: str, payload: dict[str, Any]) -> dict[str, Any] | str:
+        """Queue a write-behind event; returns the event or an error message."""
+        try:
+            return self._write_behind.append(kind, entity_id, payload)  # type: ignore[union-attr]
+        except ValueError as exc:
+            return str(exc)
 
     # --- Station dispatch tools -------------------------------------------------
 
     @tool(context=True)
+    @timed_tool
     def get_station_queue(self, station_id: str, limit: int = 5, tool_context: ToolContext | None = None) -> dict:
         """Fetch tickets for a station ordered by priority."""
         LOGGER.info("Fetching station queue | station_id=%s limit=%s", station_id, limit)
-        rows = self._db.fetch_all(
+        # Pending passes drop out of the overlay, so read far enough to still fill `limit`.
+        fetch = limit + self._write_behind.pending_tickets() if self._write_behind is not None else limit
+        if self._station_index is not None:
+            return _success({"tickets": self._overlay(self._station_index.top(station_id, fetch), limit)})
+        if self._feed is not None:
+            cached = self._feed.station_queue(station_id, fetch)
+            if cached is not None:
+                return _success({"tickets": self._overlay(cached, limit)})
+        rows = self._db.fetch_all_json(
             """
             SELECT ticket_id, status, priority_score, priority_reason, enqueued_at
             FROM v_station_queue
@@ -59,110 +132,244 @@ class KitchenTools:
             ORDER BY priority_score DESC NULLS LAST, enqueued_at ASC
             LIMIT %s
             """,
-            (station_id, limit),
+            (station_id, fetch),
         )
-        serialised = serialize_rows(rows)
-        for row in serialised:
-            if isinstance(row.get("priority_reason"), str):
-                try:
-                    row["priority_reason"] = json.loads(row["priority_reason"])
-                except json.JSONDecodeError:
-                    pass
-        return _success({"tickets": serialised})
+        decode_json_columns(rows, "priority_reason")
+        return _success({"tickets": self._overlay(rows, limit)})
+
+    @tool(context=True)
+    @timed_tool
+    def get_station_batches(self, station_id: str, tool_context: ToolContext | None = None) -> dict:
+        """Group a station's active tickets into Smart Queue batch cards.
+
+        Tickets of the same item, note and order source are packed FIFO into cards of up
+        to the station's capacity. The lead card is `queuing` while its merge window is
+        open, then `cooking`; cards behind it are `queued`.
+        """
+        LOGGER.info("Fetching station batches | station_id=%s", station_id)
+        return _success(self._smart_queue.station_cards(station_id))
 
     @tool(context=True)
+    @timed_tool
     def start_ticket(self, ticket_id: str, tool_context: ToolContext | None = None) -> dict:
         """Mark a ticket as actively firing."""
         LOGGER.info("Starting ticket | ticket_id=%s", ticket_id)
-        row = self._db.fetch_one(
+        if self._write_behind is not None:
+            event = self._append_event("ticket_start", ticket_id, {"ticket_id": ticket_id})
+            if isinstance(event, str):
+                return _error(event)
+            return _text_success(
+                "Ticket moved to firing (write-behind)",
+                {"id": ticket_id, "status": "firing", "started_at": event["at"], "event_id": event["event_id"]},
+            )
+        row = self._db.execute_returning(
             """
             UPDATE kds_tickets
             SET status = 'firing', started_at = COALESCE(started_at, now())
             WHERE id = %s
-            RETURNING id, status, started_at
+            RETURNING id, station_id, status, priority_score, priority_reason, enqueued_at, started_at
             """,
             (ticket_id,),
         )
         if not row:
             return _error(f"Ticket {ticket_id} not found")
-        return _text_success("Ticket moved to firing", serialize_row(row))
+        self._write_through(row)
+        return _text_success(
+            "Ticket moved to firing",
+            serialize_row({"id": row["id"], "status": row["status"], "started_at": row["started_at"]}),
+        )
 
     @tool(context=True)
+    @timed_tool
     def hold_ticket(self, ticket_id: str, minutes: int = 2, tool_context: ToolContext | None = None) -> dict:
         """Temporarily delay a ticket by shifting its enqueue time."""
         LOGGER.info("Holding ticket | ticket_id=%s minutes=%s", ticket_id, minutes)
-        row = self._db.fetch_one(
+        if self._write_behind is not None:
+            self._write_behind.settle([ticket_id])
+        row = self._db.execute_returning(
             """
             UPDATE kds_tickets
             SET status = 'queued',
                 enqueued_at = now() + make_interval(mins => %s),
                 priority_score = COALESCE(priority_score, 0) * 0.8
             WHERE id = %s
-            RETURNING id, status, enqueued_at, priority_score
+            RETURNING id, station_id, status, enqueued_at, priority_score, priority_reason
             """,
             (minutes, ticket_id),
         )
         if not row:
             return _error(f"Ticket {ticket_id} not found")
-        return _text_success("Ticket held", serialize_row(row))
+        self._write_through(row)
+        return _text_success(
+            "Ticket held",
+            serialize_row(
+                {
+                    "id": row["id"],
+                    "status": row["status"],
+                    "enqueued_at": row["enqueued_at"],
+                    "priority_score": row["priority_score"],
+                }
+            ),
+        )
 
     @tool(context=True)
+    @timed_tool
     def pass_ticket(self, ticket_id: str, tool_context: ToolContext | None = None) -> dict:
         """Complete a ticket and move it down the queue."""
         LOGGER.info("Passing ticket | ticket_id=%s", ticket_id)
-        row = self._db.fetch_one(
+        if self._write_behind is not None:
+            event = self._append_event("ticket_pass", ticket_id, {"ticket_id": ticket_id})
+            if isinstance(event, str):
+                return _error(event)
+            return _text_success(
+                "Ticket passed to next step (write-behind)",
+                {"id": ticket_id, "status": "passed", "completed_at": event["at"], "event_id": event["event_id"]},
+            )
+        row = self._db.execute_returning(
             """
             UPDATE kds_tickets
             SET status = 'passed', completed_at = now()
             WHERE id = %s
-            RETURNING id, status, completed_at
+            RETURNING id, station_id, status, priority_score, priority_reason, enqueued_at, completed_at
             """,
             (ticket_id,),
         )
         if not row:
             return _error(f"Ticket {ticket_id} not found")
-        return _text_success("Ticket passed to next step", serialize_row(row))
+        self._write_through(row)
+        return _text_success(
+            "Ticket passed to next step",
+            serialize_row({"id": row["id"], "status": row["status"], "completed_at": row["completed_at"]}),
+        )
+
+    def _transition(self, actions: list[dict[str, Any]]) -> dict:
+        if not actions:
+            return _error("At least one ticket is required")
+        if self._write_behind is not None:
+            self._write_behind.settle(str(action.get("ticket_id")) for action in actions)
+        with self._db.transaction() as cur:
+            outcome = apply_ticket_actions(cur, actions)
+        for row in outcome["rows"]:
+            self._write_through(row)
+        applied = sum(1 for result in outcome["results"] if result["outcome"] == "ok")
+        return _text_success(
+            f"Applied {applied} of {len(outcome['results'])} ticket transitions",
+            {
+                "results": [serialize_row(result) for result in outcome["results"]],
+                "order_items": [serialize_row(item) for item in outcome["items"]],
+            },
+        )
+
+    @tool(context=True)
+    @timed_tool
+    def start_tickets(self, ticket_ids: list[str], tool_context: ToolContext | None = None) -> dict:
+        """Mark several tickets as firing in one transaction; returns a per-ticket outcome."""
+        LOGGER.info("Starting tickets | count=%s", len(ticket_ids))
+        return self._transition([{"ticket_id": ticket_id, "action": "start"} for ticket_id in ticket_ids])
+
+    @tool(context=True)
+    @timed_tool
+    def hold_tickets(self, ticket_ids: list[str], minutes: int = 2, tool_context: ToolContext | None = None) -> dict:
+        """Delay several tickets by `minutes` in one transaction; returns a per-ticket outcome."""
+        LOGGER.info("Holding tickets | count=%s minutes=%s", len(ticket_ids), minutes)
+        return self._transition(
+            [{"ticket_id": ticket_id, "action": "hold", "minutes": minutes} for ticket_id in ticket_ids]
+        )
+
+    @tool(context=True)
+    @timed_tool
+    def pass_tickets(self, ticket_ids: list[str], tool_context: ToolContext | None = None) -> dict:
+        """Pass several tickets (e.g. a whole table) in one transaction; returns a per-ticket outcome."""
+        LOGGER.info("Passing tickets | count=%s", len(ticket_ids))
+        return self._transition([{"ticket_id": ticket_id, "action": "pass"} for ticket_id in ticket_ids])
+
+    @tool(context=True)
+    @timed_tool
+    def transition_tickets(self, actions: list[dict[str, Any]], tool_context: ToolContext | None = None) -> dict:
+        """Apply mixed ticket actions in one transaction.
+
+        `actions` is a list of {"ticket_id", "action": "start" | "hold" | "pass", "minutes"?}.
+        Owning order items roll forward and get status history rows in the same commit.
+        """
+        LOGGER.info("Transitioning tickets | count=%s", len(actions))
+        return self._transition(actions)
+
+    @tool(context=True)
+    @timed_tool
+    def estimate_prep_time(
+        self, menu_item_id: str, station_id: str | None = None, tool_context: ToolContext | None = None
+    ) -> dict:
+        """Learned prep time for a menu item per station and daypart (mean, p50, p90 minutes).
+
+        Estimates come from passed tickets; a row applies now when its `daypart` equals its
+        `current_daypart` (the daypart in that station's local time).
+        """
+        LOGGER.info("Estimating prep time | menu_item_id=%s station_id=%s", menu_item_id, station_id)
+        estimates = fetch_estimates(self._db, menu_item_id, station_id)
+        if estimates is None:
+            return _error("No learned prep times yet; run `python main.py prep-times learn`")
+        if not estimates:
+            return _error(f"No prep-time history for menu item {menu_item_id}")
+        return _success({"estimates": [serialize_row(row) for row in estimates]})
+
+    @tool(context=True)
+    @timed_tool
+    def rescore_tickets(self, location_id: str, tool_context: ToolContext | None = None) -> dict:
+        """Recompute priority scores for every active ticket at a location.
+
+        Scores weigh SLA risk, expected prep time, order completion and overdue time;
+        each updated ticket gets a structured `priority_reason`.
+        """
+        LOGGER.info("Rescoring tickets | location_id=%s", location_id)
+        result = rescore_location(self._db, location_id)
+        if self._station_index is not None and result["updated"]:
+            self._station_index.reconcile()
+        return _text_success(f"Rescored {result['tickets']} tickets ({result['updated']} changed)", result)
 
     # --- SLA watchdog tools -----------------------------------------------------
 
     @tool(context=True)
+    @timed_tool
     def list_open_breaches(self, location_id: str, tool_context: ToolContext | None = None) -> dict:
         """List tickets breaching wait-time SLA for a location."""
         LOGGER.info("Listing open SLA breaches | location_id=%s", location_id)
-        rows = self._db.fetch_all(
-            """
-            SELECT b.ticket_id,
-                   b.station_id,
-                   s.name AS station_name,
-                   b.minutes_elapsed,
-                   b.sla_minutes,
-                   (b.minutes_elapsed / NULLIF(b.sla_minutes, 0)) AS sla_ratio
-            FROM v_wait_sla_breaches b
-            JOIN stations s ON s.id = b.station_id
-            WHERE s.location_id = %s
-            ORDER BY b.minutes_elapsed DESC
-            """,
-            (location_id,),
-        )
-        payload = []
+        rows = self._feed.open_breaches(location_id) if self._feed is not None else None
+        if rows is None:
+            rows = self._db.fetch_all_json(
+                """
+                SELECT b.ticket_id,
+                       b.station_id,
+                       s.name AS station_name,
+                       b.minutes_elapsed,
+                       b.sla_minutes,
+                       (b.minutes_elapsed / NULLIF(b.sla_minutes, 0)) AS sla_ratio
+                FROM v_wait_sla_breaches b
+                JOIN stations s ON s.id = b.station_id
+                WHERE s.location_id = %s
+                ORDER BY b.minutes_elapsed DESC
+                """,
+                (location_id,),
+            )
         for row in rows:
-            data = serialize_row(row)
-            ratio = data.get("sla_ratio")
+            ratio = row.get("sla_ratio")
             if isinstance(ratio, (float, int)):
-                if ratio >= 2:
-                    data["severity"] = "critical"
-                elif ratio >= 1.2:
-                    data["severity"] = "warning"
-                else:
-                    data["severity"] = "info"
-            payload.append(data)
-        return _success({"breaches": payload})
+                row["severity"] = severity_for_ratio(ratio)
+        return _success({"breaches": rows})
 
     @tool(context=True)
+    @timed_tool
     def ack_alert(self, alert_id: str, tool_context: ToolContext | None = None) -> dict:
         """Acknowledge an alert to stop repeated notifications."""
         LOGGER.info("Acknowledging alert | alert_id=%s", alert_id)
-        row = self._db.fetch_one(
+        if self._write_behind is not None:
+            event = self._append_event("alert_ack", alert_id, {"alert_id": alert_id})
+            if isinstance(event, str):
+                return _error(event)
+            return _text_success(
+                "Alert acknowledged (write-behind)",
+                {"id": alert_id, "acknowledged_at": event["at"], "event_id": event["event_id"]},
+            )
+        row = self._db.execute_returning(
             """
             UPDATE alerts
             SET acknowledged_at = now()
@@ -176,6 +383,7 @@ class KitchenTools:
         return _text_success("Alert acknowledged", serialize_row(row))
 
     @tool(context=True)
+    @timed_tool
     def notify(self, channel: str, message: str, tool_context: ToolContext | None = None) -> dict:
         """Log a notification for downstream systems to consume."""
         LOGGER.warning("Notification dispatched | channel=%s message=%s", channel, message)
@@ -184,6 +392,7 @@ class KitchenTools:
     # --- Prep planner tools -----------------------------------------------------
 
     @tool(context=True)
+    @timed_tool
     def generate_prep_plan(
         self,
         location_id: str,
@@ -191,105 +400,14 @@ class KitchenTools:
         tool_context: ToolContext | None = None,
     ) -> dict:
         """Create or refresh a prep plan for a location and time window."""
-        if "start" not in window or "end" not in window:
-            raise ValueError("window.start and window.end are required ISO-8601 timestamps")
-
-        start_at = _parse_timestamp(window["start"], "window.start")
-        end_at = _parse_timestamp(window["end"], "window.end")
-        if end_at <= start_at:
-            raise ValueError("window.end must be later than window.start")
+        start_at, end_at = _parse_window(window)
 
         LOGGER.info(
             "Generating prep plan | location_id=%s start=%s end=%s", location_id, start_at.isoformat(), end_at.isoformat()
         )
 
         with self._db.transaction() as cur:
-            cur.execute(
-                """
-                SELECT id
-                FROM prep_plans
-                WHERE location_id = %s AND plan_for = %s
-                """,
-                (location_id, start_at),
-            )
-            existing = cur.fetchone()
-            if existing:
-                plan_id = existing["id"]
-                cur.execute("DELETE FROM prep_plan_lines WHERE plan_id = %s", (plan_id,))
-            else:
-                cur.execute(
-                    """
-                    INSERT INTO prep_plans (location_id, plan_for, model_version, note)
-                    VALUES (%s, %s, %s, %s)
-                    RETURNING id
-                    """,
-                    (location_id, start_at, "planner-v0", json.dumps({"window": window})),
-                )
-                plan_id = cur.fetchone()["id"]
-
-            cur.execute(
-                """
-                SELECT menu_item_id, SUM(expected_qty) AS expected_qty
-                FROM demand_forecasts
-                WHERE location_id = %s AND bucket_start >= %s AND bucket_end <= %s
-                GROUP BY menu_item_id
-                """,
-                (location_id, start_at, end_at),
-            )
-            forecasts = cur.fetchall()
-
-            total_lines = 0
-            for forecast in forecasts:
-                menu_item_id = forecast["menu_item_id"]
-                expected_qty = forecast["expected_qty"] or Decimal("0")
-
-                cur.execute(
-                    """
-                    SELECT r.ingredient_id,
-                           r.qty,
-                           i.on_hand,
-                           i.unit
-                    FROM recipes r
-                    LEFT JOIN inventory_levels i ON i.ingredient_id = r.ingredient_id AND i.location_id = %s
-                    WHERE r.menu_item_id = %s
-                    """,
-                    (location_id, menu_item_id),
-                )
-                ingredients = cur.fetchall()
-
-                available_portions: float | None = None
-                ingredient_details: list[dict[str, Any]] = []
-                for ingredient in ingredients:
-                    qty = ingredient["qty"] or 0
-                    on_hand = ingredient.get("on_hand") or 0
-                    if qty and on_hand is not None:
-                        possible = float(on_hand) / float(qty) if qty else 0
-                        available_portions = possible if available_portions is None else min(available_portions, possible)
-                    ingredient_details.append(serialize_row(ingredient))
-
-                available_portions = available_portions or 0.0
-                recommended_qty = max(float(expected_qty) - available_portions, 0.0)
-
-                rationale = {
-                    "expected_qty": float(expected_qty),
-                    "available_portions": available_portions,
-                    "ingredients": ingredient_details,
-                    "window": window,
-                }
-
-                if recommended_qty <= 0:
-                    continue
-
-                cur.execute(
-                    """
-                    INSERT INTO prep_plan_lines (plan_id, menu_item_id, recommended_qty, rationale)
-                    VALUES (%s, %s, %s, %s)
-                    ON CONFLICT (plan_id, menu_item_id)
-                    DO UPDATE SET recommended_qty = EXCLUDED.recommended_qty, rationale = EXCLUDED.rationale
-                    """,
-                    (plan_id, menu_item_id, recommended_qty, json.dumps(rationale)),
-                )
-                total_lines += 1
+            plan_id, total_lines = generate_plan(cur, location_id, start_at, end_at, window)
 
         return _text_success(
             "Prep plan generated",
@@ -297,10 +415,44 @@ class KitchenTools:
         )
 
     @tool(context=True)
+    @timed_tool
+    def generate_prep_plans_batch(
+        self,
+        windows: list[dict[str, str]],
+        location_ids: list[str] | None = None,
+        max_workers: int = 4,
+        tool_context: ToolContext | None = None,
+    ) -> dict:
+        """Create or refresh prep plans for many locations and windows in one call.
+
+        Args:
+            windows: List of {"start", "end"} ISO-8601 windows (e.g. lunch and dinner).
+            location_ids: Locations to plan; omit to plan every location.
+            max_workers: Locations planned in parallel.
+        """
+        plan_windows = []
+        for window in windows:
+            start_at, end_at = _parse_window(window)
+            plan_windows.append(PlanWindow(start_at=start_at, end_at=end_at, raw=window))
+
+        LOGGER.info(
+            "Generating prep plans in batch | locations=%s windows=%s",
+            len(location_ids) if location_ids else "all",
+            len(plan_windows),
+        )
+        summary = generate_plans_batch(self._db, location_ids or [], plan_windows, max_workers=max_workers)
+        failed = sum(1 for plan in summary["plans"] if plan["status"] != "success")
+        message = f"Generated {len(summary['plans']) - failed} prep plans"
+        if failed:
+            message += f" ({failed} failed)"
+        return _text_success(message, summary)
+
+    @tool(context=True)
+    @timed_tool
     def summarize_prep_plan(self, plan_id: str, tool_context: ToolContext | None = None) -> dict:
         """Summarise a stored prep plan."""
         LOGGER.info("Summarising prep plan | plan_id=%s", plan_id)
-        plan = self._db.fetch_one(
+        plan = self._db.fetch_one_json(
             """
             SELECT p.id, p.plan_for, p.generated_at, p.model_version, p.note, l.name AS location_name
             FROM prep_plans p
@@ -312,7 +464,7 @@ class KitchenTools:
         if not plan:
             return _error(f"Prep plan {plan_id} not found")
 
-        lines = self._db.fetch_all(
+        lines = self._db.fetch_all_json(
             """
             SELECT ppl.menu_item_id,
                    mi.name,
@@ -325,56 +477,50 @@ class KitchenTools:
             """,
             (plan_id,),
         )
-        payload = serialize_row(plan)
-        payload["lines"] = []
-        for line in lines:
-            entry = serialize_row(line)
-            if isinstance(entry.get("rationale"), str):
-                try:
-                    entry["rationale"] = json.loads(entry["rationale"])
-                except json.JSONDecodeError:
-                    pass
-            payload["lines"].append(entry)
-
+        decode_json_columns(lines, "rationale")
+        payload = dict(plan)
+        payload["lines"] = lines
         return _success(payload)
 
     # --- Inventory tools --------------------------------------------------------
 
     @tool(context=True)
-    def list_restock_risks(self, location_id: str, tool_context: ToolContext | None = None) -> dict:
-        """Retrieve restock recommendations for a location."""
-        LOGGER.info("Listing restock risks | location_id=%s", location_id)
-        rows = self._db.fetch_all(
-            """
-            SELECT rr.id,
-                   rr.ingredient_id,
-                   ing.name AS ingredient_name,
-                   rr.recommended_qty_packs,
-                   rr.supplier_id,
-                   sup.name AS supplier_name,
-                   rr.rationale,
-                   rr.created_at
-            FROM restock_recommendations rr
-            JOIN ingredients ing ON ing.id = rr.ingredient_id
-            LEFT JOIN suppliers sup ON sup.id = rr.supplier_id
-            WHERE rr.location_id = %s
-            ORDER BY rr.created_at DESC
-            """,
-            (location_id,),
-        )
-        payload = []
-        for row in rows:
-            serialised = serialize_row(row)
-            rationale = serialised.get("rationale")
-            if isinstance(rationale, str):
-                try:
-                    serialised["rationale"] = json.loads(rationale)
-                except json.JSONDecodeError:
-                    pass
-            payload.append(serialised)
-        return _success({"recommendations": payload})
+    @timed_tool
+    def list_restock_risks(
+        self,
+        location_id: str,
+        limit: int | None = None,
+        after: str | None = None,
+        tool_context: ToolContext | None = None,
+    ) -> dict:
+        """Retrieve restock recommendations for a location, newest first, optionally one page at a time.
+
+        Args:
+            location_id: Location to list recommendations for.
+            limit: Page size (1-1000; default: all recommendations).
+            after: `next_cursor` from the previous page; omit for the first page.
+        """
+        LOGGER.info("Listing restock risks | location_id=%s limit=%s after=%s", location_id, limit, after)
+        if limit is not None:
+            limit = min(max(int(limit), 1), MAX_PAGE_SIZE)
+        rows = None
+        if self._feed is not None and after is None:
+            rows = self._feed.restock_risks(location_id)
+        if rows is None:
+            try:
+                params = restock_risks_params(location_id, after, limit + 1 if limit is not None else None)
+            except ValueError as exc:
+                return _error(str(exc))
+            rows = self._db.fetch_all_json(RESTOCK_RISKS_SQL, params)
+            decode_json_columns(rows, "rationale")
+        next_cursor = None
+        if limit is not None and len(rows) > limit:
+            next_cursor = restock_cursor(rows[limit - 1])
+            rows = rows[:limit]
+        return _success({"recommendations": rows, "next_cursor": next_cursor})
 
     @tool(context=True)
+    @timed_tool
     def create_po_from_recs(
         self,
         location_id: str,
@@ -398,6 +544,7 @@ class KitchenTools:
                 LEFT JOIN ingredient_suppliers isp
                     ON isp.ingredient_id = rr.ingredient_id AND isp.supplier_id = %s
                 WHERE rr.location_id = %s AND (rr.supplier_id = %s OR rr.supplier_id IS NULL)
+                ORDER BY rr.created_at ASC
                 """,
                 (supplier_id, location_id, supplier_id),
             )
@@ -405,8 +552,7 @@ class KitchenTools:
             if not recs:
                 return _error("No restock recommendations available for the supplier")
 
-            now_str = datetime.utcnow().strftime("%Y%m%d%H%M%S")
-            po_number = f"PO-{now_str}"
+            po_number = po_number_prefix()
             cur.execute(
                 """
                 INSERT INTO purchase_orders (org_id, location_id, supplier_id, po_number)
@@ -422,20 +568,14 @@ class KitchenTools:
                 raise RuntimeError("Failed to create purchase order header")
             po_id = po_row["id"]
 
+            # One line per ingredient; rows are oldest first, so the newest recommendation wins.
+            latest: dict[Any, dict[str, Any]] = {rec["ingredient_id"]: rec for rec in recs}
+            line_rows: list[tuple[Any, Any, Any, Any]] = []
             line_payload: list[dict[str, Any]] = []
-            for rec in recs:
+            for rec in latest.values():
                 qty_packs = rec["recommended_qty_packs"]
                 price = rec.get("price_per_pack") or 0
-                cur.execute(
-                    """
-                    INSERT INTO purchase_order_items (po_id, ingredient_id, qty_packs, price_per_pack)
-                    VALUES (%s, %s, %s, %s)
-                    ON CONFLICT (po_id, ingredient_id)
-                    DO UPDATE SET qty_packs = EXCLUDED.qty_packs, price_per_pack = EXCLUDED.price_per_pack
-                    RETURNING id
-                    """,
-                    (po_id, rec["ingredient_id"], qty_packs, price),
-                )
+                line_rows.append((po_id, rec["ingredient_id"], qty_packs, price))
                 line_payload.append(
                     {
                         "ingredient_id": rec["ingredient_id"],
@@ -444,101 +584,80 @@ class KitchenTools:
                         "price_per_pack": float(price),
                     }
                 )
+            write_po_lines(cur, line_rows)
 
+        total_cost = sum(line["qty_packs"] * line["price_per_pack"] for line in line_payload)
         return _text_success(
             "Purchase order drafted",
-            {"po_id": po_id, "po_number": po_number, "lines": line_payload},
+            {"po_id": po_id, "po_number": po_number, "lines": line_payload, "total_cost": round(total_cost, 4)},
         )
 
     @tool(context=True)
-    def monthly_shopping_list(self, days: int = 30, tool_context: ToolContext | None = None) -> dict:
-        """Compute monthly shopping list from recent order history (legacy schema).
+    @timed_tool
+    def create_pos_bulk(self, location_id: str | None = None, tool_context: ToolContext | None = None) -> dict:
+        """Draft purchase orders for every supplier with open recommendations.
 
-        This tool reads from legacy tables `orders`, `orderitems`, `menuitemingredients`, and `ingredients`
-        to estimate the last-N-day ingredient usage and suggest recommended buy quantities.
+        One draft PO is created per (location, supplier) in a single transaction.
+        Recommendations without a supplier fall back to the ingredient's primary supplier.
 
         Args:
-            days: Lookback window in days (default 30).
+            location_id: Limit drafting to one location; omit to cover all locations.
         """
-        LOGGER.info("Generating monthly shopping list | days=%s", days)
-        rows = self._db.fetch_all(
-            """
-            WITH month_orders AS (
-                SELECT oi.itemid   AS item_id,
-                       SUM(oi.quantity) AS qty
-                FROM orderitems oi
-                JOIN orders o ON o.orderid = oi.orderid
-                WHERE o.orderdate >= (now() - make_interval(days => %s))
-                GROUP BY oi.itemid
-            ),
-            ingredient_usage AS (
-                SELECT mii.ingredientid AS ingredient_id,
-                       SUM(mo.qty * mii.quantityneeded) AS monthly_usage
-                FROM month_orders mo
-                JOIN menuitemingredients mii ON mii.itemid = mo.item_id
-                GROUP BY mii.ingredientid
-            )
-            SELECT i.ingredientid            AS id,
-                   i.ingredientname          AS name,
-                   i."Category"             AS category,
-                   i.unit                    AS unit,
-                   i.stockquantity           AS current_stock,
-                   COALESCE(u.monthly_usage, 0) AS monthly_usage,
-                   i."LowThreshold"         AS low_threshold
-            FROM ingredients i
-            LEFT JOIN ingredient_usage u ON u.ingredient_id = i.ingredientid
-            ORDER BY u.monthly_usage DESC NULLS LAST
-            """,
-            (days,),
+        LOGGER.info("Creating purchase orders in bulk | location_id=%s", location_id or "all")
+        with self._db.transaction() as cur:
+            summary = draft_purchase_orders(cur, location_id)
+        if not summary["purchase_orders"]:
+            message = "No restock recommendations with a known supplier"
+            return _text_success(message, summary) if summary["unassigned"] else _error(message)
+        return _text_success(
+            f"Drafted {len(summary['purchase_orders'])} purchase orders totalling {summary['total_cost']:.2f}",
+            summary,
         )
 
-        items: list[dict[str, Any]] = []
-        for row in rows:
-            name = row.get("name")
-            unit = row.get("unit") or "ea"
-            current_stock = float(row.get("current_stock") or 0)
-            monthly_usage = float(row.get("monthly_usage") or 0)
-            low = float(row.get("low_threshold") or 0)
-            recommended = max(monthly_usage - current_stock, 0)
-
-            urgency = "low"
-            if current_stock <= 0:
-                urgency = "critical"
-            elif current_stock < low:
-                urgency = "high"
-            elif recommended > 0:
-                urgency = "medium"
-
-            reason_parts: list[str] = []
-            reason_parts.append(f"Projected {days}d usage {monthly_usage:.2f} {unit}")
-            reason_parts.append(f"On hand {current_stock:.2f} {unit}")
-            if low > 0:
-                reason_parts.append(f"Par {low:.2f} {unit}")
-
-            if recommended > 0:
-                items.append(
-                    {
-                        "id": str(row.get("id")),
-                        "name": name,
-                        "category": row.get("category") or "Uncategorized",
-                        "currentStock": current_stock,
-                        "unit": unit,
-                        "recommendedQty": float(f"{recommended:.2f}"),
-                        "urgency": urgency,
-                        "reason": " · ".join(reason_parts),
-                        "estimatedCost": 0.0,
-                    }
-                )
+    @tool(context=True)
+    @timed_tool
+    def monthly_shopping_list(
+        self,
+        days: int = 30,
+        limit: int | None = None,
+        offset: int = 0,
+        tool_context: ToolContext | None = None,
+    ) -> dict:
+        """Compute monthly shopping list from recent order history (legacy schema).
+
+        This tool reads from legacy tables `orders`, `orderitems`, `menuitemingredients`, and `ingredients`
+        to estimate the last-N-day ingredient usage and suggest recommended buy quantities. Closed days
+        come from the `legacy_item_daily_usage` rollup when it exists.
 
-        return _success({"items": items, "days": days})
+        Args:
+            days: Lookback window in days (default 30).
+            limit: Maximum items to return (default: all).
+            offset: Items to skip, e.g. `next_offset` from the previous page.
+        """
+        LOGGER.info("Generating monthly shopping list | days=%s limit=%s offset=%s", days, limit, offset)
+        offset = max(int(offset), 0)
+        stop = offset + min(max(int(limit), 1), MAX_PAGE_SIZE) + 1 if limit is not None else None
+        # Usage rows stream from a server-side cursor; only the items on this page are kept.
+        rows = stream_ingredient_usage(self._db, days)
+        try:
+            items = list(islice(shopping_items(rows, days), offset, stop))
+        finally:
+            rows.close()
+
+        next_offset = None
+        if stop is not None and len(items) > stop - offset - 1:
+            items.pop()
+            next_offset = offset + len(items)
+        return _success({"items": items, "days": days, "next_offset": next_offset})
 
     # --- Waste & substitution tools --------------------------------------------
 
     @tool(context=True)
+    @timed_tool
     def suggest_substitute(self, ingredient_id: str, tool_context: ToolContext | None = None) -> dict:
         """Suggest an alternative ingredient with available stock."""
         LOGGER.info("Suggesting substitute | ingredient_id=%s", ingredient_id)
-        ingredient = self._db.fetch_one(
+        ingredient = self._db.fetch_one_json(
             """
             SELECT id, name, unit
             FROM ingredients
@@ -549,7 +668,7 @@ class KitchenTools:
         if not ingredient:
             return _error(f"Ingredient {ingredient_id} not found")
 
-        rows = self._db.fetch_all(
+        rows = self._db.fetch_all_json(
             """
             SELECT ing.id,
                    ing.name,
@@ -564,12 +683,13 @@ class KitchenTools:
             (ingredient["unit"], ingredient_id),
         )
         payload = {
-            "ingredient": serialize_row(ingredient),
-            "candidates": serialize_rows(rows),
+            "ingredient": ingredient,
+            "candidates": rows,
         }
         return _success(payload)
 
     @tool(context=True)
+    @timed_tool
     def log_waste(
         self,
         menu_item_id: str | None,
@@ -588,7 +708,24 @@ class KitchenTools:
             reason,
             location_id,
         )
-        row = self._db.fetch_one(
+        if self._write_behind is not None:
+            event = self._append_event(
+                "waste",
+                location_id,
+                {
+                    "location_id": location_id,
+                    "menu_item_id": menu_item_id,
+                    "ingredient_id": ingredient_id,
+                    "qty": qty,
+                    "reason": reason,
+                },
+            )
+            if isinstance(event, str):
+                return _error(event)
+            return _text_success(
+                "Waste event recorded (write-behind)", {"id": event["event_id"], "occurred_at": event["at"]}
+            )
+        row = self._db.execute_returning(
             """
             INSERT INTO waste_events (location_id, menu_item_id, ingredient_id, qty, reason)
             VALUES (%s, %s, %s, %s, %s)
@@ -601,10 +738,11 @@ class KitchenTools:
     # --- Explainability tools ---------------------------------------------------
 
     @tool(context=True)
+    @timed_tool
     def explain_ticket(self, ticket_id: str, tool_context: ToolContext | None = None) -> dict:
         """Provide context for why a ticket is prioritised."""
         LOGGER.info("Explaining ticket | ticket_id=%s", ticket_id)
-        row = self._db.fetch_one(
+        row = self._db.fetch_one_json(
             """
             SELECT kt.id,
                    kt.status,
@@ -626,16 +764,14 @@ class KitchenTools:
         )
         if not row:
             return _error(f"Ticket {ticket_id} not found")
-        data = serialize_row(row)
-        reason = data.get("priority_reason")
-        if isinstance(reason, str):
-            try:
-                data["priority_reason"] = json.loads(reason)
-            except json.JSONDecodeError:
-                pass
-        return _success(data)
+        decode_json_columns([row], "priority_reason")
+        pending = self._write_behind.pending_ticket(ticket_id) if self._write_behind is not None else None
+        if pending is not None:
+            row.update(pending, pending=True)
+        return _success(row)
 
     @tool(context=True)
+    @timed_tool
     def explain_prep_plan(self, plan_id: str, tool_context: ToolContext | None = None) -> dict:
         """Explain the drivers for a prep plan."""
         LOGGER.info("Explaining prep plan | plan_id=%s", plan_id)
@@ -0,0 +1,303 @@
+"""Per-run tracing for agent invocations.
+
+Each run gets a `RunTrace` with one span per model call and one per tool invocation:
+
+* Model spans come from `TracedModel`, a pass-through wrapper around the shared model
+  that times the stream (total and time to first event), reads token usage from the
+  final `metadata` event and records request/response payload sizes.
+* Tool spans come from Strands' `BeforeToolCallEvent` / `AfterToolCallEvent` hooks and
+  record duration, input/result sizes and the result status.
+
+The run summary splits wall time into model time, tool time (union of tool spans, as
+tools may run concurrently) and the remainder (framework, JSON handling, hooks).
+Finished traces are kept in a bounded in-memory `RunStore` and served by
+`GET /agents/runs/{run_id}`.
+"""
+
+from __future__ import annotations
+
+import json
+import logging
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from typing import Any, AsyncIterable
+
+from strands.hooks import AfterToolCallEvent, BeforeToolCallEvent, HookProvider, HookRegistry
+from strands.models import Model
+
+LOGGER = logging.getLogger(__name__)
+
+
+def _size(value: Any) -> int:
+    """Approximate payload size in bytes as the JSON a provider would send."""
+    try:
+        return len(json.dumps(value, default=str, separators=(",", ":")).encode())
+    except (TypeError, ValueError):
+        return len(str(value).encode())
+
+
+def _round(value: float | None) -> float | None:
+    return round(value, 3) if value is not None else None
+
+
+@dataclass
+class Span:
+    kind: str
+    name: str
+    start: float
+    end: float | None = None
+    attributes: dict[str, Any] = field(default_factory=dict)
+
+    def to_dict(self, origin: float) -> dict[str, Any]:
+        return {
+            "kind": self.kind,
+            "name": self.name,
+            "offset_ms": _round((self.start - origin) * 1000),
+            "duration_ms": _round((self.end - self.start) * 1000) if self.end is not None else None,
+            **self.attributes,
+        }
+
+
+def _union_seconds(intervals: list[tuple[float, float]]) -> float:
+    total, current_start, current_end = 0.0, None, None
+    for start, end in sorted(intervals):
+        if current_end is None or start > current_end:
+            if current_end is not None:
+                total += current_end - current_start
+            current_start, current_end = start, end
+        else:
+            current_end = max(current_end, end)
+    if current_end is not None:
+        total += current_end - current_start
+    return total
+
+
+class RunTrace:
+    """Spans and outcome of one agent invocation."""
+
+    def __init__(self, agent: str, prompt: str) -> None:
+        self.run_id = uuid.uuid4().hex
+        self.agent = agent
+        self.prompt_chars = len(prompt)
+        self.started_at = datetime.now(tz=timezone.utc)
+        self.start = time.perf_counter()
+        self.end: float | None = None
+        self.status = "running"
+        self.stop_reason: str | None = None
+        self.output_chars: int | None = None
+        self.error: str | None = None
+        self._spans: list[Span] = []
+        self._lock = threading.Lock()
+
+    def open_span(self, kind: str, name: str, **attributes: Any) -> Span:
+        span = Span(kind=kind, name=name, start=time.perf_counter(), attributes=attributes)
+        with self._lock:
+            self._spans.append(span)
+        return span
+
+    def finish(self, result: Any = None, error: BaseException | None = None) -> None:
+        self.end = time.perf_counter()
+        if error is not None:
+            self.status = "error"
+            self.error = f"{type(error).__name__}: {error}"
+        else:
+            self.status = "ok"
+            self.stop_reason = getattr(result, "stop_reason", None)
+            self.output_chars = len(str(result)) if result is not None else 0
+
+    def summary(self) -> dict[str, Any]:
+        with self._lock:
+            spans = list(self._spans)
+        end = self.end if self.end is not None else time.perf_counter()
+        closed = [span for span in spans if span.end is not None]
+        model = [span for span in closed if span.kind == "model"]
+        tools = [span for span in closed if span.kind == "tool"]
+        model_s = _union_seconds([(span.start, span.end) for span in model])
+        tool_s = _union_seconds([(span.start, span.end) for span in tools])
+        total_s = end - self.start
+        return {
+            "duration_ms": _round(total_s * 1000),
+            "model_ms": _round(model_s * 1000),
+            "tool_ms": _round(tool_s * 1000),
+            "other_ms": _round(max(total_s - model_s - tool_s, 0.0) * 1000),
+            "model_calls": len(model),
+            "tool_calls": len(tools),
+            "input_tokens": sum(span.attributes.get("input_tokens") or 0 for span in model),
+            "output_tokens": sum(span.attributes.get("output_tokens") or 0 for span in model),
+        }
+
+    def to_dict(self, include_spans: bool = True) -> dict[str, Any]:
+        payload: dict[str, Any] = {
+            "run_id": self.run_id,
+            "agent": self.agent,
+            "status": self.status,
+            "stop_reason": self.stop_reason,
+            "started_at": self.started_at.isoformat(),
+            "prompt_chars": self.prompt_chars,
+            "output_chars": self.output_chars,
+            "error": self.error,
+            "summary": self.summary(),
+        }
+        if include_spans:
+            with self._lock:
+                spans = sorted(self._spans, key=lambda span: span.start)
+            payload["spans"] = [span.to_dict(self.start) for span in spans]
+        return payload
+
+
+class RunStore:
+    """Bounded in-memory ring buffer of recent run traces."""
+
+    def __init__(self, max_runs: int = 200) -> None:
+        self._max_runs = max(1, max_runs)
+        self._runs: OrderedDict[str, RunTrace] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def add(self, trace: RunTrace) -> None:
+        with self._lock:
+            self._runs[trace.run_id] = trace
+            while len(self._runs) > self._max_runs:
+                self._runs.popitem(last=False)
+
+    def get(self, run_id: str) -> RunTrace | None:
+        with self._lock:
+            return self._runs.get(run_id)
+
+    def recent(self, limit: int = 20, agent: str | None = None) -> list[RunTrace]:
+        with self._lock:
+            runs = list(reversed(self._runs.values()))
+        if agent is not None:
+            runs = [run for run in runs if run.agent == agent]
+        return runs[: max(limit, 0)]
+
+
+class AgentTracer(HookProvider):
+    """Collects spans for the run currently executing on one agent instance.
+
+    Agents are checked out by one request at a time (see `AgentRegistry.checkout`), so
+    a tracer per agent holds at most one active run.
+    """
+
+    def __init__(self, agent_name: str, store: RunStore) -> None:
+        self.agent_name = agent_name
+        self._store = store
+        self._active: RunTrace | None = None
+        self._tool_spans: dict[str, Span] = {}
+
+    @property
+    def active(self) -> RunTrace | None:
+        return self._active
+
+    def begin(self, prompt: str) -> RunTrace:
+        self._active = RunTrace(self.agent_name, prompt)
+        self._tool_spans = {}
+        self._store.add(self._active)
+        return self._active
+
+    def finish(self, result: Any = None, error: BaseException | None = None) -> RunTrace | None:
+        trace, self._active = self._active, None
+        if trace is not None:
+            trace.finish(result=result, error=error)
+            LOGGER.info("Agent run traced | run_id=%s agent=%s %s", trace.run_id, trace.agent, trace.summary())
+        return trace
+
+    # --- tool spans (Strands hooks) -----------------------------------------------
+
+    def register_hooks(self, registry: HookRegistry, **kwargs: Any) -> None:
+        registry.add_callback(BeforeToolCallEvent, self._before_tool)
+        registry.add_callback(AfterToolCallEvent, self._after_tool)
+
+    def _before_tool(self, event: BeforeToolCallEvent) -> None:
+        trace = self._active
+        if trace is None:
+            return
+        tool_use = event.tool_use
+        self._tool_spans[tool_use["toolUseId"]] = trace.open_span(
+            "tool", tool_use["name"], tool_use_id=tool_use["toolUseId"], input_bytes=_size(tool_use.get("input"))
+        )
+
+    def _after_tool(self, event: AfterToolCallEvent) -> None:
+        span = self._tool_spans.pop(event.tool_use["toolUseId"], None)
+        if span is None:
+            return
+        span.end = time.perf_counter()
+        result = event.result or {}
+        span.attributes["status"] = result.get("status")
+        span.attributes["result_bytes"] = _size(result.get("content"))
+        if event.exception is not None:
+            span.attributes["error"] = f"{type(event.exception).__name__}: {event.exception}"
+
+
+class TracedModel(Model):
+    """Pass-through model that records a span per `stream` call on the tracer's run."""
+
+    def __init__(self, inner: Model, tracer: AgentTracer) -> None:
+        self._inner = inner
+        self._tracer = tracer
+
+    def update_config(self, **model_config: Any) -> None:
+        self._inner.update_config(**model_config)
+
+    def get_config(self) -> Any:
+        return self._inner.get_config()
+
+    def structured_output(self, output_model: Any, prompt: Any, system_prompt: str | None = None, **kwargs: Any):
+        return self._inner.structured_output(output_model, prompt, system_prompt=system_prompt, **kwargs)
+
+    async def stream(
+        self,
+        messages: Any,
+        tool_specs: list[Any] | None = None,
+        system_prompt: str | None = None,
+        **kwargs: Any,
+    ) -> AsyncIterable[Any]:
+        trace = self._tracer.active
+        if trace is None:
+            async for event in self._inner.stream(messages, tool_specs, system_prompt, **kwargs):
+                yield event
+            return
+
+        config = self.get_config()
+        model_id = config.get("model_id") if isinstance(config, dict) else None
+        span = trace.open_span(
+            "model",
+            str(model_id or type(self._inner).__name__),
+            request_bytes=_size(messages) + len((system_prompt or "").encode()),
+            messages=len(messages),
+            tool_specs=len(tool_specs or ()),
+        )
+        response_bytes = 0
+        try:
+            async for event in self._inner.stream(messages, tool_specs, system_prompt, **kwargs):
+                if "first_event_ms" not in span.attributes:
+                    span.attributes["first_event_ms"] = _round((time.perf_counter() - span.start) * 1000)
+                delta = event.get("contentBlockDelta", {}).get("delta", {}) if isinstance(event, dict) else {}
+                if "text" in delta:
+                    response_bytes += len(delta["text"].encode())
+                elif "toolUse" in delta:
+                    response_bytes += len(delta["toolUse"].get("input", "").encode())
+                if isinstance(event, dict) and "messageStop" in event:
+                    span.attributes["stop_reason"] = event["messageStop"].get("stopReason")
+                if isinstance(event, dict) and "metadata" in event:
+                    usage = event["metadata"].get("usage", {})
+                    span.attributes["input_tokens"] = usage.get("inputTokens")
+                    span.attributes["output_tokens"] = usage.get("outputTokens")
+                yield event
+        except BaseException as exc:
+            span.attributes["error"] = f"{type(exc).__name__}: {exc}"
+            raise
+        finally:
+            span.end = time.perf_counter()
+            span.attributes["response_bytes"] = response_bytes
+
+    def __getattr__(self, name: str) -> Any:
+        if name == "_inner":
+            raise AttributeError(name)
+        return getattr(self._inner, name)
+
+
+__all__ = ["AgentTracer", "RunStore", "RunTrace", "TracedModel"]
@@ -2,9 +2,24 @@
 
 from __future__ import annotations
 
+import json
+import re
 from datetime import date, datetime
 from decimal import Decimal
-from typing import Any
+from typing import Any, Iterable
+from uuid import UUID
+
+from psycopg.adapt import AdaptersMap, Loader
+from psycopg.types.datetime import DateLoader, TimestampLoader, TimestamptzLoader
+from psycopg.types.numeric import FloatLoader
+from psycopg.types.string import TextLoader
+
+try:  # Optional fast encoder; the stdlib path produces the same JSON.
+    import orjson
+except ImportError:  # pragma: no cover - depends on the environment
+    orjson = None
+
+JSON_ENCODER = "orjson" if orjson is not None else "json"
 
 
 def serialize_value(value: Any) -> Any:
@@ -15,6 +30,9 @@ def serialize_value(value: Any) -> Any:
     if isinstance(value, (datetime, date)):
         return value.isoformat()
 
+    if isinstance(value, UUID):
+        return str(value)
+
     if isinstance(value, list):
         return [serialize_value(item) for item in value]
 
@@ -32,3 +50,95 @@ def serialize_row(row: dict) -> dict:
 def serialize_rows(rows: list[dict]) -> list[dict]:
     """Serialise a list of database rows."""
     return [serialize_row(row) for row in rows]
+
+
+# --- Fetch-time conversion ------------------------------------------------------
+#
+# Rows fetched through `Database.fetch_*_json` are converted while psycopg parses the
+# wire format, so they are JSON-ready without a second walk: numeric -> float,
+# date/timestamp(tz) -> ISO-8601 string, uuid -> str. jsonb already loads as Python
+# objects.
+
+_ISO_TS = re.compile(rb"^\d{4}-\d{2}-\d{2}[ T]\d{2}:\d{2}:\d{2}(\.\d+)?([+-]\d{2}(:\d{2}){0,2})?$")
+
+
+class _IsoTimestampLoader(Loader):
+    """Load timestamp/timestamptz text as an ISO-8601 string."""
+
+    fallback: type[Loader] = TimestampLoader
+
+    def __init__(self, oid: int, context: Any = None) -> None:
+        super().__init__(oid, context)
+        self._fallback = self.fallback(oid, context)
+
+    def load(self, data: Any) -> str:
+        raw = bytes(data)
+        if not _ISO_TS.match(raw):
+            # Non-ISO DateStyle or +/-infinity: parse normally, then format.
+            try:
+                return self._fallback.load(data).isoformat()
+            except Exception:  # noqa: BLE001
+                return raw.decode()
+        text = raw.decode()
+        text = text[:10] + "T" + text[11:]
+        sign = max(text.rfind("+"), text.rfind("-", 19))
+        if sign > 18 and len(text) - sign == 3:
+            text += ":00"
+        return text
+
+
+class _IsoTimestamptzLoader(_IsoTimestampLoader):
+    fallback = TimestamptzLoader
+
+
+class _IsoDateLoader(Loader):
+    def __init__(self, oid: int, context: Any = None) -> None:
+        super().__init__(oid, context)
+        self._fallback = DateLoader(oid, context)
+
+    def load(self, data: Any) -> str:
+        raw = bytes(data)
+        if len(raw) == 10 and raw[4:5] == b"-":
+            return raw.decode()
+        try:
+            return self._fallback.load(data).isoformat()
+        except Exception:  # noqa: BLE001
+            return raw.decode()
+
+
+def configure_json_loaders(adapters: AdaptersMap) -> None:
+    """Register loaders that return JSON-ready Python values on `adapters`."""
+    adapters.register_loader("numeric", FloatLoader)
+    adapters.register_loader("uuid", TextLoader)
+    adapters.register_loader("date", _IsoDateLoader)
+    adapters.register_loader("timestamp", _IsoTimestampLoader)
+    adapters.register_loader("timestamptz", _IsoTimestamptzLoader)
+
+
+def decode_json_columns(rows: Iterable[dict], *columns: str) -> None:
+    """Parse JSON stored as text in `columns` in place; jsonb values are left untouched."""
+    for row in rows:
+        for column in columns:
+            value = row.get(column)
+            if isinstance(value, str):
+                try:
+                    row[column] = json.loads(value)
+                except json.JSONDecodeError:
+                    pass
+
+
+# --- Encoding -------------------------------------------------------------------
+
+
+def _json_default(value: Any) -> Any:
+    converted = serialize_value(value)
+    if converted is value:
+        raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+    return converted
+
+
+def dumps_bytes(payload: Any) -> bytes:
+    """Encode `payload` to compact JSON bytes, using orjson when installed."""
+    if orjson is not None:
+        return orjson.dumps(payload, default=_json_default, option=orjson.OPT_NON_STR_KEYS)
+    return json.dumps(payload, default=_json_default, separators=(",", ":"), ensure_ascii=False).encode()
@@ -0,0 +1,420 @@
+"""Write-behind event log for ticket lifecycle, alert acknowledgement and waste events.
+
+With ``WRITE_BEHIND_ENABLED=1`` the ``start_ticket``, ``pass_ticket``, ``ack_alert``
+and ``log_waste`` tools append an event to a local SQLite database (WAL,
+``synchronous=FULL``, so every append is fsync'd) and return at once. A background
+flusher reads the log in order and group-commits up to ``batch_size`` events per
+Postgres transaction:
+
+* every event carries a UUID idempotency key recorded in ``write_behind_events`` in
+  the same transaction, so replaying a batch after a crash between the Postgres
+  commit and the local delete applies nothing twice;
+* events are applied in append order by a single thread, which preserves ordering
+  per ticket (a start is never applied after the pass that followed it);
+* timestamps come from the event, not the flush, so ``started_at`` / ``completed_at``
+  / ``occurred_at`` match what staff saw;
+* an event Postgres rejects (unknown location, bad reason) is moved to
+  ``dead_events`` in the local file instead of blocking the log; connection errors
+  leave the batch in place and are retried with backoff.
+
+Pending ticket states are kept in memory (rebuilt from the file on start) and laid
+over ticket reads, so a client sees its own writes before they reach Postgres.
+"""
+
+from __future__ import annotations
+
+import json
+import logging
+import sqlite3
+import threading
+import time
+import uuid
+from datetime import datetime, timezone
+from typing import Any, Callable, Iterable
+
+import psycopg
+
+from .db import Database
+from .metrics import WRITE_BEHIND_BATCH_EVENTS, WRITE_BEHIND_FLUSH_SECONDS
+
+LOGGER = logging.getLogger(__name__)
+
+TicketListener = Callable[[dict[str, Any]], None]
+
+LOCAL_SCHEMA = """
+CREATE TABLE IF NOT EXISTS events (
+    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+    event_id TEXT NOT NULL UNIQUE,
+    kind TEXT NOT NULL,
+    entity_id TEXT NOT NULL,
+    payload TEXT NOT NULL,
+    created_at TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS dead_events (
+    seq INTEGER PRIMARY KEY,
+    event_id TEXT NOT NULL,
+    kind TEXT NOT NULL,
+    entity_id TEXT NOT NULL,
+    payload TEXT NOT NULL,
+    created_at TEXT NOT NULL,
+    error TEXT NOT NULL,
+    failed_at TEXT NOT NULL
+);
+"""
+
+INSTALL_SQL = """
+CREATE TABLE IF NOT EXISTS write_behind_events (
+  event_id UUID PRIMARY KEY,
+  kind TEXT NOT NULL,
+  applied_at TIMESTAMPTZ NOT NULL DEFAULT now()
+)
+"""
+
+PRUNE_SQL = "DELETE FROM write_behind_events WHERE applied_at < now() - make_interval(days => %s)"
+
+CLAIM_SQL = """
+INSERT INTO write_behind_events (event_id, kind)
+SELECT * FROM unnest(%s::uuid[], %s::text[])
+ON CONFLICT (event_id) DO NOTHING
+RETURNING event_id
+"""
+
+# Keyed by event kind; parameters are the event payload plus its `event_id` and timestamp `at`.
+# Waste rows reuse the event id as their primary key, so the tool can return it up front.
+APPLY_SQL: dict[str, str] = {
+    "ticket_start": """
+        UPDATE kds_tickets
+        SET status = 'firing', started_at = COALESCE(started_at, %(at)s::timestamptz)
+        WHERE id = %(ticket_id)s
+        RETURNING id, station_id, status, priority_score, priority_reason, enqueued_at, started_at
+    """,
+    "ticket_pass": """
+        UPDATE kds_tickets
+        SET status = 'passed', completed_at = %(at)s::timestamptz
+        WHERE id = %(ticket_id)s
+        RETURNING id, station_id, status, priority_score, priority_reason, enqueued_at, completed_at
+    """,
+    "alert_ack": """
+        UPDATE alerts
+        SET acknowledged_at = COALESCE(acknowledged_at, %(at)s::timestamptz)
+        WHERE id = %(alert_id)s
+        RETURNING id
+    """,
+    "waste": """
+        INSERT INTO waste_events (id, location_id, menu_item_id, ingredient_id, qty, reason, occurred_at)
+        VALUES (%(event_id)s, %(location_id)s, %(menu_item_id)s, %(ingredient_id)s, %(qty)s, %(reason)s,
+                %(at)s::timestamptz)
+        ON CONFLICT (id) DO NOTHING
+        RETURNING id
+    """,
+}
+
+_TICKET_STATES = {"ticket_start": ("firing", "started_at"), "ticket_pass": ("passed", "completed_at")}
+_UUID_FIELDS = ("ticket_id", "alert_id", "location_id", "menu_item_id", "ingredient_id")
+
+
+def _now_iso() -> str:
+    return datetime.now(timezone.utc).isoformat()
+
+
+def _key(entity_id: Any) -> str:
+    """Canonical id text, so ids from callers and UUIDs from Postgres compare equal."""
+    try:
+        return str(uuid.UUID(str(entity_id)))
+    except ValueError:
+        return str(entity_id)
+
+
+def install_write_behind(db: Database, retention_days: int = 7) -> int:
+    """Create the idempotency table and prune keys older than `retention_days`."""
+    with db.transaction() as cur:
+        cur.execute(INSTALL_SQL)
+        cur.execute(PRUNE_SQL, (retention_days,))
+        return cur.rowcount
+
+
+class WriteBehindLog:
+    """Durable local event queue plus the background flusher that drains it into Postgres."""
+
+    def __init__(self, db: Database, path: str, batch_size: int = 200, flush_interval: float = 0.05) -> None:
+        self._db = db
+        self._path = path
+        self._batch_size = max(1, batch_size)
+        self._flush_interval = flush_interval
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+        self._listeners: list[TicketListener] = []
+
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=FULL")
+        self._conn.executescript(LOCAL_SCHEMA)
+
+        # ticket_id -> (last seq, pending fields) for read-your-writes.
+        self._tickets: dict[str, tuple[int, dict[str, Any]]] = {}
+        self._pending = 0
+        self._stats = {
+            "appended": 0,
+            "flushed": 0,
+            "duplicates": 0,
+            "missing": 0,
+            "dead": 0,
+            "batches": 0,
+            "errors": 0,
+        }
+        self._replay()
+
+    # --- local log --------------------------------------------------------------
+
+    def _replay(self) -> None:
+        """Rebuild the pending ticket overlay from events not yet flushed."""
+        rows = self._conn.execute("SELECT seq, kind, entity_id, created_at FROM events ORDER BY seq").fetchall()
+        with self._lock:
+            for row in rows:
+                self._track(row["seq"], row["kind"], row["entity_id"], row["created_at"])
+            self._pending = len(rows)
+        if rows:
+            LOGGER.info("Replaying %s write-behind events from %s", len(rows), self._path)
+
+    def _track(self, seq: int, kind: str, entity_id: str, at: str) -> None:
+        state = _TICKET_STATES.get(kind)
+        if state is None:
+            return
+        status, column = state
+        fields = dict(self._tickets.get(entity_id, (0, {}))[1])
+        fields.update({"status": status, column: at})
+        self._tickets[entity_id] = (seq, fields)
+
+    def append(self, kind: str, entity_id: str, payload: dict[str, Any]) -> dict[str, Any]:
+        """Durably queue one event; returns its ``event_id`` and timestamp ``at``.
+
+        Raises `ValueError` for unknown kinds or malformed ids, which would otherwise
+        only fail at flush time.
+        """
+        if kind not in APPLY_SQL:
+            raise ValueError(f"Unknown write-behind event kind '{kind}'")
+        for field in _UUID_FIELDS:
+            if payload.get(field) is not None:
+                try:
+                    uuid.UUID(str(payload[field]))
+                except ValueError as exc:
+                    raise ValueError(f"Invalid {field}: {payload[field]}") from exc
+        event_id = str(uuid.uuid4())
+        at = _now_iso()
+        body = json.dumps({**payload, "event_id": event_id, "at": at}, default=str)
+        with self._lock:
+            cursor = self._conn.execute(
+                "INSERT INTO events (event_id, kind, entity_id, payload, created_at) VALUES (?, ?, ?, ?, ?)",
+                (event_id, kind, _key(entity_id), body, at),
+            )
+            self._track(cursor.lastrowid, kind, _key(entity_id), at)
+            self._pending += 1
+            self._stats["appended"] += 1
+            full = self._pending >= self._batch_size
+        if full:
+            self._wake.set()
+        return {"event_id": event_id, "at": at}
+
+    # --- read-your-writes -------------------------------------------------------
+
+    def pending_ticket(self, ticket_id: str) -> dict[str, Any] | None:
+        with self._lock:
+            entry = self._tickets.get(_key(ticket_id))
+        return dict(entry[1]) if entry is not None else None
+
+    def pending_tickets(self) -> int:
+        with self._lock:
+            return len(self._tickets)
+
+    def overlay_tickets(self, rows: Iterable[dict[str, Any]], id_key: str = "ticket_id") -> list[dict[str, Any]]:
+        """Apply pending states to queue rows; tickets with a pending pass are dropped."""
+        with self._lock:
+            if not self._tickets:
+                return list(rows)
+            pending = {ticket_id: fields for ticket_id, (_, fields) in self._tickets.items()}
+        merged: list[dict[str, Any]] = []
+        for row in rows:
+            fields = pending.get(_key(row[id_key]))
+            if fields is None:
+                merged.append(row)
+            elif fields["status"] != "passed":
+                merged.append({**row, "status": fields["status"], "pending": True})
+        return merged
+
+    def settle(self, ticket_ids: Iterable[str]) -> None:
+        """Flush now if any of `ticket_ids` has a pending event.
+
+        Synchronous ticket writes (holds, batch transitions) call this first so they
+        cannot land before an earlier queued start or pass of the same ticket.
+        """
+        with self._lock:
+            pending = any(_key(ticket_id) in self._tickets for ticket_id in ticket_ids)
+        if pending:
+            self.flush()
+
+    def add_listener(self, listener: TicketListener) -> None:
+        """Call `listener(row)` with each ticket row once its event is committed to Postgres."""
+        self._listeners.append(listener)
+
+    # --- flushing ---------------------------------------------------------------
+
+    def _apply(self, cur: Any, kind: str, params: dict[str, Any]) -> dict[str, Any] | None:
+        cur.execute(APPLY_SQL[kind], params)
+        return cur.fetchone()
+
+    def _apply_batch(self, cur: Any, events: list[sqlite3.Row], isolate: bool) -> tuple[list, list, int, int]:
+        """Apply `events` in order; returns (ticket rows, dead events, missing, duplicates)."""
+        cur.execute(CLAIM_SQL, ([event["event_id"] for event in events], [event["kind"] for event in events]))
+        fresh = {str(row["event_id"]) for row in cur.fetchall()}
+        ticket_rows: list[dict[str, Any]] = []
+        dead: list[tuple[sqlite3.Row, str]] = []
+        missing = 0
+        for event in events:
+            if event["event_id"] not in fresh:
+                continue
+            params = json.loads(event["payload"])
+            if isolate:
+                cur.execute("SAVEPOINT write_behind_event")
+                try:
+                    row = self._apply(cur, event["kind"], params)
+                except psycopg.OperationalError:
+                    raise
+                except psycopg.Error as exc:
+                    cur.execute("ROLLBACK TO SAVEPOINT write_behind_event")
+                    dead.append((event, f"{type(exc).__name__}: {exc}"))
+                    continue
+                cur.execute("RELEASE SAVEPOINT write_behind_event")
+            else:
+                row = self._apply(cur, event["kind"], params)
+            if row is None:
+                missing += 1
+            elif event["kind"] in _TICKET_STATES:
+                ticket_rows.append(row)
+        return ticket_rows, dead, missing, len(events) - len(fresh)
+
+    def flush_once(self) -> int:
+        """Group-commit the oldest batch; returns how many events left the local log."""
+        with self._flush_lock:
+            with self._lock:
+                events = self._conn.execute(
+                    "SELECT seq, event_id, kind, entity_id, payload, created_at FROM events ORDER BY seq LIMIT ?",
+                    (self._batch_size,),
+                ).fetchall()
+            if not events:
+                return 0
+            started = time.perf_counter()
+            outcome = "commit"
+            try:
+                try:
+                    with self._db.transaction() as cur:
+                        ticket_rows, dead, missing, duplicates = self._apply_batch(cur, events, isolate=False)
+                except psycopg.OperationalError:
+                    raise
+                except psycopg.Error:
+                    # One bad event; redo the batch with a savepoint per event to isolate it.
+                    LOGGER.warning("Write-behind batch rejected; retrying event by event", exc_info=True)
+                    outcome = "partial"
+                    with self._db.transaction() as cur:
+                        ticket_rows, dead, missing, duplicates = self._apply_batch(cur, events, isolate=True)
+            except Exception:
+                WRITE_BEHIND_FLUSH_SECONDS.observe(time.perf_counter() - started, outcome="error")
+                raise
+            WRITE_BEHIND_FLUSH_SECONDS.observe(time.perf_counter() - started, outcome=outcome)
+            WRITE_BEHIND_BATCH_EVENTS.observe(len(events))
+
+            last_seq = events[-1]["seq"]
+            with self._lock:
+                failed_at = _now_iso()
+                self._conn.execute("BEGIN")
+                self._conn.executemany(
+                    "INSERT OR REPLACE INTO dead_events VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                    [(*tuple(event), error, failed_at) for event, error in dead],
+                )
+                self._conn.execute("DELETE FROM events WHERE seq <= ?", (last_seq,))
+                self._conn.execute("COMMIT")
+                self._tickets = {
+                    ticket_id: entry for ticket_id, entry in self._tickets.items() if entry[0] > last_seq
+                }
+                self._pending = max(0, self._pending - len(events))
+                self._stats["flushed"] += len(events) - len(dead)
+                self._stats["dead"] += len(dead)
+                self._stats["missing"] += missing
+                self._stats["duplicates"] += duplicates
+                self._stats["batches"] += 1
+            for event, error in dead:
+                LOGGER.error(
+                    "Write-behind event dead-lettered | kind=%s id=%s error=%s", event["kind"], event["entity_id"], error
+                )
+            for row in ticket_rows:
+                for listener in self._listeners:
+                    try:
+                        listener(row)
+                    except Exception:  # noqa: BLE001
+                        LOGGER.exception("Write-behind listener failed")
+            return len(events)
+
+    def flush(self) -> int:
+        """Drain everything currently in the log; returns the number of events handled."""
+        total = 0
+        while True:
+            handled = self.flush_once()
+            total += handled
+            if handled < self._batch_size:
+                return total
+
+    def _run(self) -> None:
+        backoff = self._flush_interval
+        while not self._stop.is_set():
+            # Waiting here is the group-commit window; a full batch wakes the flusher early.
+            self._wake.wait(backoff)
+            self._wake.clear()
+            try:
+                self.flush()
+                backoff = self._flush_interval
+            except Exception:  # noqa: BLE001
+                self._stats["errors"] += 1
+                backoff = min(max(backoff * 2, 0.5), 30.0)
+                LOGGER.exception("Write-behind flush failed; retrying in %.2fs", backoff)
+
+    def start(self) -> None:
+        if self._thread is not None:
+            return
+        install_write_behind(self._db)
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="write-behind", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float = 10.0) -> None:
+        """Stop the flusher and try to drain what is left; anything unflushed is replayed on restart."""
+        self._stop.set()
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join(timeout=timeout)
+            self._thread = None
+        try:
+            self.flush()
+        except Exception:  # noqa: BLE001
+            LOGGER.warning("Write-behind drain on shutdown failed; %s events kept in %s", self._pending, self._path)
+        with self._lock:
+            self._conn.close()
+
+    def stats(self) -> dict[str, Any]:
+        with self._lock:
+            oldest = self._conn.execute("SELECT min(created_at) AS at FROM events").fetchone()["at"]
+            dead = self._conn.execute("SELECT count(*) AS n FROM dead_events").fetchone()["n"]
+            stats: dict[str, Any] = dict(self._stats)
+            stats["pending"] = self._pending
+            stats["pending_tickets"] = len(self._tickets)
+        stats["dead_letters"] = dead
+        stats["oldest_pending_at"] = oldest
+        stats["running"] = self._thread is not None
+        stats["path"] = self._path
+        stats["batch_size"] = self._batch_size
+        return stats
+
+
+__all__ = ["APPLY_SQL", "WriteBehindLog", "install_write_behind"]
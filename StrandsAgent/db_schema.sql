@@ -42,7 +42,8 @@ CREATE TABLE stations (
   location_id UUID NOT NULL REFERENCES locations(id) ON DELETE CASCADE,
   name TEXT NOT NULL,             -- e.g., "Maki", "Grill", "Expedite"
   kind TEXT NOT NULL CHECK (kind IN ('prep','cook','expedite','bar','dessert')),
-  is_active BOOLEAN NOT NULL DEFAULT TRUE
+  is_active BOOLEAN NOT NULL DEFAULT TRUE,
+  max_capacity INT CHECK (max_capacity > 0)  -- Smart Queue portions per batch card
 );
 
 CREATE TABLE station_sla (
@@ -221,6 +222,7 @@ CREATE TABLE order_item_status_history (
   changed_at TIMESTAMPTZ NOT NULL DEFAULT now(),
   reason TEXT
 );
+CREATE INDEX idx_order_item_status_history_item ON order_item_status_history(order_item_id, changed_at);
 
 -- One KDS ticket per station step for a given order item
 CREATE TABLE kds_tickets (
@@ -237,6 +239,15 @@ CREATE TABLE kds_tickets (
   completed_at TIMESTAMPTZ
 );
 CREATE INDEX idx_kds_station_priority ON kds_tickets(station_id, status, priority_score DESC);
+CREATE INDEX idx_kds_tickets_order_item ON kds_tickets(order_item_id);
+
+-- Ticket events replayed from the write-behind log (app/write_behind.py, `write-behind install`):
+-- ids already applied, so a replay after a crash or reconnect is idempotent
+CREATE TABLE write_behind_events (
+  event_id UUID PRIMARY KEY,
+  kind TEXT NOT NULL,
+  applied_at TIMESTAMPTZ NOT NULL DEFAULT now()
+);
 
 -- =========
 -- Forecasts & prep plans (pre-dining recommendations)
@@ -256,6 +267,25 @@ CREATE TABLE demand_forecasts (
 );
 CREATE INDEX idx_forecast_lookup ON demand_forecasts(location_id, bucket_start, bucket_end);
 
+-- Demand forecaster state (app/forecasting.py): weekday x time-bucket profiles per location,
+-- decayed as days close; the forecaster writes demand_forecasts from them
+CREATE TABLE demand_profiles (
+  location_id UUID NOT NULL REFERENCES locations(id) ON DELETE CASCADE,
+  menu_item_id UUID NOT NULL REFERENCES menu_items(id) ON DELETE CASCADE,
+  dow SMALLINT NOT NULL CHECK (dow BETWEEN 0 AND 6),  -- 0 = Monday
+  qty DOUBLE PRECISION[] NOT NULL,                    -- decayed qty per time bucket
+  updated_at TIMESTAMPTZ NOT NULL DEFAULT now(),
+  PRIMARY KEY (location_id, menu_item_id, dow)
+);
+CREATE TABLE demand_profile_state (
+  location_id UUID PRIMARY KEY REFERENCES locations(id) ON DELETE CASCADE,
+  dow_weight DOUBLE PRECISION[] NOT NULL,  -- decayed count of closed days per weekday
+  closed_through DATE NOT NULL,            -- last local day folded into the profiles
+  forecast_through DATE,                   -- last local day written to demand_forecasts
+  bucket_minutes INT NOT NULL,
+  updated_at TIMESTAMPTZ NOT NULL DEFAULT now()
+);
+
 -- Pre-dining prep plan output by the model
 CREATE TABLE prep_plans (
   id UUID PRIMARY KEY DEFAULT gen_random_uuid(),
@@ -340,6 +370,8 @@ CREATE TABLE alerts (
   ack_user_id UUID REFERENCES users(id) ON DELETE SET NULL
 );
 CREATE INDEX idx_alerts_kind_time ON alerts(kind, detected_at DESC);
+-- Breach detector dedupe: at most one alert per ticket and severity, across processes
+CREATE UNIQUE INDEX idx_alerts_wait_sla_ticket ON alerts ((entity->>'ticket_id'), severity) WHERE kind = 'wait_sla_breach';
 
 -- =========
 -- Analytics snapshots (optional but handy)
@@ -364,6 +396,46 @@ CREATE INDEX idx_order_items_status ON order_items(status, created_at);
 CREATE INDEX idx_kds_status_time ON kds_tickets(status, enqueued_at);
 CREATE INDEX idx_inventory_levels_par ON inventory_levels(location_id, ingredient_id);
 
+-- =========
+-- Learned models & background job state
+-- (the owning modules also create these with IF NOT EXISTS on install/start)
+-- =========
+-- Prep-time learner (app/prep_times.py): decayed stats per item, station and local daypart
+CREATE TABLE prep_time_stats (
+  menu_item_id UUID NOT NULL REFERENCES menu_items(id) ON DELETE CASCADE,
+  station_id UUID NOT NULL REFERENCES stations(id) ON DELETE CASCADE,
+  daypart TEXT NOT NULL,
+  observations BIGINT NOT NULL,
+  weight DOUBLE PRECISION NOT NULL,     -- decayed observation count
+  sum_s DOUBLE PRECISION NOT NULL,      -- decayed sum of prep seconds
+  sum_sq DOUBLE PRECISION NOT NULL,     -- decayed sum of squared prep seconds
+  hist DOUBLE PRECISION[] NOT NULL,     -- decayed counts per log-spaced bin
+  last_completed_at TIMESTAMPTZ,
+  updated_at TIMESTAMPTZ NOT NULL DEFAULT now(),
+  PRIMARY KEY (menu_item_id, station_id, daypart)
+);
+-- Keyset position (completed_at, ticket id) of the last ticket folded in
+CREATE TABLE prep_time_watermarks (
+  name TEXT PRIMARY KEY,
+  completed_at TIMESTAMPTZ NOT NULL,
+  ticket_id UUID NOT NULL,
+  updated_at TIMESTAMPTZ NOT NULL DEFAULT now()
+);
+CREATE INDEX idx_kds_tickets_passed_completed ON kds_tickets(completed_at, id) WHERE status = 'passed';
+
+-- Smart Queue (app/smart_queue.py): lead batch card per station and group, shared by API workers
+CREATE TABLE station_batch_leads (
+  station_id UUID NOT NULL REFERENCES stations(id) ON DELETE CASCADE,
+  group_key TEXT NOT NULL,               -- JSON [menu_item_id, note, source, route_sequence]
+  card_key TEXT NOT NULL,                -- first ticket id on the card and its card index
+  created_at DOUBLE PRECISION NOT NULL,  -- epoch the first ticket's order was placed
+  lead_since DOUBLE PRECISION NOT NULL,  -- epoch the card became lead (merge window start)
+  started BOOLEAN NOT NULL DEFAULT false,
+  entries JSONB NOT NULL,                -- ticket_id -> portions on the lead card
+  updated_at TIMESTAMPTZ NOT NULL DEFAULT now(),
+  PRIMARY KEY (station_id, group_key)
+);
+
 -- =========
 -- Views (examples)
 -- =========
@@ -393,4 +465,4 @@ FROM kds_tickets kt
 JOIN order_items oi ON oi.id = kt.order_item_id
 WHERE kt.status IN ('queued','firing','prepping')
   AND kt.sla_minutes IS NOT NULL
-  AND (now() - COALESCE(oi.started_at, oi.created_at)) > (kt.sla_minutes || ' minutes')::INTERVAL;
\ No newline at end of file
+  AND (now() - COALESCE(oi.started_at, oi.created_at)) > (kt.sla_minutes || ' minutes')::INTERVAL;
@@ -6,12 +6,30 @@ import argparse
 import json
 import logging
 import sys
+import time
+import urllib.request
+from datetime import date, datetime
 from typing import Any
 
 from app.agents import AgentRegistry
+from app.benchmarks import BENCHMARKS
+from app.breaches import BreachDetector, install_breach_detector
+from app.changefeed import ChangeFeed, install_change_feed, uninstall_change_feed
 from app.config import get_settings
 from app.db import Database
-from app.seed_data import seed_demo_data
+from app.fast_path import FastPathRouter
+from app.forecasting import ensure_forecast_schema, forecast_chain
+from app.metrics import METRICS, format_snapshot
+from app.prep_times import PrepTimeModel, ensure_prep_time_schema, fetch_estimates, learn, predict
+from app.response_cache import install_response_cache
+from app.seed_data import LOCATION_ID, seed_demo_data
+from app.scoring import PriorityScorer
+from app.shopping import refresh_usage_rollup, verify_usage_rollup
+from app.simulator import SimulationConfig, simulate
+from app.smart_queue import ensure_smart_queue_schema
+from app.station_index import StationQueueIndex
+from app.synthetic_data import SyntheticDataConfig, generate_synthetic_data
+from app.write_behind import WriteBehindLog, install_write_behind
 
 
 def configure_logging(level: str) -> None:
@@ -81,14 +99,157 @@ def run() -> None:
     run_parser = subparsers.add_parser("run", help="Invoke an agent with a prompt")
     run_parser.add_argument("agent", help="Agent name")
     run_parser.add_argument("prompt", help="User prompt to send")
+    run_parser.add_argument("--stats", action="store_true", help="Print per-tool and DB timings afterwards")
+    run_parser.add_argument("--trace", action="store_true", help="Print the run trace (model/tool spans) as JSON")
+    run_parser.add_argument(
+        "--llm", action="store_true", help="Always ask the model, even when a fast-path rule matches the prompt"
+    )
 
     tool_parser = subparsers.add_parser("tool", help="Call an agent tool directly")
     tool_parser.add_argument("agent", help="Agent name")
     tool_parser.add_argument("tool_name", help="Tool method name (snake_case)")
     tool_parser.add_argument("--payload", help="JSON payload forwarded to the tool", default=None)
+    tool_parser.add_argument("--stats", action="store_true", help="Print per-tool and DB timings afterwards")
+
+    stats_parser = subparsers.add_parser("stats", help="Summarise tool and DB latency metrics of a running API")
+    stats_parser.add_argument("--url", default="http://127.0.0.1:8000", help="Base URL of the kitchen agents API")
+    stats_parser.add_argument("--json", action="store_true", help="Print the raw JSON snapshot")
 
     subparsers.add_parser("seed", help="Insert demo data to exercise the agents")
 
+    bulk_parser = subparsers.add_parser(
+        "seed-bulk", help="COPY a deterministic synthetic estate (orders, tickets, forecasts) for load tests"
+    )
+    bulk_parser.add_argument("--seed", type=int, default=1, help="Seed for ids and values; same seed, same data")
+    bulk_parser.add_argument("--orgs", type=int, default=1, help="Organisations to create")
+    bulk_parser.add_argument("--locations", type=int, default=4, help="Locations per organisation")
+    bulk_parser.add_argument("--stations", type=int, default=5, help="Stations per location")
+    bulk_parser.add_argument("--menu-items", type=int, default=2000, help="Menu items per organisation")
+    bulk_parser.add_argument("--ingredients", type=int, default=1500, help="Ingredients per organisation")
+    bulk_parser.add_argument("--order-items", type=int, default=1_000_000, help="Approximate order items in history")
+    bulk_parser.add_argument("--start", default="2025-01-01", help="First local day of order history")
+    bulk_parser.add_argument("--days", type=int, default=90, help="Days of order history")
+    bulk_parser.add_argument("--open-orders", type=int, default=40, help="In-progress orders per location")
+    bulk_parser.add_argument("--forecast-days", type=int, default=2, help="Days of hourly forecasts after history")
+    bulk_parser.add_argument("--chunk-rows", type=int, default=50_000, help="Order items per COPY chunk")
+    bulk_parser.add_argument("--replace", action="store_true", help="Delete data previously generated for this seed")
+    bulk_parser.add_argument(
+        "--keep-triggers", action="store_true", help="Leave change-feed triggers enabled during the load"
+    )
+    bulk_parser.add_argument(
+        "--keep-indexes",
+        action="store_true",
+        help="Maintain secondary indexes and foreign keys row by row instead of rebuilding them after the load",
+    )
+
+    batch_parser = subparsers.add_parser("plan-batch", help="Generate prep plans for many locations and windows")
+    batch_parser.add_argument(
+        "--window",
+        nargs=2,
+        action="append",
+        metavar=("START", "END"),
+        required=True,
+        help="ISO-8601 window; repeat for lunch, dinner, ...",
+    )
+    batch_parser.add_argument(
+        "--location",
+        action="append",
+        dest="locations",
+        default=None,
+        help="Location id; repeat for several. Omit to plan every location.",
+    )
+    batch_parser.add_argument("--workers", type=int, default=4, help="Locations planned in parallel")
+
+    rollup_parser = subparsers.add_parser("usage-rollup", help="Maintain the daily usage rollup for shopping lists")
+    rollup_parser.add_argument("action", choices=["refresh", "check"], help="Refresh the rollup or verify it")
+    rollup_parser.add_argument("--full", action="store_true", help="Rebuild every closed day (refresh only)")
+    rollup_parser.add_argument("--settle-days", type=int, default=2, help="Trailing closed days always recomputed")
+    rollup_parser.add_argument("--days", type=int, default=30, help="Lookback window to verify (check only)")
+
+    detector_parser = subparsers.add_parser("breach-detector", help="Run the SLA breach detector in the foreground")
+    detector_parser.add_argument(
+        "action", nargs="?", choices=["run", "install"], default="run", help="Run the detector or install its index"
+    )
+    detector_parser.add_argument("--location", default=None, help="Only watch tickets for this location")
+    detector_parser.add_argument("--stats-every", type=float, default=60.0, help="Seconds between stats log lines")
+
+    feed_parser = subparsers.add_parser("change-feed", help="Install or watch the LISTEN/NOTIFY change feed")
+    feed_parser.add_argument(
+        "action", choices=["install", "uninstall", "watch"], help="Install or drop triggers, or run the listener"
+    )
+    feed_parser.add_argument("--stats-every", type=float, default=10.0, help="Seconds between stats log lines")
+
+    index_parser = subparsers.add_parser(
+        "station-index", help="Check the in-process station queue index against SQL"
+    )
+    index_parser.add_argument("action", choices=["check"], help="Compare index top-K with the SQL ordering")
+    index_parser.add_argument(
+        "--station", action="append", dest="stations", default=None, help="Station id; repeat for several"
+    )
+    index_parser.add_argument("--limit", type=int, default=20, help="Tickets compared per station")
+
+    score_parser = subparsers.add_parser("score", help="Recompute priority scores for active tickets")
+    score_parser.add_argument("--location", default=None, help="Only score this location (default: all)")
+    score_parser.add_argument("--loop", action="store_true", help="Keep rescoring on PRIORITY_SCORER_INTERVAL")
+
+    prep_time_parser = subparsers.add_parser("prep-times", help="Learn prep times from passed tickets")
+    prep_time_parser.add_argument(
+        "action", choices=["learn", "show"], help="Fold new history in and write predictions, or print estimates"
+    )
+    prep_time_parser.add_argument("--full", action="store_true", help="Discard learned stats and replay history")
+    prep_time_parser.add_argument("--since", default=None, help="ISO timestamp; only replay tickets passed after it")
+    prep_time_parser.add_argument("--item", default=None, help="Menu item id (show only)")
+    prep_time_parser.add_argument("--station", default=None, help="Station id (show only)")
+
+    forecast_parser = subparsers.add_parser("forecast", help="Build seasonal demand forecasts from order history")
+    forecast_parser.add_argument(
+        "action", choices=["install", "run"], help="Create the profile tables, or fold closed days in and forecast"
+    )
+    forecast_parser.add_argument("--full", action="store_true", help="Discard profiles and rebuild from history")
+    forecast_parser.add_argument(
+        "--location", action="append", default=None, help="Location id (repeatable; default: all locations)"
+    )
+    forecast_parser.add_argument(
+        "--workers", type=int, default=None, help="Worker processes (default FORECAST_WORKERS)"
+    )
+
+    cache_parser = subparsers.add_parser("response-cache", help="Agent response cache utilities")
+    cache_parser.add_argument("action", choices=["install"], help="Install the table-change notify triggers")
+
+    wb_parser = subparsers.add_parser("write-behind", help="Write-behind event log utilities")
+    wb_parser.add_argument(
+        "action",
+        choices=["install", "status", "flush"],
+        help="Create the idempotency table, print log stats, or drain WRITE_BEHIND_PATH into Postgres",
+    )
+
+    smart_parser = subparsers.add_parser("smart-queue", help="Smart Queue batching utilities")
+    smart_parser.add_argument("action", choices=["install", "show"], help="Add stations.max_capacity or print cards")
+    smart_parser.add_argument("--station", default=None, help="Station id (show only)")
+
+    sim_parser = subparsers.add_parser(
+        "simulate", help="Drive the kitchen tools with a simulated order stream (no Bedrock needed)"
+    )
+    sim_parser.add_argument("--location", default=LOCATION_ID, help="Location whose routed menu is simulated")
+    sim_parser.add_argument(
+        "--start", default="2025-01-10T11:30:00", help="Simulated local start time (drives daypart/weekday rates)"
+    )
+    sim_parser.add_argument("--minutes", type=float, default=60.0, help="Simulated duration")
+    sim_parser.add_argument("--orders-per-hour", type=float, default=120.0, help="Base arrival rate before multipliers")
+    sim_parser.add_argument("--cooks", type=int, default=2, help="Cooks per station")
+    sim_parser.add_argument("--kds-refresh", type=float, default=5.0, help="Seconds between KDS queue polls")
+    sim_parser.add_argument("--breach-poll", type=float, default=30.0, help="Seconds between breach polls (0 = off)")
+    sim_parser.add_argument("--sla", type=int, default=12, help="sla_minutes stamped on simulated tickets")
+    sim_parser.add_argument(
+        "--time-scale", type=float, default=0.0, help="Simulated seconds per wall second (0 = as fast as possible)"
+    )
+    sim_parser.add_argument("--seed", type=int, default=42, help="Seed for arrivals and prep times")
+    sim_parser.add_argument("--cleanup", action="store_true", help="Delete the simulated orders afterwards")
+
+    bench_parser = subparsers.add_parser("bench", help="Run a performance benchmark against the database")
+    bench_parser.add_argument("name", choices=sorted(BENCHMARKS), help="Benchmark name")
+    bench_parser.add_argument("--payload", help="JSON options forwarded to the benchmark", default=None)
+
     args = parser.parse_args()
 
     database = Database(settings.database)
@@ -99,11 +260,24 @@ def run() -> None:
             for name in registry.agent_names():
                 print(name)
         elif args.command == "run":
-            agent = registry.get_agent(args.agent)
-            logging.info("Invoking agent '%s'", args.agent)
-            result = agent(args.prompt)
-            logging.info("Agent completed with stop reason=%s", result.stop_reason)
-            print(str(result).strip())
+            if args.agent not in registry.agent_names():
+                raise SystemExit(f"Unknown agent '{args.agent}'")
+            answer = None
+            if settings.fast_path.enabled and not args.llm:
+                answer = FastPathRouter(registry.call_tool).route(args.agent, args.prompt)
+            if answer is not None:
+                logging.info("Answered by fast path | intent=%s elapsed_ms=%s", answer.intent, answer.elapsed_ms)
+                print(answer.output)
+            else:
+                agent = registry.get_agent(args.agent)
+                logging.info("Invoking agent '%s'", args.agent)
+                result, trace = registry.run(agent, args.prompt)
+                logging.info("Agent completed with stop reason=%s", result.stop_reason)
+                print(str(result).strip())
+                if args.trace and trace is not None:
+                    print(json.dumps(trace.to_dict(), indent=2, default=str), file=sys.stderr)
+            if args.stats:
+                print(format_snapshot(METRICS.snapshot()), file=sys.stderr)
         elif args.command == "tool":
             payload = _load_payload(args.payload)
             logging.info("Calling tool '%s' on agent '%s' with payload=%s", args.tool_name, args.agent, payload)
@@ -111,9 +285,199 @@ def run() -> None:
             _ = registry.get_agent(args.agent)
             result = registry.call_tool(args.tool_name, **payload)
             print(json.dumps(result, indent=2, default=str))
+            if args.stats:
+                print(format_snapshot(METRICS.snapshot()), file=sys.stderr)
+        elif args.command == "stats":
+            with urllib.request.urlopen(f"{args.url.rstrip('/')}/metrics?format=json", timeout=10) as response:
+                snapshot = json.load(response)
+            print(json.dumps(snapshot, indent=2) if args.json else format_snapshot(snapshot))
         elif args.command == "seed":
             seed_demo_data(database)
             print("Demo data seeded.")
+        elif args.command == "seed-bulk":
+            config = SyntheticDataConfig(
+                seed=args.seed,
+                orgs=args.orgs,
+                locations_per_org=args.locations,
+                stations_per_location=args.stations,
+                menu_items_per_org=args.menu_items,
+                ingredients_per_org=args.ingredients,
+                order_items=args.order_items,
+                start=date.fromisoformat(args.start),
+                days=args.days,
+                open_orders_per_location=args.open_orders,
+                forecast_days=args.forecast_days,
+                chunk_rows=args.chunk_rows,
+            )
+            try:
+                result = generate_synthetic_data(
+                    database,
+                    config,
+                    replace=args.replace,
+                    keep_triggers=args.keep_triggers,
+                    keep_indexes=args.keep_indexes,
+                )
+            except RuntimeError as exc:
+                raise SystemExit(str(exc)) from exc
+            print(json.dumps(result, indent=2, default=str))
+        elif args.command == "plan-batch":
+            windows = [{"start": start, "end": end} for start, end in args.window]
+            result = registry.call_tool(
+                "generate_prep_plans_batch",
+                windows=windows,
+                location_ids=args.locations,
+                max_workers=args.workers,
+            )
+            print(json.dumps(result, indent=2, default=str))
+        elif args.command == "usage-rollup":
+            if args.action == "refresh":
+                result = refresh_usage_rollup(database, settle_days=args.settle_days, full=args.full)
+            else:
+                result = verify_usage_rollup(database, days=args.days)
+            print(json.dumps(result, indent=2, default=str))
+            if args.action == "check" and not result["ok"]:
+                raise SystemExit(1)
+        elif args.command == "breach-detector" and args.action == "install":
+            removed = install_breach_detector(database)
+            print(f"Breach alert dedupe index installed ({removed} duplicate alerts removed).")
+        elif args.command == "breach-detector":
+            breach_settings = settings.breach_detector
+            detector = BreachDetector(
+                database,
+                location_id=args.location or breach_settings.location_id,
+                discovery_interval=breach_settings.discovery_interval,
+                resync_interval=breach_settings.resync_interval,
+            )
+            detector.start()
+            try:
+                while True:
+                    time.sleep(args.stats_every)
+                    logging.info("Breach detector stats | %s", detector.stats())
+            finally:
+                detector.stop()
+        elif args.command == "change-feed":
+            if args.action == "install":
+                install_change_feed(database)
+                print("Change feed triggers installed.")
+            elif args.action == "uninstall":
+                uninstall_change_feed(database)
+                print("Change feed triggers removed.")
+            else:
+                feed = ChangeFeed(
+                    settings.database,
+                    database,
+                    max_staleness=settings.change_feed.max_staleness,
+                    resync_interval=settings.change_feed.resync_interval,
+                )
+                feed.start()
+                try:
+                    while True:
+                        time.sleep(args.stats_every)
+                        logging.info("Change feed stats | %s", feed.stats())
+                finally:
+                    feed.stop()
+        elif args.command == "station-index":
+            stations = args.stations or [
+                str(row["id"]) for row in database.fetch_all("SELECT id FROM stations ORDER BY id")
+            ]
+            result = StationQueueIndex(database).verify(stations, limit=args.limit)
+            print(json.dumps(result, indent=2, default=str))
+            if not result["ok"]:
+                raise SystemExit(1)
+        elif args.command == "score":
+            scorer = PriorityScorer(
+                database,
+                location_id=args.location or settings.scoring.location_id,
+                interval=settings.scoring.interval,
+            )
+            if not args.loop:
+                print(json.dumps(scorer.run_once(), indent=2, default=str))
+            else:
+                scorer.start()
+                try:
+                    while True:
+                        time.sleep(settings.scoring.interval)
+                        logging.info("Priority scorer stats | %s", scorer.stats())
+                finally:
+                    scorer.stop()
+        elif args.command == "prep-times":
+            if args.action == "learn":
+                ensure_prep_time_schema(database)
+                result = learn(
+                    database,
+                    PrepTimeModel(settings.prep_times.alpha),
+                    chunk_size=settings.prep_times.chunk_size,
+                    since=datetime.fromisoformat(args.since) if args.since else None,
+                    full=args.full,
+                )
+                result.update(predict(database, settings.prep_times.min_observations))
+            else:
+                if not args.item:
+                    parser.error("prep-times show requires --item")
+                result = fetch_estimates(database, args.item, args.station)
+            print(json.dumps(result, indent=2, default=str))
+        elif args.command == "forecast":
+            ensure_forecast_schema(database)
+            if args.action == "install":
+                print("demand_profiles and demand_profile_state are available.")
+            else:
+                result = forecast_chain(
+                    database,
+                    settings.database,
+                    location_ids=args.location,
+                    workers=args.workers or settings.forecasts.workers,
+                    horizon_days=settings.forecasts.horizon_days,
+                    history_days=settings.forecasts.history_days,
+                    alpha=settings.forecasts.alpha,
+                    full=args.full,
+                )
+                print(json.dumps(result, indent=2, default=str))
+        elif args.command == "response-cache":
+            tables = install_response_cache(database)
+            print(f"Response cache triggers installed on {len(tables)} tables: {', '.join(tables)}")
+        elif args.command == "write-behind":
+            if args.action == "install":
+                pruned = install_write_behind(database)
+                print(f"write_behind_events is available ({pruned} expired keys pruned).")
+            else:
+                log = WriteBehindLog(
+                    database, settings.write_behind.path, batch_size=settings.write_behind.batch_size
+                )
+                try:
+                    if args.action == "flush":
+                        install_write_behind(database)
+                        print(f"Flushed {log.flush()} events from {settings.write_behind.path}")
+                    print(json.dumps(log.stats(), indent=2, default=str))
+                finally:
+                    log.stop()
+        elif args.command == "smart-queue":
+            if args.action == "install":
+                ensure_smart_queue_schema(database)
+                print("stations.max_capacity and station_batch_leads are available.")
+            else:
+                if not args.station:
+                    parser.error("smart-queue show requires --station")
+                result = registry.call_tool("get_station_batches", station_id=args.station)
+                print(json.dumps(result, indent=2, default=str))
+        elif args.command == "simulate":
+            config = SimulationConfig(
+                location_id=args.location,
+                start_at=datetime.fromisoformat(args.start),
+                duration_minutes=args.minutes,
+                orders_per_hour=args.orders_per_hour,
+                cooks_per_station=args.cooks,
+                kds_refresh_seconds=args.kds_refresh,
+                breach_poll_seconds=args.breach_poll,
+                sla_minutes=args.sla,
+                time_scale=args.time_scale,
+                seed=args.seed,
+            )
+            print(json.dumps(simulate(database, config, cleanup=args.cleanup), indent=2, default=str))
+        elif args.command == "bench":
+            options = _load_payload(args.payload)
+            logging.info("Running benchmark '%s' with options=%s", args.name, options)
+            result = BENCHMARKS[args.name](database, settings, **options)
+            print(json.dumps(result, indent=2, default=str))
     finally:
         database.close()
 